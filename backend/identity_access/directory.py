@@ -7,6 +7,11 @@ Why:
     minimal Keycloak Admin API calls behind simple functions that return DTOs
     without PII beyond the display name.
 
+Performance:
+    Admin tokens, resolved names and HTTP connections are cached in
+    `identity_access.directory_cache`; cache misses are fetched concurrently.
+    Member search runs against the in-process `identity_access.roster_index`.
+
 Security:
     - Uses admin credentials from environment to obtain a bearer token.
     - Do not log credentials or tokens.
@@ -14,13 +19,20 @@ Security:
 """
 from __future__ import annotations
 
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 import re
 import os
 import requests
+from identity_access import directory_cache, roster_index
 from identity_access.domain import ALLOWED_ROLES
 
 
+def _http():
+    """Pooled HTTP session for admin API GETs (keep-alive across lookups)."""
+    return directory_cache.http_session()
+
+
 class _KC:
     def __init__(self) -> None:
         self.base_url = os.getenv("KC_BASE_URL", "http://localhost:8080").rstrip("/")
@@ -34,6 +46,7 @@ class _KC:
         self.admin_username = os.getenv("KC_ADMIN_USERNAME")
         # Accept both KC_ADMIN_PASSWORD and KC_ADMIN_PASS (Makefile uses KC_ADMIN_PASS)
         self.admin_password = os.getenv("KC_ADMIN_PASSWORD") or os.getenv("KC_ADMIN_PASS")
+        self._expires_in: Optional[float] = None
 
     def token(self) -> str:
         """Obtain an admin bearer token.
@@ -72,11 +85,26 @@ class _KC:
         # Disallow redirects to avoid leaking tokens over 3xx chains
         r = requests.post(url, data=data, timeout=10, verify=verify_opt, allow_redirects=False)
         r.raise_for_status()
-        tok = (r.json() or {}).get("access_token")
+        body = r.json() or {}
+        tok = body.get("access_token")
         if not tok:
             raise RuntimeError("Keycloak admin token missing")
+        try:
+            self._expires_in = float(body.get("expires_in")) if body.get("expires_in") else None
+        except (TypeError, ValueError):
+            self._expires_in = None
         return str(tok)
 
+    def _cache_key(self) -> tuple[str, ...]:
+        return (self.base_url, self.admin_realm, self.admin_client_id, self.admin_username or "")
+
+    def cached_token(self) -> str:
+        """Return a cached admin token, fetching a new one shortly before expiry."""
+        return directory_cache.TOKEN_CACHE.get(self._cache_key(), lambda: (self.token(), self._expires_in))
+
+    def invalidate_token(self) -> None:
+        directory_cache.TOKEN_CACHE.invalidate(self._cache_key())
+
     def hdr(self, token: str) -> Dict[str, str]:
         return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
@@ -147,78 +175,143 @@ def _display_name(u: dict) -> str:
     return "Unbekannt"
 
 
-def search_users_by_name(*, role: str, q: str, limit: int) -> List[dict]:
-    """Search users by role and display name fragment (pages through role members).
+def _roster_enabled() -> bool:
+    return (os.getenv("DIRECTORY_ROSTER_INDEX", "true") or "").strip().lower() not in {"0", "false", "no", "off"}
 
-    Why:
-        Keycloak's role users endpoint is paginated. Filtering only the first
-        page can miss matches outside that window. We iterate over pages until
-        we collect `limit` matches or exhaust available pages, capping the scan
-        to a reasonable upper bound.
 
-    Returns: list of { sub, name } where `sub` is the Keycloak user ID.
-    """
-    kc = _KC()
-    token = kc.token()
-    if role not in ALLOWED_ROLES:
-        raise ValueError("invalid role")
+def _iter_role_members(kc: _KC, role: str, *, scan_cap: int):
+    """Yield raw user representations of ``role`` page by page (capped)."""
+    token = kc.cached_token()
     url = f"{kc.base_url}/admin/realms/{kc.realm}/roles/{role}/users"
     ca = os.getenv("KEYCLOAK_CA_BUNDLE")
     verify_opt = ca if ca else True
-    ql = (q or "").strip().lower()
-    results: List[dict] = []
-    # Page across role members; KC caps max to ~200; we use batch=200
+    # KC caps max to ~200; we use batch=200
     batch = 200
     first = 0
-    scanned = 0
-    scan_cap = 2000  # do not scan unboundedly
-    while len(results) < max(1, int(limit)) and scanned < scan_cap:
+    while first < scan_cap:
         params = {"first": first, "max": batch}
-        r = requests.get(url, headers=kc.hdr(token), params=params, timeout=10, verify=verify_opt, allow_redirects=False)
+        r = _http().get(url, headers=kc.hdr(token), params=params, timeout=10, verify=verify_opt, allow_redirects=False)
+        directory_cache.record(keycloak_calls=1)
         r.raise_for_status()
         arr = r.json() or []
-        if not arr:
-            break
-        scanned += len(arr)
-        for u in arr:
-            name = _display_name(u)
-            uname = str(u.get("username", ""))
-            if ql in name.lower() or (ql and ql in uname.lower()):
-                sub = u.get("id")
-                if sub and name:
-                    results.append({"sub": str(sub), "name": name})
-                    if len(results) >= limit:
-                        break
-        # Advance to next page
+        yield from arr
         first += batch
         if len(arr) < batch:  # last page
             break
+
+
+def _load_roster(kc: _KC, role: str) -> List[roster_index.RosterEntry]:
+    try:
+        cap = int((os.getenv("DIRECTORY_ROSTER_MAX_USERS") or "").strip() or 10000)
+    except ValueError:
+        cap = 10000
+    entries: List[roster_index.RosterEntry] = []
+    for u in _iter_role_members(kc, role, scan_cap=max(200, cap)):
+        sub, name = u.get("id"), _display_name(u)
+        if sub and name:
+            entries.append(roster_index.RosterEntry(sub=str(sub), name=name, username=str(u.get("username", ""))))
+    return entries
+
+
+def role_roster(role: str) -> roster_index.RosterIndex:
+    """Return the process-wide roster index for ``role`` in the configured realm."""
+    kc = _KC()
+    return roster_index.roster_for((kc.base_url, kc.realm, role))
+
+
+def search_users_by_name(*, role: str, q: str, limit: int) -> List[dict]:
+    """Search users by role and display name fragment.
+
+    Why:
+        The members UI searches on every keystroke. Instead of paging through
+        Keycloak per request, searches are answered from a locally synced
+        roster index (`identity_access.roster_index`) that is refreshed in the
+        background. Set `DIRECTORY_ROSTER_INDEX=false` to fall back to a live
+        scan over the (paginated) role users endpoint.
+
+    Returns: list of { sub, name } where `sub` is the Keycloak user ID.
+    """
+    if role not in ALLOWED_ROLES:
+        raise ValueError("invalid role")
+    kc = _KC()
+    limit = max(1, int(limit))
+    if _roster_enabled():
+        index = roster_index.roster_for((kc.base_url, kc.realm, role))
+        index.ensure_fresh(lambda: _load_roster(_KC(), role))
+        return [{"sub": e.sub, "name": e.name} for e in index.search(q, limit=limit)]
+    ql = (q or "").strip().lower()
+    results: List[dict] = []
+    for u in _iter_role_members(kc, role, scan_cap=2000):  # do not scan unboundedly
+        name = _display_name(u)
+        uname = str(u.get("username", ""))
+        if ql in name.lower() or (ql and ql in uname.lower()):
+            sub = u.get("id")
+            if sub and name:
+                results.append({"sub": str(sub), "name": name})
+                if len(results) >= limit:
+                    break
     return results
 
 
+def _fetch_display_name(kc: _KC, token: str, sid: str, verify_opt) -> tuple[str, Optional[str], bool]:
+    """Fetch one user; returns (sub, name or None, cacheable).
+
+    404 is a definitive "unknown user" and is negatively cached; transport or
+    5xx errors are not cached so the next request retries.
+    """
+    try:
+        url = f"{kc.base_url}/admin/realms/{kc.realm}/users/{sid}"
+        r = _http().get(url, headers=kc.hdr(token), timeout=10, verify=verify_opt, allow_redirects=False)
+        directory_cache.record(keycloak_calls=1)
+        if r.status_code == 404:
+            return sid, None, True
+        if r.status_code == 401:
+            kc.invalidate_token()
+        r.raise_for_status()
+        u = r.json() or {}
+        return sid, (_display_name(u) or None), True
+    except Exception:
+        return sid, None, False
+
+
 def resolve_student_names(subs: List[str]) -> Dict[str, str]:
     """Resolve user IDs to display names using KC Admin API.
 
+    Cached names (and cached "unknown" results) as well as students already in
+    the synced roster index are served without contacting Keycloak; remaining
+    ids are fetched concurrently over the pooled session.
     Returns a mapping for the provided subs; unknown ids map to the id itself.
     """
-    kc = _KC()
-    token = kc.token()
-    out: Dict[str, str] = {}
-    ca = os.getenv("KEYCLOAK_CA_BUNDLE")
-    verify_opt = ca if ca else True
-    for sid in subs:
-        try:
-            url = f"{kc.base_url}/admin/realms/{kc.realm}/users/{sid}"
-            r = requests.get(url, headers=kc.hdr(token), timeout=10, verify=verify_opt, allow_redirects=False)
-            if r.status_code == 404:
-                out[sid] = sid
-                continue
-            r.raise_for_status()
-            u = r.json() or {}
-            out[sid] = _display_name(u) or sid
-        except Exception:
-            out[sid] = sid
-    return out
+    unique = list(dict.fromkeys(str(s) for s in subs if s))
+    found, missing = directory_cache.NAME_CACHE.lookup(unique)
+    if missing and _roster_enabled():
+        roster = role_roster("student")
+        still_missing = []
+        for sid in missing:
+            entry = roster.get(sid)
+            if entry is None:
+                still_missing.append(sid)
+            else:
+                found[sid] = entry.name
+                directory_cache.NAME_CACHE.put(sid, entry.name)
+        directory_cache.record(roster_hits=len(missing) - len(still_missing))
+        missing = still_missing
+    if missing:
+        kc = _KC()
+        token = kc.cached_token()
+        ca = os.getenv("KEYCLOAK_CA_BUNDLE")
+        verify_opt = ca if ca else True
+        workers = max(1, min(directory_cache.POOL_SIZE, len(missing)))
+        if workers == 1:
+            results = [_fetch_display_name(kc, token, sid, verify_opt) for sid in missing]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kc-names") as pool:
+                results = list(pool.map(lambda sid: _fetch_display_name(kc, token, sid, verify_opt), missing))
+        for sid, name, cacheable in results:
+            if cacheable:
+                directory_cache.NAME_CACHE.put(sid, name)
+            found[sid] = name
+    return {sid: (found.get(sid) or sid) for sid in unique}
 
 
 def list_users_by_role(*, role: str, limit: int, offset: int) -> List[dict]:
@@ -227,7 +320,7 @@ def list_users_by_role(*, role: str, limit: int, offset: int) -> List[dict]:
     Returns: list of { sub, name } with pagination.
     """
     kc = _KC()
-    token = kc.token()
+    token = kc.cached_token()
     if role not in ALLOWED_ROLES:
         raise ValueError("invalid role")
     url = f"{kc.base_url}/admin/realms/{kc.realm}/roles/{role}/users"
@@ -235,7 +328,8 @@ def list_users_by_role(*, role: str, limit: int, offset: int) -> List[dict]:
     params = {"first": max(0, int(offset or 0)), "max": max(1, min(200, int(limit or 50)))}
     ca = os.getenv("KEYCLOAK_CA_BUNDLE")
     verify_opt = ca if ca else True
-    r = requests.get(url, headers=kc.hdr(token), params=params, timeout=10, verify=verify_opt, allow_redirects=False)
+    r = _http().get(url, headers=kc.hdr(token), params=params, timeout=10, verify=verify_opt, allow_redirects=False)
+    directory_cache.record(keycloak_calls=1)
     r.raise_for_status()
     arr = r.json() or []
     results: List[dict] = []
@@ -0,0 +1,222 @@
+"""
+Caching primitives for the Keycloak directory adapter.
+
+Why:
+    Live summaries and member pages resolve every student `sub` to a display
+    name. Without caching, a 30-student class costs one admin-token request
+    plus 30 sequential `GET /users/{id}` calls per page view. This module keeps
+    the expensive parts warm:
+
+    - `TokenCache`: admin bearer token reused until shortly before expiry.
+    - `NameCache`: bounded TTL cache sub → display name, with shorter-lived
+      negative entries for unknown users (404) so typos/deleted users do not
+      hammer Keycloak either.
+    - `http_session()`: one pooled `requests.Session` (keep-alive) shared by
+      all directory lookups.
+    - `DirectoryStats`: counters exposed via `/internal/metrics/caches`,
+      including how many Keycloak calls the caches saved.
+
+Security:
+    - Only display names are cached (no e-mail, no tokens in stats/logs).
+    - Tokens stay in process memory and are dropped before they expire.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from threading import Lock
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import os
+import time
+
+import requests
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        value = float((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+@dataclass
+class DirectoryStats:
+    keycloak_calls: int = 0
+    token_fetches: int = 0
+    token_cache_hits: int = 0
+    name_cache_hits: int = 0
+    name_cache_misses: int = 0
+    negative_cache_hits: int = 0
+    roster_hits: int = 0
+
+    @property
+    def calls_saved(self) -> int:
+        """Keycloak round-trips avoided by the token/name caches and the roster index."""
+        return self.token_cache_hits + self.name_cache_hits + self.negative_cache_hits + self.roster_hits
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["calls_saved"] = self.calls_saved
+        return data
+
+
+_stats = DirectoryStats()
+_stats_lock = Lock()
+
+
+def record(**deltas: int) -> None:
+    """Increment one or more `DirectoryStats` counters atomically."""
+    with _stats_lock:
+        for key, amount in deltas.items():
+            setattr(_stats, key, getattr(_stats, key) + int(amount))
+
+
+def stats() -> dict:
+    """Return a snapshot of the directory counters plus cache sizes."""
+    with _stats_lock:
+        data = _stats.as_dict()
+    data["names_cached"] = len(NAME_CACHE)
+    return data
+
+
+class TokenCache:
+    """Reuse an admin token until ``expires_in - skew`` seconds have passed.
+
+    Keyed by the credential identity (base URL, realm, client) so changing the
+    environment never serves a token minted for another client.
+    """
+
+    def __init__(self, *, skew_seconds: float = 30.0, default_ttl: float = 60.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self._skew = skew_seconds
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: Dict[Tuple[str, ...], Tuple[str, float]] = {}
+
+    def get(self, key: Tuple[str, ...], fetch: Callable[[], Tuple[str, Optional[float]]]) -> str:
+        now = self._clock()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[1] > now:
+                record(token_cache_hits=1)
+                return hit[0]
+        token, expires_in = fetch()
+        record(token_fetches=1, keycloak_calls=1)
+        ttl = float(expires_in) if expires_in else self._default_ttl
+        valid_until = now + max(0.0, ttl - self._skew)
+        with self._lock:
+            self._entries[key] = (token, valid_until)
+        return token
+
+    def invalidate(self, key: Tuple[str, ...] | None = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class NameCache:
+    """Bounded LRU of sub → display name with positive and negative TTLs.
+
+    Negative entries are stored as ``None`` and expire after
+    ``negative_ttl`` seconds (default much shorter than positive entries).
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = 600.0,
+        negative_ttl_seconds: float = 60.0,
+        max_entries: int = 5000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._max = max(1, int(max_entries))
+        self._clock = clock
+        self._lock = Lock()
+        self._data: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, subs: Iterable[str]) -> Tuple[Dict[str, Optional[str]], list[str]]:
+        """Split ``subs`` into cached results (name or None) and misses."""
+        now = self._clock()
+        found: Dict[str, Optional[str]] = {}
+        missing: list[str] = []
+        positive = negative = 0
+        with self._lock:
+            for sub in subs:
+                hit = self._data.get(sub)
+                if hit and hit[1] > now:
+                    self._data.move_to_end(sub)
+                    found[sub] = hit[0]
+                    if hit[0] is None:
+                        negative += 1
+                    else:
+                        positive += 1
+                else:
+                    if hit:
+                        self._data.pop(sub, None)
+                    missing.append(sub)
+        record(name_cache_hits=positive, negative_cache_hits=negative, name_cache_misses=len(missing))
+        return found, missing
+
+    def put(self, sub: str, name: Optional[str]) -> None:
+        ttl = self._ttl if name is not None else self._negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[sub] = (name, self._clock() + ttl)
+            self._data.move_to_end(sub)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def invalidate(self, sub: str | None = None) -> None:
+        with self._lock:
+            if sub is None:
+                self._data.clear()
+            else:
+                self._data.pop(sub, None)
+
+
+TOKEN_CACHE = TokenCache(skew_seconds=_env_float("KC_ADMIN_TOKEN_SKEW_SECONDS", 30.0))
+NAME_CACHE = NameCache(
+    ttl_seconds=_env_float("DIRECTORY_NAME_CACHE_TTL_SECONDS", 600.0),
+    negative_ttl_seconds=_env_float("DIRECTORY_NAME_NEGATIVE_TTL_SECONDS", 60.0),
+    max_entries=int(_env_float("DIRECTORY_NAME_CACHE_MAX_ENTRIES", 5000)),
+)
+
+_session: requests.Session | None = None
+_session_lock = Lock()
+POOL_SIZE = 8
+
+
+def http_session() -> requests.Session:
+    """Return the shared, pooled HTTP session for Keycloak admin calls."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def reset_for_tests() -> None:
+    """Clear caches, counters and the pooled session. Intended for pytest."""
+    global _session
+    TOKEN_CACHE.invalidate()
+    NAME_CACHE.invalidate()
+    with _stats_lock:
+        for key in asdict(_stats):
+            setattr(_stats, key, 0)
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
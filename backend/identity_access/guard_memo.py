@@ -0,0 +1,92 @@
+"""
+Request-scoped memo for authorization lookups (ownership, membership).
+
+Why:
+    A single SSR page runs the same guard queries several times: once in the
+    page handler and again inside every loopback API call it makes
+    (`course_exists_for_owner`, `unit_exists_for_author`, module listings,
+    the `course_memberships` check in each learning repo method). Within one
+    incoming request their answers cannot meaningfully change, so each
+    distinct lookup only needs to hit the database once.
+
+Scope:
+    `GuardMemoMiddleware` opens a memo for each incoming GET/HEAD request.
+    Loopback requests issued in-process (httpx `ASGITransport`) run in the
+    caller's context and therefore share the outer memo instead of opening
+    their own. Unsafe methods (POST, PATCH, DELETE, ...) never read from or
+    write to a memo and clear an inherited one, so a write can never be
+    followed by a stale guard decision. Outside a request (workers, CLI,
+    tests without the middleware) lookups run uncached.
+
+Security:
+    Keys always include the caller identity next to the resource ids, and
+    only determinate answers are stored (callers pass `cache_none=False` for
+    lookups where None means "could not determine"). RLS and ownership
+    checks are not bypassed: the memo returns exactly what the same query
+    returned earlier in the same request for the same caller.
+"""
+from __future__ import annotations
+
+import copy
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_SAFE_METHODS = frozenset({"GET", "HEAD"})
+
+_MEMO: ContextVar[Optional[Dict[Tuple[Hashable, ...], Any]]] = ContextVar("gustav_guard_memo", default=None)
+
+
+def memoized(kind: str, key: Tuple[Hashable, ...], compute: Callable[[], T], *, cache_none: bool = True) -> T:
+    """Return the memoized result of `compute()` for (kind, *key) in this request.
+
+    Mutable results (lists, dicts) are deep-copied on the way in and out so
+    callers cannot alter what later lookups see.
+    """
+    memo = _MEMO.get()
+    if memo is None:
+        return compute()
+    full_key = (kind, *key)
+    if full_key in memo:
+        return copy.deepcopy(memo[full_key])
+    value = compute()
+    if value is not None or cache_none:
+        memo[full_key] = copy.deepcopy(value)
+    return value
+
+
+class GuardMemoMiddleware:
+    """Pure ASGI middleware that scopes the guard memo to one incoming request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        method = str(scope.get("method") or "GET").upper()
+        outer = _MEMO.get()
+        if method not in _SAFE_METHODS:
+            # Writes run uncached and discard anything an enclosing request
+            # memoized before them (e.g. SSR GET → loopback POST).
+            if outer is not None:
+                outer.clear()
+            token = _MEMO.set(None)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _MEMO.reset(token)
+                if outer is not None:
+                    outer.clear()
+            return
+        if outer is not None:
+            # Loopback read inside an outer request: share its memo.
+            await self.app(scope, receive, send)
+            return
+        token = _MEMO.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _MEMO.reset(token)
@@ -0,0 +1,258 @@
+"""
+In-process roster index for member search (display names + usernames).
+
+Why:
+    The members UI searches on every keystroke (`keyup changed delay:300ms`).
+    Paging through up to 2000 role members via the Keycloak Admin API for each
+    keystroke costs up to 10 HTTP requests per search. Instead, we keep a small
+    per-role index in memory and answer searches locally in well under a
+    millisecond for school-sized rosters.
+
+Search:
+    Queries are normalized (casefold, accents stripped). Results are ranked:
+      0. word prefix of the display name or username prefix ("ma" → "Max Muster")
+      1. substring anywhere ("ust" → "Max Muster")
+      2. trigram similarity for typos ("mustr" → "Max Muster"), only for
+         queries with at least 3 characters and only to fill remaining slots.
+
+Freshness:
+    - `ensure_fresh()` performs one blocking full sync when the index is empty
+      (single flight: concurrent first searches wait for it and reuse its
+      result instead of paging Keycloak each) and otherwise refreshes stale
+      data in a background thread (stale-while-revalidate, single flight) so
+      warm searches never wait on Keycloak.
+    - `upsert()`/`remove()` apply incremental changes (e.g., a student logging in
+      for the first time) without a full sync.
+    - Full syncs diff against the current index: unchanged entries are kept,
+      changed ones re-indexed, vanished ones dropped.
+
+Security:
+    Stores only `sub`, display name and username — the same data the search
+    endpoint already returns to teachers.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from threading import Lock, Thread
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import os
+import time
+import unicodedata
+
+
+def _normalize(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold().strip()
+
+
+def _trigrams(value: str) -> Set[str]:
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class RosterEntry:
+    sub: str
+    name: str
+    username: str = ""
+
+    @property
+    def name_key(self) -> str:
+        return _normalize(self.name)
+
+    @property
+    def username_key(self) -> str:
+        return _normalize(self.username)
+
+
+class RosterIndex:
+    """Searchable set of users for one role."""
+
+    def __init__(
+        self,
+        *,
+        max_age_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_age = max_age_seconds
+        self._clock = clock
+        self._lock = Lock()
+        self._cold_sync_lock = Lock()
+        self._entries: Dict[str, RosterEntry] = {}
+        self._keys: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._synced_at: Optional[float] = None
+        self._refreshing = False
+        self.full_syncs = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def is_populated(self) -> bool:
+        return self._synced_at is not None
+
+    def is_stale(self) -> bool:
+        return self._synced_at is None or (self._clock() - self._synced_at) > self._max_age
+
+    # --- Mutations -----------------------------------------------------------
+
+    def _index(self, entry: RosterEntry) -> None:
+        name_key, user_key = entry.name_key, entry.username_key
+        self._keys[entry.sub] = (name_key, user_key, tuple(name_key.split()))
+        for gram in _trigrams(name_key) | (_trigrams(user_key) if user_key else set()):
+            self._grams.setdefault(gram, set()).add(entry.sub)
+
+    def _unindex(self, sub: str) -> None:
+        keys = self._keys.pop(sub, None)
+        if not keys:
+            return
+        name_key, user_key, _ = keys
+        for gram in _trigrams(name_key) | (_trigrams(user_key) if user_key else set()):
+            bucket = self._grams.get(gram)
+            if bucket is not None:
+                bucket.discard(sub)
+                if not bucket:
+                    self._grams.pop(gram, None)
+
+    def upsert(self, sub: str, name: str, username: str = "") -> None:
+        """Add or update one user (incremental refresh)."""
+        if not sub or not name:
+            return
+        entry = RosterEntry(sub=str(sub), name=str(name), username=str(username or ""))
+        with self._lock:
+            if self._entries.get(entry.sub) == entry:
+                return
+            self._unindex(entry.sub)
+            self._entries[entry.sub] = entry
+            self._index(entry)
+
+    def remove(self, sub: str) -> None:
+        with self._lock:
+            self._entries.pop(sub, None)
+            self._unindex(sub)
+
+    def replace_all(self, entries: Iterable[RosterEntry]) -> Dict[str, int]:
+        """Apply a full sync as a diff; returns added/updated/removed counts."""
+        incoming = {e.sub: e for e in entries if e.sub and e.name}
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            for sub in [s for s in self._entries if s not in incoming]:
+                self._entries.pop(sub, None)
+                self._unindex(sub)
+                counts["removed"] += 1
+            for sub, entry in incoming.items():
+                current = self._entries.get(sub)
+                if current == entry:
+                    continue
+                counts["updated" if current else "added"] += 1
+                self._unindex(sub)
+                self._entries[sub] = entry
+                self._index(entry)
+            self._synced_at = self._clock()
+            self.full_syncs += 1
+        return counts
+
+    # --- Sync ----------------------------------------------------------------
+
+    def ensure_fresh(self, loader: Callable[[], Iterable[RosterEntry]]) -> None:
+        """Sync from ``loader`` if needed without blocking warm searches."""
+        if not self.is_stale():
+            return
+        if not self.is_populated:
+            with self._cold_sync_lock:
+                # Waiters find the index populated by the caller they queued behind.
+                if not self.is_populated:
+                    self.replace_all(loader())
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run() -> None:
+            try:
+                self.replace_all(loader())
+            except Exception:
+                pass  # keep serving the previous snapshot; retry on next access
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        Thread(target=_run, name="roster-refresh", daemon=True).start()
+
+    # --- Queries -------------------------------------------------------------
+
+    def get(self, sub: str) -> Optional[RosterEntry]:
+        return self._entries.get(sub)
+
+    def search(self, q: str, *, limit: int, min_similarity: float = 0.5) -> List[RosterEntry]:
+        limit = max(1, int(limit))
+        ql = _normalize(q)
+        with self._lock:
+            entries = dict(self._entries)
+            keys = dict(self._keys)
+            if not ql:
+                return sorted(entries.values(), key=lambda e: e.name_key)[:limit]
+            ranked: List[Tuple[int, float, str, RosterEntry]] = []
+            seen: Set[str] = set()
+            for sub, (name_key, user_key, words) in keys.items():
+                if user_key.startswith(ql) or name_key.startswith(ql) or any(w.startswith(ql) for w in words):
+                    rank = 0
+                elif ql in name_key or ql in user_key:
+                    rank = 1
+                else:
+                    continue
+                seen.add(sub)
+                ranked.append((rank, 0.0, name_key, entries[sub]))
+            if len(ranked) < limit and len(ql) >= 3:
+                q_grams = _trigrams(ql)
+                overlap: Dict[str, int] = {}
+                for gram in q_grams:
+                    for sub in self._grams.get(gram, ()):
+                        if sub not in seen:
+                            overlap[sub] = overlap.get(sub, 0) + 1
+                for sub, hits in overlap.items():
+                    score = hits / len(q_grams)
+                    if score >= min_similarity:
+                        ranked.append((2, -score, keys[sub][0], entries[sub]))
+        ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked[:limit]]
+
+
+_registry: Dict[Tuple[str, ...], RosterIndex] = {}
+_registry_lock = Lock()
+
+
+def _max_age() -> float:
+    try:
+        value = float((os.getenv("DIRECTORY_ROSTER_REFRESH_SECONDS") or "").strip() or 300)
+    except ValueError:
+        return 300.0
+    return value if value > 0 else 300.0
+
+
+def roster_for(key: Tuple[str, ...]) -> RosterIndex:
+    """Return the process-wide index for ``key`` (e.g., base URL, realm, role)."""
+    with _registry_lock:
+        index = _registry.get(key)
+        if index is None:
+            index = RosterIndex(max_age_seconds=_max_age())
+            _registry[key] = index
+        return index
+
+
+def stats() -> dict:
+    """Sizes and sync counters per indexed role (no user data)."""
+    with _registry_lock:
+        items = list(_registry.items())
+    return {
+        "rosters": len(items),
+        "entries": sum(len(idx) for _, idx in items),
+        "full_syncs": sum(idx.full_syncs for _, idx in items),
+    }
+
+
+def reset_for_tests() -> None:
+    with _registry_lock:
+        _registry.clear()
@@ -0,0 +1,189 @@
+"""
+Session maintenance: batch-delete expired rows from the auth tables.
+
+Why:
+    `DBSessionStore.get` filters `expires_at > now()`, but nothing removed
+    expired rows, so `public.app_sessions` (and its indexes) grew with every
+    login. This job deletes expired sessions, OIDC state records and CSRF tokens
+    in bounded chunks so each statement holds locks only briefly.
+
+Usage (repo checkout or any image that ships `identity_access`):
+    python -m identity_access.session_maintenance             # one pass
+    python -m identity_access.session_maintenance --dry-run   # count only
+    python -m identity_access.session_maintenance --loop 3600 # every hour
+
+Permissions:
+    Needs the service-role DSN used by the DB stores (`SESSION_DATABASE_URL`);
+    the limited app role has no access to these tables by design.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable
+
+from .stores_db import HAVE_PSYCOPG, _TABLE_RE, _execute, _delete_expired_batch, _resolve_dsn
+
+try:
+    import psycopg
+except Exception:  # pragma: no cover - optional dependency in dev
+    psycopg = None  # type: ignore
+
+LOG = logging.getLogger("gustav.identity_access.session_maintenance")
+
+DEFAULT_TABLES = ("public.app_sessions", "public.app_auth_states", "public.app_csrf_tokens")
+
+
+@dataclass
+class SweepReport:
+    table: str
+    deleted: int = 0
+    batches: int = 0
+    expired_remaining: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class MaintenanceReport:
+    dry_run: bool
+    duration_ms: int = 0
+    tables: list[SweepReport] = field(default_factory=list)
+
+    @property
+    def deleted_total(self) -> int:
+        return sum(t.deleted for t in self.tables)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["deleted_total"] = self.deleted_total
+        return data
+
+
+def count_expired(dsn: str, table: str) -> int:
+    """Return the number of expired rows in ``table`` (dry-run reporting)."""
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cur:
+            _execute(cur, table, "select count(*) from {table} where expires_at <= now()", ())
+            row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def sweep_table(
+    dsn: str,
+    table: str,
+    *,
+    batch_size: int = 1000,
+    max_batches: int | None = None,
+    pause_seconds: float = 0.0,
+    delete_batch: Callable[[str, str, int], int] = _delete_expired_batch,
+    sleep: Callable[[float], None] = time.sleep,
+) -> SweepReport:
+    """Delete expired rows of one table in chunks of ``batch_size``.
+
+    Stops when a batch comes back short (nothing left) or after
+    ``max_batches``. ``pause_seconds`` between batches gives autovacuum and
+    concurrent logins room on busy databases.
+    """
+    report = SweepReport(table=table)
+    while max_batches is None or report.batches < max_batches:
+        deleted = delete_batch(dsn, table, batch_size)
+        report.batches += 1
+        report.deleted += deleted
+        if deleted < batch_size:
+            break
+        if pause_seconds > 0:
+            sleep(pause_seconds)
+    return report
+
+
+def run_once(
+    dsn: str,
+    *,
+    tables: Iterable[str] = DEFAULT_TABLES,
+    batch_size: int = 1000,
+    max_batches: int | None = None,
+    pause_seconds: float = 0.0,
+    dry_run: bool = False,
+    delete_batch: Callable[[str, str, int], int] = _delete_expired_batch,
+    count: Callable[[str, str], int] = count_expired,
+) -> MaintenanceReport:
+    """Sweep all ``tables`` once and return per-table counts.
+
+    Failures are isolated per table (e.g., a migration not yet applied) and
+    reported as a short error class name; no row data is logged.
+    """
+    started = time.monotonic()
+    report = MaintenanceReport(dry_run=dry_run)
+    for table in tables:
+        if not _TABLE_RE.match(table or ""):
+            raise ValueError(f"Invalid table name: {table!r}")
+        try:
+            if dry_run:
+                entry = SweepReport(table=table, expired_remaining=count(dsn, table))
+            else:
+                entry = sweep_table(
+                    dsn,
+                    table,
+                    batch_size=batch_size,
+                    max_batches=max_batches,
+                    pause_seconds=pause_seconds,
+                    delete_batch=delete_batch,
+                )
+        except Exception as exc:
+            entry = SweepReport(table=table, error=exc.__class__.__name__)
+        report.tables.append(entry)
+        LOG.info(
+            "session_maintenance table=%s deleted=%s batches=%s expired=%s error=%s",
+            entry.table,
+            entry.deleted,
+            entry.batches,
+            entry.expired_remaining,
+            entry.error,
+        )
+    report.duration_ms = int((time.monotonic() - started) * 1000)
+    return report
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Delete expired sessions, OIDC states and CSRF tokens")
+    parser.add_argument("--dsn", default=None, help="Service-role DSN (default: SESSION_DATABASE_URL)")
+    parser.add_argument("--table", action="append", dest="tables", help="Table to sweep (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "1000")))
+    parser.add_argument("--max-batches", type=int, default=None, help="Upper bound of batches per table and pass")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count expired rows")
+    parser.add_argument("--loop", type=float, default=None, metavar="SECONDS", help="Repeat every SECONDS")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entrypoint; prints one JSON report per pass."""
+    logging.basicConfig(level=(os.getenv("LOG_LEVEL", "INFO").strip().upper() or "INFO"))
+    args = _parse_args(argv)
+    if not HAVE_PSYCOPG:
+        raise SystemExit("psycopg3 is required for session maintenance")
+    dsn = _resolve_dsn(args.dsn)
+    if not dsn:
+        raise SystemExit("No database DSN provided (use --dsn or SESSION_DATABASE_URL)")
+    batch_size = max(1, args.batch_size)
+    while True:
+        report = run_once(
+            dsn,
+            tables=args.tables or DEFAULT_TABLES,
+            batch_size=batch_size,
+            max_batches=args.max_batches,
+            pause_seconds=max(0.0, args.pause),
+            dry_run=args.dry_run,
+        )
+        print(json.dumps(report.as_dict()), flush=True)
+        if not args.loop:
+            return 1 if any(t.error for t in report.tables) else 0
+        time.sleep(max(1.0, args.loop))
+
+
+if __name__ == "__main__":  # pragma: no cover - manual entry
+    raise SystemExit(main())
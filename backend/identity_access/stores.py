@@ -1,8 +1,14 @@
 """
-In-memory stores for development: StateStore and SessionStore.
+In-memory stores for development: StateStore, CsrfTokenStore and SessionStore.
 
 Why: Keep server-side state (CSRF/QR context, PKCE code_verifier) and sessions
-opaque to the client. For production, replace with Redis/DB-backed stores.
+opaque to the client. For multi-worker deployments, use the Postgres-backed
+variants in `identity_access.stores_db` so every worker sees the same state.
+
+Bounded memory: State and CSRF entries expire lazily on access and are swept
+whenever the store reaches its entry cap; if still full, the oldest entries are
+evicted first (insertion order). This keeps a long-running process from growing
+without bound over a school year.
 
 Security: Cookies carry only an opaque session id. Session data stays server-side.
 """
@@ -27,9 +33,33 @@ class StateRecord:
     nonce: Optional[str] = None
 
 
+def _enforce_cap(data: dict, max_entries: int, is_expired) -> None:
+    """Make room for one more entry in ``data`` (insertion-ordered dict).
+
+    Sweeps expired entries first; if the store is still full, evicts the
+    oldest entries. Callers hold no lock: the GIL keeps dict ops atomic and a
+    lost race only means one extra sweep.
+    """
+    if len(data) < max_entries:
+        return
+    for key in [k for k, v in data.items() if is_expired(v)]:
+        data.pop(key, None)
+    while len(data) >= max_entries:
+        try:
+            data.pop(next(iter(data)))
+        except (StopIteration, KeyError, RuntimeError):
+            break
+
+
 class StateStore:
-    def __init__(self):
+    """PKCE/OIDC state records with TTL, lazy expiry and an entry cap."""
+
+    def __init__(self, *, max_entries: int = 10_000):
         self._data: Dict[str, StateRecord] = {}
+        self._max_entries = max(1, int(max_entries))
+
+    def __len__(self) -> int:
+        return len(self._data)
 
     def create(self, *, code_verifier: str, ttl_seconds: int = 900, redirect: Optional[str] = None, nonce: Optional[str] = None) -> StateRecord:
         state = secrets.token_urlsafe(24)
@@ -40,6 +70,7 @@ class StateStore:
             expires_at=_now() + ttl_seconds,
             nonce=nonce,
         )
+        _enforce_cap(self._data, self._max_entries, lambda r: r.expires_at < _now())
         self._data[state] = rec
         return rec
 
@@ -51,6 +82,68 @@ class StateStore:
             return None
         return rec
 
+    def sweep(self) -> int:
+        """Drop expired records; returns the number of removed entries."""
+        now = _now()
+        expired = [k for k, v in self._data.items() if v.expires_at < now]
+        for key in expired:
+            self._data.pop(key, None)
+        return len(expired)
+
+
+@dataclass
+class CsrfRecord:
+    token: str
+    expires_at: int
+
+
+class CsrfTokenStore:
+    """Per-session synchronizer tokens with sliding TTL and an entry cap.
+
+    Tokens are reused for the lifetime of a session; every `get_or_create`
+    extends the expiry so active users keep a stable token across forms.
+    """
+
+    def __init__(self, *, ttl_seconds: int = 3600, max_entries: int = 50_000):
+        self._data: Dict[str, CsrfRecord] = {}
+        self._ttl = max(1, int(ttl_seconds))
+        self._max_entries = max(1, int(max_entries))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_or_create(self, session_id: str) -> str:
+        now = _now()
+        rec = self._data.get(session_id)
+        if rec and rec.expires_at >= now:
+            rec.expires_at = now + self._ttl
+            return rec.token
+        self._data.pop(session_id, None)
+        _enforce_cap(self._data, self._max_entries, lambda r: r.expires_at < now)
+        rec = CsrfRecord(token=secrets.token_urlsafe(24), expires_at=now + self._ttl)
+        self._data[session_id] = rec
+        return rec.token
+
+    def get(self, session_id: str) -> Optional[str]:
+        rec = self._data.get(session_id)
+        if not rec:
+            return None
+        if rec.expires_at < _now():
+            self._data.pop(session_id, None)
+            return None
+        return rec.token
+
+    def delete(self, session_id: str) -> None:
+        self._data.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """Drop expired tokens; returns the number of removed entries."""
+        now = _now()
+        expired = [k for k, v in self._data.items() if v.expires_at < now]
+        for key in expired:
+            self._data.pop(key, None)
+        return len(expired)
+
 
 @dataclass
 class SessionRecord:
@@ -1,5 +1,6 @@
 """
-Database-backed SessionStore for production use (Postgres/Supabase).
+Database-backed stores for production use (Postgres/Supabase): sessions,
+OIDC state records and CSRF tokens.
 
 Why: In-memory sessions are not durable and do not scale across instances. This
 store persists sessions in Postgres (e.g., via Supabase) while keeping the
@@ -11,16 +12,20 @@ Security:
 - Only the opaque `session_id` is set in the cookie; all user context stays server-side.
 
 Note: This module uses psycopg3. It is imported only when enabled via
-`SESSIONS_BACKEND=db`. Tests can continue to use the in-memory store.
+`SESSIONS_BACKEND=db` (or `AUTH_STATE_BACKEND=db` for state/CSRF). Tests can
+continue to use the in-memory stores.
 """
 from __future__ import annotations
 
 from dataclasses import dataclass
 from typing import Optional, Sequence
 import os
+import secrets
 import time
 import re
 
+from .stores import StateRecord
+
 try:
     import psycopg
     from psycopg.types.json import Json
@@ -34,6 +39,57 @@ def _now() -> int:
     return int(time.time())
 
 
+_TABLE_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,62}(?:\.[A-Za-z_][A-Za-z0-9_]{0,62})?$')
+
+
+def _resolve_dsn(dsn: str | None) -> str:
+    # Prefer a dedicated session DSN to avoid clashing with limited-role DATABASE_URL
+    return (
+        dsn
+        or os.getenv("SESSION_DATABASE_URL")
+        or os.getenv("DATABASE_URL")
+        or os.getenv("SUPABASE_DB_URL", "")
+    )
+
+
+def _execute(cur, table: str, template: str, params: tuple) -> None:
+    """Execute ``template`` with ``{table}`` substituted as a safe identifier.
+
+    Falls back to plain string formatting (table names are validated against
+    `_TABLE_RE` at construction) for fake psycopg drivers used in tests.
+    """
+    schema, name = table.split(".", 1) if "." in table else ("public", table)
+    try:
+        from psycopg import sql as _sql  # type: ignore
+
+        stmt = _sql.SQL(template.replace("{table}", "{}.{}")).format(
+            _sql.Identifier(schema), _sql.Identifier(name)
+        )
+        cur.execute(stmt, params)
+    except Exception:
+        cur.execute(template.replace("{table}", table), params)
+
+
+def _delete_expired_batch(dsn: str, table: str, limit: int) -> int:
+    """Delete at most ``limit`` expired rows of ``table``; returns the count.
+
+    Oldest rows go first via the ``expires_at`` index; `skip locked` lets
+    concurrent sweepers (opportunistic web sweeps, the maintenance job) share
+    the work instead of blocking on each other.
+    """
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        with conn.cursor() as cur:
+            _execute(
+                cur,
+                table,
+                "delete from {table} where ctid = any(array("
+                "select ctid from {table} where expires_at <= now() "
+                "order by expires_at limit %s for update skip locked))",
+                (int(limit),),
+            )
+            return int(getattr(cur, "rowcount", 0) or 0)
+
+
 @dataclass
 class SessionRecord:
     session_id: str
@@ -59,17 +115,11 @@ class DBSessionStore:
     def __init__(self, dsn: str | None = None, table: str = "public.app_sessions") -> None:
         if not HAVE_PSYCOPG:
             raise RuntimeError("psycopg3 is required for DBSessionStore")
-        # Prefer a dedicated session DSN to avoid clashing with limited-role DATABASE_URL
-        self._dsn = (
-            dsn
-            or os.getenv("SESSION_DATABASE_URL")
-            or os.getenv("DATABASE_URL")
-            or os.getenv("SUPABASE_DB_URL", "")
-        )
+        self._dsn = _resolve_dsn(dsn)
         if not self._dsn:
             raise RuntimeError("No database DSN provided for DBSessionStore")
         # Validate table identifier early (defense-in-depth)
-        if not re.match(r'^[A-Za-z_][A-Za-z0-9_]{0,62}(?:\.[A-Za-z_][A-Za-z0-9_]{0,62})?$', table or ''):
+        if not _TABLE_RE.match(table or ''):
             raise ValueError("Invalid table name")
         self._table = table
 
@@ -134,6 +184,10 @@ class DBSessionStore:
                     expires_at=int(row[5]) if row[5] is not None else None,
                 )
 
+    def sweep(self, *, limit: int = 1000) -> int:
+        """Delete up to ``limit`` expired sessions; returns the number removed."""
+        return _delete_expired_batch(self._dsn, self._table, limit)
+
     def delete(self, session_id: str) -> None:
         with psycopg.connect(self._dsn, autocommit=True) as conn:
             with conn.cursor() as cur:
@@ -146,3 +200,132 @@ class DBSessionStore:
                     cur.execute(stmt, (session_id,))
                 except Exception:
                     cur.execute(f"delete from {self._table} where session_id = %s", (session_id,))
+
+
+class _SweepingDBStore:
+    """Shared plumbing for short-lived, TTL-bound rows.
+
+    Every `sweep_every`-th write deletes a bounded batch of expired rows, so
+    the tables stay small without a separate cron job. `sweep()` can also be
+    called explicitly (e.g., from a maintenance task).
+    """
+
+    _label = "DB store"
+
+    def __init__(self, dsn: str | None, table: str, *, sweep_every: int = 200, sweep_batch: int = 500) -> None:
+        if not HAVE_PSYCOPG:
+            raise RuntimeError(f"psycopg3 is required for {self.__class__.__name__}")
+        self._dsn = _resolve_dsn(dsn)
+        if not self._dsn:
+            raise RuntimeError(f"No database DSN provided for {self.__class__.__name__}")
+        if not _TABLE_RE.match(table or ''):
+            raise ValueError("Invalid table name")
+        self._table = table
+        self._sweep_every = max(1, int(sweep_every))
+        self._sweep_batch = max(1, int(sweep_batch))
+        self._writes = 0
+
+    def _maybe_sweep(self) -> None:
+        self._writes += 1
+        if self._writes % self._sweep_every:
+            return
+        try:
+            self.sweep()
+        except Exception:  # pragma: no cover - sweeping is best-effort
+            pass
+
+    def sweep(self, *, limit: int | None = None) -> int:
+        """Delete up to ``limit`` expired rows; returns the number removed."""
+        return _delete_expired_batch(self._dsn, self._table, int(limit) if limit else self._sweep_batch)
+
+
+class DBStateStore(_SweepingDBStore):
+    """Postgres-backed OIDC state store shared by all web workers.
+
+    `pop_valid` deletes and returns the row in one statement, so a state value
+    can be redeemed exactly once even when callbacks race across workers.
+    """
+
+    def __init__(self, dsn: str | None = None, table: str = "public.app_auth_states", **kwargs) -> None:
+        super().__init__(dsn, table, **kwargs)
+
+    def create(self, *, code_verifier: str, ttl_seconds: int = 900, redirect: Optional[str] = None, nonce: Optional[str] = None) -> StateRecord:
+        state = secrets.token_urlsafe(24)
+        expires_at = _now() + ttl_seconds
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    self._table,
+                    "insert into {table} (state, code_verifier, redirect, nonce, expires_at) "
+                    "values (%s, %s, %s, %s, to_timestamp(%s))",
+                    (state, code_verifier, redirect, nonce, expires_at),
+                )
+        self._maybe_sweep()
+        return StateRecord(state=state, code_verifier=code_verifier, redirect=redirect, expires_at=expires_at, nonce=nonce)
+
+    def pop_valid(self, state: str) -> Optional[StateRecord]:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    self._table,
+                    "delete from {table} where state = %s "
+                    "returning state, code_verifier, redirect, nonce, extract(epoch from expires_at)::bigint",
+                    (state,),
+                )
+                row = cur.fetchone()
+        if not row:
+            return None
+        expires_at = int(row[4])
+        if expires_at < _now():
+            return None
+        return StateRecord(state=row[0], code_verifier=row[1], redirect=row[2], nonce=row[3], expires_at=expires_at)
+
+
+class DBCsrfTokenStore(_SweepingDBStore):
+    """Postgres-backed per-session CSRF tokens with sliding TTL.
+
+    `get_or_create` is a single upsert: it keeps a live token (extending its
+    expiry) or replaces an expired one, so concurrent workers converge on the
+    same token for a session.
+    """
+
+    def __init__(self, dsn: str | None = None, table: str = "public.app_csrf_tokens", *, ttl_seconds: int = 3600, **kwargs) -> None:
+        super().__init__(dsn, table, **kwargs)
+        self._ttl = max(1, int(ttl_seconds))
+
+    def get_or_create(self, session_id: str) -> str:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    self._table,
+                    "insert into {table} as t (session_id, token, expires_at) "
+                    "values (%s, %s, now() + make_interval(secs => %s)) "
+                    "on conflict (session_id) do update set "
+                    "token = case when t.expires_at > now() then t.token else excluded.token end, "
+                    "expires_at = excluded.expires_at "
+                    "returning token",
+                    (session_id, secrets.token_urlsafe(24), self._ttl),
+                )
+                row = cur.fetchone()
+        self._maybe_sweep()
+        return str(row[0]) if row else ""
+
+    def get(self, session_id: str) -> Optional[str]:
+        with psycopg.connect(self._dsn) as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    self._table,
+                    "select token from {table} where session_id = %s and expires_at > now()",
+                    (session_id,),
+                )
+                row = cur.fetchone()
+        return str(row[0]) if row else None
+
+    def delete(self, session_id: str) -> None:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                _execute(cur, self._table, "delete from {table} where session_id = %s", (session_id,))
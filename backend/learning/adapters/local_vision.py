@@ -23,6 +23,7 @@ from typing import Dict, Optional
 import base64
 import inspect
 import logging
+from functools import lru_cache
 from urllib.parse import urlparse as _urlparse
 
 from backend.learning.adapters.ports import (
@@ -31,6 +32,7 @@ from backend.learning.adapters.ports import (
     VisionTransientError,
 )
 from backend.vision.pipeline import stitch_images_vertically, process_pdf_bytes
+from backend.storage.blobs import blob_repo_from_env
 from backend.storage.config import get_submissions_bucket, get_learning_max_upload_bytes
 
 LOG = logging.getLogger(__name__)
@@ -96,6 +98,12 @@ def _submissions_bucket() -> str:
     return get_submissions_bucket()
 
 
+@lru_cache(maxsize=1)
+def _blob_registry():
+    """Shared content-blob registry, or None when dedup is off."""
+    return blob_repo_from_env()
+
+
 def _strip_bucket_prefix(key: str, bucket: str) -> str:
     prefix = f"{bucket}/"
     if key.startswith(prefix):
@@ -398,8 +406,11 @@ class _LocalVisionAdapter:
         Behavior:
             1. Serve `derived/<submission_id>/stitched.png` when present.
             2. Stitch referenced page PNGs from `internal_metadata.page_keys`.
-            3. As fallback, scan derived directories, then render from the PDF
-               bytes (local or remote fetch). Persist stitched results each time.
+            3. As fallback, scan derived directories, then stitch pages already
+               rendered for the same content blob (`backend.storage.blobs`),
+               then render from the PDF bytes (local or remote fetch). Persist
+               stitched results each time; a fresh render also records its
+               pages on the blob so later duplicates skip rendering.
             4. Emit structured logs (action=...) without bucket/student details.
 
         Permissions:
@@ -567,6 +578,59 @@ class _LocalVisionAdapter:
         except Exception:
             pass
 
+        # Same bytes rendered before (content-addressed blob): stitch those pages.
+        blob = None
+        blobs = _blob_registry()
+        sha256 = str((submission or {}).get("sha256") or "").lower()
+        if blobs is not None and sha256:
+            try:
+                blob = blobs.find(owner_sub=student_sub, sha256=sha256)
+            except Exception as exc:
+                LOG.warning(
+                    "learning.vision.pdf_ensure_stitched action=blob_lookup_failed error_type=%s submission_id=%s",
+                    type(exc).__name__,
+                    submission_id,
+                )
+        if blob is not None and blob.derived_keys:
+            blob_paths: list[Path] = []
+            for key in blob.derived_keys:
+                # Dev writers place derived pages under root/{bucket}/{key}.
+                for path in _resolved_key_paths([f"{bucket}/{key}", key]):
+                    if path.is_file():
+                        blob_paths.append(path)
+                        break
+            page_bytes = _read_page_bytes(blob_paths)
+            if len(page_bytes) == len(blob.derived_keys):
+                stitched_png = _stitch_or_none(page_bytes)
+                if stitched_png:
+                    _persist_stitched(stitched_png)
+                    _log_storage_event(
+                        submission_id=submission_id,
+                        action="stitch_from_blob_pages",
+                        pages=len(page_bytes),
+                    )
+                    return stitched_png
+
+        def _record_blob_pages(pages: list[bytes]) -> None:
+            if blob is None or blob.derived_keys or blobs is None:
+                return
+            prefix = f"submissions/{course_id}/{task_id}/{student_sub}/derived/{submission_id}"
+            keys = [f"{prefix}/page_{idx:04}.png" for idx in range(1, len(pages) + 1)]
+            try:
+                for key, data in zip(keys, pages):
+                    target = (base / bucket / key).resolve()
+                    if os.path.commonpath([str(base), str(target)]) != str(base):
+                        return
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(data)
+                blobs.set_derived(owner_sub=student_sub, sha256=sha256, keys=keys)
+            except Exception as exc:
+                LOG.warning(
+                    "learning.vision.pdf_ensure_stitched action=blob_pages_failed error_type=%s submission_id=%s",
+                    type(exc).__name__,
+                    submission_id,
+                )
+
         # Try to read original PDF and render (local or remote fetch fallback)
         storage_key = (job_payload or {}).get("storage_key") or (submission or {}).get("storage_key") or ""
         if not storage_key:
@@ -626,6 +690,7 @@ class _LocalVisionAdapter:
                 )
                 return None
             _persist_stitched(stitched_png)
+            _record_blob_pages(page_bytes)
             LOG.info(
                 "learning.vision.pdf_ensure_stitched action=persist_derived bytes=%s submission_id=%s",
                 len(stitched_png),
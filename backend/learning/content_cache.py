@@ -0,0 +1,83 @@
+"""
+Shared snapshot cache for released unit content (sections, materials, tasks).
+
+Why:
+    Every student of a course sees the same released structure of a unit. The
+    student unit page used to rebuild it from the database for each request.
+    `DBLearningRepo.list_released_sections_by_unit` now stores the shared part
+    under (course, unit, content version, query shape) and only performs the
+    per-student checks (membership, unit in course) on each request.
+
+Invalidation:
+    `public.unit_content_versions.version` is bumped by triggers on
+    `unit_sections`, `unit_materials`, `unit_tasks` and
+    `module_section_releases`, so teacher edits and release toggles from any
+    worker produce a new key. Old versions simply age out of the LRU.
+
+Security:
+    Callers must check membership before reading from the cache. Snapshots
+    contain only course-wide released content, never per-student data.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, List, Optional
+import copy
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+class ReleasedContentCache:
+    """Bounded LRU of released-content snapshots with hit/miss counters.
+
+    Values are deep-copied on the way in and out so callers can decorate the
+    returned dicts (e.g., with per-student state) without corrupting the
+    shared snapshot.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._max = max_entries
+        self._lock = Lock()
+        self._data: "OrderedDict[Hashable, List[dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[List[dict]]:
+        with self._lock:
+            snapshot = self._data.get(key)
+            if snapshot is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(snapshot)
+
+    def put(self, key: Hashable, sections: List[dict]) -> None:
+        if self._max <= 0:
+            return
+        snapshot = copy.deepcopy(sections)
+        with self._lock:
+            self._data[key] = snapshot
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._data), "max_entries": self._max}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+RELEASED_CONTENT_CACHE = ReleasedContentCache(_env_int("LEARNING_CONTENT_CACHE_MAX_ENTRIES", 256))
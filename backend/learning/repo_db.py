@@ -3,12 +3,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Iterable, List, Optional, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 import json
 import os
 import re
 from uuid import UUID, uuid5
 
+from backend.learning.content_cache import RELEASED_CONTENT_CACHE
+from identity_access.guard_memo import memoized
+
 try:  # pragma: no cover -- optional dependency in some environments
     import psycopg
     from psycopg import Connection
@@ -166,6 +169,22 @@ class DBLearningRepo:
     def _set_current_sub(self, cur, sub: str) -> None:
         cur.execute("select set_config('app.current_sub', %s, true)", (sub,))
 
+    def _is_course_member(self, cur, course_uuid: str, student_sub: str) -> bool:
+        """Membership check shared by all student reads; memoized per request.
+
+        Runs on the caller's cursor (after `_set_current_sub`) so RLS applies
+        exactly as before; repeated checks within one request reuse the answer.
+        """
+
+        def lookup() -> bool:
+            cur.execute(
+                "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
+                (course_uuid, student_sub),
+            )
+            return bool(cur.fetchone()[0])
+
+        return memoized("learning.course_member", (course_uuid, student_sub), lookup)
+
     # ------------------------------------------------------------------
     def list_courses_for_student(self, *, student_sub: str, limit: int, offset: int) -> List[dict]:
         """Return the student's courses with minimal fields, alphabetically.
@@ -215,11 +234,7 @@ class DBLearningRepo:
             with conn.cursor() as cur:
                 self._set_current_sub(cur, student_sub)
                 # Membership check for strict 404 semantics
-                cur.execute(
-                    "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
-                    (course_uuid, student_sub),
-                )
-                if not bool(cur.fetchone()[0]):
+                if not self._is_course_member(cur, course_uuid, student_sub):
                     raise LookupError("not_member_or_missing")
                 cur.execute(
                     """
@@ -259,11 +274,7 @@ class DBLearningRepo:
             with conn.cursor() as cur:
                 # RLS: set caller identity for membership check and all subsequent helpers
                 self._set_current_sub(cur, student_sub)
-                cur.execute(
-                    "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
-                    (course_uuid, student_sub),
-                )
-                if not bool(cur.fetchone()[0]):
+                if not self._is_course_member(cur, course_uuid, student_sub):
                     raise PermissionError("not_course_member")
 
                 self._set_current_sub(cur, student_sub)
@@ -299,19 +310,29 @@ class DBLearningRepo:
                     "materials": [],
                     "tasks": [],
                 }
-                if include_materials:
-                    entry["materials"] = self._fetch_materials(conn, student_sub, course_uuid, section_id)
-                if include_tasks:
-                    entry["tasks"] = self._fetch_tasks(conn, student_sub, course_uuid, section_id)
                 sections.append(entry)
-            return sections
+            return self._attach_released_content(
+                conn,
+                student_sub,
+                course_uuid,
+                sections,
+                include_materials=include_materials,
+                include_tasks=include_tasks,
+            )
 
-    def _fetch_materials(self, conn: Connection, student_sub: str, course_id: str, section_id: str) -> List[dict]:
+    def _fetch_materials_bulk(
+        self, conn: Connection, student_sub: str, course_id: str, section_ids: List[str]
+    ) -> Dict[str, List[dict]]:
+        """Released materials for all ``section_ids`` in one query, grouped by section."""
+        grouped: Dict[str, List[dict]] = {sid: [] for sid in section_ids}
+        if not section_ids:
+            return grouped
         with conn.cursor() as cur:
             self._set_current_sub(cur, student_sub)
             cur.execute(
                 """
-                select id::text,
+                select section_id::text,
+                       id::text,
                        title,
                        kind,
                        body_md,
@@ -324,38 +345,44 @@ class DBLearningRepo:
                        material_position,
                        created_at_iso,
                        updated_at_iso
-                  from public.get_released_materials_for_student(%s, %s, %s)
+                  from public.get_released_materials_for_student_sections(%s, %s, %s::uuid[])
                 """,
-                (student_sub, course_id, section_id),
+                (student_sub, course_id, list(section_ids)),
             )
             rows = cur.fetchall()
-        materials: List[dict] = []
         for row in rows:
-            materials.append(
+            grouped.setdefault(row[0], []).append(
                 {
-                    "id": row[0],
-                    "title": row[1],
-                    "kind": row[2],
-                    "body_md": row[3],
-                    "mime_type": row[4],
-                    "size_bytes": row[5],
-                    "filename_original": row[6],
-                    "storage_key": row[7],
-                    "sha256": row[8],
-                    "alt_text": row[9],
-                    "position": int(row[10]) if row[10] is not None else None,
-                    "created_at": row[11],
-                    "updated_at": row[12],
+                    "id": row[1],
+                    "title": row[2],
+                    "kind": row[3],
+                    "body_md": row[4],
+                    "mime_type": row[5],
+                    "size_bytes": row[6],
+                    "filename_original": row[7],
+                    "storage_key": row[8],
+                    "sha256": row[9],
+                    "alt_text": row[10],
+                    "position": int(row[11]) if row[11] is not None else None,
+                    "created_at": row[12],
+                    "updated_at": row[13],
                 }
             )
-        return materials
-
-    def _fetch_tasks(self, conn: Connection, student_sub: str, course_id: str, section_id: str) -> List[dict]:
+        return grouped
+
+    def _fetch_tasks_bulk(
+        self, conn: Connection, student_sub: str, course_id: str, section_ids: List[str]
+    ) -> Dict[str, List[dict]]:
+        """Released tasks for all ``section_ids`` in one query, grouped by section."""
+        grouped: Dict[str, List[dict]] = {sid: [] for sid in section_ids}
+        if not section_ids:
+            return grouped
         with conn.cursor() as cur:
             self._set_current_sub(cur, student_sub)
             cur.execute(
                 """
-                select id::text,
+                select section_id::text,
+                       id::text,
                        instruction_md,
                        criteria,
                        hints_md,
@@ -364,28 +391,93 @@ class DBLearningRepo:
                        task_position,
                        created_at_iso,
                        updated_at_iso
-                  from public.get_released_tasks_for_student(%s, %s, %s)
+                  from public.get_released_tasks_for_student_sections(%s, %s, %s::uuid[])
                 """,
-                (student_sub, course_id, section_id),
+                (student_sub, course_id, list(section_ids)),
             )
             rows = cur.fetchall()
-        tasks: List[dict] = []
         for row in rows:
-            tasks.append(
+            grouped.setdefault(row[0], []).append(
                 {
-                    "id": row[0],
-                    "instruction_md": row[1],
-                    "criteria": list(row[2] or []),
-                    "hints_md": row[3],
-                    "due_at": row[4],
-                    "max_attempts": row[5],
-                    "position": int(row[6]) if row[6] is not None else None,
-                    "created_at": row[7],
-                    "updated_at": row[8],
+                    "id": row[1],
+                    "instruction_md": row[2],
+                    "criteria": list(row[3] or []),
+                    "hints_md": row[4],
+                    "due_at": row[5],
+                    "max_attempts": row[6],
+                    "position": int(row[7]) if row[7] is not None else None,
+                    "created_at": row[8],
+                    "updated_at": row[9],
                     "kind": "native",
                 }
             )
-        return tasks
+        return grouped
+
+    def _attach_released_content(
+        self,
+        conn: Connection,
+        student_sub: str,
+        course_id: str,
+        sections: List[dict],
+        *,
+        include_materials: bool,
+        include_tasks: bool,
+    ) -> List[dict]:
+        """Fill `materials`/`tasks` of each entry with one set-based query per kind.
+
+        Replaces the former per-section helpers (2N extra round-trips per page).
+        """
+        section_ids = [entry["section"]["id"] for entry in sections]
+        if include_materials:
+            materials = self._fetch_materials_bulk(conn, student_sub, course_id, section_ids)
+            for entry in sections:
+                entry["materials"] = materials.get(entry["section"]["id"], [])
+        if include_tasks:
+            tasks = self._fetch_tasks_bulk(conn, student_sub, course_id, section_ids)
+            for entry in sections:
+                entry["tasks"] = tasks.get(entry["section"]["id"], [])
+        return sections
+
+    def _check_unit_access(self, cur, student_sub: str, course_uuid: str, unit_uuid: str) -> int:
+        """Run the per-student checks for unit-scoped reads; return the content version.
+
+        Raises PermissionError when the caller is not a course member and
+        LookupError when the unit is not part of the course.
+        """
+        self._set_current_sub(cur, student_sub)
+        # Ensure membership exists
+        if not self._is_course_member(cur, course_uuid, student_sub):
+            raise PermissionError("not_course_member")
+
+        # Verify that the unit belongs to the course from the student's perspective
+        # and read the unit's content version (bumped by triggers on writes).
+        cur.execute(
+            """
+            select exists (
+                     select 1
+                       from public.get_course_units_for_student(%s, %s) t
+                      where t.unit_id = %s
+                   ),
+                   (select v.version from public.unit_content_versions v where v.unit_id = %s)
+            """,
+            (student_sub, course_uuid, unit_uuid, unit_uuid),
+        )
+        check = cur.fetchone()
+        if not bool(check[0]):
+            raise LookupError("unit_not_in_course")
+        return int(check[1] or 0)
+
+    def released_unit_content_version(self, *, student_sub: str, course_id: str, unit_id: str) -> int:
+        """Return the unit's content version after the same checks as the listing.
+
+        Used for conditional GETs: a matching ETag can be answered with 304
+        without loading sections, materials or tasks.
+        """
+        course_uuid = str(UUID(course_id))
+        unit_uuid = str(UUID(unit_id))
+        with psycopg.connect(self._dsn) as conn:
+            with conn.cursor() as cur:
+                return self._check_unit_access(cur, student_sub, course_uuid, unit_uuid)
 
     def list_released_sections_by_unit(
         self,
@@ -398,39 +490,63 @@ class DBLearningRepo:
         limit: int,
         offset: int,
     ) -> List[dict]:
-        """List released sections for a specific unit (student scope).
+        """List released sections for a specific unit (student scope)."""
+        return self.list_released_sections_by_unit_versioned(
+            student_sub=student_sub,
+            course_id=course_id,
+            unit_id=unit_id,
+            include_materials=include_materials,
+            include_tasks=include_tasks,
+            limit=limit,
+            offset=offset,
+        )[0]
+
+    def list_released_sections_by_unit_versioned(
+        self,
+        *,
+        student_sub: str,
+        course_id: str,
+        unit_id: str,
+        include_materials: bool,
+        include_tasks: bool,
+        limit: int,
+        offset: int,
+    ) -> tuple[List[dict], int]:
+        """List released sections for a unit together with its content version.
+
+        The version is read by the same access check that guards the listing,
+        so callers can derive an ETag without a second round trip.
 
         Security:
             Validates that the student is a member of the course and that the
             unit belongs to the course (via course_modules). Uses a dedicated
             SQL helper for efficient server-side filtering.
+
+        Performance:
+            After the per-student checks, the released structure is served from
+            `RELEASED_CONTENT_CACHE` keyed by the unit's content version; only
+            the first request after a change queries sections/materials/tasks.
         """
         course_uuid = str(UUID(course_id))
         unit_uuid = str(UUID(unit_id))
         with psycopg.connect(self._dsn) as conn:
             with conn.cursor() as cur:
-                self._set_current_sub(cur, student_sub)
-                # Ensure membership exists
-                cur.execute(
-                    "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
-                    (course_uuid, student_sub),
+                version = self._check_unit_access(cur, student_sub, course_uuid, unit_uuid)
+
+                # Released content is identical for all members of the course:
+                # serve the shared snapshot for this content version if present.
+                cache_key = (
+                    course_uuid,
+                    unit_uuid,
+                    version,
+                    bool(include_materials),
+                    bool(include_tasks),
+                    int(limit),
+                    int(offset),
                 )
-                if not bool(cur.fetchone()[0]):
-                    raise PermissionError("not_course_member")
-
-                # Verify that the unit belongs to the course from the student's perspective
-                cur.execute(
-                    """
-                    select exists (
-                             select 1
-                               from public.get_course_units_for_student(%s, %s) t
-                              where t.unit_id = %s
-                           )
-                    """,
-                    (student_sub, course_uuid, unit_uuid),
-                )
-                if not bool(cur.fetchone()[0]):
-                    raise LookupError("unit_not_in_course")
+                cached = RELEASED_CONTENT_CACHE.get(cache_key)
+                if cached is not None:
+                    return cached, version
 
                 # Fetch released sections for the unit (may be empty)
                 cur.execute(
@@ -461,12 +577,17 @@ class DBLearningRepo:
                     "materials": [],
                     "tasks": [],
                 }
-                if include_materials:
-                    entry["materials"] = self._fetch_materials(conn, student_sub, course_uuid, section_id)
-                if include_tasks:
-                    entry["tasks"] = self._fetch_tasks(conn, student_sub, course_uuid, section_id)
                 sections.append(entry)
-            return sections
+            self._attach_released_content(
+                conn,
+                student_sub,
+                course_uuid,
+                sections,
+                include_materials=include_materials,
+                include_tasks=include_tasks,
+            )
+            RELEASED_CONTENT_CACHE.put(cache_key, sections)
+            return sections, version
 
     # ------------------------------------------------------------------
     def create_submission(self, data: SubmissionInput) -> dict:
@@ -500,11 +621,7 @@ class DBLearningRepo:
         with psycopg.connect(self._dsn) as conn:
             with conn.cursor() as cur:
                 self._set_current_sub(cur, data.student_sub)
-                cur.execute(
-                    "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
-                    (course_uuid, data.student_sub),
-                )
-                if not bool(cur.fetchone()[0]):
+                if not self._is_course_member(cur, course_uuid, data.student_sub):
                     raise PermissionError("not_course_member")
 
                 # Normalize Idempotency-Key (guard against hidden whitespace/case quirks)
@@ -799,11 +916,7 @@ class DBLearningRepo:
         with psycopg.connect(self._dsn) as conn:
             with conn.cursor() as cur:
                 self._set_current_sub(cur, student_sub)
-                cur.execute(
-                    "select exists(select 1 from public.course_memberships where course_id=%s and student_id=%s)",
-                    (course_uuid, student_sub),
-                )
-                if not bool(cur.fetchone()[0]):
+                if not self._is_course_member(cur, course_uuid, student_sub):
                     raise PermissionError("not_course_member")
 
                 cur.execute(
@@ -10,11 +10,14 @@ Parameters:
     - worker_dsn: Postgres DSN with privileges to update submissions under RLS.
     - storage: BinaryWriteStorage implementation used to persist PNG pages.
     - bucket: Supabase storage bucket for learning submissions.
+    - blobs: optional content-blob registry (`backend.storage.blobs`); pages
+      already rendered for the same (student, sha256) are reused.
 
 Expected behavior:
     - Reject oversized inputs (`input_too_large`) before rendering.
     - Map PDF render errors to `input_corrupt`.
     - Persist derived page images and mark submission `extracted` on success.
+    - Skip rendering when the submission's blob already has derived pages.
 
 Permissions:
     Caller must ensure the student owns the submission. This use case sets
@@ -58,6 +61,14 @@ class SubmissionContext:
     sha256: str
 
 
+class DerivedPagesRegistry(Protocol):
+    """Subset of `backend.storage.blobs.BlobRepo` used for page reuse."""
+
+    def find(self, *, owner_sub: str, sha256: str): ...
+
+    def set_derived(self, *, owner_sub: str, sha256: str, keys: list[str]) -> None: ...
+
+
 class PreprocessPdfSubmissionUseCase:
     """Render a PDF submission to images, store them, and update status."""
 
@@ -69,12 +80,14 @@ class PreprocessPdfSubmissionUseCase:
         storage: BinaryWriteStorage,
         bucket: str,
         size_limit_bytes: int | None = None,
+        blobs: DerivedPagesRegistry | None = None,
     ) -> None:
         self._repo = repo
         self._worker_dsn = worker_dsn
         self._storage = storage
         self._bucket = bucket
         self._size_limit = size_limit_bytes or 10 * 1024 * 1024  # 10 MiB default
+        self._blobs = blobs
 
     def execute(self, *, context: SubmissionContext, pdf_bytes: bytes) -> None:
         """Drive the preprocessing workflow for a single submission."""
@@ -85,6 +98,9 @@ class PreprocessPdfSubmissionUseCase:
             self._mark_failed(context=context, code="input_too_large", message="payload size exceeds configured limit")
             return
 
+        if self._reuse_rendered_pages(context):
+            return
+
         try:
             pipeline = importlib.import_module("backend.vision.pipeline")
             process_pdf_bytes = getattr(pipeline, "process_pdf_bytes")
@@ -132,7 +148,7 @@ class PreprocessPdfSubmissionUseCase:
             persist_pages.append(_PersistPage(data))
 
         try:
-            persist_rendered_pages(
+            page_keys = persist_rendered_pages(
                 storage=self._storage,
                 bucket=self._bucket,
                 scope=scope,
@@ -141,6 +157,26 @@ class PreprocessPdfSubmissionUseCase:
             )
         except Exception as exc:
             self._mark_failed(context=context, code="input_corrupt", message=str(exc) or "persist rendered pages failed")
+            return
+        if self._blobs is not None and context.sha256:
+            try:
+                self._blobs.set_derived(owner_sub=context.student_sub, sha256=context.sha256, keys=list(page_keys))
+            except Exception:
+                pass  # Reuse is an optimization; the submission is already extracted.
+
+    def _reuse_rendered_pages(self, context: SubmissionContext) -> bool:
+        """Mark extracted with the blob's existing pages; True when reused."""
+        if self._blobs is None or not context.sha256:
+            return False
+        try:
+            blob = self._blobs.find(owner_sub=context.student_sub, sha256=context.sha256)
+        except Exception:
+            return False
+        keys = list(getattr(blob, "derived_keys", None) or ())
+        if not keys:
+            return False
+        self._repo.mark_extracted(submission_id=context.submission_id, page_keys=keys)
+        return True
 
     def _mark_failed(self, *, context: SubmissionContext, code: str, message: str) -> None:
         """Set submission status to failed with the provided error code/message."""
@@ -96,14 +96,35 @@ class ListUnitSectionsUseCase:
         Security:
             Repository enforces course membership and unit-in-course relation.
         """
-        limit = max(1, min(req.limit, 100))
-        offset = max(0, req.offset)
-        return self._repo.list_released_sections_by_unit(
+        return self.execute_versioned(req)[0]
+
+    def execute_versioned(self, req: ListUnitSectionsInput) -> tuple[list[dict], int | None]:
+        """Like `execute`, plus the unit's content version when the repository
+        can read it in the same call (None otherwise; callers hash the body).
+        """
+        params = dict(
             student_sub=req.student_sub,
             course_id=req.course_id,
             unit_id=req.unit_id,
             include_materials=req.include_materials,
             include_tasks=req.include_tasks,
-            limit=limit,
-            offset=offset,
+            limit=max(1, min(req.limit, 100)),
+            offset=max(0, req.offset),
         )
+        versioned = getattr(self._repo, "list_released_sections_by_unit_versioned", None)
+        if versioned is None:
+            return self._repo.list_released_sections_by_unit(**params), None
+        sections, version = versioned(**params)
+        return sections, int(version)
+
+    def content_version(self, req: ListUnitSectionsInput) -> int | None:
+        """Return the unit's content version for conditional GETs, if supported.
+
+        Performs the same membership/unit checks as `execute` (raising the
+        same errors) but does not load any content. Returns None when the
+        repository cannot provide versions; callers then hash the response.
+        """
+        probe = getattr(self._repo, "released_unit_content_version", None)
+        if probe is None:
+            return None
+        return int(probe(student_sub=req.student_sub, course_id=req.course_id, unit_id=req.unit_id))
@@ -854,19 +854,48 @@ def run_forever(
     feedback_adapter: FeedbackAdapterProtocol,
     poll_interval: float = 0.5,
 ) -> None:
-    """Continuously process jobs until interrupted."""
+    """Continuously process jobs until interrupted.
+
+    Between analysis jobs the worker also derives queued previews for
+    submissions and file materials (`backend.storage.preview_jobs`), so the
+    web tier never rasterizes PDFs itself.
+    """
     import time
 
+    from backend.storage.bootstrap import service_storage_adapter
+    from backend.storage.preview_jobs import preview_queue_from_env
+
+    preview_queue = preview_queue_from_env(dsn)
+    preview_adapter = None
+    if preview_queue is not None:
+        try:
+            preview_adapter = service_storage_adapter()
+        except Exception as exc:  # pragma: no cover - depends on installed supabase client
+            LOG.warning("learning.worker.previews adapter_unavailable error_type=%s", type(exc).__name__)
+
     while True:
         processed = run_once(
             dsn=dsn,
             vision_adapter=vision_adapter,
             feedback_adapter=feedback_adapter,
         )
-        if not processed:
+        previews = _run_preview_jobs(preview_queue, adapter=preview_adapter) if preview_queue is not None else 0
+        if not processed and not previews:
             time.sleep(poll_interval)
 
 
+def _run_preview_jobs(queue, *, adapter) -> int:
+    """Derive a few queued previews; failures never stop the analysis loop."""
+    from backend.storage.config import dev_upload_root
+    from backend.storage.preview_jobs import process_preview_jobs
+
+    try:
+        return process_preview_jobs(queue, adapter=adapter, local_root=dev_upload_root())
+    except Exception as exc:
+        LOG.warning("learning.worker.previews failed error_type=%s", type(exc).__name__)
+        return 0
+
+
 def _dsn_username(dsn: str) -> str:
     try:
         from urllib.parse import urlparse
@@ -0,0 +1,463 @@
+"""
+Content-addressed blobs for submission uploads.
+
+Why:
+    Students re-upload the same file, e.g. a worksheet PDF for every attempt.
+    Each upload used to be stored under its own key and rendered to page PNGs
+    again. A registry keyed by (student, sha256) lets later submissions point
+    at the first verified object and reuse its rendered pages and preview.
+
+Model:
+    - One `BlobRecord` per (owner_sub, sha256): canonical object key, size,
+      MIME type, derived page keys and a reference count.
+    - One reference per submission. In Postgres, triggers maintain the
+      refcount and references cascade when a submission is deleted.
+    - Dedup is scoped per student, so a submission never points into another
+      student's storage prefix (keys and signed URLs contain the owner's sub).
+
+GC safety (`collect_unreferenced_blobs`):
+    Only blobs with refcount 0 are collected, and only when their last
+    reference and last lookup are older than the grace period
+    (`CONTENT_BLOBS_GC_GRACE_SECONDS`, default 7 days). The DB backend also
+    skips blobs whose object key is still named by a submission row. The
+    registry row is deleted before the objects, so a concurrent upload can no
+    longer be handed a blob whose objects are about to disappear.
+
+Backends:
+    Dedup is off unless `CONTENT_BLOBS_BACKEND=db` selects `DBBlobRepo` on
+    `public.storage_blobs` / `public.storage_blob_refs` (`blob_repo_from_env`,
+    used by `main.py` and the vision worker). Only the DB registry sees
+    submission deletes (cascading refs) and GC, so a process-local registry is
+    never used in production. `InMemoryBlobRepo` backs tests. The tables are
+    service role only. Callers confirm the canonical object still exists
+    (`blob_object_exists`) before handing it to a new submission.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+
+try:  # pragma: no cover - optional dependency in some environments
+    import psycopg  # type: ignore
+
+    HAVE_PSYCOPG = True
+except Exception:  # pragma: no cover
+    psycopg = None  # type: ignore
+    HAVE_PSYCOPG = False
+
+from backend.storage.previews import submission_preview_key
+
+logger = logging.getLogger("gustav.storage.blobs")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def gc_grace_seconds() -> int:
+    """Minimum age of an unreferenced blob before GC may remove it."""
+    return _env_int("CONTENT_BLOBS_GC_GRACE_SECONDS", 7 * 24 * 3600)
+
+
+@dataclass(frozen=True)
+class BlobRecord:
+    owner_sub: str
+    sha256: str
+    bucket: str
+    object_key: str
+    size_bytes: int
+    mime_type: str
+    derived_keys: tuple[str, ...] = ()
+    refcount: int = 0
+
+
+class BlobRepo(Protocol):
+    """Registry of content-addressed submission objects."""
+
+    def find(self, *, owner_sub: str, sha256: str) -> Optional[BlobRecord]: ...
+
+    def register(
+        self, *, owner_sub: str, sha256: str, bucket: str, object_key: str, size_bytes: int, mime_type: str
+    ) -> BlobRecord: ...
+
+    def add_ref(self, *, owner_sub: str, sha256: str, submission_id: str) -> None: ...
+
+    def remove_ref(self, *, submission_id: str) -> None: ...
+
+    def set_derived(self, *, owner_sub: str, sha256: str, keys: Sequence[str]) -> None: ...
+
+    def collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]: ...
+
+    def claim_collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]: ...
+
+
+@dataclass
+class _MemEntry:
+    record: BlobRecord
+    refs: set[str] = field(default_factory=set)
+    created_at: float = 0.0
+    last_seen_at: float = 0.0
+    unreferenced_at: Optional[float] = None
+
+
+class InMemoryBlobRepo:
+    """Process-local blob registry (dev/tests, single worker).
+
+    Losing the registry on restart is harmless: later uploads are stored
+    again, and GC only ever sees blobs this process registered.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._data: Dict[tuple[str, str], _MemEntry] = {}
+        self._ref_owner: Dict[str, tuple[str, str]] = {}
+
+    def _snapshot(self, entry: _MemEntry) -> BlobRecord:
+        return replace(entry.record, refcount=len(entry.refs))
+
+    def find(self, *, owner_sub: str, sha256: str) -> Optional[BlobRecord]:
+        with self._lock:
+            entry = self._data.get((owner_sub, sha256.lower()))
+            if entry is None:
+                return None
+            entry.last_seen_at = time.time()
+            return self._snapshot(entry)
+
+    def register(
+        self, *, owner_sub: str, sha256: str, bucket: str, object_key: str, size_bytes: int, mime_type: str
+    ) -> BlobRecord:
+        now = time.time()
+        key = (owner_sub, sha256.lower())
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                record = BlobRecord(
+                    owner_sub=owner_sub,
+                    sha256=sha256.lower(),
+                    bucket=bucket,
+                    object_key=object_key,
+                    size_bytes=int(size_bytes),
+                    mime_type=mime_type,
+                )
+                entry = _MemEntry(record=record, created_at=now)
+                self._data[key] = entry
+            entry.last_seen_at = now
+            return self._snapshot(entry)
+
+    def add_ref(self, *, owner_sub: str, sha256: str, submission_id: str) -> None:
+        key = (owner_sub, sha256.lower())
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                raise LookupError("blob_not_found")
+            if submission_id in self._ref_owner:
+                return
+            entry.refs.add(submission_id)
+            entry.unreferenced_at = None
+            self._ref_owner[submission_id] = key
+
+    def remove_ref(self, *, submission_id: str) -> None:
+        with self._lock:
+            key = self._ref_owner.pop(submission_id, None)
+            entry = self._data.get(key) if key else None
+            if entry is None:
+                return
+            entry.refs.discard(submission_id)
+            if not entry.refs:
+                entry.unreferenced_at = time.time()
+
+    def set_derived(self, *, owner_sub: str, sha256: str, keys: Sequence[str]) -> None:
+        with self._lock:
+            entry = self._data.get((owner_sub, sha256.lower()))
+            if entry is not None and not entry.record.derived_keys:
+                entry.record = replace(entry.record, derived_keys=tuple(keys))
+
+    def _collectable_keys(self, grace_seconds: int, limit: int) -> List[tuple[str, str]]:
+        cutoff = time.time() - grace_seconds
+        candidates = [
+            (max(e.unreferenced_at or e.created_at, e.last_seen_at), k)
+            for k, e in self._data.items()
+            if not e.refs and max(e.unreferenced_at or e.created_at, e.last_seen_at) <= cutoff
+        ]
+        return [k for _, k in sorted(candidates)[: max(0, limit)]]
+
+    def collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]:
+        with self._lock:
+            return [self._snapshot(self._data[k]) for k in self._collectable_keys(grace_seconds, limit)]
+
+    def claim_collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]:
+        with self._lock:
+            return [self._snapshot(self._data.pop(k)) for k in self._collectable_keys(grace_seconds, limit)]
+
+
+_COLUMNS = "owner_sub, sha256, bucket, object_key, size_bytes, mime_type, derived_keys, refcount"
+
+# A blob is collectable once nothing references it for longer than the grace
+# period, nobody looked it up meanwhile, and no submission row names its key.
+_COLLECTABLE_WHERE = (
+    "b.refcount = 0"
+    " and greatest(coalesce(b.unreferenced_at, b.created_at), b.last_seen_at)"
+    " <= now() - make_interval(secs => %s)"
+    " and not exists (select 1 from public.storage_blob_refs r"
+    " where r.owner_sub = b.owner_sub and r.sha256 = b.sha256)"
+    " and not exists (select 1 from public.learning_submissions s where s.storage_key = b.object_key)"
+)
+
+
+def _record(row: Sequence[Any]) -> BlobRecord:
+    return BlobRecord(
+        owner_sub=str(row[0]),
+        sha256=str(row[1]),
+        bucket=str(row[2]),
+        object_key=str(row[3]),
+        size_bytes=int(row[4] or 0),
+        mime_type=str(row[5] or ""),
+        derived_keys=tuple(str(k) for k in (row[6] or ())),
+        refcount=int(row[7] or 0),
+    )
+
+
+def _resolve_dsn(dsn: str | None) -> str:
+    # Service-role tables: never fall back to the limited application role first.
+    return (
+        dsn
+        or os.getenv("SERVICE_ROLE_DSN")
+        or os.getenv("SESSION_DATABASE_URL")
+        or os.getenv("DATABASE_URL")
+        or os.getenv("SUPABASE_DB_URL", "")
+    )
+
+
+class DBBlobRepo:
+    """Postgres-backed blob registry shared by all web workers and the worker."""
+
+    def __init__(self, dsn: str | None = None) -> None:
+        if not HAVE_PSYCOPG:
+            raise RuntimeError("psycopg3 is required for DBBlobRepo")
+        self._dsn = _resolve_dsn(dsn)
+        if not self._dsn:
+            raise RuntimeError("No database DSN provided for DBBlobRepo")
+
+    def _fetch(self, sql: str, params: tuple) -> List[tuple]:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                if cur.description is None:
+                    return []
+                return list(cur.fetchall())
+
+    def find(self, *, owner_sub: str, sha256: str) -> Optional[BlobRecord]:
+        rows = self._fetch(
+            f"update public.storage_blobs b set last_seen_at = now() "
+            f"where b.owner_sub = %s and b.sha256 = %s returning {_COLUMNS}",
+            (owner_sub, sha256.lower()),
+        )
+        return _record(rows[0]) if rows else None
+
+    def register(
+        self, *, owner_sub: str, sha256: str, bucket: str, object_key: str, size_bytes: int, mime_type: str
+    ) -> BlobRecord:
+        rows = self._fetch(
+            "insert into public.storage_blobs as b "
+            "(owner_sub, sha256, bucket, object_key, size_bytes, mime_type) "
+            "values (%s, %s, %s, %s, %s, %s) "
+            "on conflict (owner_sub, sha256) do update set last_seen_at = now() "
+            f"returning {_COLUMNS}",
+            (owner_sub, sha256.lower(), bucket, object_key, int(size_bytes), mime_type),
+        )
+        return _record(rows[0])
+
+    def add_ref(self, *, owner_sub: str, sha256: str, submission_id: str) -> None:
+        self._fetch(
+            "insert into public.storage_blob_refs (submission_id, owner_sub, sha256) "
+            "values (%s::uuid, %s, %s) on conflict (submission_id) do nothing",
+            (submission_id, owner_sub, sha256.lower()),
+        )
+
+    def remove_ref(self, *, submission_id: str) -> None:
+        self._fetch("delete from public.storage_blob_refs where submission_id = %s::uuid", (submission_id,))
+
+    def set_derived(self, *, owner_sub: str, sha256: str, keys: Sequence[str]) -> None:
+        self._fetch(
+            "update public.storage_blobs set derived_keys = %s "
+            "where owner_sub = %s and sha256 = %s and cardinality(derived_keys) = 0",
+            (list(keys), owner_sub, sha256.lower()),
+        )
+
+    def collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]:
+        rows = self._fetch(
+            f"select {_COLUMNS} from public.storage_blobs b where {_COLLECTABLE_WHERE} "
+            "order by b.last_seen_at limit %s",
+            (int(grace_seconds), int(limit)),
+        )
+        return [_record(r) for r in rows]
+
+    def claim_collectable(self, *, grace_seconds: int, limit: int) -> List[BlobRecord]:
+        # `skip locked` lets concurrent GC runs share the work; the FK from
+        # storage_blob_refs (on delete restrict) rejects deleting a blob that
+        # gained a reference after the candidate scan.
+        rows = self._fetch(
+            "delete from public.storage_blobs b where b.ctid = any(array("
+            f"select b.ctid from public.storage_blobs b where {_COLLECTABLE_WHERE} "
+            "order by b.last_seen_at limit %s for update skip locked)) "
+            f"returning {_COLUMNS}",
+            (int(grace_seconds), int(limit)),
+        )
+        return [_record(r) for r in rows]
+
+
+_BLOB_REPO: Optional[BlobRepo] = None
+
+
+def get_blob_repo() -> Optional[BlobRepo]:
+    """Active blob registry, or None when dedup is disabled."""
+    return _BLOB_REPO
+
+
+def set_blob_repo(repo: Optional[BlobRepo]) -> None:
+    global _BLOB_REPO
+    _BLOB_REPO = repo
+
+
+def blob_repo_from_env() -> Optional[BlobRepo]:
+    """`DBBlobRepo` when `CONTENT_BLOBS_BACKEND=db`, else None (dedup off).
+
+    Any other value, including the former `memory`, disables dedup: a
+    per-process registry misses deletes and GC in other processes.
+    """
+    backend = (os.getenv("CONTENT_BLOBS_BACKEND") or "off").strip().lower()
+    if backend != "db":
+        return None
+    try:
+        return DBBlobRepo()
+    except RuntimeError as exc:
+        logger.warning("storage.blobs action=db_unavailable error=%s", exc)
+        return None
+
+
+def blob_object_keys(record: BlobRecord) -> List[str]:
+    """All storage keys owned by a blob: original, rendered pages, preview."""
+    return [record.object_key, *record.derived_keys, submission_preview_key(record.object_key)]
+
+
+def _delete_local(root: str, bucket: str, key: str) -> bool:
+    base = Path(root).resolve()
+    removed = False
+    # Dev writers place derived pages under root/{bucket}/{key}, uploads under root/{key}.
+    for rel in (key, f"{bucket}/{key}"):
+        target = (base / rel.lstrip("/")).resolve()
+        if os.path.commonpath([str(base), str(target)]) != str(base):
+            continue
+        try:
+            target.unlink()
+            removed = True
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def blob_object_exists(*, adapter: Any, bucket: str, key: str, size_bytes: int, local_root: str = "") -> bool:
+    """True when the object is present with the expected size (dev root or adapter HEAD)."""
+    if local_root:
+        base = Path(local_root).resolve()
+        for rel in (key, f"{bucket}/{key}"):
+            target = (base / rel.lstrip("/")).resolve()
+            if os.path.commonpath([str(base), str(target)]) != str(base):
+                continue
+            try:
+                if target.is_file() and target.stat().st_size == size_bytes:
+                    return True
+            except OSError:
+                continue
+    head = getattr(adapter, "head_object", None)
+    if not callable(head):
+        return False
+    try:
+        info = head(bucket=bucket, key=key)
+        return bool(info) and int(info.get("content_length") or -1) == size_bytes
+    except Exception as exc:
+        logger.warning("storage.blobs action=head_failed error_type=%s", type(exc).__name__)
+        return False
+
+
+def delete_blob_object(*, adapter: Any, bucket: str, key: str, local_root: str = "") -> bool:
+    """Best-effort removal of one object from the dev root and/or the adapter."""
+    try:
+        if local_root and _delete_local(local_root, bucket, key):
+            return True
+        delete = getattr(adapter, "delete_object", None)
+        if not callable(delete):
+            return False
+        delete(bucket=bucket, key=key)
+        return True
+    except Exception as exc:
+        logger.warning("storage.blobs action=delete_failed error_type=%s", type(exc).__name__)
+        return False
+
+
+@dataclass
+class BlobGcReport:
+    dry_run: bool
+    blobs: int = 0
+    objects: int = 0
+    bytes: int = 0
+    failed: int = 0
+    keys: List[str] = field(default_factory=list)
+
+
+def collect_unreferenced_blobs(
+    repo: BlobRepo,
+    *,
+    adapter: Any = None,
+    local_root: str = "",
+    grace_seconds: Optional[int] = None,
+    limit: int = 100,
+    dry_run: bool = False,
+) -> BlobGcReport:
+    """Remove at most `limit` unreferenced blobs and their derived objects.
+
+    With `dry_run=True` nothing is changed; the report lists what would go.
+    """
+    grace = gc_grace_seconds() if grace_seconds is None else int(grace_seconds)
+    report = BlobGcReport(dry_run=dry_run)
+    fetch = repo.collectable if dry_run else repo.claim_collectable
+    for record in fetch(grace_seconds=grace, limit=limit):
+        report.blobs += 1
+        report.bytes += record.size_bytes
+        for key in blob_object_keys(record):
+            report.keys.append(key)
+            if dry_run:
+                continue
+            if delete_blob_object(adapter=adapter, bucket=record.bucket, key=key, local_root=local_root):
+                report.objects += 1
+            else:
+                report.failed += 1
+    logger.info(
+        "storage.blobs action=gc dry_run=%s blobs=%s objects=%s bytes=%s failed=%s",
+        dry_run, report.blobs, report.objects, report.bytes, report.failed,
+    )
+    return report
+
+
+__all__ = [
+    "BlobGcReport",
+    "BlobRecord",
+    "BlobRepo",
+    "DBBlobRepo",
+    "InMemoryBlobRepo",
+    "blob_object_keys",
+    "collect_unreferenced_blobs",
+    "delete_blob_object",
+    "gc_grace_seconds",
+    "get_blob_repo",
+    "set_blob_repo",
+]
@@ -186,4 +186,20 @@ def ensure_buckets_from_env() -> bool:
     return ensure_buckets(base, key, [teaching_bucket, learning_bucket])
 
 
-__all__ = ["ensure_buckets_from_env", "ensure_buckets"]
+def service_storage_adapter():
+    """Supabase Storage adapter with service-role credentials, or None.
+
+    For trusted background processes (storage GC, learning worker) that read
+    and write objects outside a user request.
+    """
+    url = (os.getenv("SUPABASE_URL") or "").strip()
+    key = (os.getenv("SUPABASE_SERVICE_ROLE_KEY") or "").strip()
+    if not url or not key:
+        return None
+    from supabase import create_client  # type: ignore
+    from teaching.storage_supabase import SupabaseStorageAdapter  # type: ignore
+
+    return SupabaseStorageAdapter(create_client(url, key))
+
+
+__all__ = ["ensure_buckets_from_env", "ensure_buckets", "service_storage_adapter"]
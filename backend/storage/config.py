@@ -95,3 +95,19 @@ __all__ += [
     "get_learning_max_upload_bytes",
     "get_materials_max_upload_bytes",
 ]
+
+# --- Dev upload root ------------------------------------------------------------
+
+
+def dev_upload_root() -> str:
+    """Directory the dev upload stub writes to and local readers resolve keys in.
+
+    Env:
+        STORAGE_VERIFY_ROOT – optional override; otherwise `.tmp/dev_uploads`
+        inside the working directory.
+    """
+    root = (os.getenv("STORAGE_VERIFY_ROOT") or "").strip()
+    return root or os.path.abspath(".tmp/dev_uploads")
+
+
+__all__ += ["dev_upload_root"]
@@ -0,0 +1,564 @@
+"""
+Storage GC: remove objects no database row refers to anymore.
+
+Why:
+    Abandoned upload intents, uploads whose submission was never created (or
+    was rejected) and deleted materials leave objects in the submissions and
+    materials buckets and `derived/` directories under STORAGE_VERIFY_ROOT
+    forever. Storage grows every day and so does the nightly backup.
+
+What is live (everything else older than the grace period is an orphan):
+    - submissions/{course}/{task}/{student}/{file}: named by a submission
+      (`learning_submissions.storage_key`) or a content blob
+      (`storage_blobs.object_key`).
+    - submissions/.../derived/{id}/...: `{id}` is an existing submission, the
+      key is a rendered page of a blob or listed in a submission's
+      `internal_metadata.page_keys`, or `{id}` is the stem of a live original
+      (per-upload previews).
+    - materials/{unit}/{section}/{material}/{file}: named by a material or by
+      an unconsumed, unexpired upload intent.
+    - materials/.../derived/...: the material still exists.
+    Keys of any other shape are reported as `unknown` and never deleted.
+
+Behavior:
+    - Lists the dev upload root (`--local-root`, default STORAGE_VERIFY_ROOT)
+      and/or the Storage buckets via `SupabaseStorageAdapter.list_objects`.
+    - Works in batches of `--batch-size` keys: one set of reference lookups
+      per batch. A failed lookup keeps the whole batch.
+    - Objects younger than `--grace` seconds (`STORAGE_GC_GRACE_SECONDS`,
+      default 2 days) are never deleted: uploads between intent and
+      submission are in flight.
+    - Deletes are paced to `--rate` objects per second and capped by
+      `--max-deletes` per run; `--dry-run` only reports.
+    - The CLI deletes only with `STORAGE_GC_DELETE=true`; without it every
+      pass is a dry run, so a freshly deployed job cannot remove anything
+      before its report was reviewed.
+    - Runs the content blob GC (`backend.storage.blobs`) first.
+
+Usage (repo checkout or the web image):
+    python -m backend.storage.gc --dry-run                      # JSON report only
+    STORAGE_GC_DELETE=true python -m backend.storage.gc --rate 20  # delete, 20 objects/s
+    python -m backend.storage.gc --loop 86400                   # daily
+
+Permissions:
+    Needs the service-role DSN (`SERVICE_ROLE_DSN`) to see all rows across
+    RLS, and the Supabase service-role key for listing/removing objects.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence
+
+try:  # pragma: no cover - optional dependency in some environments
+    import psycopg  # type: ignore
+
+    HAVE_PSYCOPG = True
+except Exception:  # pragma: no cover
+    psycopg = None  # type: ignore
+    HAVE_PSYCOPG = False
+
+from backend.storage.bootstrap import service_storage_adapter
+from backend.storage.config import get_materials_bucket, get_submissions_bucket
+
+LOG = logging.getLogger("gustav.storage.gc")
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+# Originals are stored with the extension of the uploaded file name.
+_ORIGINAL_EXTENSIONS = ("pdf", "png", "jpg", "jpeg", "webp", "gif")
+_SAMPLE_KEYS = 20
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    bucket: str
+    key: str
+    size: int
+    modified_at: float
+    local_path: Optional[Path] = None
+
+
+class ReferenceIndex(Protocol):
+    """Answers which of the given identifiers the database still refers to."""
+
+    def submission_keys(self, keys: Sequence[str]) -> set[str]: ...
+
+    def submission_ids(self, ids: Sequence[str]) -> set[str]: ...
+
+    def page_keys(self, keys: Sequence[str]) -> set[str]: ...
+
+    def material_keys(self, keys: Sequence[str]) -> set[str]: ...
+
+    def material_ids(self, ids: Sequence[str]) -> set[str]: ...
+
+
+def classify(key: str) -> tuple[str, str]:
+    """Return (kind, reference) for a storage key; kind "unknown" is kept."""
+    parts = key.split("/")
+    if len(parts) >= 5 and parts[0] == "submissions" and all(parts[:5]):
+        if len(parts) == 5:
+            return "submission", key
+        if parts[4] == "derived" and len(parts) >= 7 and parts[5]:
+            return "submission_derived", parts[5]
+    if len(parts) >= 5 and parts[0] == "materials" and all(parts[:5]):
+        if len(parts) == 5:
+            return "material", key
+        if parts[4] == "derived" and len(parts) >= 6:
+            return "material_derived", parts[3]
+    return "unknown", key
+
+
+def _original_candidates(key: str, stem: str) -> List[str]:
+    base = "/".join(key.split("/")[:4])
+    return [f"{base}/{stem}.{ext}" for ext in _ORIGINAL_EXTENSIONS] + [f"{base}/{stem}"]
+
+
+def live_keys(index: ReferenceIndex, objects: Sequence[StoredObject]) -> set[str]:
+    """Keys of `objects` that are still referenced (one lookup per kind)."""
+    kinds = {obj.key: classify(obj.key) for obj in objects}
+    live: set[str] = set()
+
+    originals = [k for k, (kind, _) in kinds.items() if kind == "submission"]
+    derived = {k: ref for k, (kind, ref) in kinds.items() if kind == "submission_derived"}
+    stems = {k: _original_candidates(k, ref) for k, ref in derived.items() if not _UUID_RE.match(ref)}
+    lookup = originals + [c for cands in stems.values() for c in cands]
+    known_originals = index.submission_keys(lookup) if lookup else set()
+    live.update(k for k in originals if k in known_originals)
+
+    ids = sorted({ref for ref in derived.values() if _UUID_RE.match(ref)})
+    known_ids = index.submission_ids(ids) if ids else set()
+    known_pages = index.page_keys(list(derived)) if derived else set()
+    for key, ref in derived.items():
+        if ref in known_ids or key in known_pages or any(c in known_originals for c in stems.get(key, ())):
+            live.add(key)
+
+    materials = [k for k, (kind, _) in kinds.items() if kind == "material"]
+    if materials:
+        live.update(index.material_keys(materials))
+    material_derived = {k: ref for k, (kind, ref) in kinds.items() if kind == "material_derived"}
+    mids = sorted({ref for ref in material_derived.values() if _UUID_RE.match(ref)})
+    known_mids = index.material_ids(mids) if mids else set()
+    for key, ref in material_derived.items():
+        # Non-UUID directories cannot be matched to a material: keep them.
+        if ref in known_mids or not _UUID_RE.match(ref):
+            live.add(key)
+
+    live.update(k for k, (kind, _) in kinds.items() if kind == "unknown")
+    return live
+
+
+# --- Listings -------------------------------------------------------------------
+
+
+def _domain_key(bucket: str, path: str, domain: str) -> str:
+    """Map a bucket-relative path back to the `{domain}/...` storage key.
+
+    The adapter strips a leading `{bucket}/` from keys, so with the default
+    bucket names `submissions/c/...` is stored as `c/...`.
+    """
+    path = path.lstrip("/")
+    if path.startswith(f"{domain}/"):
+        return path
+    return f"{domain}/{path}" if bucket == domain else f"{bucket}/{path}"
+
+
+def _parse_time(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        # Unknown age counts as brand new: never deleted.
+        return time.time()
+
+
+def iter_adapter_objects(adapter: Any, *, bucket: str, domain: str) -> Iterator[StoredObject]:
+    """Objects of one Storage bucket (adapter must offer `list_objects`)."""
+    for item in adapter.list_objects(bucket=bucket):
+        yield StoredObject(
+            bucket=bucket,
+            key=_domain_key(bucket, str(item.get("path") or ""), domain),
+            size=int(item.get("size") or 0),
+            modified_at=_parse_time(item.get("updated_at")),
+        )
+
+
+def iter_local_objects(root: str, *, buckets: Dict[str, str]) -> Iterator[StoredObject]:
+    """Objects under the dev upload root.
+
+    Uploads live at `root/{key}`; the dev PDF hook writes pages to
+    `root/{bucket}/{key}`. `buckets` maps domains ("submissions",
+    "materials") to bucket names.
+    """
+    base = Path(root).resolve()
+    if not base.is_dir():
+        return
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue  # in-flight temp files (atomic writes)
+            path = Path(dirpath) / name
+            rel = path.relative_to(base).as_posix()
+            for domain, bucket in buckets.items():
+                nested = f"{bucket}/{domain}/"
+                if rel.startswith(nested):
+                    rel, owner = rel[len(bucket) + 1 :], bucket
+                    break
+                if rel.startswith(f"{domain}/"):
+                    owner = bucket
+                    break
+            else:
+                owner = ""
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield StoredObject(bucket=owner, key=rel, size=stat.st_size, modified_at=stat.st_mtime, local_path=path)
+
+
+def _batches(items: Iterable[StoredObject], size: int) -> Iterator[List[StoredObject]]:
+    batch: List[StoredObject] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Deletion -------------------------------------------------------------------
+
+
+class RateLimiter:
+    """Spread deletions to at most `rate` objects per second (0 = unlimited)."""
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+
+    def acquire(self, count: int = 1) -> None:
+        if not self._interval:
+            return
+        now = self._clock()
+        if self._next > now:
+            self._sleep(self._next - now)
+            now = self._next
+        self._next = now + self._interval * count
+
+
+def _prune_empty_dirs(path: Path, stop: Path) -> None:
+    parent = path.parent
+    while parent != stop and stop in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            return
+        parent = parent.parent
+
+
+def delete_objects(objects: Sequence[StoredObject], *, adapter: Any = None, local_root: str = "") -> int:
+    """Delete one batch; returns how many objects were removed."""
+    removed = 0
+    remote: Dict[str, List[str]] = {}
+    stop = Path(local_root).resolve() if local_root else None
+    for obj in objects:
+        if obj.local_path is not None:
+            try:
+                obj.local_path.unlink()
+                removed += 1
+                if stop is not None:
+                    _prune_empty_dirs(obj.local_path, stop)
+            except FileNotFoundError:
+                continue
+        else:
+            remote.setdefault(obj.bucket, []).append(obj.key)
+    for bucket, keys in remote.items():
+        many = getattr(adapter, "delete_objects", None)
+        if callable(many):
+            many(bucket=bucket, keys=keys)
+        else:
+            for key in keys:
+                adapter.delete_object(bucket=bucket, key=key)
+        removed += len(keys)
+    return removed
+
+
+# --- Job ------------------------------------------------------------------------
+
+
+@dataclass
+class GcReport:
+    dry_run: bool
+    scanned: int = 0
+    live: int = 0
+    young: int = 0
+    unknown: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    deleted: int = 0
+    failed_batches: int = 0
+    batches: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+    sample: List[str] = field(default_factory=list)
+    blobs: Optional[dict] = None
+    duration_ms: int = 0
+    truncated: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def collect_orphans(
+    objects: Iterable[StoredObject],
+    index: ReferenceIndex,
+    *,
+    adapter: Any = None,
+    local_root: str = "",
+    grace_seconds: Optional[int] = None,
+    batch_size: int = 500,
+    max_deletes: Optional[int] = None,
+    rate: float = 0.0,
+    dry_run: bool = False,
+    limiter: Optional[RateLimiter] = None,
+    report: Optional[GcReport] = None,
+) -> GcReport:
+    """Scan `objects` in batches and delete (or report) unreferenced ones."""
+    grace = _env_int("STORAGE_GC_GRACE_SECONDS", 2 * 24 * 3600) if grace_seconds is None else int(grace_seconds)
+    report = report or GcReport(dry_run=dry_run)
+    limiter = limiter or RateLimiter(rate)
+    cutoff = time.time() - grace
+    for batch in _batches(objects, max(1, batch_size)):
+        report.batches += 1
+        report.scanned += len(batch)
+        old = [obj for obj in batch if obj.modified_at <= cutoff]
+        report.young += len(batch) - len(old)
+        try:
+            keep = live_keys(index, old)
+        except Exception as exc:
+            report.failed_batches += 1
+            LOG.warning("storage.gc action=lookup_failed error_type=%s", type(exc).__name__)
+            continue
+        orphans = []
+        for obj in old:
+            kind = classify(obj.key)[0]
+            if kind == "unknown":
+                report.unknown += 1
+            elif obj.key in keep:
+                report.live += 1
+            else:
+                orphans.append(obj)
+                report.by_kind[kind] = report.by_kind.get(kind, 0) + 1
+        if max_deletes is not None:
+            room = max(0, max_deletes - report.orphans)
+            if len(orphans) > room:
+                orphans, report.truncated = orphans[:room], True
+        report.orphans += len(orphans)
+        report.orphan_bytes += sum(obj.size for obj in orphans)
+        for obj in orphans:
+            if len(report.sample) >= _SAMPLE_KEYS:
+                break
+            report.sample.append(f"{obj.bucket}:{obj.key}")
+        if not dry_run and orphans:
+            limiter.acquire(len(orphans))
+            try:
+                report.deleted += delete_objects(orphans, adapter=adapter, local_root=local_root)
+            except Exception as exc:
+                report.failed_batches += 1
+                LOG.warning("storage.gc action=delete_failed error_type=%s", type(exc).__name__)
+        if report.truncated:
+            break
+    return report
+
+
+class DBReferenceIndex:
+    """`ReferenceIndex` backed by Postgres (service role; sees all rows)."""
+
+    def __init__(self, dsn: str | None = None) -> None:
+        if not HAVE_PSYCOPG:
+            raise RuntimeError("psycopg3 is required for the storage GC")
+        # Deliberately no DATABASE_URL fallback: under RLS the limited app role
+        # sees no rows, and every object would look orphaned.
+        self._dsn = dsn or os.getenv("SERVICE_ROLE_DSN", "")
+        if not self._dsn:
+            raise RuntimeError("No service-role DSN provided for the storage GC")
+
+    def ensure_sees_all_rows(self) -> None:
+        """Raise unless the connected role bypasses row level security."""
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute("select rolsuper or rolbypassrls from pg_roles where rolname = current_user")
+                row = cur.fetchone()
+        if not row or not row[0]:
+            raise RuntimeError("storage GC requires a role that bypasses RLS")
+
+    def _column(self, sql: str, params: tuple) -> set[str]:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                return {str(row[0]) for row in cur.fetchall()}
+
+    def submission_keys(self, keys: Sequence[str]) -> set[str]:
+        return self._column(
+            "select storage_key from public.learning_submissions where storage_key = any(%s) "
+            "union select object_key from public.storage_blobs where object_key = any(%s)",
+            (list(keys), list(keys)),
+        )
+
+    def submission_ids(self, ids: Sequence[str]) -> set[str]:
+        return self._column(
+            "select id::text from public.learning_submissions where id = any(%s::uuid[])", (list(ids),)
+        )
+
+    def page_keys(self, keys: Sequence[str]) -> set[str]:
+        # Deduplicated submissions list the first submission's pages in
+        # internal_metadata.page_keys; those stay live even after that one is gone.
+        return self._column(
+            "select k from public.storage_blobs b, unnest(b.derived_keys) k "
+            "where cardinality(b.derived_keys) > 0 and k = any(%s) "
+            "union select k from public.learning_submissions s, "
+            "jsonb_array_elements_text(s.internal_metadata->'page_keys') k "
+            "where jsonb_typeof(s.internal_metadata->'page_keys') = 'array' and k = any(%s)",
+            (list(keys), list(keys)),
+        )
+
+    def material_keys(self, keys: Sequence[str]) -> set[str]:
+        return self._column(
+            "select storage_key from public.unit_materials where storage_key = any(%s) "
+            "union select storage_key from public.upload_intents "
+            "where storage_key = any(%s) and consumed_at is null and expires_at > now()",
+            (list(keys), list(keys)),
+        )
+
+    def material_ids(self, ids: Sequence[str]) -> set[str]:
+        return self._column("select id::text from public.unit_materials where id = any(%s::uuid[])", (list(ids),))
+
+
+def run_once(
+    index: ReferenceIndex,
+    *,
+    adapter: Any = None,
+    local_root: str = "",
+    buckets: Optional[Dict[str, str]] = None,
+    blob_repo: Any = None,
+    grace_seconds: Optional[int] = None,
+    batch_size: int = 500,
+    max_deletes: Optional[int] = None,
+    rate: float = 0.0,
+    dry_run: bool = False,
+) -> GcReport:
+    """One GC pass over the local root and/or the Storage buckets."""
+    started = time.monotonic()
+    buckets = buckets or {"submissions": get_submissions_bucket(), "materials": get_materials_bucket()}
+    report = GcReport(dry_run=dry_run)
+    if blob_repo is not None:
+        from backend.storage.blobs import collect_unreferenced_blobs
+
+        blob_report = collect_unreferenced_blobs(
+            blob_repo, adapter=adapter, local_root=local_root, limit=batch_size, dry_run=dry_run
+        )
+        report.blobs = {k: v for k, v in asdict(blob_report).items() if k != "keys"}
+    limiter = RateLimiter(rate)
+    sources: List[Iterable[StoredObject]] = []
+    if local_root:
+        sources.append(iter_local_objects(local_root, buckets=buckets))
+    if adapter is not None and callable(getattr(adapter, "list_objects", None)):
+        for domain, bucket in buckets.items():
+            sources.append(iter_adapter_objects(adapter, bucket=bucket, domain=domain))
+    for source in sources:
+        collect_orphans(
+            source,
+            index,
+            adapter=adapter,
+            local_root=local_root,
+            grace_seconds=grace_seconds,
+            batch_size=batch_size,
+            max_deletes=max_deletes,
+            dry_run=dry_run,
+            limiter=limiter,
+            report=report,
+        )
+        if report.truncated:
+            break
+    report.duration_ms = int((time.monotonic() - started) * 1000)
+    LOG.info(
+        "storage.gc dry_run=%s scanned=%s live=%s young=%s unknown=%s orphans=%s deleted=%s failed_batches=%s",
+        dry_run, report.scanned, report.live, report.young, report.unknown,
+        report.orphans, report.deleted, report.failed_batches,
+    )
+    return report
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Delete storage objects no database row refers to")
+    parser.add_argument("--dsn", default=None, help="Service-role DSN (default: SERVICE_ROLE_DSN; never the app role)")
+    parser.add_argument("--local-root", default=os.getenv("STORAGE_VERIFY_ROOT", ""), help="Dev upload root to scan")
+    parser.add_argument("--no-remote", action="store_true", help="Do not list Supabase Storage buckets")
+    parser.add_argument("--grace", type=int, default=None, help="Minimum object age in seconds (STORAGE_GC_GRACE_SECONDS)")
+    parser.add_argument("--batch-size", type=int, default=_env_int("STORAGE_GC_BATCH_SIZE", 500) or 500)
+    parser.add_argument("--max-deletes", type=int, default=None, help="Upper bound of deletions per pass")
+    parser.add_argument("--rate", type=float, default=float(_env_int("STORAGE_GC_RATE", 50)), help="Deletions per second (0 = unlimited)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report orphans (implied unless STORAGE_GC_DELETE=true)")
+    parser.add_argument("--loop", type=float, default=None, metavar="SECONDS", help="Repeat every SECONDS")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entrypoint; prints one JSON report per pass."""
+    logging.basicConfig(level=(os.getenv("LOG_LEVEL", "INFO").strip().upper() or "INFO"))
+    args = _parse_args(argv)
+    dry_run = args.dry_run or (os.getenv("STORAGE_GC_DELETE") or "").strip().lower() != "true"
+    if dry_run and not args.dry_run:
+        LOG.warning("storage.gc action=dry_run reason=delete_not_enabled (set STORAGE_GC_DELETE=true)")
+    index = DBReferenceIndex(args.dsn)
+    index.ensure_sees_all_rows()
+    adapter = None if args.no_remote else service_storage_adapter()
+    blob_repo = None
+    if (os.getenv("CONTENT_BLOBS_BACKEND") or "").lower() == "db":
+        from backend.storage.blobs import DBBlobRepo
+
+        blob_repo = DBBlobRepo(args.dsn)
+    while True:
+        report = run_once(
+            index,
+            adapter=adapter,
+            local_root=(args.local_root or "").strip(),
+            blob_repo=blob_repo,
+            grace_seconds=args.grace,
+            batch_size=max(1, args.batch_size),
+            max_deletes=args.max_deletes,
+            rate=max(0.0, args.rate),
+            dry_run=dry_run,
+        )
+        print(json.dumps(report.as_dict()), flush=True)
+        if not args.loop:
+            return 1 if report.failed_batches else 0
+        time.sleep(max(1.0, args.loop))
+
+
+if __name__ == "__main__":  # pragma: no cover - manual entry
+    raise SystemExit(main())
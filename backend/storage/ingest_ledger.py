@@ -0,0 +1,254 @@
+"""
+Verified-ingest ledger: remember hashes computed while bytes passed through us.
+
+Why:
+    Uploads through the same-origin proxy or the dev stub are hashed on the
+    fly (see `routes.learning._UploadStream`). Finalizing the submission used
+    to verify the object again — a Storage HEAD and, when no trusted checksum
+    header exists, a full re-download (`_stream_hash_from_url`) or a local
+    re-read. When we streamed the bytes ourselves that work is redundant.
+
+Behavior:
+    - Ingest paths call `record(storage_key, sha256, size, subject=...)` after
+      the upload succeeded. Records expire after `INGEST_LEDGER_TTL_SECONDS`
+      (default 900).
+    - Finalization calls `check(...)`: "match" when a valid record agrees,
+      "mismatch" when a record exists for the key but size/hash differ (the
+      client reports different bytes than we saw), None when there is no
+      usable record — callers then run the regular verification.
+    - A record only confirms uploads of the same subject (student sub).
+
+Backends:
+    The upload and the finalization usually land on different web workers,
+    so the ledger must be shared to be useful. `ingest_ledger_from_env`
+    selects `DBIngestLedger` on `public.storage_ingest_records` when
+    `INGEST_LEDGER_BACKEND` (default: `SESSIONS_BACKEND`) is `db`, and the
+    process-local `IngestLedger` otherwise (dev, tests, single worker). Both
+    live server-side only (the table is service role only), so records are not
+    signed. A miss only costs the regular verification; correctness never
+    depends on a hit.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Optional, Protocol, Sequence
+
+try:  # pragma: no cover - optional dependency in some environments
+    import psycopg  # type: ignore
+
+    HAVE_PSYCOPG = True
+except Exception:  # pragma: no cover
+    psycopg = None  # type: ignore
+    HAVE_PSYCOPG = False
+
+from backend.storage.blobs import _resolve_dsn
+
+logger = logging.getLogger("gustav.storage.ingest_ledger")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def _ttl_seconds() -> int:
+    return _env_int("INGEST_LEDGER_TTL_SECONDS", 900)
+
+
+@dataclass(frozen=True)
+class IngestRecord:
+    storage_key: str
+    sha256: str
+    size_bytes: int
+    subject: str
+    expires_at: float
+
+
+class IngestLedgerStore(Protocol):
+    """(storage_key → sha256/size/subject) records written at ingest."""
+
+    def record(self, storage_key: str, sha256: str, size_bytes: int, *, subject: str) -> IngestRecord: ...
+
+    def lookup(self, storage_key: str, *, subject: str) -> Optional[IngestRecord]: ...
+
+    def check(self, storage_key: str, sha256: str, size_bytes: int | None, *, subject: str) -> Optional[str]: ...
+
+    def sweep(self) -> int: ...
+
+
+def _compare(rec: Optional[IngestRecord], sha256: str, size_bytes: int | None) -> Optional[str]:
+    if rec is None:
+        return None
+    if size_bytes is not None and int(size_bytes) != rec.size_bytes:
+        return "mismatch"
+    if str(sha256 or "").lower() != rec.sha256:
+        return "mismatch"
+    return "match"
+
+
+class IngestLedger:
+    """Process-local, short-lived records (dev/tests, single worker).
+
+    The store is capped like the in-memory auth state stores.
+    """
+
+    def __init__(self, *, ttl_seconds: int | None = None, max_entries: int = 10_000) -> None:
+        self._ttl = ttl_seconds if ttl_seconds is not None else _ttl_seconds()
+        self._max_entries = max(1, int(max_entries))
+        self._data: Dict[str, IngestRecord] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def record(self, storage_key: str, sha256: str, size_bytes: int, *, subject: str) -> IngestRecord:
+        """Store the hash/size computed while ingesting `storage_key`."""
+        rec = IngestRecord(
+            storage_key=storage_key,
+            sha256=sha256.lower(),
+            size_bytes=int(size_bytes),
+            subject=subject,
+            expires_at=round(time.time() + self._ttl, 3),
+        )
+        with self._lock:
+            if len(self._data) >= self._max_entries and storage_key not in self._data:
+                self._sweep_locked()
+                while len(self._data) >= self._max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[storage_key] = rec
+        return rec
+
+    def lookup(self, storage_key: str, *, subject: str) -> Optional[IngestRecord]:
+        """Return the valid record for `storage_key` ingested by `subject`, if any."""
+        rec = self._data.get(storage_key)
+        if rec is None or rec.subject != subject:
+            return None
+        if rec.expires_at < time.time():
+            with self._lock:
+                self._data.pop(storage_key, None)
+            return None
+        return rec
+
+    def check(self, storage_key: str, sha256: str, size_bytes: int | None, *, subject: str) -> Optional[str]:
+        """Compare submission metadata with the ledger: "match", "mismatch" or None."""
+        return _compare(self.lookup(storage_key, subject=subject), sha256, size_bytes)
+
+    def sweep(self) -> int:
+        """Drop expired records; returns the number of removed entries."""
+        with self._lock:
+            return self._sweep_locked()
+
+    def _sweep_locked(self) -> int:
+        now = time.time()
+        expired = [k for k, v in self._data.items() if v.expires_at < now]
+        for key in expired:
+            self._data.pop(key, None)
+        return len(expired)
+
+
+_COLUMNS = "storage_key, sha256, size_bytes, subject, extract(epoch from expires_at)::float8"
+
+
+def _record(row: Sequence[Any]) -> IngestRecord:
+    return IngestRecord(
+        storage_key=str(row[0]),
+        sha256=str(row[1]),
+        size_bytes=int(row[2] or 0),
+        subject=str(row[3]),
+        expires_at=float(row[4]),
+    )
+
+
+class DBIngestLedger:
+    """Postgres-backed ledger shared by all web workers.
+
+    Expired rows are ignored on lookup and removed opportunistically on
+    every `sweep_every`-th write.
+    """
+
+    def __init__(self, dsn: str | None = None, *, ttl_seconds: int | None = None, sweep_every: int = 200) -> None:
+        if not HAVE_PSYCOPG:
+            raise RuntimeError("psycopg3 is required for DBIngestLedger")
+        self._dsn = _resolve_dsn(dsn)
+        if not self._dsn:
+            raise RuntimeError("No database DSN provided for DBIngestLedger")
+        self._ttl = ttl_seconds if ttl_seconds is not None else _ttl_seconds()
+        self._sweep_every = max(1, int(sweep_every))
+        self._writes = 0
+
+    def _fetch(self, sql: str, params: tuple) -> list:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                if cur.description is None:
+                    return [cur.rowcount]
+                return list(cur.fetchall())
+
+    def record(self, storage_key: str, sha256: str, size_bytes: int, *, subject: str) -> IngestRecord:
+        """Store the hash/size computed while ingesting `storage_key`."""
+        rows = self._fetch(
+            "insert into public.storage_ingest_records (storage_key, sha256, size_bytes, subject, expires_at) "
+            "values (%s, %s, %s, %s, now() + make_interval(secs => %s)) "
+            "on conflict (storage_key) do update set sha256 = excluded.sha256, "
+            "size_bytes = excluded.size_bytes, subject = excluded.subject, expires_at = excluded.expires_at "
+            f"returning {_COLUMNS}",
+            (storage_key, sha256.lower(), int(size_bytes), subject, int(self._ttl)),
+        )
+        self._writes += 1
+        if self._writes % self._sweep_every == 0:
+            try:
+                self.sweep()
+            except Exception as exc:  # pragma: no cover - best effort
+                logger.warning("storage.ingest_ledger action=sweep_failed error_type=%s", type(exc).__name__)
+        return _record(rows[0])
+
+    def lookup(self, storage_key: str, *, subject: str) -> Optional[IngestRecord]:
+        """Return the valid record for `storage_key` ingested by `subject`, if any."""
+        rows = self._fetch(
+            f"select {_COLUMNS} from public.storage_ingest_records "
+            "where storage_key = %s and subject = %s and expires_at > now()",
+            (storage_key, subject),
+        )
+        return _record(rows[0]) if rows else None
+
+    def check(self, storage_key: str, sha256: str, size_bytes: int | None, *, subject: str) -> Optional[str]:
+        """Compare submission metadata with the ledger: "match", "mismatch" or None."""
+        return _compare(self.lookup(storage_key, subject=subject), sha256, size_bytes)
+
+    def sweep(self) -> int:
+        """Drop expired records; returns the number of removed entries."""
+        rows = self._fetch("delete from public.storage_ingest_records where expires_at < now()", ())
+        return int(rows[0]) if rows else 0
+
+
+INGEST_LEDGER = IngestLedger()
+_ACTIVE: IngestLedgerStore = INGEST_LEDGER
+
+
+def get_ingest_ledger() -> IngestLedgerStore:
+    """Active ledger: the shared DB ledger when configured, else `INGEST_LEDGER`."""
+    return _ACTIVE
+
+
+def set_ingest_ledger(ledger: Optional[IngestLedgerStore]) -> None:
+    global _ACTIVE
+    _ACTIVE = ledger if ledger is not None else INGEST_LEDGER
+
+
+def ingest_ledger_from_env() -> Optional[IngestLedgerStore]:
+    """`DBIngestLedger` when `INGEST_LEDGER_BACKEND` (default `SESSIONS_BACKEND`) is `db`."""
+    backend = (os.getenv("INGEST_LEDGER_BACKEND") or os.getenv("SESSIONS_BACKEND") or "memory").strip().lower()
+    if backend != "db":
+        return None
+    try:
+        return DBIngestLedger()
+    except RuntimeError as exc:
+        logger.warning("storage.ingest_ledger action=db_unavailable error=%s", exc)
+        return None
@@ -57,18 +57,27 @@ def make_materials_key(*, unit_id: str, section_id: str, material_id: str, filen
     return f"materials/{u}/{s}/{m}/{hexpart}{ext}"
 
 
-def make_submission_key(*, course_id: str, task_id: str, student_sub: str, ext: str, epoch_ms: int, uuid_hex: str) -> str:
-    """Build a storage key for learning submissions.
+def submission_key_prefix(*, course_id: str, task_id: str, student_sub: str) -> str:
+    """Return the folder holding a student's uploads for one task.
 
-    Returns: submissions/{course}/{task}/{student}/{epoch_ms}-{uuid}.{ext}
+    Returns: submissions/{course}/{task}/{student}/
     """
     c = _sanitize_segment(course_id, fallback="course")
     t = _sanitize_segment(task_id, fallback="task")
     stu = _sanitize_segment(student_sub, fallback="student")
+    return f"submissions/{c}/{t}/{stu}/"
+
+
+def make_submission_key(*, course_id: str, task_id: str, student_sub: str, ext: str, epoch_ms: int, uuid_hex: str) -> str:
+    """Build a storage key for learning submissions.
+
+    Returns: submissions/{course}/{task}/{student}/{epoch_ms}-{uuid}.{ext}
+    """
+    prefix = submission_key_prefix(course_id=course_id, task_id=task_id, student_sub=student_sub)
     ext_norm = _sanitize_ext_from_filename(ext, default_ext=ext)
     hexpart = (uuid_hex or "").strip() or "file"
-    return f"submissions/{c}/{t}/{stu}/{epoch_ms}-{hexpart}{ext_norm}"
+    return f"{prefix}{epoch_ms}-{hexpart}{ext_norm}"
 
 
-__all__ = ["make_materials_key", "make_submission_key"]
+__all__ = ["make_materials_key", "make_submission_key", "submission_key_prefix"]
 
@@ -0,0 +1,256 @@
+"""
+Preview derivation as queued jobs for the learning worker.
+
+Why:
+    Rendering a preview (PDF rasterization, image resampling) is CPU-bound.
+    Run as a BackgroundTask it competed with request handling in the web
+    worker. The web tier now only enqueues a job after the response; the
+    learning worker derives the preview between analysis jobs.
+
+Behavior:
+    - `schedule_preview(...)` returns the work to run after the response:
+      enqueue when a queue is configured, otherwise (dev without database)
+      derive in-process as before.
+    - Jobs carry only (kind, storage_key, mime_type). Bucket, preview key and
+      size limit are derived from the kind, so a job can only ever write
+      `…/derived/preview.*` next to an original of that kind.
+    - `process_preview_jobs(...)` leases a few jobs (visibility timeout),
+      derives them via `backend.storage.previews.derive_preview` and retries
+      failures with backoff up to `max_attempts`.
+
+Backends:
+    `preview_queue_from_env` selects `DBPreviewQueue` on
+    `public.storage_preview_jobs` unless `PREVIEW_JOBS_BACKEND=inline`. The
+    web tier enqueues with the service DSN, the worker drains the queue with
+    its app role (grants via `gustav_limited`).
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Protocol, Sequence
+
+try:  # pragma: no cover - optional dependency in some environments
+    import psycopg  # type: ignore
+
+    HAVE_PSYCOPG = True
+except Exception:  # pragma: no cover
+    psycopg = None  # type: ignore
+    HAVE_PSYCOPG = False
+
+from backend.storage.blobs import _resolve_dsn
+from backend.storage.config import (
+    get_learning_max_upload_bytes,
+    get_materials_bucket,
+    get_materials_max_upload_bytes,
+    get_submissions_bucket,
+)
+from backend.storage.previews import PREVIEWABLE_MIME, derive_preview, material_preview_key, submission_preview_key
+
+logger = logging.getLogger("gustav.storage.preview_jobs")
+
+PREVIEW_KINDS = ("submission", "material")
+_KEY_PREFIX = {"submission": "submissions/", "material": "materials/"}
+
+
+@dataclass(frozen=True)
+class PreviewJob:
+    id: int
+    kind: str
+    storage_key: str
+    mime_type: str
+    attempts: int
+
+
+class PreviewQueue(Protocol):
+    """Pending preview derivations."""
+
+    def enqueue(self, *, kind: str, storage_key: str, mime_type: str) -> None: ...
+
+    def lease(self, *, limit: int, lease_seconds: int) -> List[PreviewJob]: ...
+
+    def done(self, job_id: int) -> None: ...
+
+    def retry(self, job_id: int, *, delay_seconds: int) -> None: ...
+
+
+def preview_target(kind: str, storage_key: str) -> tuple[str, str, int]:
+    """(bucket, preview_key, max_bytes) for an original of `kind`."""
+    if kind == "material":
+        return get_materials_bucket(), material_preview_key(storage_key), get_materials_max_upload_bytes()
+    return get_submissions_bucket(), submission_preview_key(storage_key), get_learning_max_upload_bytes()
+
+
+def _valid(kind: str, storage_key: str, mime_type: str) -> bool:
+    return (
+        kind in PREVIEW_KINDS
+        and (mime_type or "").lower() in PREVIEWABLE_MIME
+        and str(storage_key).startswith(_KEY_PREFIX[kind])
+        and ".." not in str(storage_key)
+    )
+
+
+_COLUMNS = "id, kind, storage_key, mime_type, attempts"
+
+
+def _job(row: Sequence[Any]) -> PreviewJob:
+    return PreviewJob(
+        id=int(row[0]), kind=str(row[1]), storage_key=str(row[2]), mime_type=str(row[3]), attempts=int(row[4] or 0)
+    )
+
+
+class DBPreviewQueue:
+    """Postgres-backed preview queue shared by web workers and the learning worker."""
+
+    def __init__(self, dsn: str | None = None) -> None:
+        if not HAVE_PSYCOPG:
+            raise RuntimeError("psycopg3 is required for DBPreviewQueue")
+        self._dsn = _resolve_dsn(dsn)
+        if not self._dsn:
+            raise RuntimeError("No database DSN provided for DBPreviewQueue")
+
+    def _fetch(self, sql: str, params: tuple) -> List[tuple]:
+        with psycopg.connect(self._dsn, autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                if cur.description is None:
+                    return []
+                return list(cur.fetchall())
+
+    def enqueue(self, *, kind: str, storage_key: str, mime_type: str) -> None:
+        # One pending job per original; re-enqueueing resets its attempts.
+        self._fetch(
+            "insert into public.storage_preview_jobs (kind, storage_key, mime_type) values (%s, %s, %s) "
+            "on conflict (kind, storage_key) do update set mime_type = excluded.mime_type, "
+            "attempts = 0, visible_at = now()",
+            (kind, storage_key, mime_type.lower()),
+        )
+
+    def lease(self, *, limit: int, lease_seconds: int) -> List[PreviewJob]:
+        # Moving `visible_at` forward is the lease: a crashed worker's job
+        # becomes visible again once it runs out.
+        rows = self._fetch(
+            "update public.storage_preview_jobs j "
+            "set visible_at = now() + make_interval(secs => %s), attempts = j.attempts + 1 "
+            "where j.id = any(array(select id from public.storage_preview_jobs "
+            "where visible_at <= now() order by visible_at limit %s for update skip locked)) "
+            f"returning {_COLUMNS}",
+            (int(lease_seconds), int(limit)),
+        )
+        return [_job(r) for r in rows]
+
+    def done(self, job_id: int) -> None:
+        self._fetch("delete from public.storage_preview_jobs where id = %s", (int(job_id),))
+
+    def retry(self, job_id: int, *, delay_seconds: int) -> None:
+        self._fetch(
+            "update public.storage_preview_jobs set visible_at = now() + make_interval(secs => %s) where id = %s",
+            (int(delay_seconds), int(job_id)),
+        )
+
+
+_PREVIEW_QUEUE: Optional[PreviewQueue] = None
+
+
+def get_preview_queue() -> Optional[PreviewQueue]:
+    """Active preview queue, or None when previews are derived in-process."""
+    return _PREVIEW_QUEUE
+
+
+def set_preview_queue(queue: Optional[PreviewQueue]) -> None:
+    global _PREVIEW_QUEUE
+    _PREVIEW_QUEUE = queue
+
+
+def preview_queue_from_env(dsn: str | None = None) -> Optional[PreviewQueue]:
+    """`DBPreviewQueue` unless `PREVIEW_JOBS_BACKEND=inline` or no database is configured."""
+    backend = (os.getenv("PREVIEW_JOBS_BACKEND") or "db").strip().lower()
+    if backend != "db":
+        return None
+    try:
+        return DBPreviewQueue(dsn)
+    except RuntimeError as exc:
+        logger.warning("storage.preview_jobs action=db_unavailable error=%s", exc)
+        return None
+
+
+def _enqueue(queue: PreviewQueue, kind: str, storage_key: str, mime_type: str) -> None:
+    try:
+        queue.enqueue(kind=kind, storage_key=storage_key, mime_type=mime_type)
+    except Exception as exc:
+        logger.warning("storage.preview_jobs action=enqueue_failed error_type=%s", type(exc).__name__)
+
+
+def schedule_preview(
+    *, kind: str, storage_key: str, mime: str, adapter: Any, local_root: str = ""
+) -> Optional[Callable[[], Any]]:
+    """Return the work to run after the response for a new original, if any.
+
+    With a queue this is a single insert; the learning worker renders. Without
+    one (dev, tests) the preview is derived in-process.
+    """
+    mime = (mime or "").lower()
+    if not storage_key or not _valid(kind, storage_key, mime):
+        return None
+    queue = get_preview_queue()
+    if queue is not None:
+        return functools.partial(_enqueue, queue, kind, storage_key, mime)
+    bucket, preview_key, max_bytes = preview_target(kind, storage_key)
+    return functools.partial(
+        derive_preview,
+        adapter=adapter,
+        bucket=bucket,
+        storage_key=storage_key,
+        mime=mime,
+        preview_key=preview_key,
+        local_root=local_root,
+        max_bytes=max_bytes,
+    )
+
+
+def process_preview_jobs(
+    queue: PreviewQueue,
+    *,
+    adapter: Any,
+    local_root: str = "",
+    limit: int = 4,
+    lease_seconds: int = 300,
+    max_attempts: int = 3,
+) -> int:
+    """Derive up to `limit` queued previews; returns the number of leased jobs."""
+    jobs = queue.lease(limit=limit, lease_seconds=lease_seconds)
+    for job in jobs:
+        if not _valid(job.kind, job.storage_key, job.mime_type):
+            queue.done(job.id)
+            continue
+        bucket, preview_key, max_bytes = preview_target(job.kind, job.storage_key)
+        written = derive_preview(
+            adapter=adapter,
+            bucket=bucket,
+            storage_key=job.storage_key,
+            mime=job.mime_type,
+            preview_key=preview_key,
+            local_root=local_root,
+            max_bytes=max_bytes,
+        )
+        if written or job.attempts >= max_attempts:
+            queue.done(job.id)
+        else:
+            queue.retry(job.id, delay_seconds=60 * job.attempts)
+    return len(jobs)
+
+
+__all__ = [
+    "DBPreviewQueue",
+    "PREVIEW_KINDS",
+    "PreviewJob",
+    "PreviewQueue",
+    "get_preview_queue",
+    "preview_queue_from_env",
+    "preview_target",
+    "process_preview_jobs",
+    "schedule_preview",
+    "set_preview_queue",
+]
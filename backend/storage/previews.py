@@ -0,0 +1,222 @@
+"""
+Pre-generated previews for submission files and file materials.
+
+Why:
+    The teacher live detail pane and material pages used to embed originals:
+    clicking through 30 photo submissions downloaded 30 × several MB, and each
+    PDF material loaded the whole document into an iframe. A small WebP/JPEG
+    preview is derived once after the upload is finalized; pages show it first
+    and load the original only on demand.
+
+Layout (next to the `derived/` artifacts of the vision pipeline):
+    - Submissions: submissions/{course}/{task}/{student}/derived/{upload}/preview.webp
+      ({upload} is the original's file name without extension, so submissions
+      sharing a content blob, see `backend.storage.blobs`, share the preview)
+    - Materials:   materials/{unit}/{section}/{material}/derived/preview.webp
+
+Behavior:
+    - `derive_preview(...)` reads the original from the dev upload root
+      (STORAGE_VERIFY_ROOT) or via a short-lived signed URL from a trusted
+      storage host, renders it (`backend.vision.previews`) and writes the
+      preview to the same place. Best-effort: returns None on any failure.
+    - `sign_preview(...)` / `sign_previews(...)` return signed preview URLs
+      through the signed URL cache; missing previews are simply omitted, so
+      callers fall back to the original. This relies on the adapter refusing
+      to sign missing objects (Supabase does, and declares it via
+      `signs_existing_objects_only`); other adapters get no preview URLs.
+
+Permissions:
+    Callers authorize access to the original before deriving or signing its
+    preview; the preview is a downscaled copy with the same audience.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from backend.storage.signed_url_cache import presign_download_cached, presign_downloads
+from backend.vision.previews import PreviewError, preview_format, render_preview
+
+logger = logging.getLogger("gustav.storage.previews")
+
+PREVIEWABLE_MIME = frozenset({"image/jpeg", "image/png", "image/webp", "image/gif", "application/pdf"})
+
+
+def _preview_name() -> str:
+    return f"preview.{preview_format()[2]}"
+
+
+def submission_preview_key(storage_key: str) -> str:
+    """Preview key for one uploaded object, shared by deduplicated submissions."""
+    base, _, name = str(storage_key).lstrip("/").rpartition("/")
+    stem = name.rsplit(".", 1)[0] or name
+    return f"{base}/derived/{stem}/{_preview_name()}"
+
+
+def material_preview_key(storage_key: str) -> str:
+    """Preview key inside the material's directory (one file per material)."""
+    base = str(storage_key).lstrip("/").rsplit("/", 1)[0]
+    return f"{base}/derived/{_preview_name()}"
+
+
+def _local_path(root: str, key: str) -> Optional[Path]:
+    if not root or not key:
+        return None
+    base = Path(root).resolve()
+    target = (base / key.lstrip("/")).resolve()
+    if os.path.commonpath([str(base), str(target)]) != str(base):
+        return None
+    return target
+
+
+def _trusted_download_url(url: str) -> Optional[str]:
+    """Return a fetchable URL on the configured Supabase hosts, or None."""
+    supabase_base = (os.getenv("SUPABASE_URL") or "").strip()
+    public_base = (os.getenv("SUPABASE_PUBLIC_URL") or "").strip()
+    sup_host = urlparse(supabase_base).hostname or ""
+    pub_host = urlparse(public_base).hostname or ""
+    target = urlparse(url)
+    if target.scheme not in {"http", "https"}:
+        return None
+    if (target.hostname or "") not in {h for h in (sup_host, pub_host) if h}:
+        return None
+    if pub_host and sup_host and target.hostname == pub_host:
+        # Server-side fetches go through the internal gateway (see verification).
+        internal = urlparse(supabase_base)
+        url = target._replace(scheme=internal.scheme, netloc=internal.netloc).geturl()
+    return url
+
+
+def _download(url: str, *, max_bytes: int, timeout: float = 15.0) -> Optional[bytes]:
+    import httpx
+
+    trusted = _trusted_download_url(url)
+    if not trusted:
+        return None
+    chunks: list[bytes] = []
+    total = 0
+    with httpx.Client(timeout=timeout, follow_redirects=False) as client:
+        with client.stream("GET", trusted) as resp:
+            if resp.status_code >= 300:
+                return None
+            for chunk in resp.iter_bytes():
+                total += len(chunk)
+                if total > max_bytes:
+                    return None
+                chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _read_original(
+    *, adapter: Any, bucket: str, storage_key: str, local_root: str, max_bytes: int
+) -> tuple[Optional[bytes], bool]:
+    """Return (bytes, from_local_root) for the original upload."""
+    path = _local_path(local_root, storage_key)
+    if path is not None and path.is_file():
+        if path.stat().st_size > max_bytes:
+            return None, True
+        return path.read_bytes(), True
+    if adapter is None:
+        return None, False
+    presign = adapter.presign_download(bucket=bucket, key=storage_key, expires_in=60, disposition="inline")
+    url = str((presign or {}).get("url") or "")
+    return (_download(url, max_bytes=max_bytes) if url else None), False
+
+
+def _write_local(root: str, key: str, body: bytes) -> bool:
+    path = _local_path(root, key)
+    if path is None:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+    return True
+
+
+def derive_preview(
+    *,
+    adapter: Any,
+    bucket: str,
+    storage_key: str,
+    mime: str,
+    preview_key: str,
+    local_root: str = "",
+    max_bytes: int = 20 * 1024 * 1024,
+) -> Optional[str]:
+    """Render and store the preview for one original; returns the preview key.
+
+    Runs after the upload was accepted (background task), so failures are
+    logged and swallowed — pages then keep showing the original.
+    """
+    if (mime or "").lower() not in PREVIEWABLE_MIME:
+        return None
+    try:
+        data, local = _read_original(
+            adapter=adapter, bucket=bucket, storage_key=storage_key, local_root=local_root, max_bytes=max_bytes
+        )
+        if not data:
+            logger.info("storage.previews action=source_unavailable")
+            return None
+        preview = render_preview(data, mime)
+        if local:
+            # Dev layout: originals live under the upload root, previews next to them.
+            if not _write_local(local_root, preview_key, preview.data):
+                return None
+        else:
+            put_object = getattr(adapter, "put_object", None)
+            if not callable(put_object):
+                return None
+            put_object(bucket=bucket, key=preview_key, body=preview.data, content_type=preview.content_type)
+    except PreviewError as exc:
+        logger.info("storage.previews action=render_failed reason=%s", exc)
+        return None
+    except Exception as exc:
+        logger.warning("storage.previews action=derive_failed error_type=%s", type(exc).__name__)
+        return None
+    logger.info("storage.previews action=derived bytes=%s", len(preview.data))
+    return preview_key
+
+
+def _signing_proves_existence(adapter: Any) -> bool:
+    return bool(getattr(adapter, "signs_existing_objects_only", False))
+
+
+def sign_preview(adapter: Any, *, bucket: str, preview_key: str, expires_in: int) -> Optional[Dict[str, Any]]:
+    """Signed inline URL for a preview, or None when it is missing/unsignable."""
+    if not _signing_proves_existence(adapter):
+        return None
+    try:
+        presign = presign_download_cached(
+            adapter, bucket=bucket, key=preview_key, expires_in=expires_in, disposition="inline"
+        )
+    except Exception:
+        return None
+    return presign if isinstance(presign, dict) and presign.get("url") else None
+
+
+def sign_previews(
+    adapter: Any, *, bucket: str, preview_keys: Iterable[str], expires_in: int
+) -> Dict[str, Dict[str, Any]]:
+    """Batch variant of `sign_preview`: {preview_key: {url, expires_at}}."""
+    if not _signing_proves_existence(adapter):
+        return {}
+    try:
+        return presign_downloads(
+            adapter, bucket=bucket, keys=preview_keys, expires_in=expires_in, disposition="inline"
+        )
+    except Exception:
+        return {}
+
+
+__all__ = [
+    "PREVIEWABLE_MIME",
+    "derive_preview",
+    "material_preview_key",
+    "sign_preview",
+    "sign_previews",
+    "submission_preview_key",
+]
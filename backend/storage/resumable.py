@@ -0,0 +1,383 @@
+"""
+Resumable chunked uploads: stage fixed-size chunks on disk, assemble once.
+
+Why:
+    Large PDF submissions and teaching materials are uploaded in one PUT. On
+    flaky school Wi-Fi a connection drop at 90 % restarts the whole file. With
+    a resumable session the client PUTs fixed-size chunks (in any order, with
+    retries), asks which chunks the server already has after a reconnect and
+    only sends the missing ones.
+
+Behavior:
+    - `create(...)` opens a session for one upload intent. Its metadata
+      (storage key, size, chunk size, MIME, owner) is written once to
+      `<root>/<upload_id>/meta.json` and never changes afterwards.
+    - `write_chunk(...)` streams one chunk to a temp file, checks its exact
+      length (all chunks but the last are `chunk_size` bytes) and an optional
+      client checksum, then atomically renames it to `<index>.part` next to
+      a `<index>.sha256` sidecar. Re-sending a chunk simply replaces it.
+    - `assemble(...)` yields the file in order once every chunk is present,
+      re-hashing each part against its sidecar (corrupt parts are dropped so
+      the client can re-send them) and computing the sha256 of the whole
+      file on the way; the caller compares it to the declared checksum and
+      delivers the bytes to Storage.
+    - `begin_completion(...)` claims a session for its completion (a marker
+      file, so it holds across workers); chunk writes are rejected with
+      "completion_in_progress" until `end_completion(...)` releases it.
+    - Sessions expire after `RESUMABLE_UPLOAD_TTL_SECONDS` (default 24 h);
+      `sweep()` removes expired staging directories.
+
+Storage:
+    Chunks live under `RESUMABLE_UPLOAD_ROOT` (default: a directory in the
+    system temp dir). All web workers must share that directory, just like
+    `STORAGE_VERIFY_ROOT` for the dev upload stub.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterable, Iterator, List, Optional
+
+import anyio
+
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_READ_BLOCK_BYTES = 1 << 20
+# A completion marker older than this is left over from a crashed worker.
+_COMPLETION_LEASE_SECONDS = 15 * 60
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def _default_root() -> Path:
+    configured = (os.getenv("RESUMABLE_UPLOAD_ROOT") or "").strip()
+    if configured:
+        return Path(configured)
+    return Path(tempfile.gettempdir()) / "gustav-resumable"
+
+
+class ResumableUploadError(ValueError):
+    """Client-facing protocol error; `str(exc)` is the API detail code."""
+
+    def __init__(self, detail: str, *, index: int | None = None) -> None:
+        super().__init__(detail)
+        self.index = index
+
+
+@dataclass(frozen=True)
+class ResumableSession:
+    upload_id: str
+    storage_key: str
+    bucket: str
+    mime_type: str
+    size_bytes: int
+    chunk_size: int
+    subject: str
+    context: str
+    expires_at: float
+    local_root: Optional[str] = None
+
+    @property
+    def chunk_count(self) -> int:
+        return max(1, -(-self.size_bytes // self.chunk_size))
+
+    def chunk_length(self, index: int) -> int:
+        """Exact byte length of chunk `index` (the last one may be shorter)."""
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size_bytes - self.chunk_size * (self.chunk_count - 1)
+
+
+class ResumableAssembly:
+    """Ordered iterator over all chunks of a session with a running sha256.
+
+    Iterating yields blocks of at most 1 MiB; after exhaustion `size` and
+    `hexdigest()` describe the assembled file.
+    """
+
+    def __init__(self, store: "ResumableUploadStore", session: ResumableSession) -> None:
+        self._store = store
+        self._session = session
+        self._sha = hashlib.sha256()
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        directory = self._store._dir(self._session.upload_id)
+        for index in range(self._session.chunk_count):
+            part = directory / f"{index}.part"
+            expected = (directory / f"{index}.sha256").read_text(encoding="utf-8").strip()
+            part_sha = hashlib.sha256()
+            with part.open("rb") as fh:
+                while True:
+                    block = fh.read(_READ_BLOCK_BYTES)
+                    if not block:
+                        break
+                    part_sha.update(block)
+                    self._sha.update(block)
+                    self.size += len(block)
+                    yield block
+            if part_sha.hexdigest() != expected:
+                self._store._drop_chunk(self._session.upload_id, index)
+                raise ResumableUploadError("chunk_corrupt", index=index)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+class ResumableUploadStore:
+    """Filesystem-staged resumable upload sessions."""
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        *,
+        chunk_size: int | None = None,
+        ttl_seconds: int | None = None,
+    ) -> None:
+        self._root = Path(root) if root is not None else None
+        self._chunk_size = chunk_size
+        self._ttl = ttl_seconds
+
+    @property
+    def root(self) -> Path:
+        return self._root if self._root is not None else _default_root()
+
+    @property
+    def chunk_size(self) -> int:
+        if self._chunk_size is not None:
+            return self._chunk_size
+        return _env_int("RESUMABLE_UPLOAD_CHUNK_BYTES", 5 * 1024 * 1024)
+
+    @property
+    def ttl_seconds(self) -> int:
+        if self._ttl is not None:
+            return self._ttl
+        return _env_int("RESUMABLE_UPLOAD_TTL_SECONDS", 24 * 60 * 60)
+
+    def _dir(self, upload_id: str) -> Path:
+        if not UPLOAD_ID_RE.fullmatch(upload_id or ""):
+            raise ResumableUploadError("invalid_upload_id")
+        return self.root / upload_id
+
+    def create(
+        self,
+        *,
+        storage_key: str,
+        bucket: str,
+        mime_type: str,
+        size_bytes: int,
+        subject: str,
+        context: str,
+        local_root: str | None = None,
+    ) -> ResumableSession:
+        """Open a new session; expired sessions are swept opportunistically."""
+        if int(size_bytes) <= 0:
+            raise ResumableUploadError("invalid_size")
+        self.sweep()
+        session = ResumableSession(
+            upload_id=os.urandom(16).hex(),
+            storage_key=storage_key,
+            bucket=bucket,
+            mime_type=mime_type,
+            size_bytes=int(size_bytes),
+            chunk_size=self.chunk_size,
+            subject=subject,
+            context=context,
+            expires_at=round(time.time() + self.ttl_seconds, 3),
+            local_root=local_root,
+        )
+        directory = self._dir(session.upload_id)
+        directory.mkdir(parents=True, exist_ok=False)
+        tmp = directory / "meta.json.tmp"
+        tmp.write_text(json.dumps(asdict(session)), encoding="utf-8")
+        os.replace(tmp, directory / "meta.json")
+        return session
+
+    def get(self, upload_id: str, *, subject: str) -> Optional[ResumableSession]:
+        """Return the live session owned by `subject`, or None (unknown/expired/foreign)."""
+        try:
+            raw = (self._dir(upload_id) / "meta.json").read_text(encoding="utf-8")
+            session = ResumableSession(**json.loads(raw))
+        except (ResumableUploadError, OSError, ValueError, TypeError):
+            return None
+        if session.subject != subject:
+            return None
+        if session.expires_at < time.time():
+            self.discard(upload_id)
+            return None
+        return session
+
+    def received(self, session: ResumableSession) -> List[int]:
+        """Indices of chunks stored so far (sorted)."""
+        directory = self._dir(session.upload_id)
+        indices: List[int] = []
+        for index in range(session.chunk_count):
+            if (directory / f"{index}.part").exists():
+                indices.append(index)
+        return indices
+
+    def offset(self, session: ResumableSession, received: List[int] | None = None) -> int:
+        """Bytes covered by the contiguous run of chunks from the start (tus-style offset)."""
+        have = set(self.received(session) if received is None else received)
+        index = 0
+        while index in have:
+            index += 1
+        return min(session.size_bytes, index * session.chunk_size)
+
+    async def write_chunk(
+        self,
+        session: ResumableSession,
+        index: int,
+        body: AsyncIterable[bytes],
+        *,
+        expected_sha256: str | None = None,
+    ) -> str:
+        """Stream chunk `index` to disk and return its sha256.
+
+        Received bytes are buffered up to 1 MiB; hashing and file IO run in a
+        worker thread so the event loop keeps serving other requests.
+
+        Raises ResumableUploadError with detail "invalid_chunk_index",
+        "chunk_size_mismatch", "chunk_checksum_mismatch" or
+        "completion_in_progress"; nothing is kept on error.
+        """
+        if index < 0 or index >= session.chunk_count:
+            raise ResumableUploadError("invalid_chunk_index", index=index)
+        expected_length = session.chunk_length(index)
+        directory = self._dir(session.upload_id)
+        if self._completing(directory):
+            raise ResumableUploadError("completion_in_progress", index=index)
+        fd, tmp_name = await anyio.to_thread.run_sync(
+            lambda: tempfile.mkstemp(prefix=f"{index}.", suffix=".tmp", dir=directory)
+        )
+        tmp = Path(tmp_name)
+        sha = hashlib.sha256()
+        written = 0
+        pending: list[bytes] = []
+        pending_bytes = 0
+        try:
+            with os.fdopen(fd, "wb") as fh:
+
+                def _flush(blocks: list[bytes]) -> None:
+                    data = b"".join(blocks)
+                    sha.update(data)
+                    fh.write(data)
+
+                async for chunk in body:
+                    if not chunk:
+                        continue
+                    written += len(chunk)
+                    if written > expected_length:
+                        raise ResumableUploadError("chunk_size_mismatch", index=index)
+                    pending.append(chunk)
+                    pending_bytes += len(chunk)
+                    if pending_bytes >= _READ_BLOCK_BYTES:
+                        await anyio.to_thread.run_sync(_flush, pending)
+                        pending, pending_bytes = [], 0
+                if pending:
+                    await anyio.to_thread.run_sync(_flush, pending)
+            if written != expected_length:
+                raise ResumableUploadError("chunk_size_mismatch", index=index)
+            digest = sha.hexdigest()
+            if expected_sha256 and expected_sha256.strip().lower() != digest:
+                raise ResumableUploadError("chunk_checksum_mismatch", index=index)
+            await anyio.to_thread.run_sync(self._commit_chunk, directory, tmp, index, digest)
+            return digest
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    @classmethod
+    def _commit_chunk(cls, directory: Path, tmp: Path, index: int, digest: str) -> None:
+        if cls._completing(directory):
+            raise ResumableUploadError("completion_in_progress", index=index)
+        sidecar_tmp = directory / f"{tmp.name}.sha256"
+        sidecar_tmp.write_text(digest, encoding="utf-8")
+        # Sidecar first: a visible part always has a matching checksum file.
+        os.replace(sidecar_tmp, directory / f"{index}.sha256")
+        os.replace(tmp, directory / f"{index}.part")
+
+    @staticmethod
+    def _completing(directory: Path) -> bool:
+        try:
+            age = time.time() - (directory / "completing").stat().st_mtime
+        except OSError:
+            return False
+        return age < _COMPLETION_LEASE_SECONDS
+
+    def begin_completion(self, session: ResumableSession) -> bool:
+        """Claim the session for completion; False while another completion runs."""
+        directory = self._dir(session.upload_id)
+        marker = directory / "completing"
+        if self._completing(directory):
+            return False
+        marker.unlink(missing_ok=True)  # stale lease of a crashed worker
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def end_completion(self, session: ResumableSession) -> None:
+        """Release the claim so chunks can be re-sent (e.g. after a failed delivery)."""
+        (self._dir(session.upload_id) / "completing").unlink(missing_ok=True)
+
+    def assemble(self, session: ResumableSession) -> ResumableAssembly:
+        """Return the ordered, verifying iterator; raises "incomplete" if chunks are missing."""
+        missing = sorted(set(range(session.chunk_count)) - set(self.received(session)))
+        if missing:
+            raise ResumableUploadError("incomplete", index=missing[0])
+        return ResumableAssembly(self, session)
+
+    def _drop_chunk(self, upload_id: str, index: int) -> None:
+        directory = self._dir(upload_id)
+        (directory / f"{index}.part").unlink(missing_ok=True)
+        (directory / f"{index}.sha256").unlink(missing_ok=True)
+
+    def discard(self, upload_id: str) -> None:
+        """Remove a session and all staged chunks."""
+        try:
+            directory = self._dir(upload_id)
+        except ResumableUploadError:
+            return
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Remove expired sessions; returns the number of removed sessions."""
+        root = self.root
+        if not root.is_dir():
+            return 0
+        now = time.time()
+        removed = 0
+        for entry in root.iterdir():
+            if not UPLOAD_ID_RE.fullmatch(entry.name):
+                continue
+            try:
+                meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+                expired = float(meta.get("expires_at", 0)) < now
+            except (OSError, ValueError):
+                # Half-created session: only reap once it is older than the TTL.
+                try:
+                    expired = entry.stat().st_mtime + self.ttl_seconds < now
+                except OSError:
+                    continue
+            if expired:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+RESUMABLE_UPLOADS = ResumableUploadStore()
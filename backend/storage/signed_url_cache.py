@@ -0,0 +1,233 @@
+"""
+Signed download URL cache and batch presigning.
+
+Why:
+    Every file material on a page used to cost one `presign_download` call —
+    a Storage API round-trip plus host normalization — per request. A section
+    with 10 files opened by 30 students meant 300 signing calls for URLs that
+    are interchangeable while they are valid.
+
+Behavior:
+    - `presign_download_cached(...)` returns a cached signed URL for
+      (adapter, bucket, key, disposition, TTL) while enough of its lifetime
+      is left: at least `SIGNED_URL_CACHE_MIN_REMAINING_SECONDS` (default 30)
+      and half of the TTL. Otherwise it signs a new one. Pages hand URLs to
+      lazy-loaded images and links that are fetched well after rendering; a
+      URL with only seconds left would fail with 403 there.
+    - `presign_downloads(...)` resolves many keys at once; misses are signed
+      in one call when the adapter offers `presign_download_many` (Supabase
+      `create_signed_urls`), else one by one.
+    - `stats()` exposes hits, misses, signing calls and batch calls on
+      `/internal/metrics/caches` (key "signed_urls").
+
+Security:
+    Callers authorize the request before asking for a URL; the cache only
+    saves the signing round-trip. A signed URL is a short-lived bearer link
+    to one object, so handing the same URL to two authorized callers grants
+    nothing beyond what each of them may fetch anyway. Entries are bound to
+    the adapter instance (weak reference) so swapping adapters never serves
+    URLs signed by another backend.
+"""
+from __future__ import annotations
+
+import os
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def _parse_expiry(value: Any) -> Optional[float]:
+    """Return an epoch timestamp for an adapter-reported expiry, if parseable."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        text = str(value).strip().replace("Z", "+00:00")
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return parsed.timestamp()
+
+
+@dataclass(frozen=True)
+class _Entry:
+    adapter: "weakref.ReferenceType[Any]"
+    presign: Dict[str, Any]
+    expires_at: float
+
+
+class SignedUrlCache:
+    """Bounded LRU of signed download URLs with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 4096, *, min_remaining_seconds: int = 30) -> None:
+        self._max = max_entries
+        self._min_remaining = min_remaining_seconds
+        self._lock = Lock()
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.signed = 0
+        self.batch_calls = 0
+
+    def _fresh_enough(self, entry: _Entry, expires_in: int, now: float) -> bool:
+        threshold = max(self._min_remaining, expires_in / 2)
+        return entry.expires_at - now >= threshold
+
+    def get(self, adapter: Any, key: Hashable, expires_in: int) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.adapter() is not adapter or not self._fresh_enough(entry, expires_in, now):
+                if entry is not None:
+                    self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dict(entry.presign)
+
+    def put(self, adapter: Any, key: Hashable, presign: Dict[str, Any], expires_in: int) -> Dict[str, Any]:
+        """Store a fresh signing result and return it with `expires_at` filled in."""
+        signed_at = time.time()
+        expires_at = signed_at + expires_in
+        reported = _parse_expiry(presign.get("expires_at"))
+        if reported is not None:
+            expires_at = min(expires_at, reported)
+        result = dict(presign)
+        if not result.get("expires_at"):
+            result["expires_at"] = datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat()
+        with self._lock:
+            self.signed += 1
+            if self._max <= 0:
+                return result
+            try:
+                ref = weakref.ref(adapter)
+            except TypeError:
+                return result
+            self._data[key] = _Entry(adapter=ref, presign=dict(result), expires_at=expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+        return result
+
+    def note_batch(self) -> None:
+        with self._lock:
+            self.batch_calls += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "signed": self.signed,
+                "batch_calls": self.batch_calls,
+                "entries": len(self._data),
+                "max_entries": self._max,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.signed = self.batch_calls = 0
+
+
+SIGNED_URL_CACHE = SignedUrlCache(
+    _env_int("SIGNED_URL_CACHE_MAX_ENTRIES", 4096),
+    min_remaining_seconds=_env_int("SIGNED_URL_CACHE_MIN_REMAINING_SECONDS", 30),
+)
+
+
+def _cache_key(bucket: str, key: str, expires_in: int, disposition: str) -> tuple:
+    return (bucket, key, int(expires_in), disposition)
+
+
+def presign_download_cached(
+    adapter: Any,
+    *,
+    bucket: str,
+    key: str,
+    expires_in: int,
+    disposition: str,
+) -> Dict[str, Any]:
+    """`adapter.presign_download(...)` with reuse of still-valid URLs."""
+    cache_key = _cache_key(bucket, key, expires_in, disposition)
+    cached = SIGNED_URL_CACHE.get(adapter, cache_key, expires_in)
+    if cached is not None:
+        return cached
+    presign = adapter.presign_download(bucket=bucket, key=key, expires_in=expires_in, disposition=disposition)
+    return SIGNED_URL_CACHE.put(adapter, cache_key, dict(presign or {}), expires_in)
+
+
+def _presign_each(
+    adapter: Any, *, bucket: str, keys: list[str], expires_in: int, disposition: str
+) -> Dict[str, Any]:
+    signed: Dict[str, Any] = {}
+    for key in keys:
+        try:
+            signed[key] = adapter.presign_download(bucket=bucket, key=key, expires_in=expires_in, disposition=disposition)
+        except RuntimeError as exc:
+            if str(exc) == "storage_adapter_not_configured":
+                raise
+            continue
+        except Exception:
+            continue
+    return signed
+
+
+def presign_downloads(
+    adapter: Any,
+    *,
+    bucket: str,
+    keys: Iterable[str],
+    expires_in: int,
+    disposition: str,
+) -> Dict[str, Dict[str, Any]]:
+    """Signed download URLs for many keys of one bucket: {key: {url, expires_at}}.
+
+    Cached URLs are reused; the rest is signed in a single adapter call when
+    the adapter implements `presign_download_many`; if that call fails, keys
+    are signed one by one. Keys the adapter could not sign are omitted from
+    the result.
+    """
+    result: Dict[str, Dict[str, Any]] = {}
+    missing: list[str] = []
+    for key in dict.fromkeys(keys):
+        cached = SIGNED_URL_CACHE.get(adapter, _cache_key(bucket, key, expires_in, disposition), expires_in)
+        if cached is not None:
+            result[key] = cached
+        else:
+            missing.append(key)
+    if not missing:
+        return result
+    many = getattr(adapter, "presign_download_many", None)
+    signed: Optional[Dict[str, Any]] = None
+    if callable(many) and len(missing) > 1:
+        SIGNED_URL_CACHE.note_batch()
+        try:
+            signed = many(bucket=bucket, keys=missing, expires_in=expires_in, disposition=disposition) or {}
+        except Exception:
+            signed = None  # batch endpoint down or rejected: sign per key below
+    if signed is None:
+        signed = _presign_each(adapter, bucket=bucket, keys=missing, expires_in=expires_in, disposition=disposition)
+    for key in missing:
+        presign = signed.get(key)
+        if isinstance(presign, dict) and presign.get("url"):
+            result[key] = SIGNED_URL_CACHE.put(
+                adapter, _cache_key(bucket, key, expires_in, disposition), dict(presign), expires_in
+            )
+    return result
@@ -7,6 +7,7 @@ Supabase (or the local stub) matches the metadata submitted by the client.
 
 from __future__ import annotations
 
+import mmap
 import os
 import time
 from dataclasses import dataclass
@@ -16,6 +17,7 @@ from typing import Protocol
 
 from teaching.storage import NullStorageAdapter, StorageAdapterProtocol  # type: ignore
 from backend.storage.config import get_learning_max_upload_bytes
+from backend.storage.ingest_ledger import get_ingest_ledger
 
 
 def _allowed_upload_mime() -> frozenset[str]:
@@ -25,6 +27,34 @@ def _allowed_upload_mime() -> frozenset[str]:
 
 
 _MISMATCH_REASONS = frozenset({"size_mismatch", "hash_mismatch"})
+# Reasons under which the stored bytes were proven to hash to the expected
+# sha256 (ingest ledger, trusted checksum header, download or local read).
+# Content-addressed reuse (backend.storage.blobs) relies on exactly these.
+HASH_VERIFIED_REASONS = frozenset({"match_ingest", "match_head", "match_download", "ok"})
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def hash_file_sha256(path: str | os.PathLike[str]) -> tuple[str, int]:
+    """Return (hex SHA-256, size) of a file without reading it into memory.
+
+    The file is memory-mapped and fed to the hash in 1 MiB slices, so the
+    page cache is hashed in place instead of being copied into Python bytes.
+    """
+    h = _sha256()
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return h.hexdigest(), 0
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, _HASH_CHUNK_BYTES):
+                    h.update(view[offset : offset + _HASH_CHUNK_BYTES])
+            finally:
+                view.release()
+    return h.hexdigest(), size
+
 
 def _stream_hash_from_url(
     url: str,
@@ -119,6 +149,7 @@ def verify_storage_object_integrity(
     expected_size: int | None,
     mime_type: str,
     config: VerificationConfig,
+    ingest_subject: str | None = None,
 ) -> tuple[bool, str]:
     """
     Verify a storage object by comparing size and SHA-256 hash.
@@ -126,12 +157,23 @@ def verify_storage_object_integrity(
     Returns tuple (ok, reason). Even when `config.require_remote` is False, any
     detected size/hash mismatch is treated as a hard failure; "skipped" only
     applies when verification could not run (e.g., no root, adapter missing).
+
+    When `ingest_subject` is given and the bytes passed through our upload
+    proxy/stub for that subject, the hash recorded at ingest is authoritative
+    (see `backend.storage.ingest_ledger`): no HEAD, download or file read.
     """
 
     normalized_mime = (mime_type or "").strip().lower()
     if normalized_mime not in _allowed_upload_mime():
         raise ValueError(f"mime_not_allowed:{normalized_mime}")
 
+    if ingest_subject and storage_key:
+        verdict = get_ingest_ledger().check(storage_key, expected_sha256, expected_size, subject=ingest_subject)
+        if verdict == "match":
+            return (True, "match_ingest")
+        if verdict == "mismatch":
+            return (False, "ingest_mismatch")
+
     bucket = config.storage_bucket
     # Interpret `require_remote` as "verification is required", not strictly
     # "remote HEAD must succeed". In dev/test setups a local verify root may
@@ -263,11 +305,7 @@ def verify_storage_object_integrity(
         return (False, "missing_fields")
     if int(actual_size) != expected_size_int:
         return (False, "size_mismatch")
-    h = _sha256()
-    with target.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(65536), b""):
-            h.update(chunk)
-    actual_hash = h.hexdigest()
+    actual_hash, _ = hash_file_sha256(target)
     if actual_hash.lower() != str(expected_sha256).lower():
         return (False, "hash_mismatch")
     return (True, "ok")
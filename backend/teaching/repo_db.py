@@ -31,6 +31,8 @@ else:  # pragma: no cover - import errors handled above
     except Exception:  # pragma: no cover - fallback when errors module unavailable
         UniqueViolation = None  # type: ignore
 
+from identity_access.guard_memo import memoized
+
 LOG = logging.getLogger(__name__)
 
 
@@ -563,6 +565,10 @@ class DBTeachingRepo:
                 return cur.rowcount > 0
 
     def unit_exists_for_author(self, unit_id: str, author_id: str) -> bool:
+        """Ownership check for guards; memoized per request (see identity_access.guard_memo)."""
+        return memoized("teaching.unit_exists_for_author", (unit_id, author_id), lambda: self._unit_exists_for_author_uncached(unit_id, author_id))
+
+    def _unit_exists_for_author_uncached(self, unit_id: str, author_id: str) -> bool:
         """Check whether the unit exists and is owned by `author_id` via SECURITY DEFINER helper."""
         try:
             with psycopg.connect(self._dsn) as conn:
@@ -576,6 +582,10 @@ class DBTeachingRepo:
         return self.get_unit_for_author(unit_id, author_id) is not None
 
     def unit_exists(self, unit_id: str) -> Optional[bool]:
+        """Existence check for 404/403 mapping; determinate answers are memoized per request."""
+        return memoized("teaching.unit_exists", (unit_id,), lambda: self._unit_exists_uncached(unit_id), cache_none=False)
+
+    def _unit_exists_uncached(self, unit_id: str) -> Optional[bool]:
         """Check existence (ignoring ownership) using SECURITY DEFINER helper."""
         try:
             with psycopg.connect(self._dsn) as conn:
@@ -588,6 +598,23 @@ class DBTeachingRepo:
             return None
         return None
 
+    def unit_content_version(self, unit_id: str) -> Optional[int]:
+        """Return the unit's content version (0 before any write, None on errors).
+
+        Triggers bump `unit_content_versions` on every section, material, task
+        and release write. Conditional GETs use it to answer a matching ETag
+        without loading sections, materials or tasks; callers check
+        authorship first.
+        """
+        try:
+            with psycopg.connect(self._dsn) as conn:
+                with conn.cursor() as cur:
+                    cur.execute("select version from public.unit_content_versions where unit_id = %s", (unit_id,))
+                    r = cur.fetchone()
+        except Exception:
+            return None
+        return int(r[0]) if r is not None else 0
+
     def section_exists_for_author(self, unit_id: str, section_id: str, author_id: str) -> bool:
         """Check whether a section belongs to the unit and is visible to the author."""
         with psycopg.connect(self._dsn) as conn:
@@ -1748,6 +1775,10 @@ class DBTeachingRepo:
 
     # --- Course modules ---------------------------------------------------------
     def list_course_modules_for_owner(self, course_id: str, owner_sub: str) -> List[dict]:
+        """Return modules for a course owned by `owner_sub`, ordered by position (memoized per request)."""
+        return memoized("teaching.list_course_modules_for_owner", (course_id, owner_sub), lambda: self._list_course_modules_for_owner_uncached(course_id, owner_sub))
+
+    def _list_course_modules_for_owner_uncached(self, course_id: str, owner_sub: str) -> List[dict]:
         """Return modules for a course owned by `owner_sub`, ordered by position."""
         with psycopg.connect(self._dsn) as conn:
             with conn.cursor() as cur:
@@ -2308,6 +2339,10 @@ class DBTeachingRepo:
 
     # --- Existence checks (prefer SECURITY DEFINER helpers) ---------------------
     def course_exists_for_owner(self, course_id: str, owner_sub: str) -> bool:
+        """Ownership check for guards; memoized per request (see identity_access.guard_memo)."""
+        return memoized("teaching.course_exists_for_owner", (course_id, owner_sub), lambda: self._course_exists_for_owner_uncached(course_id, owner_sub))
+
+    def _course_exists_for_owner_uncached(self, course_id: str, owner_sub: str) -> bool:
         """Check existence+ownership in one step.
 
         Behavior:
@@ -2327,6 +2362,10 @@ class DBTeachingRepo:
         return self.get_course_for_owner(course_id, owner_sub) is not None
 
     def course_exists(self, course_id: str) -> Optional[bool]:
+        """Existence check for 404/403 mapping; determinate answers are memoized per request."""
+        return memoized("teaching.course_exists", (course_id,), lambda: self._course_exists_uncached(course_id), cache_none=False)
+
+    def _course_exists_uncached(self, course_id: str) -> Optional[bool]:
         """Return True/False when determinable, else None to avoid RLS-misclassification.
 
         Why:
@@ -12,6 +12,8 @@ from uuid import uuid4
 from teaching.storage import StorageAdapterProtocol
 from backend.storage.config import get_materials_bucket, get_materials_max_upload_bytes
 from backend.storage.keys import make_materials_key
+from backend.storage.previews import material_preview_key, sign_preview, sign_previews
+from backend.storage.signed_url_cache import presign_download_cached, presign_downloads
 
 
 class MaterialsRepoProtocol(Protocol):
@@ -96,6 +98,8 @@ class MaterialFileSettings:
     )
     max_size_bytes: int = field(default_factory=get_materials_max_upload_bytes)
     upload_intent_ttl_seconds: int = 3 * 60
+    # Resumable (chunked) uploads may span reconnects; the intent must outlive them.
+    resumable_intent_ttl_seconds: int = 24 * 60 * 60
     download_url_ttl_seconds: int = 45
     # Use centralized config to determine the default bucket name.
     storage_bucket: str = field(default_factory=get_materials_bucket)
@@ -232,6 +236,7 @@ class MaterialsService:
         mime_type: str,
         size_bytes: int,
         storage: StorageAdapterProtocol,
+        resumable: bool = False,
     ) -> Dict[str, Any]:
         if storage is None:
             raise RuntimeError("storage_adapter_not_configured")
@@ -246,7 +251,10 @@ class MaterialsService:
         if size_bytes <= 0 or size_bytes > self.settings.max_size_bytes:
             raise ValueError("size_exceeded")
         now = datetime.now(timezone.utc)
-        expires_at = now + timedelta(seconds=self.settings.upload_intent_ttl_seconds)
+        ttl_seconds = (
+            self.settings.resumable_intent_ttl_seconds if resumable else self.settings.upload_intent_ttl_seconds
+        )
+        expires_at = now + timedelta(seconds=ttl_seconds)
         intent_id = str(uuid4())
         material_uuid = uuid4()
         material_id = str(material_uuid)
@@ -402,7 +410,9 @@ class MaterialsService:
         requested_disposition = (disposition or "attachment").strip().lower()
         if requested_disposition not in {"inline", "attachment"}:
             raise ValueError("invalid_disposition")
-        presign = storage.presign_download(
+        # Still-valid URLs are reused across requests (see signed_url_cache).
+        presign = presign_download_cached(
+            storage,
             bucket=self.settings.storage_bucket,
             key=storage_key,
             expires_in=self.settings.download_url_ttl_seconds,
@@ -414,4 +424,72 @@ class MaterialsService:
             expires_at = (
                 datetime.now(timezone.utc) + timedelta(seconds=self.settings.download_url_ttl_seconds)
             ).isoformat()
-        return {"url": url, "expires_at": expires_at}
+        result = {"url": url, "expires_at": expires_at}
+        if requested_disposition == "inline":
+            preview = sign_preview(
+                storage,
+                bucket=self.settings.storage_bucket,
+                preview_key=material_preview_key(storage_key),
+                expires_in=self.settings.download_url_ttl_seconds,
+            )
+            if preview:
+                result["preview_url"] = preview["url"]
+        return result
+
+    def generate_section_download_urls(
+        self,
+        unit_id: str,
+        section_id: str,
+        author_id: str,
+        *,
+        disposition: str,
+        storage: StorageAdapterProtocol,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Signed download URLs for all file materials of a section: {material_id: {url, expires_at}}.
+
+        Signs every uncached URL of the section in one batch instead of one
+        Storage round-trip per material. Inline requests also carry
+        `preview_url` for materials whose preview was already derived.
+        """
+        if storage is None:
+            raise RuntimeError("storage_adapter_not_configured")
+        requested_disposition = (disposition or "attachment").strip().lower()
+        if requested_disposition not in {"inline", "attachment"}:
+            raise ValueError("invalid_disposition")
+        if not self.repo.section_exists_for_author(unit_id, section_id, author_id):
+            raise LookupError("section_not_found")
+        keys_by_material: Dict[str, str] = {}
+        for material in self.repo.list_materials_for_section_owned(unit_id, section_id, author_id):
+            if isinstance(material, dict):
+                kind, storage_key, material_id = material.get("kind"), material.get("storage_key"), material.get("id")
+            else:
+                kind = getattr(material, "kind", None)
+                storage_key = getattr(material, "storage_key", None)
+                material_id = getattr(material, "id", None)
+            if kind == "file" and storage_key:
+                keys_by_material[str(material_id)] = str(storage_key)
+        signed = presign_downloads(
+            storage,
+            bucket=self.settings.storage_bucket,
+            keys=keys_by_material.values(),
+            expires_in=self.settings.download_url_ttl_seconds,
+            disposition=requested_disposition,
+        )
+        previews: Dict[str, Dict[str, Any]] = {}
+        if requested_disposition == "inline":
+            previews = sign_previews(
+                storage,
+                bucket=self.settings.storage_bucket,
+                preview_keys=[material_preview_key(key) for key in keys_by_material.values()],
+                expires_in=self.settings.download_url_ttl_seconds,
+            )
+        result: Dict[str, Dict[str, Any]] = {}
+        for material_id, key in keys_by_material.items():
+            if key not in signed:
+                continue
+            entry = {"url": signed[key]["url"], "expires_at": signed[key]["expires_at"]}
+            preview = previews.get(material_preview_key(key))
+            if preview:
+                entry["preview_url"] = preview["url"]
+            result[material_id] = entry
+        return result
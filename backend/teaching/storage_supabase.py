@@ -10,6 +10,7 @@ offering:
 - create_signed_url(path, expires_in, options=None) -> { signed_url | signedURL | url, expires_at? }
 - stat(path) -> { size, mimetype }
 - remove([path]) -> Any
+- list(folder, options) -> [{ name, id, metadata, updated_at }] (storage GC)
 
 Security:
 - The caller must ensure the client is initialized with the Service Role key.
@@ -17,7 +18,7 @@ Security:
 """
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 import os
 from urllib.parse import urlparse as _urlparse, urlunparse as _urlunparse
 
@@ -27,6 +28,10 @@ from .storage import StorageAdapterProtocol
 class SupabaseStorageAdapter(StorageAdapterProtocol):
     """Storage adapter using a supabase client for Storage operations."""
 
+    # Storage refuses to sign URLs for missing objects, so a signed URL proves
+    # the object exists (used to offer derived previews only once they exist).
+    signs_existing_objects_only = True
+
     def __init__(self, client: Any):
         # Duck-typed supabase client, e.g., from `supabase import create_client(...)`.
         self._client = client
@@ -210,6 +215,52 @@ class SupabaseStorageAdapter(StorageAdapterProtocol):
             norm_key = norm_key[len(prefix):]
         b.remove([norm_key])
 
+    def delete_objects(self, *, bucket: str, keys: list[str]) -> None:
+        """Remove several objects with one Storage call (`remove(paths)`)."""
+        prefix = f"{bucket}/"
+        paths = []
+        for key in keys:
+            norm_key = key.lstrip("/")
+            if norm_key.startswith(prefix):
+                norm_key = norm_key[len(prefix):]
+            paths.append(norm_key)
+        if paths:
+            self._bucket(bucket).remove(paths)
+
+    def list_objects(self, *, bucket: str, prefix: str = "", page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield every object below `prefix` as {path, size, updated_at}.
+
+        Storage lists one folder level per call (folders come back without an
+        `id`), so this walks folders depth-first and pages with limit/offset.
+        Paths are relative to the bucket, like the ones `remove` accepts.
+        """
+        b = self._bucket(bucket)
+        pending = [prefix.strip("/")]
+        while pending:
+            folder = pending.pop()
+            offset = 0
+            while True:
+                entries = b.list(folder or None, {"limit": page_size, "offset": offset, "sortBy": {"column": "name", "order": "asc"}})
+                entries = entries.get("data") if isinstance(entries, dict) else entries
+                entries = list(entries or [])
+                for entry in entries:
+                    name = str(entry.get("name") or "")
+                    if not name:
+                        continue
+                    path = f"{folder}/{name}" if folder else name
+                    if entry.get("id") is None:
+                        pending.append(path)
+                        continue
+                    meta = entry.get("metadata") or {}
+                    yield {
+                        "path": path,
+                        "size": int(meta.get("size") or meta.get("contentLength") or 0),
+                        "updated_at": entry.get("updated_at") or entry.get("created_at"),
+                    }
+                if len(entries) < page_size:
+                    break
+                offset += page_size
+
     def presign_download(self, *, bucket: str, key: str, expires_in: int, disposition: str) -> Dict[str, Any]:
         b = self._bucket(bucket)
         norm_key = key.lstrip("/")
@@ -241,6 +292,59 @@ class SupabaseStorageAdapter(StorageAdapterProtocol):
             raise RuntimeError("failed_to_presign_download")
         return {"url": self._normalize_signed_url_host(str(url)), "expires_at": expires_at}
 
+    def presign_download_many(
+        self, *, bucket: str, keys: list[str], expires_in: int, disposition: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """Sign download URLs for several keys with one Storage call.
+
+        Uses `create_signed_urls(paths, expires_in, options)` when the client
+        offers it and falls back to per-key `presign_download` when it does
+        not or the batch call fails. Returns {key: {url, expires_at}}; keys
+        Storage refused are omitted.
+        """
+        b = self._bucket(bucket)
+        prefix = f"{bucket}/"
+        by_path: Dict[str, str] = {}
+        for key in keys:
+            norm_key = key.lstrip("/")
+            if norm_key.startswith(prefix):
+                norm_key = norm_key[len(prefix):]
+            by_path[norm_key] = key
+        create_many = getattr(b, "create_signed_urls", None)
+        if not callable(create_many):
+            return self._presign_each(bucket=bucket, keys=keys, expires_in=expires_in, disposition=disposition)
+        # One download option applies to the whole batch; True keeps original filenames.
+        opts = {"download": None if disposition == "inline" else True}
+        try:
+            res = create_many(list(by_path), expires_in, opts)
+        except Exception:
+            return self._presign_each(bucket=bucket, keys=keys, expires_in=expires_in, disposition=disposition)
+        items = res.get("data") if isinstance(res, dict) else res
+        out = {}
+        for item in items or []:
+            if not isinstance(item, dict) or item.get("error"):
+                continue
+            url = self._first_key(item, "signedURL", "signedUrl", "signed_url", "url")
+            key = by_path.get(str(item.get("path") or "").lstrip("/"))
+            if not url or key is None:
+                continue
+            out[key] = {
+                "url": self._normalize_signed_url_host(str(url)),
+                "expires_at": self._first_key(item, "expires_at", "expiresAt"),
+            }
+        return out
+
+    def _presign_each(
+        self, *, bucket: str, keys: list[str], expires_in: int, disposition: str
+    ) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for key in keys:
+            try:
+                out[key] = self.presign_download(bucket=bucket, key=key, expires_in=expires_in, disposition=disposition)
+            except Exception:
+                continue
+        return out
+
     # --- Binary write support (used by Vision pipeline) ------------------------
 
     def put_object(self, *, bucket: str, key: str, body: bytes, content_type: str) -> None:
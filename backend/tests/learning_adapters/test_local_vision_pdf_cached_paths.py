@@ -10,6 +10,7 @@ Why:
 from __future__ import annotations
 
 import base64
+import hashlib
 import importlib
 from io import BytesIO
 from types import SimpleNamespace
@@ -215,3 +216,60 @@ def test_pdf_remote_fetch_redirect_logs_reason(monkeypatch: pytest.MonkeyPatch,
     assert "action=remote_fetch_failed" in logs
     assert "reason=redirect" in logs
     assert "student3" not in logs
+
+
+def test_pdf_reuses_pages_rendered_for_the_same_blob(monkeypatch: pytest.MonkeyPatch, tmp_path, caplog) -> None:
+    from backend.storage.blobs import InMemoryBlobRepo  # type: ignore
+
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path))
+    monkeypatch.setenv("AI_VISION_MODEL", "vision-mini")
+    monkeypatch.delenv("SUPABASE_SERVICE_ROLE_KEY", raising=False)
+    caplog.set_level("INFO")
+
+    pdf = b"%PDF-1.4 worksheet"
+    sha = hashlib.sha256(pdf).hexdigest()
+    pdf_key = "submissions/courseE/taskF/student5/1-a.pdf"
+    (tmp_path / pdf_key).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / pdf_key).write_bytes(pdf)
+    repo = InMemoryBlobRepo()
+    repo.register(
+        owner_sub="student5", sha256=sha, bucket="submissions",
+        object_key=pdf_key, size_bytes=18, mime_type="application/pdf",
+    )
+
+    module = _reload_adapter()
+    monkeypatch.setattr(module, "_blob_registry", lambda: repo)
+    renders: list[bytes] = []
+
+    def _fake_render(data: bytes):
+        renders.append(data)
+        return [SimpleNamespace(data=_png_bytes(4, 4, 20)), SimpleNamespace(data=_png_bytes(4, 5, 200))], {}
+
+    monkeypatch.setattr(module, "process_pdf_bytes", _fake_render)
+    monkeypatch.setattr(module, "stitch_images_vertically", lambda pages: b"stitched-%d" % len(pages))
+    client = _CapturingClient()
+    monkeypatch.setitem(sys.modules, "ollama", SimpleNamespace(Client=lambda base_url=None: client))
+    adapter = module.build()  # type: ignore[attr-defined]
+
+    for submission_id in ("sub-first", "sub-duplicate"):
+        submission = {
+            "id": submission_id,
+            "course_id": "courseE",
+            "task_id": "taskF",
+            "student_sub": "student5",
+            "kind": "file",
+            "mime_type": "application/pdf",
+            "storage_key": pdf_key,
+            "sha256": sha.upper(),
+        }
+        adapter.extract(submission=submission, job_payload={"mime_type": "application/pdf", "storage_key": pdf_key})
+
+    # Only the first job renders; its pages are recorded on the blob for the duplicate.
+    assert len(renders) == 1
+    blob = repo.find(owner_sub="student5", sha256=sha)
+    assert blob is not None and len(blob.derived_keys) == 2
+    assert all((tmp_path / "submissions" / key).is_file() for key in blob.derived_keys)
+    assert [base64.b64decode(call["images"][0]) for call in client.calls] == [b"stitched-2", b"stitched-2"]
+    logs = "\n".join(rec.getMessage() for rec in caplog.records)
+    assert "action=stitch_from_blob_pages" in logs
+    assert "student5" not in logs
@@ -1,7 +1,8 @@
 """
 Cache-Control and CSP hardening tests.
 
-Ensures sensitive API responses are not cached and production CSP avoids
+Ensures sensitive API responses are never shared-cached (private, revalidated
+on every use) and production CSP avoids
 "unsafe-inline" to reduce XSS surface.
 """
 
@@ -33,7 +34,7 @@ if not isinstance(main.SESSION_STORE, SessionStore):  # pragma: no cover - defen
 
 
 @pytest.mark.anyio
-async def test_courses_list_includes_private_no_store_cache_header():
+async def test_courses_list_includes_private_revalidate_cache_header():
     sess = main.SESSION_STORE.create(sub="t-cache-1", name="Teacher", roles=["teacher"])  # type: ignore
     async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as c:
         c.cookies.set(main.SESSION_COOKIE_NAME, sess.session_id)
@@ -41,7 +42,8 @@ async def test_courses_list_includes_private_no_store_cache_header():
 
     assert r.status_code == 200
     cc = r.headers.get("Cache-Control", "")
-    assert "private" in cc and "no-store" in cc
+    # Never shared caches; browsers keep a copy only to revalidate it (ETag).
+    assert "private" in cc and "no-cache" in cc and "public" not in cc
 
 
 @pytest.mark.anyio
@@ -0,0 +1,163 @@
+"""
+Conditional GET — strong ETags and 304 for learning/teaching reads.
+
+Why:
+- Repeated HTMX/SSR reads should revalidate instead of re-downloading. The
+  unit sections endpoint must answer a matching If-None-Match from the content
+  version alone (no section/material/task loading) and still enforce
+  membership. Cache-Control is private, no-cache (API_CACHE_MODE=no-store
+  opts out). Teaching reads below a unit use the content version as well.
+"""
+from __future__ import annotations
+
+import uuid
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+import main  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+class _VersionedRepo:
+    def __init__(self) -> None:
+        self.version = 3
+        self.members = {"s-etag"}
+        self.loads = 0
+        self.probes = 0
+
+    def released_unit_content_version(self, *, student_sub: str, course_id: str, unit_id: str) -> int:
+        self.probes += 1
+        if student_sub not in self.members:
+            raise PermissionError("not_course_member")
+        return self.version
+
+    def list_released_sections_by_unit_versioned(self, **kwargs) -> tuple[list[dict], int]:
+        if kwargs["student_sub"] not in self.members:
+            raise PermissionError("not_course_member")
+        self.loads += 1
+        sections = [{"section": {"id": "s1", "title": f"v{self.version}", "position": 1, "unit_id": kwargs["unit_id"]}, "materials": [], "tasks": []}]
+        return sections, self.version
+
+
+@pytest.fixture
+def learning_repo():
+    import routes.learning as learning  # type: ignore
+
+    previous = learning._get_repo()
+    repo = _VersionedRepo()
+    learning.set_repo(repo)  # type: ignore[arg-type]
+    yield repo
+    learning.set_repo(previous)
+
+
+async def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test", headers={"Origin": "http://test"})
+
+
+async def test_unit_sections_304_skips_loading_until_version_changes(learning_repo: _VersionedRepo):
+    main.SESSION_STORE = SessionStore()
+    student = main.SESSION_STORE.create(sub="s-etag", name="S", roles=["student"])
+    path = f"/api/learning/courses/{uuid.uuid4()}/units/{uuid.uuid4()}/sections"
+
+    async with (await _client()) as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, student.session_id)
+        r1 = await c.get(path)
+        assert r1.status_code == 200
+        assert r1.headers["Cache-Control"] == "private, no-cache"
+        etag = r1.headers["ETag"]
+        assert etag.startswith('"') and not etag.startswith("W/")
+        # A plain GET reads the version with the listing: no separate probe.
+        assert learning_repo.probes == 0
+
+        r2 = await c.get(path, headers={"If-None-Match": etag})
+        assert r2.status_code == 304
+        assert r2.content == b""
+        assert r2.headers["ETag"] == etag
+        assert r2.headers["Cache-Control"] == "private, no-cache"
+        assert learning_repo.loads == 1
+
+        learning_repo.version = 4
+        r3 = await c.get(path, headers={"If-None-Match": etag})
+        assert r3.status_code == 200
+        assert r3.headers["ETag"] != etag
+        assert learning_repo.loads == 2
+
+        # Membership is re-checked before any 304
+        learning_repo.members.clear()
+        r4 = await c.get(path, headers={"If-None-Match": r3.headers["ETag"]})
+        assert r4.status_code == 403
+
+
+async def test_no_store_mode_opts_out(learning_repo: _VersionedRepo, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("API_CACHE_MODE", "no-store")
+    main.SESSION_STORE = SessionStore()
+    student = main.SESSION_STORE.create(sub="s-etag", name="S", roles=["student"])
+    async with (await _client()) as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, student.session_id)
+        r = await c.get(f"/api/learning/courses/{uuid.uuid4()}/units/{uuid.uuid4()}/sections")
+    assert r.headers["Cache-Control"] == "private, no-store"
+    assert r.headers["Vary"] == "Origin"
+
+
+async def test_teaching_unit_get_revalidates_on_body_hash():
+    main.SESSION_STORE = SessionStore()
+    teacher = main.SESSION_STORE.create(sub="t-etag", name="T", roles=["teacher"])
+    async with (await _client()) as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, teacher.session_id)
+        created = await c.post("/api/teaching/units", json={"title": "ETag Unit"})
+        assert created.status_code == 201
+        unit_id = created.json()["id"]
+
+        r1 = await c.get(f"/api/teaching/units/{unit_id}")
+        assert r1.status_code == 200
+        etag = r1.headers["ETag"]
+        r2 = await c.get(f"/api/teaching/units/{unit_id}", headers={"If-None-Match": f'W/{etag}, "other"'})
+        assert r2.status_code == 304
+        assert r2.headers["Cache-Control"] == "private, no-cache"
+
+        patched = await c.patch(f"/api/teaching/units/{unit_id}", json={"title": "Neu"})
+        assert patched.status_code == 200
+        r3 = await c.get(f"/api/teaching/units/{unit_id}", headers={"If-None-Match": etag})
+        assert r3.status_code == 200
+        assert r3.json()["title"] == "Neu"
+
+
+async def test_teaching_sections_304_from_content_version(monkeypatch: pytest.MonkeyPatch):
+    import routes.teaching as teaching  # type: ignore
+
+    main.SESSION_STORE = SessionStore()
+    teacher = main.SESSION_STORE.create(sub="t-etag-v", name="T", roles=["teacher"])
+    other = main.SESSION_STORE.create(sub="t-etag-other", name="O", roles=["teacher"])
+    repo = teaching._get_repo()
+    version = {"value": 5}
+    loads: list[str] = []
+    list_sections = repo.list_sections_for_author
+    monkeypatch.setattr(repo, "unit_content_version", lambda unit_id: version["value"], raising=False)
+    monkeypatch.setattr(repo, "list_sections_for_author", lambda *a: loads.append("sections") or list_sections(*a))
+    async with (await _client()) as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, teacher.session_id)
+        unit_id = (await c.post("/api/teaching/units", json={"title": "Versioned"})).json()["id"]
+        path = f"/api/teaching/units/{unit_id}/sections"
+        r1 = await c.get(path)
+        assert r1.status_code == 200
+        etag = r1.headers["ETag"]
+
+        r2 = await c.get(path, headers={"If-None-Match": etag})
+        assert r2.status_code == 304 and r2.headers["ETag"] == etag
+        assert loads == ["sections"]
+
+        # Another author is rejected before any 304.
+        c.cookies.set(main.SESSION_COOKIE_NAME, other.session_id)
+        r3 = await c.get(path, headers={"If-None-Match": etag})
+        assert r3.status_code in (403, 404)
+
+        version["value"] = 6
+        c.cookies.set(main.SESSION_COOKIE_NAME, teacher.session_id)
+        r4 = await c.get(path, headers={"If-None-Match": etag})
+        assert r4.status_code == 200 and r4.headers["ETag"] != etag
+        assert loads == ["sections", "sections"]
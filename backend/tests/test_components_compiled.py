@@ -0,0 +1,58 @@
+"""
+Compiled component templates and per-role navigation shell caching.
+
+Why:
+- Static chrome is compiled once; only slots change per request. The cached
+  navigation shell must never leak one user's name into another user's page
+  and must still highlight the active entry per path.
+"""
+from __future__ import annotations
+
+import pytest
+
+from components.compiled import Template  # type: ignore  # noqa: E402
+from components.navigation import Navigation, _compiled_user_shell  # type: ignore  # noqa: E402
+
+
+def test_template_render_and_partial():
+    tpl = Template('<div class="{cls}">{{literal}} {body}</div>')
+    assert tpl.slots == ("cls", "body")
+    assert tpl.render(cls="card", body="<p>x</p>") == '<div class="card">{literal} <p>x</p></div>'
+
+    baked = tpl.partial(cls="card")
+    assert baked.slots == ("body",)
+    # Slot values are inserted verbatim, braces included
+    assert baked.render(body="{x}") == '<div class="card">{literal} {x}</div>'
+    with pytest.raises(KeyError):
+        baked.render()
+
+
+def test_template_rejects_format_specs():
+    with pytest.raises(ValueError):
+        Template("{value:>10}")
+    with pytest.raises(ValueError):
+        Template("{user.name}")
+
+
+def test_navigation_shell_is_shared_per_role_but_slots_are_per_user():
+    _compiled_user_shell.cache_clear()
+    a = Navigation({"name": "Anna <script>", "role": "teacher", "roles": ["teacher"]}, "/courses/1").render()
+    b = Navigation({"name": "Ben", "role": "teacher", "roles": ["teacher"]}, "/courses/2").render()
+
+    info = _compiled_user_shell.cache_info()
+    assert info.misses == 1 and info.hits == 1
+    assert "Anna &lt;script&gt;" in a and "Anna" not in b
+    assert "Ben" in b
+    assert 'href="/courses"' in a and 'aria-current="page"' in a
+
+
+def test_navigation_active_entry_follows_path():
+    user = {"name": "Sam", "role": "student", "roles": ["student"]}
+    on_learning = Navigation(user, "/learning/courses/x").render_aside(oob=True)
+    on_about = Navigation(user, "/about").render_aside()
+
+    assert 'hx-swap-oob="true"' in on_learning
+    assert 'hx-swap-oob' not in on_about
+    assert 'class="sidebar-link active"' in on_learning.split('href="/learning"', 1)[1].split("</a>", 1)[0]
+    assert 'class="sidebar-link active"' in on_about.split('href="/about"', 1)[1].split("</a>", 1)[0]
+    assert 'href="/auth/logout"' in on_learning and 'href="/auth/logout"' in on_about
@@ -0,0 +1,139 @@
+"""
+Response compression middleware — threshold, allowlist, streaming, SSE.
+
+Why:
+- Dynamic HTML/JSON should be gzip-compressed on the wire, but SSE and other
+  streamed responses must keep flowing chunk by chunk, and already encoded or
+  tiny responses must pass through unchanged.
+"""
+from __future__ import annotations
+
+import zlib
+
+import anyio
+import httpx
+import pytest
+from httpx import ASGITransport
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from compression import CompressionMiddleware  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+BIG_HTML = "<tr><td>Schüler</td><td>✓</td></tr>" * 200
+
+
+async def _page(request):
+    return HTMLResponse(BIG_HTML, headers={"ETag": '"abc"'})
+
+
+async def _small(request):
+    return JSONResponse({"ok": True})
+
+
+async def _events(request):
+    async def gen():
+        for i in range(3):
+            yield f"data: {i}\n\n"
+
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+
+async def _stream_html(request):
+    async def gen():
+        for i in range(3):
+            yield f"<section>{i}</section>" * 100
+
+    return StreamingResponse(gen(), media_type="text/html")
+
+
+async def _encoded(request):
+    return Response(b"\x1f\x8balready", media_type="text/css", headers={"Content-Encoding": "gzip"})
+
+
+def _app(**kwargs) -> Starlette:
+    app = Starlette(routes=[
+        Route("/page", _page),
+        Route("/small", _small),
+        Route("/events", _events),
+        Route("/stream", _stream_html),
+        Route("/encoded", _encoded),
+    ])
+    app.add_middleware(CompressionMiddleware, **kwargs)
+    return app
+
+
+async def test_compresses_large_html_and_weakens_etag():
+    async with httpx.AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as c:
+        r = await c.get("/page", headers={"Accept-Encoding": "gzip"})
+        plain = await c.get("/page", headers={"Accept-Encoding": "identity"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["Vary"]
+    assert r.headers["ETag"] == 'W/"abc"'
+    assert r.text == BIG_HTML
+    assert int(r.headers["Content-Length"]) < len(BIG_HTML.encode()) // 5
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] == '"abc"'
+
+
+async def test_small_and_already_encoded_responses_pass_through():
+    async with httpx.AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as c:
+        small = await c.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.json() == {"ok": True}
+    headers, bodies = await _collect(_app(minimum_size=0), "/encoded")
+    assert headers["content-encoding"] == "gzip"
+    assert bodies[0]["body"] == b"\x1f\x8balready"
+
+
+async def _collect(app, path: str) -> tuple[dict, list[dict]]:
+    messages: list[dict] = []
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip, br"), (b"host", b"test")], "scheme": "http",
+        "server": ("test", 80), "client": ("127.0.0.1", 1), "root_path": "", "http_version": "1.1",
+    }
+
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await anyio.sleep_forever()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    bodies = [m for m in messages if m["type"] == "http.response.body"]
+    return {k.decode().lower(): v.decode() for k, v in start["headers"]}, bodies
+
+
+async def test_sse_is_never_compressed():
+    headers, bodies = await _collect(_app(minimum_size=0), "/events")
+    assert "content-encoding" not in headers
+    assert b"".join(m["body"] for m in bodies) == b"data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+
+async def test_streamed_html_is_flushed_per_chunk():
+    headers, bodies = await _collect(_app(), "/stream")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    decoder = zlib.decompressobj(31)
+    # Every chunk is decodable on arrival (sync flush), not only at the end.
+    for i in range(3):
+        assert decoder.decompress(bodies[i]["body"]) == (f"<section>{i}</section>" * 100).encode()
+    assert bodies[-1]["more_body"] is False
+
+
+async def test_disabled_via_env(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("RESPONSE_COMPRESSION", "off")
+    async with httpx.AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as c:
+        r = await c.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
@@ -0,0 +1,174 @@
+"""
+Request-scoped memo for ownership/membership guard lookups.
+
+Why:
+- An SSR page and its loopback API calls must run each distinct guard query
+  once per incoming request. Writes must never see a memoized decision, and
+  nothing may leak across requests or callers.
+"""
+from __future__ import annotations
+
+import httpx
+import pytest
+from httpx import ASGITransport
+from fastapi import FastAPI
+
+from identity_access.guard_memo import GuardMemoMiddleware, memoized  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _counting_app(calls: list[tuple[str, str]]) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(GuardMemoMiddleware)
+
+    def owns(course_id: str, sub: str) -> bool:
+        def lookup() -> bool:
+            calls.append((course_id, sub))
+            return sub == "owner"
+
+        return memoized("test.owns", (course_id, sub), lookup)
+
+    def loopback() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://loopback")
+
+    @app.get("/api/courses/{course_id}")
+    async def api_read(course_id: str, sub: str):
+        return {"owner": owns(course_id, sub)}
+
+    @app.post("/api/courses/{course_id}")
+    async def api_write(course_id: str, sub: str):
+        return {"owner": owns(course_id, sub)}
+
+    @app.get("/page/{course_id}")
+    async def page(course_id: str, sub: str, write: bool = False):
+        allowed = owns(course_id, sub)
+        async with loopback() as client:
+            first = (await client.get(f"/api/courses/{course_id}", params={"sub": sub})).json()
+            if write:
+                await client.post(f"/api/courses/{course_id}", params={"sub": sub})
+            second = (await client.get(f"/api/courses/{course_id}", params={"sub": sub})).json()
+        return {"page": allowed, "first": first["owner"], "second": second["owner"]}
+
+    return app
+
+
+async def _get(app: FastAPI, path: str, **params):
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get(path, params=params)
+
+
+def test_without_request_scope_lookups_are_not_memoized():
+    calls = []
+    for _ in range(2):
+        memoized("test.k", ("c",), lambda: calls.append(1) or True)
+    assert len(calls) == 2
+
+
+async def test_page_and_loopback_reads_share_one_lookup():
+    calls: list[tuple[str, str]] = []
+    app = _counting_app(calls)
+
+    r = await _get(app, "/page/c1", sub="owner")
+    assert r.json() == {"page": True, "first": True, "second": True}
+    assert calls == [("c1", "owner")]
+
+    # A new incoming request starts with an empty memo
+    await _get(app, "/page/c1", sub="owner")
+    assert calls == [("c1", "owner")] * 2
+
+
+async def test_memo_is_keyed_by_caller():
+    calls: list[tuple[str, str]] = []
+    app = _counting_app(calls)
+
+    assert (await _get(app, "/api/courses/c1", sub="owner")).json() == {"owner": True}
+    assert (await _get(app, "/api/courses/c1", sub="intruder")).json() == {"owner": False}
+    assert calls == [("c1", "owner"), ("c1", "intruder")]
+
+
+async def test_writes_bypass_and_reset_the_memo():
+    calls: list[tuple[str, str]] = []
+    app = _counting_app(calls)
+
+    await _get(app, "/page/c1", sub="owner", write="true")
+    # page + first read share one lookup; the POST runs uncached and the
+    # read after it queries again.
+    assert calls == [("c1", "owner")] * 3
+
+
+async def test_indeterminate_answers_are_not_memoized():
+    calls = []
+    app = FastAPI()
+    app.add_middleware(GuardMemoMiddleware)
+
+    @app.get("/exists")
+    async def exists():
+        for _ in range(2):
+            memoized("test.exists", ("c1",), lambda: calls.append(1), cache_none=False)
+        return {}
+
+    await _get(app, "/exists")
+    assert len(calls) == 2
+
+
+async def test_mutable_results_are_copied():
+    app = FastAPI()
+    app.add_middleware(GuardMemoMiddleware)
+
+    @app.get("/modules")
+    async def modules():
+        first = memoized("test.modules", ("c1",), lambda: [{"id": "m1"}])
+        first.append({"id": "injected"})
+        first[0]["id"] = "changed"
+        return memoized("test.modules", ("c1",), lambda: [])
+
+    assert (await _get(app, "/modules")).json() == [{"id": "m1"}]
+
+
+class _FakeCursor:
+    def __init__(self, log: list[str]):
+        self._log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self._log.append(sql)
+
+    def fetchone(self):
+        return (True,)
+
+
+class _FakeConnection(_FakeCursor):
+    def cursor(self):
+        return _FakeCursor(self._log)
+
+
+async def test_teaching_repo_guards_query_once_per_request(monkeypatch: pytest.MonkeyPatch):
+    from teaching import repo_db  # type: ignore
+
+    statements: list[str] = []
+    monkeypatch.setattr(repo_db.psycopg, "connect", lambda *a, **k: _FakeConnection(statements))
+    repo = object.__new__(repo_db.DBTeachingRepo)
+    repo._dsn = "postgresql://gustav_limited@db/postgres"
+
+    app = FastAPI()
+    app.add_middleware(GuardMemoMiddleware)
+
+    @app.get("/guards")
+    def guards():
+        for _ in range(3):
+            assert repo.course_exists_for_owner("c1", "owner") is True
+            assert repo.unit_exists_for_author("u1", "owner") is True
+        return {}
+
+    await _get(app, "/guards")
+    assert statements == [
+        "select public.course_exists_for_owner(%s, %s)",
+        "select public.unit_exists_for_author(%s, %s)",
+    ]
@@ -0,0 +1,159 @@
+"""
+Directory cache — token reuse, name caching (incl. negative), concurrent misses.
+
+Why:
+- `resolve_student_names` used to fetch a fresh admin token and issue one
+  sequential `GET /users/{id}` per student on every live/members page. These
+  tests pin the cached behaviour and the "calls saved" metric exposed at
+  `/internal/metrics/caches`.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import types
+from pathlib import Path
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+WEB_DIR = REPO_ROOT / "backend" / "web"
+if str(WEB_DIR) not in sys.path:
+    sys.path.insert(0, str(WEB_DIR))
+
+from identity_access import directory, directory_cache, roster_index  # type: ignore  # noqa: E402
+
+
+class _Resp:
+    def __init__(self, status: int, data=None):
+        self.status_code = status
+        self._data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._data
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    directory_cache.reset_for_tests()
+    roster_index.reset_for_tests()
+    yield
+    directory_cache.reset_for_tests()
+    roster_index.reset_for_tests()
+
+
+def _install_fake_kc(monkeypatch: pytest.MonkeyPatch, users: dict[str, dict], *, fail: set[str] | None = None):
+    calls = {"token": 0, "get": []}
+    threads: set[str] = set()
+
+    def fake_token(self):
+        calls["token"] += 1
+        self._expires_in = 300
+        return "tok"
+
+    def fake_get(url, headers=None, params=None, timeout=None, verify=None, allow_redirects=None):
+        sid = url.rsplit("/", 1)[-1]
+        calls["get"].append(sid)
+        threads.add(threading.current_thread().name)
+        if fail and sid in fail:
+            return _Resp(503)
+        if sid not in users:
+            return _Resp(404)
+        return _Resp(200, users[sid])
+
+    monkeypatch.setattr(directory._KC, "token", fake_token)
+    monkeypatch.setattr(directory, "_http", lambda: types.SimpleNamespace(get=fake_get))
+    return calls, threads
+
+
+def test_second_resolution_is_served_from_cache(monkeypatch: pytest.MonkeyPatch):
+    users = {f"s{i}": {"firstName": f"Kind{i}", "lastName": "Test"} for i in range(5)}
+    calls, threads = _install_fake_kc(monkeypatch, users)
+
+    first = directory.resolve_student_names(list(users))
+    assert first["s3"] == "Kind3 Test"
+    assert calls["token"] == 1
+    assert sorted(calls["get"]) == sorted(users)
+    assert any(t.startswith("kc-names") for t in threads)
+
+    second = directory.resolve_student_names(list(users))
+    assert second == first
+    assert calls["token"] == 1
+    assert len(calls["get"]) == 5
+
+    stats = directory_cache.stats()
+    assert stats["keycloak_calls"] == 6  # 1 token + 5 users
+    assert stats["name_cache_hits"] == 5
+    assert stats["calls_saved"] == 5
+
+
+def test_unknown_users_are_negatively_cached_but_errors_are_not(monkeypatch: pytest.MonkeyPatch):
+    calls, _ = _install_fake_kc(monkeypatch, {"ok": {"username": "max.muster"}}, fail={"flaky"})
+
+    out = directory.resolve_student_names(["ok", "gone", "flaky"])
+    assert out == {"ok": "Max Muster", "gone": "gone", "flaky": "flaky"}
+
+    directory.resolve_student_names(["ok", "gone", "flaky"])
+    # Only the transient failure is retried
+    assert calls["get"].count("gone") == 1
+    assert calls["get"].count("flaky") == 2
+    assert directory_cache.stats()["negative_cache_hits"] == 1
+
+
+def test_token_cache_refreshes_before_expiry():
+    now = [0.0]
+    cache = directory_cache.TokenCache(skew_seconds=30, clock=lambda: now[0])
+    fetched: list[int] = []
+
+    def fetch():
+        fetched.append(1)
+        return f"t{len(fetched)}", 60
+
+    assert cache.get(("k",), fetch) == "t1"
+    now[0] = 29
+    assert cache.get(("k",), fetch) == "t1"
+    now[0] = 31  # within the skew window before the 60s expiry
+    assert cache.get(("k",), fetch) == "t2"
+
+
+def test_name_cache_is_bounded_lru():
+    cache = directory_cache.NameCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.lookup(["a"])  # touch a → b is least recently used
+    cache.put("c", "C")
+    found, missing = cache.lookup(["a", "b", "c"])
+    assert found == {"a": "A", "c": "C"}
+    assert missing == ["b"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cache_metrics_endpoint_requires_teacher_and_reports_directory():
+    import main  # type: ignore
+    from identity_access.stores import SessionStore  # type: ignore
+
+    main.SESSION_STORE = SessionStore()
+    teacher = main.SESSION_STORE.create(sub="t-metrics", name="T", roles=["teacher"])
+    student = main.SESSION_STORE.create(sub="s-metrics", name="S", roles=["student"])
+    directory_cache.record(keycloak_calls=2, name_cache_hits=3)
+
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as c:
+        r = await c.get("/internal/metrics/caches")
+        assert r.status_code == 401
+        c.cookies.set(main.SESSION_COOKIE_NAME, student.session_id)
+        r = await c.get("/internal/metrics/caches")
+        assert r.status_code == 403
+        c.cookies.set(main.SESSION_COOKIE_NAME, teacher.session_id)
+        r = await c.get("/internal/metrics/caches")
+
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"] == "private, no-store"
+    body = r.json()["caches"]["directory"]
+    assert body["keycloak_calls"] == 2
+    assert body["calls_saved"] == 3
@@ -71,7 +71,9 @@ def test_directory_search_pages_over_role_members(monkeypatch: pytest.MonkeyPatc
         else:
             return _Resp(200, [])
 
-    monkeypatch.setattr(dir, "requests", types.SimpleNamespace(get=fake_get))
+    monkeypatch.setattr(dir, "_http", lambda: types.SimpleNamespace(get=fake_get))
+    dir.directory_cache.reset_for_tests()
+    dir.roster_index.reset_for_tests()
 
     out = dir.search_users_by_name(role="student", q="Zel", limit=5)
     subs = [it.get("sub") for it in out]
@@ -0,0 +1,145 @@
+"""
+Roster index — local member search without per-keystroke Keycloak paging.
+
+Why:
+- The members UI searches on every keystroke. `search_users_by_name` must be
+  answered from a synced in-process index (prefix/substring/trigram) that
+  refreshes incrementally and in the background.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+WEB_DIR = REPO_ROOT / "backend" / "web"
+if str(WEB_DIR) not in sys.path:
+    sys.path.insert(0, str(WEB_DIR))
+
+from identity_access import directory, directory_cache, roster_index  # type: ignore  # noqa: E402
+from identity_access.roster_index import RosterEntry, RosterIndex  # type: ignore  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fresh():
+    directory_cache.reset_for_tests()
+    roster_index.reset_for_tests()
+    yield
+    directory_cache.reset_for_tests()
+    roster_index.reset_for_tests()
+
+
+def _index(*entries: RosterEntry) -> RosterIndex:
+    idx = RosterIndex()
+    idx.replace_all(entries)
+    return idx
+
+
+def test_search_ranks_prefix_then_substring_then_trigram():
+    idx = _index(
+        RosterEntry("1", "Max Muster", "max.muster"),
+        RosterEntry("2", "Anna Schmuster", "anna"),
+        RosterEntry("3", "Moritz Mustre", "mm"),
+        RosterEntry("4", "Zoe Weber", "zoe"),
+    )
+    assert [e.sub for e in idx.search("must", limit=10)] == ["1", "3", "2"]
+    assert [e.sub for e in idx.search("muster", limit=10)] == ["1", "2", "3"]  # trigram fills after substring
+    assert [e.sub for e in idx.search("zoe", limit=10)] == ["4"]
+    assert [e.sub for e in idx.search("", limit=2)] == ["2", "1"]  # empty query lists by name
+
+
+def test_search_is_case_and_accent_insensitive():
+    idx = _index(RosterEntry("1", "Jürgen Ölmann", "juergen"))
+    assert [e.sub for e in idx.search("OLM", limit=5)] == ["1"]
+    assert [e.sub for e in idx.search("jurg", limit=5)] == ["1"]
+
+
+def test_replace_all_diffs_and_upsert_updates_incrementally():
+    idx = _index(RosterEntry("1", "Alt Name"), RosterEntry("2", "Bleibt"))
+    counts = idx.replace_all([RosterEntry("2", "Bleibt"), RosterEntry("3", "Neu Dazu")])
+    assert counts == {"added": 1, "updated": 0, "removed": 1}
+    assert idx.search("alt", limit=5) == []
+
+    idx.upsert("3", "Umbenannt")
+    assert idx.search("neu", limit=5) == []
+    assert [e.sub for e in idx.search("umbe", limit=5)] == ["3"]
+
+
+def test_ensure_fresh_refreshes_stale_index_in_background():
+    now = [0.0]
+    idx = RosterIndex(max_age_seconds=60, clock=lambda: now[0])
+    idx.ensure_fresh(lambda: [RosterEntry("1", "Erste")])
+    assert idx.full_syncs == 1
+
+    release = threading.Event()
+    done = threading.Event()
+
+    def slow_loader():
+        release.wait(5)
+        done.set()
+        return [RosterEntry("1", "Erste"), RosterEntry("2", "Zweite")]
+
+    now[0] = 61
+    started = time.monotonic()
+    idx.ensure_fresh(slow_loader)
+    idx.ensure_fresh(slow_loader)  # single flight
+    assert time.monotonic() - started < 1
+    assert [e.sub for e in idx.search("", limit=5)] == ["1"]  # stale data still served
+
+    release.set()
+    assert done.wait(5)
+    for _ in range(100):
+        if idx.full_syncs == 2:
+            break
+        time.sleep(0.01)
+    assert idx.full_syncs == 2
+    assert len(idx) == 2
+
+
+def test_cold_sync_is_single_flight():
+    idx = RosterIndex(max_age_seconds=60)
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return [RosterEntry("1", "Erste")]
+
+    threads = [threading.Thread(target=idx.ensure_fresh, args=(slow_loader,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    assert idx.full_syncs == 1
+    assert len(idx) == 1
+
+
+def test_search_users_by_name_hits_keycloak_only_for_sync(monkeypatch: pytest.MonkeyPatch):
+    calls: list[int] = []
+
+    def fake_get(url, headers=None, params=None, timeout=None, verify=None, allow_redirects=None):
+        calls.append(int(params["first"]))
+        users = [{"id": f"s{i}", "firstName": f"Kind{i}", "lastName": "Test", "username": f"k{i}"} for i in range(250)]
+        first = int(params["first"])
+        return types.SimpleNamespace(status_code=200, raise_for_status=lambda: None, json=lambda: users[first:first + 200])
+
+    monkeypatch.setattr(directory._KC, "token", lambda self: "tok")
+    monkeypatch.setattr(directory, "_http", lambda: types.SimpleNamespace(get=fake_get))
+
+    assert directory.search_users_by_name(role="student", q="Kind24", limit=3)[0]["name"] == "Kind24 Test"
+    assert calls == [0, 200]
+    for q in ("K", "Ki", "Kin", "Kind", "Kind2", "Kind24"):
+        directory.search_users_by_name(role="student", q=q, limit=20)
+    assert calls == [0, 200]
+
+    # Names of synced students resolve without per-user requests
+    assert directory.resolve_student_names(["s7"]) == {"s7": "Kind7 Test"}
+    assert calls == [0, 200]
+    assert directory_cache.stats()["roster_hits"] == 1
+    assert roster_index.stats()["entries"] == 250
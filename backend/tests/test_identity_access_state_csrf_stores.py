@@ -0,0 +1,165 @@
+"""
+State and CSRF stores: lazy expiry, memory caps and the Postgres variants.
+
+Why:
+- OIDC state and CSRF tokens used to live in unbounded per-process dicts.
+  These tests pin the bounded in-memory behaviour and the SQL flow of the
+  shared DB-backed stores (single-use state, sliding CSRF upsert, sweeping).
+"""
+from __future__ import annotations
+
+import types
+
+import pytest
+
+from identity_access import stores as mem
+from identity_access import stores_db as dbmod
+
+
+def test_state_store_pop_is_single_use_and_rejects_expired():
+    store = mem.StateStore()
+    rec = store.create(code_verifier="v", ttl_seconds=60)
+    assert store.pop_valid(rec.state) is not None
+    assert store.pop_valid(rec.state) is None
+
+    expired = store.create(code_verifier="v", ttl_seconds=-1)
+    assert store.pop_valid(expired.state) is None
+    assert len(store) == 0
+
+
+def test_state_store_cap_sweeps_expired_then_evicts_oldest():
+    store = mem.StateStore(max_entries=3)
+    stale = store.create(code_verifier="old", ttl_seconds=-1)
+    first = store.create(code_verifier="a", ttl_seconds=60)
+    second = store.create(code_verifier="b", ttl_seconds=60)
+    # Full: the expired record is swept before anything live is evicted
+    third = store.create(code_verifier="c", ttl_seconds=60)
+    assert len(store) == 3
+    assert store.pop_valid(stale.state) is None
+    # Full again with live entries only: the oldest live record makes room
+    store.create(code_verifier="d", ttl_seconds=60)
+    store.create(code_verifier="e", ttl_seconds=60)
+    assert len(store) == 3
+    assert store.pop_valid(first.state) is None
+    assert store.pop_valid(second.state) is None
+    assert store.pop_valid(third.state) is not None
+
+
+def test_csrf_store_reuses_token_and_expires_lazily(monkeypatch: pytest.MonkeyPatch):
+    now = [1_000]
+    monkeypatch.setattr(mem, "_now", lambda: now[0])
+    store = mem.CsrfTokenStore(ttl_seconds=10)
+    token = store.get_or_create("sid-1")
+    now[0] += 5
+    assert store.get_or_create("sid-1") == token  # sliding TTL extends to 1015
+    now[0] += 9
+    assert store.get("sid-1") == token
+    now[0] += 20
+    assert store.get("sid-1") is None
+    assert len(store) == 0
+    assert store.get_or_create("sid-1") != token
+
+
+def test_csrf_store_sweep_and_cap(monkeypatch: pytest.MonkeyPatch):
+    now = [1_000]
+    monkeypatch.setattr(mem, "_now", lambda: now[0])
+    store = mem.CsrfTokenStore(ttl_seconds=10, max_entries=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get_or_create("c")
+    assert len(store) == 2
+    assert store.get("a") is None
+    now[0] += 60
+    assert store.sweep() == 2
+    assert len(store) == 0
+
+
+class _RecordingCursor:
+    """Accepts only plain SQL strings so stores use their fallback path."""
+
+    def __init__(self, log: list, rows: list) -> None:
+        self._log = log
+        self._rows = rows
+        self.rowcount = 0
+
+    def execute(self, sql, params):
+        if not isinstance(sql, str):
+            raise TypeError("composed SQL not supported by fake")
+        self._log.append((" ".join(sql.split()), params))
+        self.rowcount = 3 if sql.lstrip().startswith("delete from public.app_auth_states where ctid") else 1
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _install_recorder(monkeypatch: pytest.MonkeyPatch, rows: list) -> list:
+    log: list = []
+
+    class _Conn:
+        def cursor(self):
+            return _RecordingCursor(log, rows)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    fake = types.SimpleNamespace(connect=lambda dsn, autocommit=None: _Conn())
+    monkeypatch.setattr(dbmod, "HAVE_PSYCOPG", True, raising=False)
+    monkeypatch.setattr(dbmod, "psycopg", fake, raising=False)
+    return log
+
+
+def test_db_state_store_pop_deletes_returning_and_checks_expiry(monkeypatch: pytest.MonkeyPatch):
+    rows: list = []
+    log = _install_recorder(monkeypatch, rows)
+    store = dbmod.DBStateStore(dsn="fake://dsn", sweep_every=2)
+
+    rec = store.create(code_verifier="cv", redirect="/learning", nonce="n")
+    assert log[-1][0].startswith("insert into public.app_auth_states")
+    assert log[-1][1][:4] == (rec.state, "cv", "/learning", "n")
+
+    rows.append((rec.state, "cv", "/learning", "n", rec.expires_at))
+    got = store.pop_valid(rec.state)
+    assert got is not None and got.code_verifier == "cv" and got.nonce == "n"
+    assert "returning" in log[-1][0] and log[-1][0].startswith("delete from public.app_auth_states")
+
+    rows.append((rec.state, "cv", None, None, 1))
+    assert store.pop_valid(rec.state) is None
+
+    # Every second write triggers a bounded sweep of expired rows
+    store.create(code_verifier="cv2")
+    assert "expires_at <= now() order by expires_at limit %s for update skip locked" in log[-1][0]
+    assert store.sweep(limit=10) == 3
+
+
+def test_db_csrf_store_upserts_with_sliding_ttl(monkeypatch: pytest.MonkeyPatch):
+    rows: list = [("tok-1",)]
+    log = _install_recorder(monkeypatch, rows)
+    store = dbmod.DBCsrfTokenStore(dsn="fake://dsn", ttl_seconds=120)
+
+    assert store.get_or_create("sid") == "tok-1"
+    sql, params = log[-1]
+    assert "on conflict (session_id) do update" in sql
+    assert params[0] == "sid" and params[2] == 120
+
+    assert store.get("sid") is None
+    assert "expires_at > now()" in log[-1][0]
+
+    store.delete("sid")
+    assert log[-1] == ("delete from public.app_csrf_tokens where session_id = %s", ("sid",))
+
+
+def test_db_stores_reject_invalid_table(monkeypatch: pytest.MonkeyPatch):
+    _install_recorder(monkeypatch, [])
+    with pytest.raises(ValueError):
+        dbmod.DBStateStore(dsn="fake://dsn", table="x;drop")
+    with pytest.raises(ValueError):
+        dbmod.DBCsrfTokenStore(dsn="fake://dsn", table="x;drop")
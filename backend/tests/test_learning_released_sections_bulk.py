@@ -0,0 +1,184 @@
+"""
+Learning repo — released sections load materials/tasks set-based (no N+1).
+
+Why:
+    Student unit pages listed sections and then queried materials and tasks per
+    section (2N+3 round-trips). The repo must issue one query per content kind
+    for all sections and group the rows by section in Python. The unit-scoped
+    variant additionally serves a shared snapshot per content version after
+    the per-student checks.
+"""
+from __future__ import annotations
+
+import types
+import uuid
+
+import pytest
+
+repo_db = pytest.importorskip("backend.learning.repo_db")
+if not getattr(repo_db, "HAVE_PSYCOPG", False):  # pragma: no cover
+    pytest.skip("psycopg not available", allow_module_level=True)
+
+from backend.learning.content_cache import RELEASED_CONTENT_CACHE  # noqa: E402
+
+
+class _FakeCursor:
+    def __init__(self, conn: "_FakeConn"):
+        self._conn = conn
+        self._rows: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql: str, params=None):
+        text = " ".join(str(sql).split())
+        if "set_config" not in text:
+            self._conn.queries.append(text)
+        self._rows = self._conn.respond(text, params)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class _FakeConn:
+    def __init__(self, section_ids: list[str], unit_id: str):
+        self.section_ids = section_ids
+        self.unit_id = unit_id
+        self.queries: list[str] = []
+        self.bulk_params: list[list[str]] = []
+        self.content_version = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def respond(self, text: str, params):
+        if "set_config" in text:
+            return []
+        if "get_course_units_for_student" in text:
+            return [(True, self.content_version)]
+        if "course_memberships" in text and "exists" in text:
+            return [(True,)]
+        if "get_released_sections_for_student" in text:
+            return [(sid, f"S{i}", i + 1, self.unit_id, "m1") for i, sid in enumerate(self.section_ids)]
+        if "get_released_materials_for_student_sections" in text:
+            self.bulk_params.append(list(params[2]))
+            # Every second section has one material; rows arrive ordered by section
+            return [
+                (sid, f"mat-{i}", f"M{i}", "markdown", "# hi", None, None, None, None, None, None, 1, "t0", "t1")
+                for i, sid in enumerate(self.section_ids)
+                if i % 2 == 0
+            ]
+        if "get_released_tasks_for_student_sections" in text:
+            self.bulk_params.append(list(params[2]))
+            return [(self.section_ids[-1], "task-1", "Do it", ["A"], None, None, 3, 1, "t0", "t1")]
+        raise AssertionError(f"unexpected query: {text}")
+
+
+@pytest.fixture
+def fake_db(monkeypatch: pytest.MonkeyPatch):
+    section_ids = [str(uuid.uuid4()) for _ in range(20)]
+    conn = _FakeConn(section_ids, str(uuid.uuid4()))
+    monkeypatch.setattr(repo_db, "psycopg", types.SimpleNamespace(connect=lambda *a, **k: conn))
+    monkeypatch.setenv("ALLOW_SERVICE_DSN_FOR_TESTING", "1")
+    RELEASED_CONTENT_CACHE.clear()
+    yield conn
+    RELEASED_CONTENT_CACHE.clear()
+
+
+def test_list_released_sections_uses_one_query_per_content_kind(fake_db):
+    repo = repo_db.DBLearningRepo(dsn="postgresql://gustav_limited:x@localhost/db")
+    out = repo.list_released_sections(
+        student_sub="s1",
+        course_id=str(uuid.uuid4()),
+        include_materials=True,
+        include_tasks=True,
+        limit=50,
+        offset=0,
+    )
+
+    assert len(out) == 20
+    assert len(fake_db.queries) == 4  # membership, sections, materials, tasks
+    assert fake_db.bulk_params == [fake_db.section_ids, fake_db.section_ids]
+    assert [m["id"] for m in out[0]["materials"]] == ["mat-0"]
+    assert out[1]["materials"] == []
+    assert out[-1]["tasks"][0]["criteria"] == ["A"]
+    assert out[-1]["tasks"][0]["kind"] == "native"
+    assert all(entry["tasks"] == [] for entry in out[:-1])
+
+
+def test_list_released_sections_by_unit_skips_content_queries_when_not_requested(fake_db):
+    repo = repo_db.DBLearningRepo(dsn="postgresql://gustav_limited:x@localhost/db")
+    out = repo.list_released_sections_by_unit(
+        student_sub="s1",
+        course_id=str(uuid.uuid4()),
+        unit_id=fake_db.unit_id,
+        include_materials=False,
+        include_tasks=True,
+        limit=50,
+        offset=0,
+    )
+
+    assert len(out) == 20
+    assert len(fake_db.queries) == 4  # membership, unit check, sections, tasks
+    assert all(entry["materials"] == [] for entry in out)
+
+
+def _load_unit(repo, conn):
+    return repo.list_released_sections_by_unit(
+        student_sub="s1",
+        course_id="00000000-0000-0000-0000-0000000000c1",
+        unit_id=conn.unit_id,
+        include_materials=True,
+        include_tasks=True,
+        limit=50,
+        offset=0,
+    )
+
+
+def test_unit_snapshot_is_shared_until_content_version_changes(fake_db):
+    repo = repo_db.DBLearningRepo(dsn="postgresql://gustav_limited:x@localhost/db")
+    first = _load_unit(repo, fake_db)
+    assert len(fake_db.queries) == 5  # membership, unit check + version, sections, materials, tasks
+
+    fake_db.queries.clear()
+    second = _load_unit(repo, fake_db)
+    assert second == first
+    assert len(fake_db.queries) == 2  # per-student checks only
+
+    # Callers may decorate results without corrupting the shared snapshot
+    second[0]["materials"].clear()
+    assert _load_unit(repo, fake_db)[0]["materials"] == first[0]["materials"]
+
+    fake_db.queries.clear()
+    fake_db.content_version = 2  # e.g., teacher toggled a release
+    _load_unit(repo, fake_db)
+    assert len(fake_db.queries) == 5
+    assert RELEASED_CONTENT_CACHE.stats()["hits"] == 2
+
+
+def test_unit_snapshot_requires_membership_check_on_every_request(fake_db, monkeypatch: pytest.MonkeyPatch):
+    repo = repo_db.DBLearningRepo(dsn="postgresql://gustav_limited:x@localhost/db")
+    _load_unit(repo, fake_db)
+
+    real_respond = fake_db.respond
+
+    def outsider(text, params):
+        if "course_memberships" in text and "exists" in text:
+            return [(False,)]
+        return real_respond(text, params)
+
+    monkeypatch.setattr(fake_db, "respond", outsider)
+    with pytest.raises(PermissionError):
+        _load_unit(repo, fake_db)
@@ -100,3 +100,51 @@ async def test_list_released_sections_raises_permission_for_non_member():
             limit=10,
             offset=0,
         )
+
+
+@pytest.mark.anyio
+async def test_readding_a_course_module_changes_the_content_version():
+    """Removing a unit from a course drops its releases; the cached snapshot must not survive."""
+    _require_db_or_skip()
+    try:
+        import psycopg  # type: ignore
+    except Exception:  # pragma: no cover
+        pytest.skip("psycopg not available")
+
+    from backend.learning.repo_db import DBLearningRepo  # type: ignore
+
+    dsn = _dsn()
+    teacher = f"teacher-repo-{uuid.uuid4()}"
+    student = f"student-repo-{uuid.uuid4()}"
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cur:
+            ids = _seed_course_with_section(cur, teacher=teacher)
+            cur.execute(
+                "insert into public.course_memberships (course_id, student_id, role) values (%s, %s, 'student')",
+                (ids["course_id"], student),
+            )
+            conn.commit()
+
+    repo = DBLearningRepo(dsn=dsn)
+    scope = {"student_sub": student, "course_id": ids["course_id"], "unit_id": ids["unit_id"]}
+    before = repo.released_unit_content_version(**scope)
+    listed = repo.list_released_sections_by_unit(
+        **scope, include_materials=False, include_tasks=False, limit=10, offset=0
+    )
+    assert [s["id"] for s in listed] == [ids["section_id"]]
+
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("select set_config('app.current_sub', %s, false)", (teacher,))
+            cur.execute("delete from public.course_modules where id = %s", (ids["module_id"],))
+            cur.execute(
+                "insert into public.course_modules (course_id, unit_id, position) values (%s, %s, %s)",
+                (ids["course_id"], ids["unit_id"], 1),
+            )
+            conn.commit()
+
+    assert repo.released_unit_content_version(**scope) != before
+    relisted = repo.list_released_sections_by_unit(
+        **scope, include_materials=False, include_tasks=False, limit=10, offset=0
+    )
+    assert relisted == []
@@ -13,6 +13,8 @@ Scope:
     - get_released_sections_for_student_by_unit(text, uuid, uuid, integer, integer)
     - get_released_materials_for_student(text, uuid, uuid)
     - get_released_tasks_for_student(text, uuid, uuid)
+    - get_released_materials_for_student_sections(text, uuid, uuid[])
+    - get_released_tasks_for_student_sections(text, uuid, uuid[])
     - get_task_metadata_for_student(text, uuid, uuid)
 """
 from __future__ import annotations
@@ -47,6 +49,9 @@ async def test_learning_helpers_are_not_security_definer():
         "get_released_sections_for_student_by_unit",
         "get_released_materials_for_student",
         "get_released_tasks_for_student",
+        # Set-based variants used by the sections endpoints (no per-section N+1)
+        "get_released_materials_for_student_sections",
+        "get_released_tasks_for_student_sections",
         "get_task_metadata_for_student",
     }
     # Query by function names to avoid passing anonymous composite types; ignore arg variants
@@ -115,7 +115,7 @@ async def test_upload_proxy_flow(monkeypatch):
     # Some suites reload routes.learning. Patch the actual FastAPI endpoint globals as well.
     for route in main.app.routes:
         if isinstance(route, APIRoute) and route.path == "/api/learning/internal/upload-proxy":
-            route.endpoint.__globals__["_async_forward_upload"] = fake_forward
+            monkeypatch.setitem(route.endpoint.__globals__, "_async_forward_upload", fake_forward)
             break
     else:  # pragma: no cover - defensive to surface wiring issues
         raise AssertionError("upload-proxy route not registered on FastAPI app")
@@ -0,0 +1,198 @@
+"""
+Internal upload proxy — request body is streamed, not buffered.
+
+Why:
+    Many parallel photo uploads must not pile up in web process memory. The
+    proxy forwards chunks to Storage as they arrive, enforces the size limit
+    while streaming and computes sha256 on the fly via a pooled client.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from urllib.parse import urlencode
+
+import anyio
+import httpx
+import pytest
+from fastapi.routing import APIRoute
+
+import main  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+TARGET = "https://supabase.local:54321/storage/v1/object/upload/sign/submissions/x.png?token=t"
+
+
+def _endpoint_globals() -> dict:
+    for route in main.app.routes:
+        if isinstance(route, APIRoute) and route.path == "/api/learning/internal/upload-proxy":
+            return route.endpoint.__globals__
+    raise AssertionError("upload-proxy route not registered")
+
+
+@pytest.fixture
+def student(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("ENABLE_STORAGE_UPLOAD_PROXY", "true")
+    monkeypatch.setenv("SUPABASE_URL", "https://supabase.local:54321")
+    main.SESSION_STORE = SessionStore()
+    return main.SESSION_STORE.create(sub="s-proxy-stream", name="S", roles=["student"])
+
+
+class _StreamingUpstream(httpx.AsyncBaseTransport):
+    """Like httpx.MockTransport, but without reading the request body first."""
+
+    def __init__(self, handler) -> None:
+        self._handler = handler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._handler(request)
+
+
+def _use_upstream(monkeypatch: pytest.MonkeyPatch, handler) -> None:
+    module = _endpoint_globals()
+    client = httpx.AsyncClient(transport=_StreamingUpstream(handler))
+    monkeypatch.setitem(module, "_upload_client", lambda: client)
+
+
+async def _put(session_id: str, chunks: list[bytes], *, before_chunk=None, content_length: int | None = None, key: str | None = None):
+    path = "/api/learning/internal/upload-proxy"
+    headers = [
+        (b"host", b"test"),
+        (b"origin", b"http://test"),
+        (b"content-type", b"image/png"),
+        (b"cookie", f"{main.SESSION_COOKIE_NAME}={session_id}".encode()),
+    ]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {
+        "type": "http", "method": "PUT", "path": path, "raw_path": path.encode(),
+        "query_string": urlencode({"url": TARGET, **({"key": key} if key else {})}).encode(),
+        "headers": headers, "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1),
+        "root_path": "", "http_version": "1.1",
+    }
+    pending = list(chunks)
+    state: dict = {"status": 0, "body": b""}
+
+    async def receive():
+        if not pending:
+            await anyio.sleep_forever()
+        if before_chunk is not None:
+            await before_chunk(len(chunks) - len(pending))
+        chunk = pending.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["body"] += message.get("body", b"")
+
+    with anyio.fail_after(5):
+        await main.app(scope, receive, send)
+    return state["status"], json.loads(state["body"] or b"{}")
+
+
+async def test_chunks_reach_upstream_before_body_is_complete(monkeypatch: pytest.MonkeyPatch, student):
+    first_chunk_upstream = anyio.Event()
+    received: list[bytes] = []
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        async for chunk in request.stream:
+            received.append(chunk)
+            first_chunk_upstream.set()
+        return httpx.Response(200, json={"Key": "x"})
+
+    async def before_chunk(index: int) -> None:
+        # The last client chunk is only sent once Storage has the first one;
+        # a buffering proxy would wait forever here.
+        if index == 2:
+            await first_chunk_upstream.wait()
+
+    _use_upstream(monkeypatch, upstream)
+    chunks = [b"a" * 1000, b"b" * 1000, b"c" * 500]
+    status, body = await _put(student.session_id, chunks, before_chunk=before_chunk)
+
+    assert status == 200
+    assert b"".join(received) == b"".join(chunks)
+    assert body == {"sha256": hashlib.sha256(b"".join(chunks)).hexdigest(), "size_bytes": 2500}
+
+
+async def test_declared_length_is_forwarded_instead_of_chunked(monkeypatch: pytest.MonkeyPatch, student):
+    seen: list[httpx.Headers] = []
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers)
+        async for _ in request.stream:
+            pass
+        return httpx.Response(200)
+
+    _use_upstream(monkeypatch, upstream)
+    chunks = [b"a" * 1000, b"b" * 500]
+    status, _ = await _put(student.session_id, chunks, content_length=1500)
+    assert status == 200
+    assert seen[0]["content-length"] == "1500"
+    assert "transfer-encoding" not in seen[0]
+
+    status, _ = await _put(student.session_id, chunks)
+    assert status == 200
+    assert seen[1]["transfer-encoding"] == "chunked"
+    assert "content-length" not in seen[1]
+
+
+async def test_chunked_body_over_limit_is_rejected_while_streaming(monkeypatch: pytest.MonkeyPatch, student):
+    monkeypatch.setitem(_endpoint_globals(), "_max_upload_bytes", lambda: 1500)
+    upstream_bytes: list[int] = []
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        async for chunk in request.stream:
+            upstream_bytes.append(len(chunk))
+        return httpx.Response(200)
+
+    _use_upstream(monkeypatch, upstream)
+    status, body = await _put(student.session_id, [b"a" * 1000, b"b" * 1000, b"c" * 1000])
+
+    assert status == 400
+    assert body["detail"] == "size_exceeded"
+    assert sum(upstream_bytes) <= 1500
+
+
+async def test_declared_length_over_limit_is_rejected_before_forwarding(monkeypatch: pytest.MonkeyPatch, student):
+    monkeypatch.setitem(_endpoint_globals(), "_max_upload_bytes", lambda: 100)
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("must not forward")
+
+    _use_upstream(monkeypatch, upstream)
+    status, body = await _put(student.session_id, [b"x" * 50], content_length=5000)
+    assert status == 400 and body["detail"] == "size_exceeded"
+
+
+async def test_upload_client_is_pooled_per_event_loop():
+    module = _endpoint_globals()
+    first = module["_upload_client"]()
+    assert module["_upload_client"]() is first
+    assert not first.is_closed
+
+
+async def test_proxy_records_ingest_hash_for_matching_key(monkeypatch: pytest.MonkeyPatch, student):
+    from backend.storage.ingest_ledger import get_ingest_ledger
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            pass
+        return httpx.Response(200)
+
+    _use_upstream(monkeypatch, upstream)
+    data = b"photo-bytes"
+    sha = hashlib.sha256(data).hexdigest()
+
+    status, _ = await _put(student.session_id, [data], key="other.png")
+    assert status == 200
+    assert get_ingest_ledger().lookup("other.png", subject=student.sub) is None
+
+    status, _ = await _put(student.session_id, [data], key="x.png")
+    assert status == 200
+    assert get_ingest_ledger().check("x.png", sha, len(data), subject=student.sub) == "match"
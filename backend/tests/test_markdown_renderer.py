@@ -63,3 +63,36 @@ def test_render_markdown_pipes_without_separator_render_as_text():
     assert "<table" not in html
     assert "A | B | C" in html
     assert "D | E | F" in html
+
+
+def test_render_markdown_is_served_from_bounded_cache(monkeypatch):
+    from backend.web.components import markdown
+
+    monkeypatch.setattr(markdown, "_CACHE", markdown._RenderCache(max_entries=2))
+    calls: list[str] = []
+    real = markdown._render_uncached
+    monkeypatch.setattr(markdown, "_render_uncached", lambda src: calls.append(src) or real(src))
+
+    first = render_markdown_safe("**fett**")
+    assert render_markdown_safe("**fett**") == first
+    assert calls == ["**fett**"]
+
+    render_markdown_safe("a")
+    render_markdown_safe("b")  # evicts "**fett**" (least recently used)
+    render_markdown_safe("**fett**")
+    assert calls == ["**fett**", "a", "b", "**fett**"]
+    stats = markdown.cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["evictions"] == 2
+    assert stats["entries"] == 2
+
+
+def test_render_markdown_cache_key_includes_renderer_fingerprint(monkeypatch):
+    from backend.web.components import markdown
+
+    monkeypatch.setattr(markdown, "_CACHE", markdown._RenderCache(max_entries=10))
+    render_markdown_safe("# Titel")
+    monkeypatch.setattr(markdown, "_RENDERER_FINGERPRINT", "other-config")
+    render_markdown_safe("# Titel")
+    assert markdown.cache_stats()["misses"] == 2
@@ -0,0 +1,318 @@
+"""
+Resumable chunked uploads — survive dropped connections on large files.
+
+Focus on:
+    - Chunks are validated (exact length, optional checksum), stored
+      atomically and may arrive in any order; status reports what is missing.
+    - Completion re-verifies every chunk and the whole file before anything
+      is delivered, writes the file to the dev filesystem backend
+      (STORAGE_VERIFY_ROOT) or streams it to a fresh presigned URL.
+    - Sessions are private to their owner; the ingest ledger is fed so the
+      submission does not re-hash the assembled file.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+import main  # type: ignore
+import routes.learning as learning  # type: ignore
+import routes.uploads as uploads  # type: ignore
+from identity_access.stores import SessionStore  # type: ignore
+
+from backend.storage import resumable as resumable_mod
+from backend.storage.ingest_ledger import get_ingest_ledger
+from backend.storage.resumable import ResumableUploadError, ResumableUploadStore
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+DATA = os.urandom(2500)
+
+
+async def _body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _store(tmp_path: Path, **kwargs) -> ResumableUploadStore:
+    return ResumableUploadStore(tmp_path / "staging", chunk_size=1000, ttl_seconds=kwargs.pop("ttl_seconds", 60))
+
+
+def _create(store: ResumableUploadStore, subject: str = "s1", **kwargs):
+    params = dict(
+        storage_key="submissions/c/t/s/a.pdf",
+        bucket="submissions",
+        mime_type="application/pdf",
+        size_bytes=len(DATA),
+        subject=subject,
+        context="learning",
+    )
+    params.update(kwargs)
+    return store.create(**params)
+
+
+async def test_chunks_in_any_order_assemble_to_original(tmp_path: Path):
+    store = _store(tmp_path)
+    session = _create(store)
+    assert session.chunk_count == 3 and session.chunk_length(2) == 500
+
+    await store.write_chunk(session, 2, _body(DATA[2000:]))
+    await store.write_chunk(session, 0, _body(DATA[:400], DATA[400:1000]))
+    assert store.received(session) == [0, 2]
+    assert store.offset(session) == 1000
+    with pytest.raises(ResumableUploadError, match="incomplete"):
+        store.assemble(session)
+
+    await store.write_chunk(session, 1, _body(DATA[1000:2000]))
+    assembly = store.assemble(session)
+    assert b"".join(assembly) == DATA
+    assert assembly.hexdigest() == hashlib.sha256(DATA).hexdigest()
+    assert store.offset(session) == len(DATA)
+
+
+async def test_invalid_chunks_are_rejected_and_not_kept(tmp_path: Path):
+    store = _store(tmp_path)
+    session = _create(store)
+
+    with pytest.raises(ResumableUploadError, match="chunk_size_mismatch"):
+        await store.write_chunk(session, 0, _body(DATA[:999]))
+    with pytest.raises(ResumableUploadError, match="chunk_size_mismatch"):
+        await store.write_chunk(session, 2, _body(DATA[:501]))
+    with pytest.raises(ResumableUploadError, match="invalid_chunk_index"):
+        await store.write_chunk(session, 3, _body(b"x"))
+    with pytest.raises(ResumableUploadError, match="chunk_checksum_mismatch"):
+        await store.write_chunk(session, 0, _body(DATA[:1000]), expected_sha256="0" * 64)
+    assert store.received(session) == []
+    assert sorted(p.name for p in (store.root / session.upload_id).iterdir()) == ["meta.json"]
+
+
+async def test_corrupt_part_is_dropped_at_assembly(tmp_path: Path):
+    store = _store(tmp_path)
+    session = _create(store)
+    for index in range(3):
+        await store.write_chunk(session, index, _body(DATA[index * 1000 : (index + 1) * 1000]))
+    (store.root / session.upload_id / "1.part").write_bytes(b"\0" * 1000)
+
+    with pytest.raises(ResumableUploadError) as excinfo:
+        b"".join(store.assemble(session))
+    assert str(excinfo.value) == "chunk_corrupt" and excinfo.value.index == 1
+    assert store.received(session) == [0, 2]
+
+
+def test_sessions_are_private_and_expire(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    store = _store(tmp_path)
+    session = _create(store)
+    assert store.get(session.upload_id, subject="s1") == session
+    assert store.get(session.upload_id, subject="s2") is None
+    assert store.get("../etc", subject="s1") is None
+
+    now = time.time()
+    monkeypatch.setattr(resumable_mod.time, "time", lambda: now + 120)
+    assert store.sweep() == 1
+    assert not (store.root / session.upload_id).exists()
+
+
+@pytest.fixture
+def student(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(uploads, "RESUMABLE_UPLOADS", _store(tmp_path))
+    main.SESSION_STORE = SessionStore()
+    return main.SESSION_STORE.create(sub=f"s-{uuid.uuid4()}", name="S", roles=["student"])
+
+
+def _client(session_id: str) -> httpx.AsyncClient:
+    client = httpx.AsyncClient(
+        transport=ASGITransport(app=main.app), base_url="http://test", headers={"Origin": "http://test"}
+    )
+    client.cookies.set(main.SESSION_COOKIE_NAME, session_id)
+    return client
+
+
+def _open(student, **kwargs) -> dict:
+    return uploads.resumable_intent(
+        storage_key=f"submissions/c/t/{student.sub}/{uuid.uuid4().hex}.pdf",
+        bucket="submissions",
+        mime_type="application/pdf",
+        size_bytes=len(DATA),
+        subject=student.sub,
+        context="learning",
+        **kwargs,
+    )
+
+
+async def _send_chunks(c: httpx.AsyncClient, block: dict, indices) -> None:
+    for index in indices:
+        r = await c.put(
+            block["chunk_url"].format(index=index),
+            content=DATA[index * block["chunk_size"] : (index + 1) * block["chunk_size"]],
+        )
+        assert r.status_code == 200, r.text
+
+
+async def test_resume_after_drop_and_complete_to_filesystem(tmp_path: Path, student):
+    root = tmp_path / "uploads"
+    block = _open(student, local_root=str(root))
+    sha = hashlib.sha256(DATA).hexdigest()
+
+    async with _client(student.session_id) as c:
+        await _send_chunks(c, block, [0])
+        # Connection dropped: the client asks what arrived and sends the rest.
+        status = (await c.get(block["status_url"])).json()
+        assert status["received"] == [0] and status["offset"] == 1000
+        r = await c.post(block["complete_url"], json={"sha256": sha})
+        assert r.status_code == 409 and r.json()["missing"] == [1, 2]
+
+        await _send_chunks(c, block, [2, 1])
+        r = await c.post(block["complete_url"], json={"sha256": sha})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["sha256"] == sha and body["size_bytes"] == len(DATA)
+    assert (root / body["storage_key"]).read_bytes() == DATA
+    assert get_ingest_ledger().check(body["storage_key"], sha, len(DATA), subject=student.sub) == "match"
+
+
+async def test_chunk_errors_checksum_mismatch_and_foreign_sessions(tmp_path: Path, student):
+    root = tmp_path / "uploads"
+    block = _open(student, local_root=str(root))
+    other = main.SESSION_STORE.create(sub="someone-else", name="O", roles=["student"])
+
+    async with _client(student.session_id) as c:
+        r = await c.put(block["chunk_url"].format(index=0), content=DATA[:10])
+        assert r.status_code == 400 and r.json()["detail"] == "chunk_size_mismatch"
+        r = await c.put(
+            block["chunk_url"].format(index=0), content=DATA[:1000], headers={"X-Chunk-SHA256": "0" * 64}
+        )
+        assert r.status_code == 400 and r.json()["detail"] == "chunk_checksum_mismatch"
+        r = await c.put(block["chunk_url"].format(index=0), content=DATA[:1000], headers={"Origin": "http://evil"})
+        assert r.status_code == 403
+
+    async with _client(other.session_id) as c:
+        assert (await c.get(block["status_url"])).status_code == 404
+
+    async with _client(student.session_id) as c:
+        await _send_chunks(c, block, [0, 1, 2])
+        r = await c.post(block["complete_url"], json={"sha256": "f" * 64})
+        assert r.status_code == 400 and r.json()["detail"] == "checksum_mismatch"
+        assert (await c.get(block["status_url"])).status_code == 404
+    assert not list(root.rglob("*.pdf"))
+
+
+class _Adapter:
+    def __init__(self) -> None:
+        self.presigned: list[dict] = []
+
+    def presign_upload(self, *, bucket: str, key: str, expires_in: int, headers: dict) -> dict:
+        self.presigned.append({"bucket": bucket, "key": key})
+        return {"url": f"https://storage.test/{bucket}/{key}?sig=1", "headers": {"x-upsert": "true", **headers}}
+
+
+async def test_complete_streams_to_fresh_presigned_url(monkeypatch: pytest.MonkeyPatch, student):
+    adapter = _Adapter()
+    # The module completion resolves at runtime (tests may re-import routes.learning).
+    target = uploads._route_module("learning")
+    monkeypatch.setattr(target, "STORAGE_ADAPTER", adapter)
+    forwarded: dict = {}
+
+    async def fake_forward(*, url, payload, content_type, timeout, headers=None):
+        forwarded["url"] = url
+        forwarded["headers"] = headers
+        forwarded["body"] = b"".join([chunk async for chunk in payload])
+        return httpx.Response(200)
+
+    monkeypatch.setattr(target, "_async_forward_upload", fake_forward)
+    block = _open(student)
+    async with _client(student.session_id) as c:
+        await _send_chunks(c, block, [0, 1, 2])
+        r = await c.post(block["complete_url"])
+
+    assert r.status_code == 200
+    assert forwarded["body"] == DATA
+    assert forwarded["url"].startswith("https://storage.test/submissions/")
+    assert forwarded["headers"]["x-upsert"] == "true"
+    assert forwarded["headers"]["Content-Length"] == str(len(DATA))
+    assert adapter.presigned[0]["key"] == r.json()["storage_key"]
+
+
+async def test_chunks_changed_during_delivery_are_not_vouched_for(monkeypatch: pytest.MonkeyPatch, student):
+    target = uploads._route_module("learning")
+    monkeypatch.setattr(target, "STORAGE_ADAPTER", _Adapter())
+    block = _open(student)
+    swapped = os.urandom(1000)
+    seen: dict = {}
+
+    async def fake_forward(*, url, payload, content_type, timeout, headers=None):
+        async with _client(student.session_id) as c:
+            r = await c.put(block["chunk_url"].format(index=1), content=swapped)
+            seen["put"] = (r.status_code, r.json()["detail"])
+        # A write that raced the claim: the part is replaced with a valid sidecar.
+        staged = uploads.RESUMABLE_UPLOADS.root / block["upload_id"]
+        (staged / "1.sha256").write_text(hashlib.sha256(swapped).hexdigest())
+        (staged / "1.part").write_bytes(swapped)
+        b"".join([chunk async for chunk in payload])
+        return httpx.Response(200)
+
+    monkeypatch.setattr(target, "_async_forward_upload", fake_forward)
+    key = uploads.RESUMABLE_UPLOADS.get(block["upload_id"], subject=student.sub).storage_key
+    async with _client(student.session_id) as c:
+        await _send_chunks(c, block, [0, 1, 2])
+        r = await c.post(block["complete_url"])
+
+    assert seen["put"] == (409, "completion_in_progress")
+    assert r.status_code == 400 and r.json()["detail"] == "checksum_mismatch"
+    sha = hashlib.sha256(DATA).hexdigest()
+    assert get_ingest_ledger().check(key, sha, len(DATA), subject=student.sub) != "match"
+
+
+async def test_learning_intent_opens_resumable_session(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, student):
+    monkeypatch.setenv("ENABLE_DEV_UPLOAD_STUB", "true")
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path / "uploads"))
+    learning.set_storage_adapter(learning.NullStorageAdapter())
+    monkeypatch.setattr(learning, "_wire_storage", lambda: None)
+    teacher = main.SESSION_STORE.create(sub=f"t-{uuid.uuid4()}", name="T", roles=["teacher"])
+
+    async with _client(teacher.session_id) as c:
+        course_id = (await c.post("/api/teaching/courses", json={"title": "Kurs"})).json()["id"]
+        unit_id = (await c.post("/api/teaching/units", json={"title": "Einheit"})).json()["id"]
+        section_id = (await c.post(f"/api/teaching/units/{unit_id}/sections", json={"title": "A"})).json()["id"]
+        task_id = (
+            await c.post(
+                f"/api/teaching/units/{unit_id}/sections/{section_id}/tasks",
+                json={"instruction_md": "Aufgabe", "criteria": ["K"], "max_attempts": 3},
+            )
+        ).json()["id"]
+        module_id = (await c.post(f"/api/teaching/courses/{course_id}/modules", json={"unit_id": unit_id})).json()["id"]
+        await c.patch(
+            f"/api/teaching/courses/{course_id}/modules/{module_id}/sections/{section_id}/visibility",
+            json={"visible": True},
+        )
+        await c.post(f"/api/teaching/courses/{course_id}/members", json={"sub": student.sub, "name": student.name})
+
+    async with _client(student.session_id) as c:
+        r = await c.post(
+            f"/api/learning/courses/{course_id}/tasks/{task_id}/upload-intents",
+            json={
+                "kind": "file",
+                "filename": "essay.pdf",
+                "mime_type": "application/pdf",
+                "size_bytes": len(DATA),
+                "resumable": True,
+            },
+        )
+        assert r.status_code == 200
+        intent = r.json()
+        block = intent["resumable"]
+        assert block["chunk_count"] == 3
+        await _send_chunks(c, block, [0, 1, 2])
+        done = await c.post(block["complete_url"])
+
+    assert done.status_code == 200
+    assert done.json()["storage_key"] == intent["storage_key"]
+    assert (tmp_path / "uploads" / intent["storage_key"]).read_bytes() == DATA
@@ -67,3 +67,27 @@ async def test_api_route_includes_security_headers_and_hsts_always(monkeypatch:
         assert "Strict-Transport-Security" in r2.headers
     finally:
         main.SETTINGS.override_environment(None)
+
+
+@pytest.mark.anyio
+async def test_security_headers_are_precomputed_per_config(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("SUPABASE_PUBLIC_URL", "https://files.example.org/storage")
+    main.reload_security_headers()
+    try:
+        first = main._security_headers()
+        assert main._security_headers() is first  # reused, not rebuilt per response
+        async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://app.localhost:8100") as c:
+            r = await c.get("/health")
+        assert "connect-src 'self' https://files.example.org;" in r.headers["Content-Security-Policy"]
+    finally:
+        monkeypatch.delenv("SUPABASE_PUBLIC_URL")
+        main.reload_security_headers()
+
+
+@pytest.mark.anyio
+async def test_unauthenticated_api_response_carries_security_headers():
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://app.localhost:8100") as c:
+        r = await c.get("/api/me")
+    assert r.status_code == 401
+    _assert_base_headers(r.headers)
+    assert r.headers["Cache-Control"] == "private, no-store"
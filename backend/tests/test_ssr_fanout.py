@@ -0,0 +1,105 @@
+"""
+SSR fan-out — independent fetches run concurrently with isolated failures.
+
+Why:
+- Page latency should follow the slowest independent call, not the sum of all
+  calls. A failing or hanging call must fall back to its default without
+  taking the page down, and no call may outlive the handler.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from httpx import ASGITransport
+from fastapi import FastAPI
+
+from fanout import FanOut, ServerTimingMiddleware, fan_out  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+def _sleeper(seconds: float, value):
+    async def call():
+        await asyncio.sleep(seconds)
+        return value
+
+    return call
+
+
+async def test_calls_run_concurrently():
+    started = time.perf_counter()
+    results = await fan_out({"a": _sleeper(0.1, 1), "b": _sleeper(0.1, 2), "c": _sleeper(0.1, 3)})
+    elapsed = time.perf_counter() - started
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert elapsed < 0.25
+
+
+async def test_errors_and_timeouts_yield_defaults():
+    async def boom():
+        raise RuntimeError("backend down")
+
+    async with FanOut(timeout=0.05) as fan:
+        ok = fan.start("ok", _sleeper(0, "value"), default=None)
+        failed = fan.start("failed", boom, default=[])
+        slow = fan.start("slow", _sleeper(1, "late"), default="fallback")
+        assert (await ok, await failed, await slow) == ("value", [], "fallback")
+        assert (ok.outcome, failed.outcome, slow.outcome) == ("ok", "error", "timeout")
+
+    outcomes = {s.name: s.outcome for s in fan.spans}
+    assert outcomes == {"ok": "ok", "failed": "error", "slow": "timeout"}
+
+
+async def test_leaving_block_cancels_pending_calls():
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(1)
+        finished.append(True)
+
+    async with FanOut() as fan:
+        fan.start("slow", slow, default=None)
+        quick = fan.start("quick", _sleeper(0, 1), default=None)
+        await quick  # handler returns early (e.g., 404) without awaiting "slow"
+
+    await asyncio.sleep(0)
+    assert finished == []
+    assert {s.name: s.outcome for s in fan.spans}["slow"] == "cancelled"
+
+
+async def test_server_timing_header_marks_critical_path(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("SSR_SERVER_TIMING", "1")
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/page")
+    async def page():
+        await fan_out({"fast": _sleeper(0, 1), "slow": _sleeper(0.05, 2)})
+        return {"ok": True}
+
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.get("/page")
+
+    timing = r.headers["server-timing"]
+    assert "ssr.0.fast;dur=" in timing
+    slow_entry = [part for part in timing.split(", ") if "slow" in part][0]
+    assert 'desc="critical"' in slow_entry
+
+
+async def test_server_timing_is_off_by_default(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("SSR_SERVER_TIMING", raising=False)
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/page")
+    async def page():
+        await fan_out({"a": _sleeper(0, 1)})
+        return {"ok": True}
+
+    async with httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.get("/page")
+    assert "server-timing" not in r.headers
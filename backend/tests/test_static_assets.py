@@ -0,0 +1,104 @@
+"""
+Static asset pipeline — fingerprinted names, precompressed variants, manifest.
+
+Why:
+- Fingerprinted URLs may be cached `immutable`; everything else must still
+  revalidate. Precompressed variants are negotiated via Accept-Encoding and
+  never served to clients that did not ask for them.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from httpx import ASGITransport
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+import static_assets  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+
+@pytest.fixture
+def static_tree(tmp_path: Path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "js" / "vendor").mkdir(parents=True)
+    (tmp_path / "css" / "gustav.css").write_text("body { color: red; }\n" * 50)
+    (tmp_path / "js" / "vendor" / "htmx.min.js").write_text("/* htmx */" * 100)
+    yield tmp_path
+    static_assets.reset_cache()
+
+
+def _client(static_dir: Path) -> httpx.AsyncClient:
+    app = Starlette(routes=[Mount("/static", app=static_assets.PrecompressedStaticFiles(directory=str(static_dir)))])
+    return httpx.AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_build_writes_fingerprinted_files_gzip_and_manifest(static_tree: Path):
+    assets = static_assets.build(static_tree)
+
+    css_rel = assets["css/gustav.css"]
+    digest = static_assets.content_hash((static_tree / "css" / "gustav.css").read_bytes())
+    assert css_rel == f"dist/css/gustav.{digest}.css"
+    assert assets["js/vendor/htmx.min.js"].startswith("dist/js/vendor/htmx.min.")
+    built = static_tree / css_rel
+    assert built.read_bytes() == (static_tree / "css" / "gustav.css").read_bytes()
+    assert gzip.decompress((static_tree / f"{css_rel}.gz").read_bytes()) == built.read_bytes()
+
+    manifest = json.loads((static_tree / "dist" / "manifest.json").read_text())
+    assert manifest["assets"] == assets
+    assert static_assets.asset_url("css/gustav.css", static_dir=static_tree) == f"/static/{css_rel}"
+
+    # Rebuild after a change drops the stale hash
+    (static_tree / "css" / "gustav.css").write_text("body { color: blue; }\n")
+    rebuilt = static_assets.build(static_tree)
+    assert rebuilt["css/gustav.css"] != css_rel
+    assert not built.exists()
+
+
+def test_asset_url_falls_back_to_query_hash_without_manifest(static_tree: Path):
+    digest = static_assets.content_hash((static_tree / "css" / "gustav.css").read_bytes())
+    assert static_assets.asset_url("/css/gustav.css", static_dir=static_tree) == f"/static/css/gustav.css?v={digest}"
+    assert static_assets.asset_url("css/missing.css", static_dir=static_tree) == "/static/css/missing.css"
+
+
+async def test_fingerprinted_asset_is_immutable_and_negotiates_gzip(static_tree: Path):
+    assets = static_assets.build(static_tree)
+    url = f"/static/{assets['css/gustav.css']}"
+    original = (static_tree / "css" / "gustav.css").read_bytes()
+
+    async with _client(static_tree) as c:
+        gz = await c.get(url, headers={"Accept-Encoding": "gzip"})
+        identity = await c.get(url, headers={"Accept-Encoding": "identity"})
+        refused = await c.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+        plain = await c.get("/static/css/gustav.css")
+
+    assert gz.status_code == 200
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gz.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert gz.headers["Vary"] == "Accept-Encoding"
+    assert gz.headers["Content-Type"].startswith("text/css")
+    assert gz.content == original  # httpx decodes transparently
+    assert int(gz.headers["Content-Length"]) < len(original)
+
+    for resp in (identity, refused):
+        assert "Content-Encoding" not in resp.headers
+        assert resp.content == original
+        assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    assert plain.status_code == 200
+    assert plain.headers["Cache-Control"] == "public, no-cache"
+
+
+def test_layout_references_fingerprinted_assets():
+    from components.layout import Layout  # type: ignore
+
+    static_assets.reset_cache()
+    html = Layout(title="T", content="<p>x</p>").render()
+    assert "/static/css/gustav.css?v=" in html or "/static/dist/css/gustav." in html
+    assert "?v=5" not in html
@@ -0,0 +1,232 @@
+"""
+Content-addressed submission blobs (dedup by student + sha256).
+
+Focus on:
+    - Repeated uploads of the same verified bytes for one course/task reuse
+      the first object and no second preview is derived; the duplicate upload
+      stays for retries (the storage GC collects it later).
+    - Unverified hashes, other students and other courses/tasks never share
+      blobs.
+    - Rendered PDF pages are reused instead of rendered again.
+    - GC only collects unreferenced blobs past the grace period; dry runs
+      change nothing.
+"""
+from __future__ import annotations
+
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+import main  # type: ignore
+import routes.learning as learning  # type: ignore
+from identity_access.stores import SessionStore  # type: ignore
+
+from backend.learning.usecases.pdf_preprocessing import PreprocessPdfSubmissionUseCase, SubmissionContext
+from backend.storage import blobs as blobs_mod
+from backend.storage import preview_jobs
+from backend.storage.blobs import InMemoryBlobRepo, blob_object_keys, collect_unreferenced_blobs
+from backend.storage.previews import submission_preview_key
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+PDF = b"%PDF-1.4\n" + b"worksheet" * 200
+SHA = hashlib.sha256(PDF).hexdigest()
+
+
+@pytest.fixture()
+def repo(monkeypatch: pytest.MonkeyPatch) -> InMemoryBlobRepo:
+    fresh = InMemoryBlobRepo()
+    monkeypatch.setattr(blobs_mod, "_BLOB_REPO", fresh)
+    return fresh
+
+
+def _register(repo: InMemoryBlobRepo, key: str = "submissions/c/t/s/1-a.pdf", owner: str = "s") -> None:
+    repo.register(
+        owner_sub=owner, sha256=SHA, bucket="submissions", object_key=key, size_bytes=len(PDF), mime_type="application/pdf"
+    )
+
+
+def test_registry_keeps_first_object_and_counts_refs(repo: InMemoryBlobRepo):
+    _register(repo, "submissions/c/t/s/1-a.pdf")
+    _register(repo, "submissions/c/t/s/2-b.pdf")
+    repo.add_ref(owner_sub="s", sha256=SHA, submission_id="sub-1")
+    repo.add_ref(owner_sub="s", sha256=SHA, submission_id="sub-2")
+    repo.add_ref(owner_sub="s", sha256=SHA, submission_id="sub-2")
+
+    blob = repo.find(owner_sub="s", sha256=SHA.upper())
+    assert blob is not None and blob.object_key == "submissions/c/t/s/1-a.pdf" and blob.refcount == 2
+    assert repo.find(owner_sub="other", sha256=SHA) is None
+
+    repo.set_derived(owner_sub="s", sha256=SHA, keys=["p1.png"])
+    repo.set_derived(owner_sub="s", sha256=SHA, keys=["p2.png"])
+    assert repo.find(owner_sub="s", sha256=SHA).derived_keys == ("p1.png",)  # type: ignore[union-attr]
+
+
+def test_gc_respects_refs_grace_period_and_dry_run(repo: InMemoryBlobRepo, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    key = "submissions/c/t/s/1-a.pdf"
+    _register(repo, key)
+    repo.add_ref(owner_sub="s", sha256=SHA, submission_id="sub-1")
+    repo.set_derived(owner_sub="s", sha256=SHA, keys=["submissions/c/t/s/derived/sub-1/page_0001.png"])
+    blob = repo.find(owner_sub="s", sha256=SHA)
+    assert blob is not None
+    for rel in (key, f"submissions/{blob.derived_keys[0]}", submission_preview_key(key)):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(b"x")
+
+    assert collect_unreferenced_blobs(repo, local_root=str(tmp_path), grace_seconds=0).blobs == 0
+    repo.remove_ref(submission_id="sub-1")
+    # Still inside the grace period.
+    assert collect_unreferenced_blobs(repo, local_root=str(tmp_path), grace_seconds=3600).blobs == 0
+
+    now = blobs_mod.time.time()
+    monkeypatch.setattr(blobs_mod.time, "time", lambda: now + 7200)
+    preview = collect_unreferenced_blobs(repo, local_root=str(tmp_path), grace_seconds=3600, dry_run=True)
+    assert preview.blobs == 1 and preview.objects == 0 and preview.keys == blob_object_keys(blob)
+    assert (tmp_path / key).exists()
+
+    report = collect_unreferenced_blobs(repo, local_root=str(tmp_path), grace_seconds=3600)
+    assert (report.blobs, report.objects, report.failed, report.bytes) == (1, 3, 0, len(PDF))
+    assert not any(p.is_file() for p in tmp_path.rglob("*"))
+    assert repo.find(owner_sub="s", sha256=SHA) is None
+
+
+class _MarkRepo:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, list[str]]] = []
+
+    def mark_extracted(self, *, submission_id: str, page_keys: list[str]) -> None:
+        self.calls.append((submission_id, list(page_keys)))
+
+
+def test_pdf_preprocessing_reuses_rendered_pages(repo: InMemoryBlobRepo, monkeypatch: pytest.MonkeyPatch):
+    _register(repo)
+    repo.set_derived(owner_sub="s", sha256=SHA, keys=["k/page_0001.png", "k/page_0002.png"])
+    mark = _MarkRepo()
+
+    def _no_render(name: str):
+        raise AssertionError("pipeline must not be imported for a known blob")
+
+    monkeypatch.setattr("backend.learning.usecases.pdf_preprocessing.importlib.import_module", _no_render)
+    usecase = PreprocessPdfSubmissionUseCase(repo=mark, worker_dsn="", storage=object(), bucket="submissions", blobs=repo)  # type: ignore[arg-type]
+    context = SubmissionContext(
+        submission_id="sub-2", course_id="c", task_id="t", student_sub="s",
+        storage_key="submissions/c/t/s/1-a.pdf", mime_type="application/pdf", size_bytes=len(PDF), sha256=SHA,
+    )
+    usecase.execute(context=context, pdf_bytes=PDF)
+    assert mark.calls == [("sub-2", ["k/page_0001.png", "k/page_0002.png"])]
+
+
+class _FakeLearningRepo:
+    def __init__(self) -> None:
+        self.created: list[Any] = []
+
+    def create_submission(self, data) -> dict:
+        key = getattr(data, "idempotency_key", None)
+        for previous, row in self.created:
+            if key and previous.idempotency_key == key:
+                return row
+        row = {
+            "id": str(uuid.uuid4()),
+            "attempt_nr": len(self.created) + 1,
+            "kind": data.kind,
+            "storage_key": data.storage_key,
+            "mime_type": data.mime_type,
+            "size_bytes": data.size_bytes,
+            "sha256": data.sha256,
+            "analysis_status": "pending",
+        }
+        self.created.append((data, row))
+        return row
+
+    def mark_extracted(self, *, submission_id: str, page_keys: list[str]) -> None:
+        pass
+
+
+COURSE_A, TASK_A = str(uuid.uuid4()), str(uuid.uuid4())
+COURSE_B, TASK_B = str(uuid.uuid4()), str(uuid.uuid4())
+
+
+async def _submit(
+    client: httpx.AsyncClient, key: str, *, course_id: str = COURSE_A, task_id: str = TASK_A, headers: dict | None = None
+) -> httpx.Response:
+    return await client.post(
+        f"/api/learning/courses/{course_id}/tasks/{task_id}/submissions",
+        json={"kind": "file", "storage_key": key, "mime_type": "application/pdf", "size_bytes": len(PDF), "sha256": SHA},
+        headers=headers,
+    )
+
+
+async def test_repeated_upload_reuses_blob_and_keeps_duplicate_for_retries(
+    repo: InMemoryBlobRepo, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path))
+    fake = _FakeLearningRepo()
+    monkeypatch.setattr(learning, "_REPO", fake)
+    monkeypatch.setattr(learning, "_dev_try_process_pdf", lambda **kwargs: None)
+    previews: list[str] = []
+
+    class _Queue:
+        def enqueue(self, *, kind: str, storage_key: str, mime_type: str) -> None:
+            previews.append(submission_preview_key(storage_key))
+
+    monkeypatch.setattr(preview_jobs, "_PREVIEW_QUEUE", _Queue())
+    main.SESSION_STORE = SessionStore()
+    student = main.SESSION_STORE.create(sub="student-1", name="S", roles=["student"])
+
+    first = f"submissions/{COURSE_A}/{TASK_A}/student-1/1-a.pdf"
+    second = f"submissions/{COURSE_A}/{TASK_A}/student-1/2-b.pdf"
+    elsewhere = f"submissions/{COURSE_B}/{TASK_B}/student-1/3-c.pdf"
+    for key in (first, second, elsewhere):
+        (tmp_path / key).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / key).write_bytes(PDF)
+
+    async with httpx.AsyncClient(
+        transport=ASGITransport(app=main.app), base_url="http://test", headers={"Origin": "http://test"}
+    ) as client:
+        client.cookies.set("gustav_session", student.session_id)
+        r1 = await _submit(client, first)
+        r2 = await _submit(client, second, headers={"Idempotency-Key": "attempt-2"})
+        # A retry after a lost 202 re-verifies the uploaded key; it must still exist.
+        retry = await _submit(client, second, headers={"Idempotency-Key": "attempt-2"})
+        # The same file handed in for another course never points at course A's key.
+        r3 = await _submit(client, elsewhere, course_id=COURSE_B, task_id=TASK_B)
+
+    assert r1.status_code == 202 and r2.status_code == 202 and retry.status_code == 202
+    assert r1.json()["storage_key"] == first and r2.json()["storage_key"] == first
+    assert (tmp_path / first).exists() and (tmp_path / second).exists()
+    assert r3.status_code == 202 and r3.json()["storage_key"] == elsewhere
+    assert previews == [submission_preview_key(first), submission_preview_key(elsewhere)]
+    blob = repo.find(owner_sub="student-1", sha256=SHA)
+    assert blob is not None and blob.refcount == 2
+
+
+def test_unverified_hash_is_never_deduplicated(repo: InMemoryBlobRepo, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    _register(repo, "submissions/c/t/s/1-a.pdf")
+    payload = {"storage_key": "submissions/c/t/s/2-b.pdf", "sha256": SHA, "size_bytes": len(PDF), "mime_type": "application/pdf"}
+    monkeypatch.setattr(learning, "_storage_bucket", lambda: "submissions")
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path))
+    canonical = tmp_path / "submissions/c/t/s/1-a.pdf"
+    canonical.parent.mkdir(parents=True)
+    canonical.write_bytes(PDF)
+    # Only a verified hash may look up blobs; size/MIME must match too.
+    scope = {"course_id": "c", "task_id": "t"}
+    assert learning._find_reusable_blob("s", payload, **scope) is not None
+    assert learning._find_reusable_blob("s", payload | {"size_bytes": 1}, **scope) is None
+    assert learning._find_reusable_blob("other", payload, **scope) is None
+    assert learning._find_reusable_blob("s", payload, course_id="c", task_id="other") is None
+    assert "skipped" not in learning.HASH_VERIFIED_REASONS
+    # A registry entry whose object is gone is never reused.
+    canonical.unlink()
+    assert learning._find_reusable_blob("s", payload, **scope) is None
+
+
+def test_dedup_is_off_unless_db_backend(monkeypatch: pytest.MonkeyPatch):
+    for value in ("", "memory", "off"):
+        monkeypatch.setenv("CONTENT_BLOBS_BACKEND", value)
+        assert blobs_mod.blob_repo_from_env() is None
@@ -0,0 +1,252 @@
+"""
+Storage GC: delete objects no database row refers to.
+
+Focus on:
+    - Keys are classified by layout; unknown shapes are never deleted.
+    - Originals, derived pages, previews and materials are cross-referenced
+      against submissions, blobs, materials and pending upload intents.
+    - Young objects and batches whose lookup failed are kept; dry runs only
+      report; deletions are capped, rate-limited and need STORAGE_GC_DELETE.
+    - Works on the dev upload root and on Storage listings (Supabase adapter).
+"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Sequence
+
+import pytest
+
+from backend.storage import gc
+from backend.storage.gc import RateLimiter, StoredObject, classify, collect_orphans, run_once
+from teaching.storage_supabase import SupabaseStorageAdapter  # type: ignore
+
+SID = "11111111-1111-1111-1111-111111111111"
+GONE_SID = "22222222-2222-2222-2222-222222222222"
+MID = "33333333-3333-3333-3333-333333333333"
+GONE_MID = "44444444-4444-4444-4444-444444444444"
+
+
+class _Index:
+    def __init__(self, *, submissions=(), ids=(), pages=(), materials=(), material_ids=(), fail: bool = False) -> None:
+        self.sets = {
+            "submission_keys": set(submissions),
+            "submission_ids": set(ids),
+            "page_keys": set(pages),
+            "material_keys": set(materials),
+            "material_ids": set(material_ids),
+        }
+        self.fail = fail
+        self.calls: list[str] = []
+
+    def _lookup(self, name: str, values: Sequence[str]) -> set[str]:
+        self.calls.append(name)
+        if self.fail:
+            raise RuntimeError("db down")
+        return self.sets[name] & set(values)
+
+    def submission_keys(self, keys):
+        return self._lookup("submission_keys", keys)
+
+    def submission_ids(self, ids):
+        return self._lookup("submission_ids", ids)
+
+    def page_keys(self, keys):
+        return self._lookup("page_keys", keys)
+
+    def material_keys(self, keys):
+        return self._lookup("material_keys", keys)
+
+    def material_ids(self, ids):
+        return self._lookup("material_ids", ids)
+
+
+def test_classify_storage_layouts():
+    assert classify("submissions/c/t/s/1-a.pdf") == ("submission", "submissions/c/t/s/1-a.pdf")
+    assert classify(f"submissions/c/t/s/derived/{SID}/page_0001.png") == ("submission_derived", SID)
+    assert classify("materials/u/s/m/abc.pdf") == ("material", "materials/u/s/m/abc.pdf")
+    assert classify("materials/u/s/m/derived/preview.webp") == ("material_derived", "m")
+    assert classify("submissions/c/t/s/derived/stray.txt")[0] == "unknown"
+    assert classify("backups/db.sql.gz")[0] == "unknown"
+
+
+def _tree(root: Path, files: dict[str, int]) -> None:
+    """Create files with an age in seconds."""
+    now = time.time()
+    for rel, age in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (now - age, now - age))
+
+
+OLD = 10 * 86400
+FILES = {
+    "submissions/c/t/s/1-live.pdf": OLD,
+    "submissions/c/t/s/2-orphan.pdf": OLD,
+    "submissions/c/t/s/3-young.pdf": 60,
+    "submissions/c/t/s/derived/1-live/preview.webp": OLD,
+    "submissions/c/t/s/derived/2-orphan/preview.webp": OLD,
+    # Dev PDF hook layout: root/{bucket}/{key}
+    f"submissions/submissions/c/t/s/derived/{SID}/page_0001.png": OLD,
+    f"submissions/submissions/c/t/s/derived/{GONE_SID}/page_0001.png": OLD,
+    f"submissions/submissions/c/t/s/derived/{GONE_SID}/page_0002.png": OLD,
+    f"materials/u/s/{MID}/a.pdf": OLD,
+    f"materials/u/s/{MID}/derived/preview.webp": OLD,
+    f"materials/u/s/{GONE_MID}/b.pdf": OLD,
+    f"materials/u/s/{GONE_MID}/derived/preview.webp": OLD,
+    "notes/readme.txt": OLD,
+}
+
+
+def _index() -> _Index:
+    return _Index(
+        submissions={"submissions/c/t/s/1-live.pdf"},
+        ids={SID},
+        pages={f"submissions/c/t/s/derived/{GONE_SID}/page_0002.png"},
+        materials={f"materials/u/s/{MID}/a.pdf"},
+        material_ids={MID},
+    )
+
+
+def test_local_root_dry_run_then_delete(tmp_path: Path):
+    _tree(tmp_path, FILES)
+    buckets = {"submissions": "submissions", "materials": "materials"}
+
+    dry = run_once(_index(), local_root=str(tmp_path), buckets=buckets, grace_seconds=86400, dry_run=True)
+    expected = {
+        "submissions/c/t/s/2-orphan.pdf",
+        "submissions/c/t/s/derived/2-orphan/preview.webp",
+        f"submissions/c/t/s/derived/{GONE_SID}/page_0001.png",
+        f"materials/u/s/{GONE_MID}/b.pdf",
+        f"materials/u/s/{GONE_MID}/derived/preview.webp",
+    }
+    assert {s.split(":", 1)[1] for s in dry.sample} == expected
+    assert (dry.scanned, dry.young, dry.unknown, dry.orphans, dry.deleted) == (13, 1, 1, 5, 0)
+    assert dry.by_kind == {"submission": 1, "submission_derived": 2, "material": 1, "material_derived": 1}
+    assert all((tmp_path / rel).exists() for rel in FILES)
+
+    report = run_once(_index(), local_root=str(tmp_path), buckets=buckets, grace_seconds=86400)
+    assert report.deleted == 5
+    remaining = {p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*") if p.is_file()}
+    assert remaining == set(FILES) - {
+        "submissions/c/t/s/2-orphan.pdf",
+        "submissions/c/t/s/derived/2-orphan/preview.webp",
+        f"submissions/submissions/c/t/s/derived/{GONE_SID}/page_0001.png",
+        f"materials/u/s/{GONE_MID}/b.pdf",
+        f"materials/u/s/{GONE_MID}/derived/preview.webp",
+    }
+    # Emptied directories are pruned, the root stays.
+    assert not (tmp_path / "submissions/c/t/s/derived/2-orphan").exists()
+    assert not (tmp_path / f"materials/u/s/{GONE_MID}").exists()
+
+
+def test_failed_lookup_keeps_batch(tmp_path: Path):
+    _tree(tmp_path, {"submissions/c/t/s/2-orphan.pdf": OLD})
+    report = run_once(_Index(fail=True), local_root=str(tmp_path), grace_seconds=0)
+    assert report.failed_batches == 1 and report.deleted == 0
+    assert (tmp_path / "submissions/c/t/s/2-orphan.pdf").exists()
+
+
+class _ListingAdapter:
+    def __init__(self, objects: dict[str, list[str]]) -> None:
+        self.objects = objects
+        self.deleted: list[tuple[str, list[str]]] = []
+
+    def list_objects(self, *, bucket: str, prefix: str = "", page_size: int = 1000):
+        for path in self.objects.get(bucket, []):
+            yield {"path": path, "size": 5, "updated_at": "2020-01-01T00:00:00Z"}
+
+    def delete_objects(self, *, bucket: str, keys: list[str]) -> None:
+        self.deleted.append((bucket, list(keys)))
+
+
+def test_storage_listing_is_batched_capped_and_rate_limited():
+    adapter = _ListingAdapter({"submissions": [f"c/t/s/{i}-x.pdf" for i in range(7)] + ["c/t/s/keep.pdf"]})
+    index = _Index(submissions={"submissions/c/t/s/keep.pdf"})
+    waits: list[float] = []
+    clock = [0.0]
+    limiter = RateLimiter(2.0, clock=lambda: clock[0], sleep=waits.append)
+
+    objects = gc.iter_adapter_objects(adapter, bucket="submissions", domain="submissions")
+    report = collect_orphans(
+        objects, index, adapter=adapter, grace_seconds=60, batch_size=3, max_deletes=5, limiter=limiter
+    )
+    assert report.truncated and report.deleted == 5
+    assert adapter.deleted == [
+        ("submissions", ["submissions/c/t/s/0-x.pdf", "submissions/c/t/s/1-x.pdf", "submissions/c/t/s/2-x.pdf"]),
+        ("submissions", ["submissions/c/t/s/3-x.pdf", "submissions/c/t/s/4-x.pdf"]),
+    ]
+    # Three deletions at 2/s reserve 1.5 s before the next batch may start.
+    assert waits == [1.5]
+
+
+class _Bucket:
+    def __init__(self) -> None:
+        self.tree = {
+            "": [{"name": "c", "id": None}],
+            "c": [{"name": "t", "id": None}] + [
+                {"name": f"{i}.pdf", "id": str(i), "metadata": {"size": i}, "updated_at": "2025-01-01T00:00:00Z"}
+                for i in range(3)
+            ],
+            "c/t": [{"name": "x.png", "id": "x", "metadata": {"size": 9}, "created_at": "2025-01-02T00:00:00Z"}],
+        }
+        self.list_calls: list[tuple] = []
+        self.removed: list[list[str]] = []
+
+    def list(self, path=None, options=None):
+        self.list_calls.append((path, options["offset"]))
+        entries = self.tree[path or ""]
+        return entries[options["offset"] : options["offset"] + options["limit"]]
+
+    def remove(self, paths):
+        self.removed.append(list(paths))
+
+
+class _Client:
+    def __init__(self) -> None:
+        self.bucket = _Bucket()
+        self.storage = self
+
+    def from_(self, bucket):
+        return self.bucket
+
+
+def test_supabase_adapter_lists_recursively_and_deletes_in_one_call():
+    client = _Client()
+    adapter = SupabaseStorageAdapter(client)
+    items = list(adapter.list_objects(bucket="submissions", page_size=2))
+    assert sorted(i["path"] for i in items) == ["c/0.pdf", "c/1.pdf", "c/2.pdf", "c/t/x.png"]
+    assert ("c", 2) in client.bucket.list_calls  # second page of folder "c"
+
+    adapter.delete_objects(bucket="submissions", keys=["submissions/c/0.pdf", "c/1.pdf"])
+    assert client.bucket.removed == [["c/0.pdf", "c/1.pdf"]]
+
+
+def test_db_index_refuses_app_role_fallback(monkeypatch: pytest.MonkeyPatch):
+    if not gc.HAVE_PSYCOPG:
+        pytest.skip("psycopg not installed")
+    monkeypatch.delenv("SERVICE_ROLE_DSN", raising=False)
+    monkeypatch.setenv("DATABASE_URL", "postgresql://gustav_limited@localhost/postgres")
+    with pytest.raises(RuntimeError):
+        gc.DBReferenceIndex()
+
+
+@pytest.mark.parametrize("flag, expected", [(None, True), ("false", True), ("true", False)])
+def test_cli_deletes_only_with_explicit_opt_in(monkeypatch: pytest.MonkeyPatch, flag, expected):
+    if flag is None:
+        monkeypatch.delenv("STORAGE_GC_DELETE", raising=False)
+    else:
+        monkeypatch.setenv("STORAGE_GC_DELETE", flag)
+    monkeypatch.delenv("CONTENT_BLOBS_BACKEND", raising=False)
+    monkeypatch.setattr(gc, "DBReferenceIndex", lambda dsn=None: type("I", (), {"ensure_sees_all_rows": lambda self: None})())
+    seen: list[bool] = []
+
+    def _run_once(index, **kwargs):
+        seen.append(kwargs["dry_run"])
+        return gc.GcReport(dry_run=kwargs["dry_run"])
+
+    monkeypatch.setattr(gc, "run_once", _run_once)
+    assert gc.main(["--no-remote", "--local-root", ""]) == 0
+    assert seen == [expected]
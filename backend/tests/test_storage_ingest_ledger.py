@@ -0,0 +1,149 @@
+"""
+Verified-ingest ledger — trust hashes computed while bytes passed through us.
+
+Focus on:
+    - Records confirm only the same subject, key, hash and size, and expire.
+    - The active ledger is switchable; `db` selects the shared backend.
+    - verify_storage_object_integrity answers from the ledger without touching
+      Storage, and rejects metadata that contradicts the ingest.
+    - The upload stub records what it wrote; local hashing uses mmap chunks.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+from httpx import ASGITransport
+
+from backend.storage import ingest_ledger
+from backend.storage.ingest_ledger import IngestLedger, get_ingest_ledger, ingest_ledger_from_env, set_ingest_ledger
+from backend.storage.verification import VerificationConfig, hash_file_sha256, verify_storage_object_integrity
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+SHA = hashlib.sha256(b"photo").hexdigest()
+
+
+def test_record_confirms_only_matching_metadata_and_subject():
+    ledger = IngestLedger(ttl_seconds=60)
+    ledger.record("submissions/a.png", SHA.upper(), 5, subject="s1")
+
+    assert ledger.check("submissions/a.png", SHA, 5, subject="s1") == "match"
+    assert ledger.check("submissions/a.png", SHA, 6, subject="s1") == "mismatch"
+    assert ledger.check("submissions/a.png", "0" * 64, 5, subject="s1") == "mismatch"
+    assert ledger.check("submissions/a.png", SHA, 5, subject="s2") is None
+    assert ledger.check("submissions/other.png", SHA, 5, subject="s1") is None
+
+
+def test_expired_records_are_ignored(monkeypatch: pytest.MonkeyPatch):
+    ledger = IngestLedger(ttl_seconds=60)
+    ledger.record("submissions/a.png", SHA, 5, subject="s1")
+    ledger.record("submissions/b.png", SHA, 5, subject="s1")
+    now = ingest_ledger.time.time()
+    monkeypatch.setattr(ingest_ledger.time, "time", lambda: now + 120)
+    assert ledger.lookup("submissions/b.png", subject="s1") is None
+    assert ledger.sweep() == 1
+
+
+def test_entry_cap_evicts_oldest():
+    ledger = IngestLedger(ttl_seconds=60, max_entries=2)
+    for name in ("a", "b", "c"):
+        ledger.record(f"submissions/{name}.png", SHA, 5, subject="s1")
+    assert len(ledger) == 2
+    assert ledger.lookup("submissions/a.png", subject="s1") is None
+
+
+class _NoStorageCalls:
+    def head_object(self, *, bucket: str, key: str):
+        raise AssertionError("ledger hit must not HEAD the object")
+
+    def presign_download(self, **kwargs):
+        raise AssertionError("ledger hit must not download the object")
+
+
+def _verify(ledger: IngestLedger, monkeypatch: pytest.MonkeyPatch, sha: str, size: int, subject: str | None):
+    monkeypatch.setattr(ingest_ledger, "_ACTIVE", ledger)
+    return verify_storage_object_integrity(
+        adapter=_NoStorageCalls(),  # type: ignore[arg-type]
+        storage_key="submissions/a.png",
+        expected_sha256=sha,
+        expected_size=size,
+        mime_type="image/png",
+        config=VerificationConfig(storage_bucket="submissions", require_remote=True),
+        ingest_subject=subject,
+    )
+
+
+def test_verification_uses_ledger_without_storage_roundtrip(monkeypatch: pytest.MonkeyPatch):
+    ledger = IngestLedger(ttl_seconds=60)
+    ledger.record("submissions/a.png", SHA, 5, subject="s1")
+
+    assert _verify(ledger, monkeypatch, SHA, 5, "s1") == (True, "match_ingest")
+    assert _verify(ledger, monkeypatch, "0" * 64, 5, "s1") == (False, "ingest_mismatch")
+
+
+@pytest.mark.parametrize("size", [0, 11, (1 << 20) * 2 + 7])
+def test_hash_file_sha256_matches_hashlib(tmp_path: Path, size: int):
+    data = os.urandom(size)
+    path = tmp_path / "blob.bin"
+    path.write_bytes(data)
+    assert hash_file_sha256(path) == (hashlib.sha256(data).hexdigest(), size)
+
+
+async def test_upload_stub_records_ingest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    import main  # type: ignore
+    from identity_access.stores import SessionStore  # type: ignore
+
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path))
+    monkeypatch.setenv("ENABLE_DEV_UPLOAD_STUB", "true")
+    main.SESSION_STORE = SessionStore()
+    student = main.SESSION_STORE.create(sub=f"s-{uuid.uuid4()}", name="S", roles=["student"])
+    storage_key = f"submissions/test/{uuid.uuid4().hex}.png"
+    data = b"ingest" * 100
+
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://local") as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, student.session_id)
+        r = await c.put(
+            f"/api/learning/internal/upload-stub?storage_key={storage_key}",
+            content=data,
+            headers={"Content-Type": "image/png", "Origin": "http://local"},
+        )
+
+    assert r.status_code == 200
+    sha = hashlib.sha256(data).hexdigest()
+    assert get_ingest_ledger().check(storage_key, sha, len(data), subject=student.sub) == "match"
+    assert main._compute_local_sha256(storage_key, len(data), student_sub=student.sub) == sha
+    # Without a ledger record the file is hashed from disk
+    assert main._compute_local_sha256(storage_key, len(data)) == sha
+
+
+def test_backend_selection_follows_sessions_backend(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("INGEST_LEDGER_BACKEND", raising=False)
+    monkeypatch.setenv("SESSIONS_BACKEND", "memory")
+    assert ingest_ledger_from_env() is None
+
+    created: list[str] = []
+
+    class _FakeDBLedger:
+        def __init__(self) -> None:
+            created.append("db")
+
+    monkeypatch.setattr(ingest_ledger, "DBIngestLedger", _FakeDBLedger)
+    monkeypatch.setenv("SESSIONS_BACKEND", "db")
+    assert isinstance(ingest_ledger_from_env(), _FakeDBLedger)
+    monkeypatch.setenv("INGEST_LEDGER_BACKEND", "memory")
+    assert ingest_ledger_from_env() is None
+    assert created == ["db"]
+
+    replacement = IngestLedger(ttl_seconds=60)
+    set_ingest_ledger(replacement)
+    try:
+        assert get_ingest_ledger() is replacement
+    finally:
+        set_ingest_ledger(None)
+    assert get_ingest_ledger() is ingest_ledger.INGEST_LEDGER
@@ -0,0 +1,241 @@
+"""
+Pre-generated previews for submissions and file materials.
+
+Focus on:
+    - Images and the first PDF page are downscaled to a small WebP/JPEG.
+    - Previews are written next to the `derived/` artifacts, from the dev
+      upload root or via a signed download + `put_object`.
+    - Preview URLs are only offered by adapters whose signing proves the
+      object exists; FilePreview then shows the preview and defers the original.
+    - The web tier only enqueues preview jobs; the worker derives them with
+      retries, and jobs cannot write outside the original's `derived/` path.
+"""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from backend.storage import preview_jobs
+from backend.storage import previews as storage_previews
+from backend.storage.config import dev_upload_root
+from backend.storage.preview_jobs import PreviewJob, process_preview_jobs, schedule_preview
+from backend.storage.previews import (
+    derive_preview,
+    material_preview_key,
+    sign_previews,
+    submission_preview_key,
+)
+from backend.vision.previews import PreviewError, preview_format, render_preview
+from backend.web.components.file_preview import FilePreview
+
+
+def _png(size=(2400, 1800), mode="RGBA") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _pdf() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (1240, 1754), (255, 255, 255)).save(buf, format="PDF", resolution=150)
+    return buf.getvalue()
+
+
+def test_image_preview_is_small_and_flattened():
+    original = _png()
+    preview = render_preview(original, "image/png", max_edge=320)
+    assert max(preview.width, preview.height) == 320
+    assert preview.content_type == preview_format()[1]
+    assert len(preview.data) < len(original)
+    with Image.open(io.BytesIO(preview.data)) as img:
+        assert img.mode == "RGB"
+
+
+def test_pdf_preview_renders_first_page_only(monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("pypdfium2")
+    from backend.vision import previews as vision_previews
+
+    calls = []
+    real = vision_previews.render_pdf_to_images
+
+    def spy(data, **kwargs):
+        calls.append(kwargs)
+        return real(data, **kwargs)
+
+    monkeypatch.setattr(vision_previews, "render_pdf_to_images", spy)
+    preview = render_preview(_pdf(), "application/pdf", max_edge=400)
+    assert calls[0]["page_limit"] == 1 and calls[0]["dpi"] < 72
+    assert max(preview.width, preview.height) <= 400
+
+
+def test_unsupported_and_corrupt_inputs_raise():
+    with pytest.raises(PreviewError):
+        render_preview(b"hello", "text/plain")
+    with pytest.raises(PreviewError):
+        render_preview(b"not an image", "image/png")
+
+
+def test_preview_keys_live_next_to_derived_artifacts():
+    ext = preview_format()[2]
+    assert submission_preview_key("submissions/c/t/s/1-abc.pdf") == f"submissions/c/t/s/derived/1-abc/preview.{ext}"
+    assert material_preview_key("materials/u/s/m/abc.png") == f"materials/u/s/m/derived/preview.{ext}"
+
+
+def test_derive_preview_from_local_upload_root(tmp_path: Path):
+    key = "submissions/c/t/s/1-abc.png"
+    (tmp_path / key).parent.mkdir(parents=True)
+    (tmp_path / key).write_bytes(_png())
+    preview_key = submission_preview_key(key)
+
+    written = derive_preview(
+        adapter=None, bucket="submissions", storage_key=key, mime="image/png",
+        preview_key=preview_key, local_root=str(tmp_path),
+    )
+    assert written == preview_key
+    assert (tmp_path / preview_key).stat().st_size > 0
+    # Too large originals are skipped, never partially rendered.
+    assert derive_preview(
+        adapter=None, bucket="submissions", storage_key=key, mime="image/png",
+        preview_key=preview_key, local_root=str(tmp_path), max_bytes=10,
+    ) is None
+
+
+class _RemoteAdapter:
+    signs_existing_objects_only = True
+
+    def __init__(self, existing: set[str] | None = None) -> None:
+        self.existing = existing or set()
+        self.put: list[tuple[str, str, str]] = []
+
+    def presign_download(self, *, bucket: str, key: str, expires_in: int, disposition: str) -> dict:
+        if key not in self.existing:
+            raise RuntimeError("Object not found")
+        return {"url": f"http://supabase.local/storage/v1/object/sign/{bucket}/{key}?token=t"}
+
+    def put_object(self, *, bucket: str, key: str, body: bytes, content_type: str) -> None:
+        self.put.append((bucket, key, content_type))
+
+
+def test_derive_preview_downloads_and_uploads_via_adapter(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("SUPABASE_URL", "http://supabase.local")
+    fetched: list[str] = []
+
+    def fake_download(url: str, *, max_bytes: int, timeout: float = 15.0):
+        fetched.append(url)
+        return _png()
+
+    monkeypatch.setattr(storage_previews, "_download", fake_download)
+    adapter = _RemoteAdapter({"materials/u/s/m/abc.png"})
+    preview_key = material_preview_key("materials/u/s/m/abc.png")
+
+    assert derive_preview(
+        adapter=adapter, bucket="materials", storage_key="materials/u/s/m/abc.png",
+        mime="image/png", preview_key=preview_key,
+    ) == preview_key
+    assert fetched and adapter.put == [("materials", preview_key, preview_format()[1])]
+    assert storage_previews._trusted_download_url("http://evil.test/x") is None
+
+
+def test_preview_urls_only_for_adapters_that_prove_existence():
+    adapter = _RemoteAdapter({"p/derived/preview.webp"})
+    urls = sign_previews(adapter, bucket="materials", preview_keys=["p/derived/preview.webp", "q/derived/preview.webp"], expires_in=60)
+    assert set(urls) == {"p/derived/preview.webp"}
+
+    class _Unverified:
+        def presign_download(self, **kwargs) -> dict:
+            return {"url": "http://storage.local/any"}
+
+    assert sign_previews(_Unverified(), bucket="materials", preview_keys=["p"], expires_in=60) == {}
+
+
+def test_file_preview_defers_original_when_preview_exists():
+    html = FilePreview(
+        url="http://storage.local/original.pdf",
+        mime="application/pdf",
+        title="Arbeitsblatt",
+        preview_url="http://storage.local/preview.webp",
+    ).render()
+    assert "<iframe" not in html
+    assert 'src="http://storage.local/preview.webp"' in html
+    assert 'data-full-src="http://storage.local/original.pdf"' in html
+    assert 'data-full-kind="pdf"' in html
+    assert 'href="http://storage.local/original.pdf"' in html
+    assert 'data-file-preview="true"' in html and "file-preview--pdf" in html
+
+
+class _MemoryQueue:
+    def __init__(self) -> None:
+        self.jobs: dict[int, PreviewJob] = {}
+        self.retried: list[int] = []
+
+    def enqueue(self, *, kind: str, storage_key: str, mime_type: str) -> None:
+        job_id = len(self.jobs) + 1
+        self.jobs[job_id] = PreviewJob(id=job_id, kind=kind, storage_key=storage_key, mime_type=mime_type, attempts=0)
+
+    def lease(self, *, limit: int, lease_seconds: int) -> list[PreviewJob]:
+        leased = []
+        for job_id in [i for i in self.jobs if i not in self.retried][:limit]:
+            job = self.jobs[job_id]
+            self.jobs[job_id] = leased_job = PreviewJob(**{**job.__dict__, "attempts": job.attempts + 1})
+            leased.append(leased_job)
+        return leased
+
+    def done(self, job_id: int) -> None:
+        self.jobs.pop(job_id, None)
+
+    def retry(self, job_id: int, *, delay_seconds: int) -> None:
+        self.retried.append(job_id)
+
+
+def test_schedule_preview_enqueues_instead_of_rendering(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    key = "submissions/c/t/s/1-abc.png"
+    (tmp_path / key).parent.mkdir(parents=True)
+    (tmp_path / key).write_bytes(_png())
+    queue = _MemoryQueue()
+    monkeypatch.setattr(preview_jobs, "_PREVIEW_QUEUE", queue)
+
+    work = schedule_preview(kind="submission", storage_key=key, mime="image/png", adapter=None, local_root=str(tmp_path))
+    assert work is not None
+    work()
+    assert [(j.kind, j.storage_key) for j in queue.jobs.values()] == [("submission", key)]
+    assert not (tmp_path / submission_preview_key(key)).exists()
+    # Keys outside the kind's prefix or non-previewable types are never queued.
+    assert schedule_preview(kind="material", storage_key=key, mime="image/png", adapter=None) is None
+    assert schedule_preview(kind="submission", storage_key=key, mime="text/plain", adapter=None) is None
+
+    # Without a queue (dev without database) the preview is derived in-process.
+    monkeypatch.setattr(preview_jobs, "_PREVIEW_QUEUE", None)
+    work = schedule_preview(kind="submission", storage_key=key, mime="image/png", adapter=None, local_root=str(tmp_path))
+    assert work is not None and work() == submission_preview_key(key)
+
+
+def test_worker_derives_queued_previews_and_retries_failures(tmp_path: Path):
+    good = "materials/u/s/m/abc.png"
+    (tmp_path / good).parent.mkdir(parents=True)
+    (tmp_path / good).write_bytes(_png())
+    queue = _MemoryQueue()
+    queue.enqueue(kind="material", storage_key=good, mime_type="image/png")
+    queue.enqueue(kind="submission", storage_key="submissions/c/t/s/missing.png", mime_type="image/png")
+    queue.enqueue(kind="material", storage_key="submissions/c/t/s/1-abc.png", mime_type="image/png")
+
+    assert process_preview_jobs(queue, adapter=None, local_root=str(tmp_path)) == 3
+    assert (tmp_path / material_preview_key(good)).stat().st_size > 0
+    # The missing original is retried later; the mismatched kind is dropped.
+    assert list(queue.jobs) == [2] and queue.retried == [2]
+
+    queue.retried.clear()
+    for _ in range(2):
+        process_preview_jobs(queue, adapter=None, local_root=str(tmp_path), max_attempts=3)
+        queue.retried.clear()
+    assert queue.jobs == {}
+
+
+def test_dev_upload_root_defaults_to_workspace_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("STORAGE_VERIFY_ROOT", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert dev_upload_root() == str(tmp_path / ".tmp" / "dev_uploads")
+    monkeypatch.setenv("STORAGE_VERIFY_ROOT", str(tmp_path / "root"))
+    assert dev_upload_root() == str(tmp_path / "root")
@@ -0,0 +1,201 @@
+"""
+Signed download URL cache and batch presigning.
+
+Focus on:
+    - Still-valid URLs are reused; near-expiry URLs and other adapters are not.
+    - Batch presigning signs all uncached keys in one adapter call.
+    - The Supabase adapter maps `create_signed_urls` results back to keys.
+    - MaterialsService signs a whole section at once; hit rates are visible
+      in the cache metrics.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+
+from backend.storage import signed_url_cache
+from backend.storage.signed_url_cache import SignedUrlCache, presign_download_cached, presign_downloads
+from teaching.services.materials import MaterialFileSettings, MaterialsService  # type: ignore
+from teaching.storage_supabase import SupabaseStorageAdapter  # type: ignore
+
+
+class _Adapter:
+    def __init__(self, *, batch: bool = False) -> None:
+        self.single: list[str] = []
+        self.batches: list[list[str]] = []
+        if batch:
+            self.presign_download_many = self._many
+
+    def presign_download(self, *, bucket: str, key: str, expires_in: int, disposition: str) -> dict:
+        self.single.append(key)
+        return {"url": f"https://storage.test/{bucket}/{key}?n={len(self.single)}"}
+
+    def _many(self, *, bucket: str, keys: list[str], expires_in: int, disposition: str) -> dict:
+        self.batches.append(list(keys))
+        return {key: {"url": f"https://storage.test/{bucket}/{key}?batch"} for key in keys if key != "gone.pdf"}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch: pytest.MonkeyPatch):
+    cache = SignedUrlCache(16, min_remaining_seconds=5)
+    monkeypatch.setattr(signed_url_cache, "SIGNED_URL_CACHE", cache)
+    return cache
+
+
+def _sign(adapter, key: str = "m/a.pdf", expires_in: int = 60) -> dict:
+    return presign_download_cached(adapter, bucket="materials", key=key, expires_in=expires_in, disposition="inline")
+
+
+def test_valid_url_is_reused_until_near_expiry(monkeypatch: pytest.MonkeyPatch, _fresh_cache: SignedUrlCache):
+    adapter = _Adapter()
+    first = _sign(adapter)
+    assert _sign(adapter) == first
+    assert adapter.single == ["m/a.pdf"]
+    assert datetime.fromisoformat(first["expires_at"]) > datetime.now(timezone.utc)
+
+    # With less than half of the TTL left the URL is signed again.
+    now = signed_url_cache.time.time()
+    monkeypatch.setattr(signed_url_cache.time, "time", lambda: now + 31)
+    assert _sign(adapter)["url"] != first["url"]
+    assert _fresh_cache.stats() | {"entries": 0} == {
+        "hits": 1, "misses": 2, "signed": 2, "batch_calls": 0, "entries": 0, "max_entries": 16,
+    }
+
+
+def test_short_ttl_urls_keep_a_minimum_lifetime(monkeypatch: pytest.MonkeyPatch):
+    # 45 s preview URLs: a cached URL is never handed out with under 30 s left.
+    cache = SignedUrlCache(16)
+    monkeypatch.setattr(signed_url_cache, "SIGNED_URL_CACHE", cache)
+    adapter = _Adapter()
+    now = signed_url_cache.time.time()
+    first = _sign(adapter, expires_in=45)
+    monkeypatch.setattr(signed_url_cache.time, "time", lambda: now + 14)
+    assert _sign(adapter, expires_in=45) == first
+    monkeypatch.setattr(signed_url_cache.time, "time", lambda: now + 16)
+    assert _sign(adapter, expires_in=45)["url"] != first["url"]
+
+
+def test_cache_is_bound_to_adapter_and_reported_expiry():
+    a, b = _Adapter(), _Adapter()
+    _sign(a)
+    _sign(b)
+    assert a.single == ["m/a.pdf"] and b.single == ["m/a.pdf"]
+
+    class _Expired(_Adapter):
+        def presign_download(self, **kwargs) -> dict:
+            super().presign_download(**kwargs)
+            return {"url": "https://storage.test/x", "expires_at": "2020-01-01T00:00:00Z"}
+
+    expired = _Expired()
+    _sign(expired)
+    _sign(expired)
+    assert len(expired.single) == 2
+
+
+def test_batch_signs_only_uncached_keys_in_one_call(_fresh_cache: SignedUrlCache):
+    adapter = _Adapter(batch=True)
+    _sign(adapter, "m/a.pdf")
+    result = presign_downloads(
+        adapter, bucket="materials", keys=["m/a.pdf", "m/b.pdf", "m/c.pdf", "gone.pdf", "m/b.pdf"],
+        expires_in=60, disposition="inline",
+    )
+    assert adapter.batches == [["m/b.pdf", "m/c.pdf", "gone.pdf"]]
+    assert set(result) == {"m/a.pdf", "m/b.pdf", "m/c.pdf"}
+    assert result["m/a.pdf"]["url"].endswith("?n=1")
+
+    again = presign_downloads(adapter, bucket="materials", keys=["m/b.pdf", "m/c.pdf"], expires_in=60, disposition="inline")
+    assert again == {k: result[k] for k in ("m/b.pdf", "m/c.pdf")}
+    assert len(adapter.batches) == 1
+    assert _fresh_cache.stats()["batch_calls"] == 1
+
+
+def test_batch_without_adapter_support_falls_back_to_single_calls():
+    adapter = _Adapter()
+    result = presign_downloads(adapter, bucket="materials", keys=["a", "b"], expires_in=60, disposition="inline")
+    assert adapter.single == ["a", "b"] and set(result) == {"a", "b"}
+
+
+def test_failing_batch_call_falls_back_to_single_calls():
+    adapter = _Adapter(batch=True)
+
+    def broken(**kwargs):
+        raise RuntimeError("storage 503")
+
+    adapter.presign_download_many = broken
+    result = presign_downloads(adapter, bucket="materials", keys=["a", "b"], expires_in=60, disposition="inline")
+    assert adapter.single == ["a", "b"] and set(result) == {"a", "b"}
+
+
+class _Bucket:
+    def __init__(self) -> None:
+        self.calls: list[tuple] = []
+
+    def create_signed_urls(self, paths, expires_in, options=None):
+        self.calls.append((list(paths), expires_in, options))
+        return [
+            {"path": p, "signedURL": f"http://supabase.local/object/sign/{p}?token=t", "error": None}
+            if p != "missing.pdf" else {"path": p, "signedURL": None, "error": "Either the object does not exist"}
+            for p in paths
+        ]
+
+
+class _Client:
+    def __init__(self, bucket: Any = None) -> None:
+        self.bucket = bucket or _Bucket()
+        self.storage = self
+
+    def from_(self, bucket):
+        return self.bucket
+
+
+def test_supabase_presign_download_many_maps_paths_to_keys():
+    client = _Client()
+    adapter = SupabaseStorageAdapter(client)
+    out = adapter.presign_download_many(
+        bucket="materials", keys=["materials/u/a.pdf", "u/b.pdf", "missing.pdf"], expires_in=45, disposition="inline"
+    )
+    assert client.bucket.calls == [(["u/a.pdf", "u/b.pdf", "missing.pdf"], 45, {"download": None})]
+    assert set(out) == {"materials/u/a.pdf", "u/b.pdf"}
+    assert out["u/b.pdf"]["url"].startswith("http://supabase.local/object/sign/u/b.pdf")
+
+
+def test_supabase_presign_download_many_signs_per_key_when_batch_fails():
+    class _BrokenBatch(_Bucket):
+        def create_signed_urls(self, paths, expires_in, options=None):
+            raise ConnectionError("storage unavailable")
+
+        def create_signed_url(self, path, expires_in, options=None):
+            return {"signedURL": f"http://supabase.local/object/sign/{path}?token=t"}
+
+    adapter = SupabaseStorageAdapter(_Client(_BrokenBatch()))
+    out = adapter.presign_download_many(bucket="materials", keys=["u/a.pdf", "u/b.pdf"], expires_in=45, disposition="inline")
+    assert set(out) == {"u/a.pdf", "u/b.pdf"}
+
+
+class _Repo:
+    def section_exists_for_author(self, unit_id: str, section_id: str, author_id: str) -> bool:
+        return author_id == "t1"
+
+    def list_materials_for_section_owned(self, unit_id: str, section_id: str, author_id: str) -> list[dict[str, Any]]:
+        return [
+            {"id": "m1", "kind": "file", "storage_key": "materials/u/s/m1/a.pdf"},
+            {"id": "m2", "kind": "markdown", "storage_key": None},
+            {"id": "m3", "kind": "file", "storage_key": "materials/u/s/m3/b.png"},
+        ]
+
+
+def test_service_batch_signs_section_and_metrics_report_it(_fresh_cache: SignedUrlCache):
+    adapter = _Adapter(batch=True)
+    service = MaterialsService(_Repo(), settings=MaterialFileSettings(storage_bucket="materials"))  # type: ignore[arg-type]
+
+    urls = service.generate_section_download_urls("u", "s", "t1", disposition="attachment", storage=adapter)  # type: ignore[arg-type]
+    assert set(urls) == {"m1", "m3"}
+    assert adapter.batches == [["materials/u/s/m1/a.pdf", "materials/u/s/m3/b.png"]]
+    with pytest.raises(LookupError):
+        service.generate_section_download_urls("u", "s", "other", disposition="inline", storage=adapter)  # type: ignore[arg-type]
+
+    from routes.operations import _cache_stats  # type: ignore
+
+    assert _cache_stats()["signed_urls"]["batch_calls"] == 1
@@ -159,6 +159,28 @@ async def test_courses_csrf_required_on_post():
     assert r.status_code == 403
 
 
+@pytest.mark.anyio
+async def test_courses_csrf_token_is_masked_per_response():
+    # BREACH: compressed pages must not repeat the session token verbatim.
+    sess = main.SESSION_STORE.create(sub="t-209", name="Lehrer J", roles=["teacher"])
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, sess.session_id)
+        first = _extract_csrf_token((await c.get("/courses")).text)
+        second = _extract_csrf_token((await c.get("/courses")).text)
+        raw = main.CSRF_STORE.get(sess.session_id)
+        assert first and second and raw and first != second
+        assert raw not in first and raw not in second
+        assert not main._validate_csrf(sess.session_id, first[:-4] + "AAA=")
+
+        r = await c.post(
+            "/courses",
+            data={"title": "Chemie 8", "csrf_token": first},
+            follow_redirects=False,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+    assert r.status_code in (302, 303)
+
+
 @pytest.mark.anyio
 async def test_courses_list_escapes_title_xss():
     # Arrange: seed course with XSS payload
@@ -0,0 +1,125 @@
+"""
+Live page streaming — shell is flushed before slow sub-queries resolve.
+
+Why:
+- Teachers of large courses should see the layout (and the browser should
+  start loading CSS/JS) without waiting for the summary/matrix query. The
+  streamed body must be identical to the buffered page.
+"""
+from __future__ import annotations
+
+import anyio
+import pytest
+
+import main  # type: ignore  # noqa: E402
+from components import Layout  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+
+pytestmark = pytest.mark.anyio("asyncio")
+
+COURSE_ID = "11111111-1111-1111-1111-111111111111"
+UNIT_ID = "22222222-2222-2222-2222-222222222222"
+
+
+async def _call(path: str, session_id: str, *, on_body=None, hx: bool = False) -> tuple[int, dict, list[bytes]]:
+    headers = [(b"host", b"test"), (b"cookie", f"{main.SESSION_COOKIE_NAME}={session_id}".encode())]
+    if hx:
+        headers.append((b"hx-request", b"true"))
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": headers, "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1),
+        "root_path": "", "http_version": "1.1",
+    }
+    state = {"status": 0, "headers": {}, "chunks": []}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await anyio.sleep_forever()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+            state["headers"] = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body" and message.get("body"):
+            state["chunks"].append(message["body"])
+            if on_body:
+                on_body(message["body"])
+
+    with anyio.fail_after(5):
+        await main.app(scope, receive, send)
+    return state["status"], state["headers"], state["chunks"]
+
+
+@pytest.fixture
+def teacher():
+    main.SESSION_STORE = SessionStore()
+    return main.SESSION_STORE.create(sub="t-live-stream", name="Frau L", roles=["teacher"])
+
+
+async def test_shell_is_sent_before_summary_resolves(monkeypatch: pytest.MonkeyPatch, teacher):
+    summary_gate = anyio.Event()
+
+    async def titles(request, course_id, unit_id):
+        return "Physik", "Optik"
+
+    async def module_id(request, course_id, unit_id):
+        return None
+
+    async def summary(request, course_id, unit_id):
+        # Only resolves after the client has received the layout shell.
+        await summary_gate.wait()
+        return [{"id": "task-1"}], [{"student": {"sub": "s1", "name": "Sam"}, "tasks": [{"task_id": "task-1", "has_submission": True}]}]
+
+    def on_body(chunk: bytes) -> None:
+        if b"<head>" in chunk:
+            summary_gate.set()
+
+    monkeypatch.setattr(main, "_live_unit_titles", titles)
+    monkeypatch.setattr(main, "_live_module_id", module_id)
+    monkeypatch.setattr(main, "_live_summary", summary)
+
+    path = f"/teaching/courses/{COURSE_ID}/units/{UNIT_ID}/live"
+    status, headers, chunks = await _call(path, teacher.session_id, on_body=on_body)
+
+    assert status == 200
+    assert headers["cache-control"] == "private, no-store"
+    assert headers["content-type"].startswith("text/html")
+    assert b"<head>" in chunks[0] and b"live-matrix" not in chunks[0]
+    html = b"".join(chunks).decode()
+    assert 'id="live-matrix"' in html and "cell-s1-task-1" in html
+    assert "Physik · Optik" in html
+    assert html.count("</html>") == 1
+
+    # Streamed body equals the buffered layout with the same content.
+    user = {"sub": teacher.sub, "name": "Frau L", "role": "teacher", "roles": ["teacher"]}
+    start = html.index('<div class="container"><h1>Unterricht – Live</h1>')
+    end = html.index('<div id="live-detail"></div></div>') + len('<div id="live-detail"></div></div>')
+    expected = Layout(title="Unterricht – Live", content=html[start:end], user=user, current_path=path).render()
+    assert html == expected
+
+
+async def test_htmx_navigation_streams_fragment(monkeypatch: pytest.MonkeyPatch, teacher):
+    async def titles(request, course_id, unit_id):
+        return "Kurs", "Lerneinheit"
+
+    async def module_id(request, course_id, unit_id):
+        return None
+
+    async def summary(request, course_id, unit_id):
+        return [], []
+
+    monkeypatch.setattr(main, "_live_unit_titles", titles)
+    monkeypatch.setattr(main, "_live_module_id", module_id)
+    monkeypatch.setattr(main, "_live_summary", summary)
+
+    status, _headers, chunks = await _call(f"/teaching/courses/{COURSE_ID}/units/{UNIT_ID}/live", teacher.session_id, hx=True)
+    html = b"".join(chunks).decode()
+    assert status == 200
+    assert "<html" not in html
+    assert 'hx-swap-oob="true"' in html
+    assert "Keine Aufgaben in dieser Lerneinheit." in html
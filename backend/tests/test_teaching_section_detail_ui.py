@@ -486,3 +486,32 @@ async def test_task_list_links_to_detail_page():
         page = await c.get(f"/units/{unit_id}/sections/{section_id}")
         assert page.status_code == 200
         assert f'href="/units/{unit_id}/sections/{section_id}/tasks/{tid}"' in page.text
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("failure, expected", [("timeout", 503), ("error", 502)])
+async def test_unreachable_api_is_not_reported_as_missing(monkeypatch: pytest.MonkeyPatch, failure: str, expected: int):
+    """A timed-out or failed fan-out fetch must not turn into 404 "nicht gefunden"."""
+    import asyncio
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if failure == "timeout":
+            await asyncio.sleep(1)
+        raise httpx.ConnectError("api down", request=request)
+
+    monkeypatch.setenv("SSR_FETCH_TIMEOUT_SECONDS", "0.05")
+    monkeypatch.setattr(
+        main,
+        "_internal_api_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://local"),
+    )
+    sess = main.SESSION_STORE.create(sub="t-ui-sec-detail-down", name="Lehrer SD", roles=["teacher"])  # type: ignore
+    async with httpx.AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as c:
+        c.cookies.set(main.SESSION_COOKIE_NAME, sess.session_id)
+        unit_id, section_id = "11111111-1111-4111-8111-111111111111", "22222222-2222-4222-8222-222222222222"
+        detail = await c.get(f"/units/{unit_id}/sections/{section_id}")
+        sections = await c.get(f"/units/{unit_id}")
+
+    assert detail.status_code == expected
+    assert sections.status_code == expected
+    assert detail.headers.get("Cache-Control") == "private, no-store"
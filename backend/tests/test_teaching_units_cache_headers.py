@@ -1,7 +1,8 @@
 """
 Teaching API cache headers — ensure privacy on list endpoints.
 
-Checks that 200 responses include "Cache-Control: private, no-store" for:
+Checks that 200 responses include "Cache-Control: private, no-cache" (browser
+copies must be revalidated via ETag) for:
 - GET /api/teaching/units
 - GET /api/teaching/units/{unit_id}/sections
 """
@@ -30,7 +31,7 @@ async def _client():
 
 
 @pytest.mark.anyio
-async def test_units_list_sets_private_no_store():
+async def test_units_list_sets_private_no_cache():
     # Arrange: ensure memory session store
     if not isinstance(main.SESSION_STORE, SessionStore):  # pragma: no cover - defensive
         main.SESSION_STORE = SessionStore()
@@ -42,11 +43,11 @@ async def test_units_list_sets_private_no_store():
     # Assert
     assert r.status_code == 200
     cc = r.headers.get("Cache-Control", "")
-    assert "no-store" in cc and "private" in cc
+    assert "no-cache" in cc and "private" in cc
 
 
 @pytest.mark.anyio
-async def test_sections_list_sets_private_no_store():
+async def test_sections_list_sets_private_no_cache():
     if not isinstance(main.SESSION_STORE, SessionStore):  # pragma: no cover - defensive
         main.SESSION_STORE = SessionStore()
     teacher = main.SESSION_STORE.create(sub="t-cache-2", name="Teach", roles=["teacher"])  # type: ignore
@@ -59,4 +60,4 @@ async def test_sections_list_sets_private_no_store():
         r = await c.get(f"/api/teaching/units/{unit_id}/sections")
     assert r.status_code == 200
     cc = r.headers.get("Cache-Control", "")
-    assert "no-store" in cc and "private" in cc
+    assert "no-cache" in cc and "private" in cc
@@ -0,0 +1,118 @@
+"""
+Small preview images (thumbnails) for submissions and file materials.
+
+Intent:
+- Turn an uploaded image or the first page of a PDF into a small WebP (JPEG
+  when Pillow lacks WebP support) that pages can embed instead of the
+  original file.
+- PDFs are rendered via `render_pdf_to_images` with `page_limit=1` and a DPI
+  derived from the target size, so only the first page is rasterized.
+
+Security/Permissions:
+- Pure computation on provided bytes. Callers must ensure the bytes belong to
+  an authorized upload. Decoding is bounded by Pillow's decompression-bomb
+  guard and the renderer's page limit.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.vision.pdf_renderer import PdfRenderError, render_pdf_to_images
+
+# A4 portrait is 842pt tall; render just enough pixels for the target edge.
+_PDF_POINTS_LONG_EDGE = 842
+
+
+@dataclass(frozen=True)
+class PreviewImage:
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+
+
+class PreviewError(Exception):
+    pass
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def preview_max_edge() -> int:
+    """Longest preview edge in pixels (`PREVIEW_MAX_EDGE_PX`, default 640)."""
+    return _env_int("PREVIEW_MAX_EDGE_PX", 640)
+
+
+def preview_format() -> tuple[str, str, str]:
+    """Return (Pillow format, content type, file extension) for previews."""
+    try:
+        from PIL import features
+
+        if features.check("webp"):
+            return "WEBP", "image/webp", "webp"
+    except Exception:  # pragma: no cover - Pillow without feature probing
+        pass
+    return "JPEG", "image/jpeg", "jpg"
+
+
+def _encode(img, *, max_edge: int) -> PreviewImage:
+    from PIL import Image, ImageOps
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "L"):
+        # Flatten transparency onto white so scans and screenshots stay legible.
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        img = background
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    fmt, content_type, _ext = preview_format()
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, format=fmt, quality=75, method=4)
+    else:
+        img.save(buf, format=fmt, quality=75, optimize=True)
+    return PreviewImage(data=buf.getvalue(), content_type=content_type, width=img.width, height=img.height)
+
+
+def render_preview(data: bytes, mime: str, *, max_edge: Optional[int] = None) -> PreviewImage:
+    """Render a preview for an image or PDF upload.
+
+    Raises PreviewError for unsupported MIME types and undecodable input.
+    """
+    edge = max_edge or preview_max_edge()
+    mime = (mime or "").lower()
+    if mime == "application/pdf":
+        # Render the first page at roughly the target size instead of 300 DPI.
+        dpi = max(36, min(150, (edge * 72) // _PDF_POINTS_LONG_EDGE + 1))
+        try:
+            pages, _meta = render_pdf_to_images(data, dpi=dpi, page_limit=1, grayscale=False)
+        except PdfRenderError as exc:
+            raise PreviewError(str(exc) or "pdf_render_failed") from exc
+        if not pages:
+            raise PreviewError("pdf_has_no_pages")
+        data = pages[0].data
+    elif not mime.startswith("image/"):
+        raise PreviewError("unsupported_mime")
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            return _encode(img, max_edge=edge)
+    except PreviewError:
+        raise
+    except Exception as exc:
+        raise PreviewError("image_decode_failed") from exc
+
+
+__all__ = ["PreviewError", "PreviewImage", "preview_format", "preview_max_edge", "render_preview"]
@@ -4,6 +4,7 @@ Breadcrumb component for GUSTAV
 Generates a simple breadcrumb trail based on the current request path.
 """
 
+from functools import lru_cache
 from typing import List, Tuple, Dict, Optional
 from .base import Component
 from .navigation import ROUTE_MAP, ROUTE_PATTERNS
@@ -16,7 +17,10 @@ class Breadcrumbs(Component):
         self.current_path = current_path or "/"
 
     def render(self) -> str:
-        """Render breadcrumb navigation"""
+        """Render breadcrumb navigation (memoized per path; labels depend only on it)"""
+        return _render_for_path(self._sanitize_path(self.current_path))
+
+    def _render_uncached(self) -> str:
         crumbs = self._build_crumbs()
         if len(crumbs) <= 1:
             return ""
@@ -137,3 +141,8 @@ class Breadcrumbs(Component):
                 return None
 
         return params
+
+
+@lru_cache(maxsize=1024)
+def _render_for_path(path: str) -> str:
+    return Breadcrumbs(path)._render_uncached()
@@ -0,0 +1,77 @@
+"""
+Compiled templates for GUSTAV components
+
+Static markup is split into literal segments once (at import or first use);
+rendering only joins those segments with the dynamic slot values. Combined
+with `partial()` this lets components bake request-independent parts (role
+navigation links, asset URLs) into a cached template and fill in the few
+per-request values (user name, title, main content) with a single join.
+
+Slots use `str.format` field syntax (`{name}`); literal braces are written as
+`{{` and `}}`. Slot values are inserted verbatim — callers escape user input
+exactly as they would in an f-string.
+"""
+
+from __future__ import annotations
+
+from string import Formatter
+from typing import List, Tuple
+
+
+class Template:
+    """Pre-split HTML template with named slots.
+
+    Example:
+        >>> shell = Template('<div class="{cls}">{body}</div>')
+        >>> shell.partial(cls="card").render(body="<p>x</p>")
+        '<div class="card"><p>x</p></div>'
+    """
+
+    __slots__ = ("_literals", "_slots")
+
+    def __init__(self, source: str = "", *, _compiled: Tuple[Tuple[str, ...], Tuple[str, ...]] | None = None) -> None:
+        if _compiled is not None:
+            self._literals, self._slots = _compiled
+            return
+        literals: List[str] = []
+        slots: List[str] = []
+        pending = ""
+        for literal, field, spec, conversion in Formatter().parse(source):
+            pending += literal
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"unsupported template field: {{{field}}}")
+            literals.append(pending)
+            slots.append(field)
+            pending = ""
+        literals.append(pending)
+        self._literals = tuple(literals)
+        self._slots = tuple(slots)
+
+    @property
+    def slots(self) -> Tuple[str, ...]:
+        """Names of the remaining dynamic slots, in order of appearance."""
+        return self._slots
+
+    def render(self, **values: str) -> str:
+        """Join static segments with slot values; missing slots raise KeyError."""
+        literals = self._literals
+        parts = [literals[0]]
+        for index, name in enumerate(self._slots, start=1):
+            parts.append(values[name])
+            parts.append(literals[index])
+        return "".join(parts)
+
+    def partial(self, **values: str) -> "Template":
+        """Return a new template with some slots baked into the static segments."""
+        literals: List[str] = [self._literals[0]]
+        slots: List[str] = []
+        for index, name in enumerate(self._slots, start=1):
+            if name in values:
+                literals[-1] = literals[-1] + values[name] + self._literals[index]
+            else:
+                slots.append(name)
+                literals.append(self._literals[index])
+        return Template(_compiled=(tuple(literals), tuple(slots)))
+
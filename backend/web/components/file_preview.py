@@ -12,6 +12,10 @@ Behavior:
     - For image/* MIME types: renders an <img> wrapped in a container.
     - For application/pdf: renders an <iframe> based PDF preview.
     - For all other types: falls back to a simple download link.
+    - With a pre-generated `preview_url` (storage.previews), images and PDFs
+      render the small preview image instead; the original is referenced via
+      `data-full-src` and loaded by gustav.js only when the preview is zoomed
+      (or fails to load), plus a plain link to open it directly.
 
 Security:
     - Uses short-lived, owner-scoped download URLs provided by the API.
@@ -34,6 +38,8 @@ class FilePreview(Component):
         title: Optional human-friendly title used in captions/titles.
         alt: Optional alt text for images; falls back to title when omitted.
         max_height: CSS height for embedded viewers (e.g. "600px").
+        preview_url: Optional short-lived URL of a small preview image; when
+            set, the original is loaded on demand only.
 
     Expected usage:
         - Teachers' "Material bearbeiten" page shows file previews using
@@ -50,12 +56,14 @@ class FilePreview(Component):
         title: str = "",
         alt: Optional[str] = None,
         max_height: str = "600px",
+        preview_url: Optional[str] = None,
     ) -> None:
         self.url = url or ""
         self.mime = (mime or "").lower()
         self.title = title or ""
         self.alt = (alt or "").strip()
         self.max_height = max_height
+        self.preview_url = preview_url or ""
 
     def render(self) -> str:
         """Render an inline preview or a safe download fallback."""
@@ -80,6 +88,31 @@ class FilePreview(Component):
                     "aria-label": "Dateivorschau vergrößern/verkleinern",
                 },
             )
+        # Pre-generated preview: show the small image, load the original on demand.
+        if self.preview_url and (mime.startswith("image/") or mime == "application/pdf"):
+            is_pdf = mime == "application/pdf"
+            wrapper = wrapper_attrs("file-preview--pdf" if is_pdf else "file-preview--image")
+            alt_text = self.alt or self.title or ("PDF-Vorschau" if is_pdf else "Datei-Material")
+            img_attrs = self.attributes(
+                src=self.preview_url,
+                alt=alt_text,
+                class_="file-preview__image file-preview__thumb",
+                loading="lazy",
+                **{
+                    "data-full-src": self.url,
+                    "data-full-kind": "pdf" if is_pdf else "image",
+                    "data-frame-height": self.max_height,
+                },
+            )
+            link_attrs = self.attributes(
+                href=self.url,
+                target="_blank",
+                rel="noopener",
+                class_="file-preview__original",
+            )
+            link_label = "PDF öffnen" if is_pdf else "Original öffnen"
+            return f'<figure {wrapper}><img {img_attrs}><a {link_attrs}>{link_label}</a></figure>'
+
         # Images: inline <img> preview
         if mime.startswith("image/"):
             alt_text = self.alt or self.title or "Datei-Material"
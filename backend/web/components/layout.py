@@ -4,10 +4,13 @@ Layout Component for GUSTAV
 Main layout wrapper that combines all components into a complete HTML page.
 """
 
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 from .base import Component
+from .compiled import Template
 from .navigation import Navigation
 from .breadcrumbs import Breadcrumbs
+from static_assets import asset_url
 
 
 class Layout(Component):
@@ -47,30 +50,7 @@ class Layout(Component):
         # Pass current_path to Navigation for active link highlighting
         nav_html = Navigation(self.user, self.current_path).render() if self.show_nav else ""
 
-        return f"""<!DOCTYPE html>
-<html lang="de">
-<head>
-    {self._render_head()}
-</head>
-<body>
-    <!-- Skip-Link für Barrierefreiheit (Tab-Taste macht ihn sichtbar) -->
-    <a href="#main-content" class="skip-link">
-        Zum Hauptinhalt springen
-    </a>
-
-    {nav_html}
-
-    <!-- ARIA Live Region for dynamic announcements -->
-    <div id="live-region" class="sr-only" role="status" aria-live="polite" aria-atomic="true">
-        <!-- Dynamic messages will be inserted here for screen readers -->
-    </div>
-
-    <!-- Main Content Area (adjusted for sidebar) -->
-    <main id="main-content" class="main-content" role="main">
-        {main_inner}
-    </main>
-</body>
-</html>"""
+        return _DOCUMENT.render(head=self._render_head(), nav=nav_html, main_inner=main_inner)
 
     def render_fragment(self) -> str:
         """Return the HTMX fragment that keeps the sidebar toggle in sync.
@@ -97,9 +77,80 @@ class Layout(Component):
         sidebar_oob = Navigation(self.user, self.current_path).render_aside(oob=True)
         return f"{main_inner}{sidebar_oob}"
 
+    def render_around_content(self, fragment: bool = False) -> Tuple[str, str]:
+        """Return the markup before and after `content` for streamed responses.
+
+        Why:
+            Slow pages can flush the head, navigation and breadcrumbs at once
+            and stream the content blocks as they resolve. Concatenating
+            `before + content + after` equals `render()` / `render_fragment()`.
+        """
+        original = self.content
+        self.content = _CONTENT_MARK
+        try:
+            html = self.render_fragment() if fragment else self.render()
+        finally:
+            self.content = original
+        before, after = html.split(_CONTENT_MARK, 1)
+        return before, after
+
     def _render_head(self) -> str:
         """Render the HTML head section"""
-        return f"""
+        urls = tuple(asset_url(path) for path in _HEAD_ASSETS.values())
+        return _head_template(urls).render(title=self.escape(self.title))
+
+    def _render_main_inner(self, breadcrumb_html: str) -> str:
+        """Render the inner markup of the main content column.
+
+        Returns only the children of <main> so HTMX fragment swaps can replace
+        innerHTML without nesting <main> elements.
+        """
+        return _MAIN_INNER.render(breadcrumbs=breadcrumb_html, content=self.content)
+
+
+# ---------------------------------------------------------------------------
+# Compiled templates (static chrome is split once; requests only fill slots)
+# ---------------------------------------------------------------------------
+
+# Placeholder used to split the rendered page around the content slot.
+_CONTENT_MARK = "\x00gustav-content\x00"
+
+_DOCUMENT = Template("""<!DOCTYPE html>
+<html lang="de">
+<head>
+    {head}
+</head>
+<body>
+    <!-- Skip-Link für Barrierefreiheit (Tab-Taste macht ihn sichtbar) -->
+    <a href="#main-content" class="skip-link">
+        Zum Hauptinhalt springen
+    </a>
+
+    {nav}
+
+    <!-- ARIA Live Region for dynamic announcements -->
+    <div id="live-region" class="sr-only" role="status" aria-live="polite" aria-atomic="true">
+        <!-- Dynamic messages will be inserted here for screen readers -->
+    </div>
+
+    <!-- Main Content Area (adjusted for sidebar) -->
+    <main id="main-content" class="main-content" role="main">
+        {main_inner}
+    </main>
+</body>
+</html>""")
+
+# Slot name → logical static path; URLs depend on the asset manifest.
+_HEAD_ASSETS: Dict[str, str] = {
+    "css_gustav": "css/gustav.css",
+    "js_htmx": "js/vendor/htmx.min.js",
+    "js_sortable_min": "js/vendor/Sortable.min.js",
+    "js_sortable_ext": "js/vendor/sortable.js",
+    "js_gustav": "js/gustav.js",
+    "js_learning_upload": "js/learning_upload.js",
+}
+
+_HEAD = Template("""
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <meta name="description" content="GUSTAV - KI-gestützte Lernplattform für Schulen">
@@ -108,36 +159,30 @@ class Layout(Component):
     <meta http-equiv="X-Content-Type-Options" content="nosniff">
     <meta http-equiv="X-Frame-Options" content="SAMEORIGIN">
 
-    <title>{self.escape(self.title)} - GUSTAV</title>
+    <title>{title} - GUSTAV</title>
 
     <!-- Favicon -->
     <link rel="icon" href="/static/favicon.ico">
 
-    <!-- Custom CSS (no external dependencies) -->
-    <link rel="stylesheet" href="/static/css/gustav.css?v=5">
+    <!-- Custom CSS (no external dependencies); URLs are content-fingerprinted -->
+    <link rel="stylesheet" href="{css_gustav}">
 
     <!-- HTMX for interactivity (local copy) -->
-    <SCRIPT src="/static/js/vendor/htmx.min.js"></SCRIPT>
+    <SCRIPT src="{js_htmx}"></SCRIPT>
     <!-- Sortable.js for drag-and-drop -->
-    <SCRIPT src="/static/js/vendor/Sortable.min.js?v=4"></SCRIPT>
+    <SCRIPT src="{js_sortable_min}"></SCRIPT>
     <!-- HTMX Sortable Extension (local integration) -->
-    <SCRIPT src="/static/js/vendor/sortable.js?v=4"></SCRIPT>
+    <SCRIPT src="{js_sortable_ext}"></SCRIPT>
 
     <!-- Minimal custom JavaScript -->
-    <SCRIPT src="/static/js/gustav.js?v=6" defer></SCRIPT>
+    <SCRIPT src="{js_gustav}" defer></SCRIPT>
     <!-- Learning uploads enhancement (toggle + upload-intents) -->
-    <SCRIPT src="/static/js/learning_upload.js?v=2" defer></SCRIPT>
-    """
-
-    def _render_main_inner(self, breadcrumb_html: str) -> str:
-        """Render the inner markup of the main content column.
+    <SCRIPT src="{js_learning_upload}" defer></SCRIPT>
+    """)
 
-        Returns only the children of <main> so HTMX fragment swaps can replace
-        innerHTML without nesting <main> elements.
-        """
-        return f"""
-        {breadcrumb_html}
-        {self.content}
+_MAIN_INNER = Template("""
+        {breadcrumbs}
+        {content}
 
         <!-- Footer integrated into main content -->
         <footer class="content-footer" role="contentinfo" aria-label="Seitenfuß">
@@ -151,4 +196,10 @@ class Layout(Component):
                 </p>
             </div>
         </footer>
-        """
+        """)
+
+
+@lru_cache(maxsize=8)
+def _head_template(urls: Tuple[str, ...]) -> Template:
+    """Bake the current asset URLs into the head; only the title stays a slot."""
+    return _HEAD.partial(**dict(zip(_HEAD_ASSETS, urls)))
@@ -8,9 +8,20 @@ Why:
 Security model:
 - Let a markdown parser build the HTML (with HTML input disabled).
 - Sanitize the output via a small whitelist so only known-safe tags remain.
+
+Performance:
+- Rendered HTML is kept in a bounded LRU keyed by the SHA-256 of the source and
+  a fingerprint of the renderer configuration (parser options + whitelist), so
+  the same released material is not re-rendered for every student and poll.
+  Changing the whitelist or `_RENDERER_VERSION` invalidates all entries.
 """
 from __future__ import annotations
 
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
+
 from markdown_it import MarkdownIt
 import bleach
 
@@ -63,6 +74,107 @@ _MD = MarkdownIt(
 ).enable("table")
 
 
+# Bump when rendering output changes in ways the fingerprint below cannot see
+# (e.g., markdown-it plugins or post-processing).
+_RENDERER_VERSION = "1"
+_RENDERER_FINGERPRINT = hashlib.sha256(
+    repr(
+        (
+            _RENDERER_VERSION,
+            sorted(_ALLOWED_TAGS),
+            sorted((k, sorted(v)) for k, v in _ALLOWED_ATTRIBUTES.items()),
+            sorted(_ALLOWED_PROTOCOLS),
+            sorted(_MD.options.items()),
+        )
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+# Sources larger than this are rendered but not cached to keep memory bounded.
+_CACHE_MAX_SOURCE_BYTES = 256 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+class _RenderCache:
+    """Bounded LRU of content hash → sanitized HTML with hit/miss counters."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max = max_entries
+        self._lock = Lock()
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            html = self._data.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key: str, html: str) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[key] = html
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "max_entries": self._max,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+_CACHE = _RenderCache(_env_int("MARKDOWN_RENDER_CACHE_MAX_ENTRIES", 2048))
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the render cache (exposed at `/internal/metrics/caches`)."""
+    return _CACHE.stats()
+
+
+def clear_render_cache() -> None:
+    _CACHE.clear()
+
+
+def _render_uncached(src: str) -> str:
+    # Parse markdown to HTML with tables enabled and HTML input disabled.
+    html = _MD.render(src)
+
+    # Sanitize to a minimal whitelist to keep XSS surface small.
+    cleaned = bleach.clean(
+        html,
+        tags=_ALLOWED_TAGS,
+        attributes=_ALLOWED_ATTRIBUTES,
+        protocols=_ALLOWED_PROTOCOLS,
+        strip=False,
+    )
+    return cleaned.strip()
+
+
 def render_markdown_safe(src: str) -> str:
     """Render teacher-authored markdown to safe HTML for students.
 
@@ -80,16 +192,14 @@ def render_markdown_safe(src: str) -> str:
     """
     if not src:
         return ""
-
-    # Parse markdown to HTML with tables enabled and HTML input disabled.
-    html = _MD.render(str(src))
-
-    # Sanitize to a minimal whitelist to keep XSS surface small.
-    cleaned = bleach.clean(
-        html,
-        tags=_ALLOWED_TAGS,
-        attributes=_ALLOWED_ATTRIBUTES,
-        protocols=_ALLOWED_PROTOCOLS,
-        strip=False,
-    )
-    return cleaned.strip()
+    text = str(src)
+    raw = text.encode("utf-8", "surrogatepass")
+    if len(raw) > _CACHE_MAX_SOURCE_BYTES:
+        return _render_uncached(text)
+    key = _RENDERER_FINGERPRINT + ":" + hashlib.sha256(raw).hexdigest()
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return cached
+    html = _render_uncached(text)
+    _CACHE.put(key, html)
+    return html
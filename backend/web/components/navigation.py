@@ -5,8 +5,10 @@ Role-based navigation that adapts to user type (student/teacher/admin).
 All links use HTMX for SPA-like navigation without page reloads.
 """
 
+from functools import lru_cache
 from typing import Optional, Dict, Any, List, Tuple, Set
 from .base import Component
+from .compiled import Template
 
 # ---------------------------------------------------------------------------
 # Route registry
@@ -57,66 +59,10 @@ class Navigation(Component):
         """Render navigation based on user role with collapsible sidebar"""
 
         if not self.user:
-            # Public navigation for non-authenticated users
-            return self._render_public_nav()
+            # Public navigation for non-authenticated users (fully static)
+            return _compiled_public("nav")
 
-        # Build navigation tree (supports future submenus)
-        nav_tree = self._get_nav_tree()
-
-        # Determine the single active href using "best prefix match"
-        # Then mark parent as active if any child matches
-        self._active_href = self._determine_active_href_from_tree(nav_tree)
-        self._active_parents = self._determine_active_parents(nav_tree, self._active_href)
-
-        # Build navigation HTML from tree
-        links = [self._render_nav_item(item) for item in nav_tree]
-
-        # Add logout link at the end
-        links.append(self._render_logout())
-
-        role_de = self._role_de(self.user.get("role")) if self.user else ""
-        name = self.user.get("name", "") if self.user else ""
-        return f"""
-    <!-- Sidebar Toggle Button -->
-    <button class="sidebar-toggle"
-            type="button"
-            data-action="sidebar-toggle"
-            aria-label="Navigation umschalten"
-            aria-controls="sidebar"
-            aria-expanded="false">
-        <span class="sidebar-toggle-icon">☰</span>
-    </button>
-
-    <!-- Collapsible Sidebar -->
-    <aside class="sidebar" id="sidebar" aria-label="Seitenleiste">
-        <nav class="sidebar-nav" role="navigation" aria-label="Hauptnavigation">
-            <div class="sidebar-header">
-                <span class="sidebar-logo" aria-hidden="true"></span>
-                <span class="sidebar-title">GUSTAV</span>
-            </div>
-
-            <div class="sidebar-items">
-                {''.join(links)}
-            </div>
-
-            <div class="sidebar-footer">
-                <div class="user-info-compact">
-                    <span class="nav-icon">👤</span>
-                    <div class="nav-text">
-                        <div class="user-name">{self.escape(name)}</div>
-                        <div class="user-role">{self.escape(role_de)}</div>
-                    </div>
-                </div>
-            </div>
-        </nav>
-    </aside>
-
-    <!-- Mobile Overlay -->
-    <div class="sidebar-overlay"
-         data-action="sidebar-close"
-         role="button"
-         tabindex="0"
-         aria-label="Navigation schließen"></div>"""
+        return self._user_shell("full").render(**self._user_slots())
 
     def render_aside(self, oob: bool = False) -> str:
         """Render only the sidebar <aside> element (for OOB updates via HTMX)
@@ -131,41 +77,34 @@ class Navigation(Component):
         # Public navigation for non-authenticated users
         if not self.user:
             # Public sidebar (without toggle & overlay)
-            return self._render_public_aside(oob=oob)
+            return _compiled_public("aside_oob" if oob else "aside")
+
+        # Logout control is part of the cached shell, so OOB updates keep it too
+        variant = "aside_oob" if oob else "aside"
+        return self._user_shell(variant).render(**self._user_slots())
 
+    def _user_shell(self, variant: str) -> Template:
+        """Return the cached shell for this user's menu and active entry.
+
+        Only the menu (derived from the role) and the active href influence
+        the links, so the compiled shell is shared by all users of a role on
+        the same section of the app; name and role label stay slots.
+        """
         nav_tree = self._get_nav_tree()
         self._active_href = self._determine_active_href_from_tree(nav_tree)
         self._active_parents = self._determine_active_parents(nav_tree, self._active_href)
-        links = [self._render_nav_item(item) for item in nav_tree]
-        # Ensure logout control is also present in OOB sidebar updates
-        links.append(self._render_logout())
-
-        oob_attr = ' hx-swap-oob="true"' if oob else ''
-        role_de = self._role_de(self.user.get("role")) if self.user else ""
-        name = self.user.get("name", "") if self.user else ""
-        return f"""
-    <aside class="sidebar" id="sidebar" aria-label="Seitenleiste"{oob_attr}>
-        <nav class="sidebar-nav" role="navigation" aria-label="Hauptnavigation">
-            <div class="sidebar-header">
-                <span class="sidebar-logo" aria-hidden="true"></span>
-                <span class="sidebar-title">GUSTAV</span>
-            </div>
-
-            <div class="sidebar-items">
-                {''.join(links)}
-            </div>
+        frozen = tuple(
+            (href, text, icon, tuple(children) if children else None)
+            for href, text, icon, children in nav_tree
+        )
+        return _compiled_user_shell(variant, frozen, self._active_href)
 
-            <div class="sidebar-footer">
-                <div class="user-info-compact">
-                    <span class="nav-icon">👤</span>
-                    <div class="nav-text">
-                        <div class="user-name">{self.escape(name)}</div>
-                        <div class="user-role">{self.escape(role_de)}</div>
-                    </div>
-                </div>
-            </div>
-        </nav>
-    </aside>"""
+    def _user_slots(self) -> Dict[str, str]:
+        data = self.user or {}
+        return {
+            "name": self.escape(data.get("name", "")),
+            "role": self.escape(self._role_de(data.get("role"))),
+        }
 
     def _render_public_nav(self) -> str:
         """Navigation for non-authenticated users"""
@@ -400,3 +339,101 @@ class Navigation(Component):
             "admin": "Administrator",
         }
         return mapping.get((role or "").lower(), "Nutzer")
+
+
+# ---------------------------------------------------------------------------
+# Compiled shells
+# ---------------------------------------------------------------------------
+
+_FULL_SHELL = Template("""
+    <!-- Sidebar Toggle Button -->
+    <button class="sidebar-toggle"
+            type="button"
+            data-action="sidebar-toggle"
+            aria-label="Navigation umschalten"
+            aria-controls="sidebar"
+            aria-expanded="false">
+        <span class="sidebar-toggle-icon">☰</span>
+    </button>
+
+    <!-- Collapsible Sidebar -->
+    <aside class="sidebar" id="sidebar" aria-label="Seitenleiste">
+        <nav class="sidebar-nav" role="navigation" aria-label="Hauptnavigation">
+            <div class="sidebar-header">
+                <span class="sidebar-logo" aria-hidden="true"></span>
+                <span class="sidebar-title">GUSTAV</span>
+            </div>
+
+            <div class="sidebar-items">
+                {links}
+            </div>
+
+            <div class="sidebar-footer">
+                <div class="user-info-compact">
+                    <span class="nav-icon">👤</span>
+                    <div class="nav-text">
+                        <div class="user-name">{name}</div>
+                        <div class="user-role">{role}</div>
+                    </div>
+                </div>
+            </div>
+        </nav>
+    </aside>
+
+    <!-- Mobile Overlay -->
+    <div class="sidebar-overlay"
+         data-action="sidebar-close"
+         role="button"
+         tabindex="0"
+         aria-label="Navigation schließen"></div>""")
+
+_ASIDE_SHELL = Template("""
+    <aside class="sidebar" id="sidebar" aria-label="Seitenleiste"{oob_attr}>
+        <nav class="sidebar-nav" role="navigation" aria-label="Hauptnavigation">
+            <div class="sidebar-header">
+                <span class="sidebar-logo" aria-hidden="true"></span>
+                <span class="sidebar-title">GUSTAV</span>
+            </div>
+
+            <div class="sidebar-items">
+                {links}
+            </div>
+
+            <div class="sidebar-footer">
+                <div class="user-info-compact">
+                    <span class="nav-icon">👤</span>
+                    <div class="nav-text">
+                        <div class="user-name">{name}</div>
+                        <div class="user-role">{role}</div>
+                    </div>
+                </div>
+            </div>
+        </nav>
+    </aside>""")
+
+
+@lru_cache(maxsize=128)
+def _compiled_user_shell(variant: str, nav_tree: Tuple[Tuple[str, str, str, Optional[Tuple[Tuple[str, str, str], ...]]], ...], active_href: str) -> Template:
+    """Render the links for (menu, active href) once and bake them into the shell.
+
+    Keys are bounded: a handful of role menus × the hrefs of each menu.
+    """
+    renderer = Navigation(None)
+    renderer._active_href = active_href
+    renderer._active_parents = renderer._determine_active_parents(list(nav_tree), active_href)
+    links = [renderer._render_nav_item(item) for item in nav_tree]
+    links.append(renderer._render_logout())
+    links_html = "".join(links)
+    if variant == "full":
+        return _FULL_SHELL.partial(links=links_html)
+    oob_attr = ' hx-swap-oob="true"' if variant == "aside_oob" else ""
+    return _ASIDE_SHELL.partial(links=links_html, oob_attr=oob_attr)
+
+
+@lru_cache(maxsize=None)
+def _compiled_public(variant: str) -> str:
+    """Public navigation never depends on the request; render each variant once."""
+    renderer = Navigation(None)
+    if variant == "nav":
+        return renderer._render_public_nav()
+    return renderer._render_public_aside(oob=variant == "aside_oob")
@@ -0,0 +1,174 @@
+"""
+Streaming-aware gzip compression for dynamic responses (HTML, HTMX fragments, JSON).
+
+Why:
+    SSR pages and HTMX fragments (live matrix, history lists with rendered
+    feedback Markdown) were sent uncompressed, and the reverse proxy does not
+    reliably compress dynamic upstream responses. Markup compresses 5–10×, which
+    matters on school Wi-Fi.
+
+Behavior:
+    - Applies only when the client accepts gzip and the response has a
+      content type from the allowlist, no existing `Content-Encoding`, no
+      `Cache-Control: no-transform`, and is not a HEAD/range/partial response.
+    - Single-message bodies below the threshold pass through unchanged.
+    - Streamed bodies (`more_body=True`) are compressed incrementally with a
+      sync flush per chunk, so each chunk still reaches the client when it is
+      sent. `text/event-stream` is never in the allowlist: SSE passes through
+      untouched.
+    - Strong ETags become weak on compressed responses (different bytes, same
+      semantics); `If-None-Match` comparison in `routes.conditional` is weak.
+    - BREACH: compressed HTML carries the session CSRF token. `main` masks it
+      with a fresh one-time pad per render (`_mask_csrf_token`), so response
+      sizes reveal nothing about the secret.
+
+Configuration:
+    RESPONSE_COMPRESSION=off            disable the middleware entirely
+    RESPONSE_COMPRESSION_MIN_BYTES=1024 threshold for single-message bodies
+    RESPONSE_COMPRESSION_LEVEL=6        gzip level 1–9
+"""
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+
+def _env_int(name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return min(max(value, lo), hi)
+
+
+def _accepts_gzip(headers: Headers) -> bool:
+    for part in headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() not in ("gzip", "*"):
+            continue
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                return float(value) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _compressible(headers: Headers, types: Iterable[str]) -> bool:
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    media_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return media_type in types
+
+
+class CompressionMiddleware:
+    """Pure ASGI gzip middleware; see module docstring for the rules."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: Optional[int] = None,
+        level: Optional[int] = None,
+        content_types: Iterable[str] = COMPRESSIBLE_TYPES,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else _env_int("RESPONSE_COMPRESSION_MIN_BYTES", 1024, 0, 1 << 30)
+        self.level = level if level is not None else _env_int("RESPONSE_COMPRESSION_LEVEL", 6, 1, 9)
+        self.content_types = tuple(content_types)
+        self.enabled = (os.getenv("RESPONSE_COMPRESSION") or "on").strip().lower() not in ("0", "off", "false", "no")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers or not _accepts_gzip(request_headers):
+            await self.app(scope, receive, send)
+            return
+        await _GzipResponder(self, send).run(scope, receive)
+
+
+class _GzipResponder:
+    def __init__(self, config: CompressionMiddleware, send: Send) -> None:
+        self.config = config
+        self.send = send
+        self.start: Optional[Message] = None
+        self.mode: Optional[str] = None  # "passthrough" | "gzip"
+        self.compressor: Optional["zlib._Compress"] = None
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.config.app(scope, receive, self.on_send)
+
+    async def on_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            status = int(message.get("status", 200))
+            headers = Headers(raw=message.get("headers") or [])
+            eligible = status not in (204, 206, 304) and status >= 200 and _compressible(headers, self.config.content_types)
+            if not eligible:
+                self.mode = "passthrough"
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        if self.mode == "passthrough":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = bool(message.get("more_body", False))
+        if self.mode is None:
+            assert self.start is not None
+            if not more_body and len(body) < self.config.minimum_size:
+                self.mode = "passthrough"
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.mode = "gzip"
+            # wbits=31 → gzip container
+            self.compressor = zlib.compressobj(self.config.level, zlib.DEFLATED, 31)
+            headers = MutableHeaders(raw=list(self.start.get("headers") or []))
+            headers["Content-Encoding"] = "gzip"
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+                chunk = self.compressor.compress(body) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+                await self.send({**self.start, "headers": headers.raw})
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                compressed = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send({**self.start, "headers": headers.raw})
+                await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+            return
+
+        assert self.compressor is not None
+        if more_body:
+            chunk = self.compressor.compress(body) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        else:
+            chunk = self.compressor.compress(body) + self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,231 @@
+"""
+Structured fan-out for independent SSR data fetches, with per-call spans.
+
+Why:
+    SSR handlers awaited independent internal API calls one after another
+    (unit title, sections, materials, tasks, ...), so page latency was the sum
+    of all round trips. `FanOut` starts them concurrently and keeps the usual
+    SSR contract: every call is best effort (failures and timeouts yield the
+    caller's default instead of failing the page), and no task outlives the
+    `async with` block.
+
+Usage:
+    async with FanOut() as fan:
+        units = fan.start("units", lambda: client.get(...), default=None)
+        sections = fan.start("sections", lambda: client.get(...), default=None)
+        r_units, r_sections = await units, await sections
+
+    results = await fan_out({"a": fetch_a, "b": fetch_b}, defaults={"a": [], "b": []})
+
+Tracing:
+    Each call records a span (name, duration, outcome). With
+    `SSR_SERVER_TIMING=1`, `ServerTimingMiddleware` reports the spans of a
+    request as a `Server-Timing` header (visible in browser devtools) and
+    marks the longest one as the critical path. When OpenTelemetry is
+    installed, spans are also exported via the `gustav.ssr` tracer.
+    Per-call timeout: `SSR_FETCH_TIMEOUT_SECONDS` (default 10).
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Mapping, Optional, TypeVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # optional: export spans when OpenTelemetry is configured
+    from opentelemetry import trace as _otel_trace  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    _otel_trace = None  # type: ignore
+
+logger = logging.getLogger("gustav.web.fanout")
+
+T = TypeVar("T")
+
+
+def _default_timeout() -> Optional[float]:
+    try:
+        value = float((os.getenv("SSR_FETCH_TIMEOUT_SECONDS") or "").strip() or 10)
+    except ValueError:
+        return 10.0
+    return value if value > 0 else None
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: float = 0.0
+    outcome: str = "ok"  # ok | error | timeout | cancelled
+
+    @property
+    def duration_ms(self) -> float:
+        return max(0.0, (self.end or time.perf_counter()) - self.start) * 1000
+
+
+# Request-scoped span sink; set by ServerTimingMiddleware when enabled.
+_REQUEST_SPANS: ContextVar[Optional[List[Span]]] = ContextVar("gustav_ssr_spans", default=None)
+
+
+def critical_path(spans: List[Span]) -> Optional[Span]:
+    """Longest span of a concurrent batch: the call the page actually waited for."""
+    return max(spans, key=lambda s: s.duration_ms, default=None)
+
+
+class Pending(Generic[T]):
+    """Awaitable handle for a started call; resolves to its value or default.
+
+    `outcome` tells a default caused by a failure ("error", "timeout") apart
+    from a real value ("ok"), e.g. to answer 502/503 instead of 404.
+    """
+
+    __slots__ = ("_task", "_span")
+
+    def __init__(self, task: "asyncio.Task[T]", span: Span) -> None:
+        self._task = task
+        self._span = span
+
+    def __await__(self):
+        return self._task.__await__()
+
+    @property
+    def outcome(self) -> str:
+        return self._span.outcome
+
+
+class FanOut:
+    """Async context manager that runs started calls concurrently.
+
+    - Errors and timeouts are isolated per call (logged, default returned).
+    - Leaving the block cancels calls that are still running, so handlers
+      that return early (e.g., 404) or clients that disconnect mid-stream do
+      not leave work behind.
+    """
+
+    def __init__(self, *, timeout: Optional[float] = None) -> None:
+        self.timeout = timeout if timeout is not None else _default_timeout()
+        self.spans: List[Span] = []
+        self._tasks: List[asyncio.Task] = []
+
+    async def __aenter__(self) -> "FanOut":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pending = [t for t in self._tasks if not t.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self.spans and logger.isEnabledFor(logging.DEBUG):
+            slowest = critical_path(self.spans)
+            logger.debug(
+                "ssr fan-out: %s; critical path %s (%.1f ms)",
+                ", ".join(f"{s.name}={s.duration_ms:.1f}ms/{s.outcome}" for s in self.spans),
+                slowest.name if slowest else "-",
+                slowest.duration_ms if slowest else 0.0,
+            )
+
+    def start(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        default: T,
+        timeout: Optional[float] = None,
+    ) -> Pending[T]:
+        """Start `fn()` now; awaiting the handle yields its result or `default`."""
+        span = Span(name=name, start=time.perf_counter())
+        self.spans.append(span)
+        sink = _REQUEST_SPANS.get()
+        if sink is not None:
+            sink.append(span)
+        limit = timeout if timeout is not None else self.timeout
+        task = asyncio.create_task(self._run(span, fn, default, limit))
+        self._tasks.append(task)
+        return Pending(task, span)
+
+    async def _run(self, span: Span, fn: Callable[[], Awaitable[T]], default: T, limit: Optional[float]) -> T:
+        otel = _otel_trace.get_tracer("gustav.ssr").start_as_current_span(f"ssr.{span.name}") if _otel_trace else contextlib.nullcontext()
+        try:
+            with otel:
+                if limit:
+                    return await asyncio.wait_for(fn(), timeout=limit)
+                return await fn()
+        except asyncio.TimeoutError:
+            span.outcome = "timeout"
+            logger.warning("ssr fetch %s timed out after %.1fs", span.name, limit or 0)
+            return default
+        except asyncio.CancelledError:
+            span.outcome = "cancelled"
+            raise
+        except Exception as exc:
+            span.outcome = "error"
+            logger.warning("ssr fetch %s failed: %s", span.name, exc.__class__.__name__)
+            return default
+        finally:
+            span.end = time.perf_counter()
+
+
+async def fan_out(
+    calls: Mapping[str, Callable[[], Awaitable[Any]]],
+    *,
+    defaults: Optional[Mapping[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Run independent calls concurrently and return {name: value-or-default}."""
+    defaults = defaults or {}
+    async with FanOut(timeout=timeout) as fan:
+        handles = {name: fan.start(name, fn, default=defaults.get(name)) for name, fn in calls.items()}
+        return {name: await handle for name, handle in handles.items()}
+
+
+def _server_timing_value(spans: List[Span]) -> str:
+    slowest = critical_path(spans)
+    parts = []
+    for index, span in enumerate(spans):
+        token = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in span.name)
+        entry = f"ssr.{index}.{token};dur={span.duration_ms:.1f}"
+        desc = span.outcome if span.outcome != "ok" else ""
+        if span is slowest:
+            desc = f"critical {desc}".strip()
+        if desc:
+            entry += f';desc="{desc}"'
+        parts.append(entry)
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """Expose fan-out spans as a `Server-Timing` header (opt-in, `SSR_SERVER_TIMING=1`).
+
+    Spans finished before the response starts are reported; for streamed
+    pages that is the part of the work done before the shell was flushed.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.enabled = (os.getenv("SSR_SERVER_TIMING") or "").strip().lower() in ("1", "true", "yes", "on")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        spans: List[Span] = []
+        token = _REQUEST_SPANS.set(spans)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and spans:
+                headers = MutableHeaders(raw=list(message.get("headers") or []))
+                headers.append("Server-Timing", _server_timing_value(spans))
+                message = {**message, "headers": headers.raw}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _REQUEST_SPANS.reset(token)
@@ -9,12 +9,12 @@ import uuid
 import secrets
 import mimetypes
 import json
-from typing import Optional, Dict, Any, List, Mapping
+from typing import Optional, Dict, Any, List, Mapping, AsyncIterator
 from datetime import datetime, timezone
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Component Imports
 from components import (
@@ -32,11 +32,20 @@ from components.forms.unit_edit_form import UnitEditForm
 from components.base import Component
 from components.pages import SciencePage
 from components.forms.course_edit_form import CourseEditForm
+from static_assets import PrecompressedStaticFiles
+from compression import CompressionMiddleware
+from fanout import FanOut, Pending, ServerTimingMiddleware
+from backend.storage.blobs import blob_repo_from_env, set_blob_repo
+from backend.storage.ingest_ledger import ingest_ledger_from_env, set_ingest_ledger
+from backend.storage.preview_jobs import preview_queue_from_env, set_preview_queue
+from backend.storage.previews import material_preview_key, sign_previews
+from backend.storage.signed_url_cache import presign_downloads
 
 # Auth & OIDC Imports
 from identity_access.oidc import OIDCClient, OIDCConfig
-from identity_access.stores import StateStore, SessionStore
+from identity_access.stores import StateStore, SessionStore, CsrfTokenStore
 from identity_access.domain import ALLOWED_ROLES
+from identity_access.guard_memo import GuardMemoMiddleware
 from identity_access.tokens import IDTokenVerificationError, verify_id_token
 import sys as _sys
 
@@ -110,13 +119,15 @@ app = FastAPI(title="GUSTAV alpha-2", description="KI-gestützte Lernplattform",
 # --- Static Files & Routers -----------------------------------------------------
 
 static_dir = Path(__file__).parent / "static"
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# Fingerprinted assets (see static_assets.py) are served immutable + precompressed
+app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
 
 from routes.auth import auth_router
 from routes.learning import learning_router
 from routes.teaching import teaching_router
 from routes.users import users_router
 from routes.operations import operations_router
+from routes.uploads import uploads_router
 from routes.security import _is_same_origin
 
 # --- Optional Storage Adapter Wiring (Supabase) -------------------------------
@@ -142,13 +153,25 @@ def load_oidc_config() -> OIDCConfig:
 
 OIDC_CFG = load_oidc_config()
 OIDC = OIDCClient(OIDC_CFG)
-STATE_STORE = StateStore()
 
 def _under_pytest() -> bool:
     import sys
     return "pytest" in sys.modules or bool(os.getenv("PYTEST_CURRENT_TEST"))
 
-if (not _under_pytest()) and os.getenv("SESSIONS_BACKEND", "memory").lower() == "db":
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+_SESSIONS_BACKEND = os.getenv("SESSIONS_BACKEND", "memory").lower()
+# State/CSRF follow the session backend unless explicitly overridden. With more
+# than one uvicorn worker (or container) they must be shared, i.e. "db".
+_AUTH_STATE_BACKEND = (os.getenv("AUTH_STATE_BACKEND") or _SESSIONS_BACKEND).lower()
+_CSRF_TTL_SECONDS = _env_int("CSRF_TOKEN_TTL_SECONDS", 3600)
+
+if (not _under_pytest()) and _SESSIONS_BACKEND == "db":
     try:
         from identity_access.stores_db import DBSessionStore
         SESSION_STORE = DBSessionStore()
@@ -157,6 +180,34 @@ if (not _under_pytest()) and os.getenv("SESSIONS_BACKEND", "memory").lower() ==
 else:
     SESSION_STORE = SessionStore()
 
+if (not _under_pytest()) and _AUTH_STATE_BACKEND == "db":
+    try:
+        from identity_access.stores_db import DBStateStore, DBCsrfTokenStore
+        STATE_STORE = DBStateStore()
+        CSRF_STORE = DBCsrfTokenStore(ttl_seconds=_CSRF_TTL_SECONDS)
+    except ImportError:
+        STATE_STORE = StateStore(max_entries=_env_int("AUTH_STATE_MAX_ENTRIES", 10_000))
+        CSRF_STORE = CsrfTokenStore(ttl_seconds=_CSRF_TTL_SECONDS, max_entries=_env_int("CSRF_MAX_ENTRIES", 50_000))
+else:
+    STATE_STORE = StateStore(max_entries=_env_int("AUTH_STATE_MAX_ENTRIES", 10_000))
+    CSRF_STORE = CsrfTokenStore(ttl_seconds=_CSRF_TTL_SECONDS, max_entries=_env_int("CSRF_MAX_ENTRIES", 50_000))
+
+# Content-addressed submission blobs (backend.storage.blobs): off unless
+# CONTENT_BLOBS_BACKEND=db provides the shared registry.
+if not _under_pytest():
+    set_blob_repo(blob_repo_from_env())
+
+# Verified-ingest ledger (backend.storage.ingest_ledger): shared via Postgres
+# when INGEST_LEDGER_BACKEND (default SESSIONS_BACKEND) is "db", so uploads and
+# finalization on different workers still meet.
+if not _under_pytest():
+    set_ingest_ledger(ingest_ledger_from_env())
+
+# Preview derivation (backend.storage.preview_jobs): queued for the learning
+# worker unless PREVIEW_JOBS_BACKEND=inline (or no database is configured).
+if not _under_pytest():
+    set_preview_queue(preview_queue_from_env())
+
 # --- Auth Helpers & Middleware --------------------------------------------------
 
 def _session_cookie_options() -> dict:
@@ -187,64 +238,74 @@ def _set_session_cookie(response: Response, value: str, *, max_age: int | None =
 def _is_public_path(path: str) -> bool:
     return path.startswith(("/auth/", "/static/")) or path in ("/health", "/favicon.ico")
 
-@app.middleware("http")
-async def auth_enforcement(request: Request, call_next):
-    path = request.url.path
-    if _is_public_path(path):
-        return await call_next(request)
+class AuthEnforcementMiddleware:
+    """Redirect/401 unauthenticated requests and expose `request.state.user`.
 
-    sid = request.cookies.get(SESSION_COOKIE_NAME)
-    rec = None
-    if sid:
-        try:
-            rec = SESSION_STORE.get(sid)
-        except Exception as exc:
-            logger.warning("Session store get failed: %s", exc.__class__.__name__)
-
-    if not rec:
-        if path.startswith("/api/") or path.startswith("/internal/"):
-            headers = {"Cache-Control": "private, no-store", "Vary": "Origin"}
-            return JSONResponse({"error": "unauthenticated"}, status_code=401, headers=headers)
-        if "HX-Request" in request.headers:
-            # Security: prevent intermediaries from caching unauthenticated HTMX responses
-            return Response(status_code=401, headers={"HX-Redirect": "/auth/login", "Cache-Control": "private, no-store", "Vary": "HX-Request"})
-        return RedirectResponse(url="/auth/login", status_code=302)
+    Pure ASGI middleware: unlike `@app.middleware("http")` it does not wrap the
+    downstream response in an extra task and memory stream, which matters for
+    SSE and streamed downloads.
+    """
 
-    # Expose minimal, read-only user context for downstream handlers.
-    request.state.user = {"sub": rec.sub, "name": getattr(rec, "name", ""), "role": _primary_role(rec.roles), "roles": rec.roles}
-    # Also expose the raw id_token for logout flows to hint the IdP, but do not
-    # leak it to templates or clients. This stays on the server-side request state.
-    try:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_public_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        path = scope["path"]
+        sid = request.cookies.get(SESSION_COOKIE_NAME)
+        rec = None
+        if sid:
+            try:
+                rec = SESSION_STORE.get(sid)
+            except Exception as exc:
+                logger.warning("Session store get failed: %s", exc.__class__.__name__)
+
+        if not rec:
+            if path.startswith("/api/") or path.startswith("/internal/"):
+                headers = {"Cache-Control": "private, no-store", "Vary": "Origin"}
+                response: Response = JSONResponse({"error": "unauthenticated"}, status_code=401, headers=headers)
+            elif "HX-Request" in request.headers:
+                # Security: prevent intermediaries from caching unauthenticated HTMX responses
+                response = Response(status_code=401, headers={"HX-Redirect": "/auth/login", "Cache-Control": "private, no-store", "Vary": "HX-Request"})
+            else:
+                response = RedirectResponse(url="/auth/login", status_code=302)
+            await response(scope, receive, send)
+            return
+
+        # Expose minimal, read-only user context for downstream handlers.
+        request.state.user = {"sub": rec.sub, "name": getattr(rec, "name", ""), "role": _primary_role(rec.roles), "roles": rec.roles}
+        # Also expose the raw id_token for logout flows to hint the IdP, but do not
+        # leak it to templates or clients. This stays on the server-side request state.
         request.state.id_token = getattr(rec, "id_token", None)
-    except Exception:
-        request.state.id_token = None
-    return await call_next(request)
+        await self.app(scope, receive, send)
 
 # --- Security Headers Middleware ----------------------------------------------
 
-@app.middleware("http")
-async def security_headers(request: Request, call_next):
-    response = await call_next(request)
-    # Baseline defensive headers
-    # Build connect-src dynamically to allow the configured public Supabase URL
-    # if it differs from the app origin. This keeps uploads working during
+_SECURITY_HEADERS: dict[tuple[str, str], tuple[tuple[bytes, bytes], ...]] = {}
+
+
+def _build_security_headers(environment: str, supabase_public_url: str) -> tuple[tuple[bytes, bytes], ...]:
+    # Build connect-src to allow the configured public Supabase URL if it
+    # differs from the app origin. This keeps uploads working during
     # transitions (e.g., subdomain vs. same-origin path proxy) without
     # weakening CSP more than necessary.
     extra_connect = []
     try:
-        pub = (os.getenv("SUPABASE_PUBLIC_URL") or "").strip()
+        pub = supabase_public_url.strip()
         if pub:
             from urllib.parse import urlparse as _p
             p = _p(pub)
             if p.scheme and p.netloc:
                 # include scheme://host[:port] once
-                netloc = p.netloc
-                extra_connect.append(f"{p.scheme}://{netloc}")
+                extra_connect.append(f"{p.scheme}://{p.netloc}")
     except Exception:
         pass
     connect_src = "'self'" + (" " + " ".join(dict.fromkeys(extra_connect)) if extra_connect else "")
 
-    if SETTINGS.environment == "prod":
+    if environment == "prod":
         # Harden CSP in production: avoid 'unsafe-inline' to reduce XSS surface.
         csp = (
             "default-src 'self'; script-src 'self'; style-src 'self'; "
@@ -256,19 +317,75 @@ async def security_headers(request: Request, call_next):
             "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; "
             f"img-src 'self' data:; media-src 'self' data:; font-src 'self' data:; connect-src {connect_src};"
         )
-    response.headers.setdefault("Content-Security-Policy", csp)
-    response.headers.setdefault("X-Frame-Options", "SAMEORIGIN")
-    response.headers.setdefault("X-Content-Type-Options", "nosniff")
-    # Support Origin/Referer fallback in CSRF checks without leaking cross-site
-    # paths: strict-origin-when-cross-origin.
-    response.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
+    headers = [
+        ("Content-Security-Policy", csp),
+        ("X-Frame-Options", "SAMEORIGIN"),
+        ("X-Content-Type-Options", "nosniff"),
+        # Support Origin/Referer fallback in CSRF checks without leaking
+        # cross-site paths: strict-origin-when-cross-origin.
+        ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ]
     # Opt-in to stronger document isolation; mitigates certain cross-origin leaks.
-    if SETTINGS.environment == "prod":
-        response.headers.setdefault("Cross-Origin-Opener-Policy", "same-origin")
-    response.headers.setdefault("Permissions-Policy", "geolocation=(), microphone=(), camera=()")
+    if environment == "prod":
+        headers.append(("Cross-Origin-Opener-Policy", "same-origin"))
+    headers.append(("Permissions-Policy", "geolocation=(), microphone=(), camera=()"))
     # HSTS: always on (dev = prod)
-    response.headers.setdefault("Strict-Transport-Security", "max-age=31536000; includeSubDomains")
-    return response
+    headers.append(("Strict-Transport-Security", "max-age=31536000; includeSubDomains"))
+    return tuple((k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers)
+
+
+def _security_headers() -> tuple[tuple[bytes, bytes], ...]:
+    """Return the precomputed header set for the current configuration.
+
+    Header sets are built once per (environment, SUPABASE_PUBLIC_URL) and
+    reused; the lookup itself is two dict reads.
+    """
+    key = (SETTINGS.environment, os.getenv("SUPABASE_PUBLIC_URL") or "")
+    headers = _SECURITY_HEADERS.get(key)
+    if headers is None:
+        headers = _SECURITY_HEADERS.setdefault(key, _build_security_headers(*key))
+    return headers
+
+
+def reload_security_headers() -> None:
+    """Drop precomputed header sets (call after configuration changes) and rebuild."""
+    _SECURITY_HEADERS.clear()
+    _security_headers()
+
+
+class SecurityHeadersMiddleware:
+    """Add baseline security headers unless the route already set them."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        defaults = _security_headers()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw = list(message.get("headers") or [])
+                present = {name.lower() for name, _ in raw}
+                raw.extend(item for item in defaults if item[0] not in present)
+                message = {**message, "headers": raw}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# Registration order: the last added middleware is outermost, so security
+# headers also cover the 401/redirect responses of the auth gate, and
+# compression sees the final header set. The guard memo is innermost so it
+# also wraps in-process loopback calls, which enter at the outer layers.
+app.add_middleware(GuardMemoMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(AuthEnforcementMiddleware)
+app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(CompressionMiddleware)
+reload_security_headers()
 
 # --- Dummy Data Stores ----------------------------------------------------------
 
@@ -295,8 +412,6 @@ _DUMMY_SECTIONS_STORE = {
 
 # --- CSRF & Pagination Helpers --------------------------------------------------
 
-_CSRF_BY_SESSION: dict[str, str] = {}
-
 def _get_session_id(request: Request) -> Optional[str]:
     return request.cookies.get(SESSION_COOKIE_NAME)
 
@@ -336,21 +451,61 @@ def _internal_api_client():
     base, origin = _teaching_internal_base()
     return httpx.AsyncClient(transport=ASGITransport(app=app), base_url=base, headers={"Origin": origin})
 
+_CSRF_MASK_PREFIX = "m."
+
+
+def _mask_csrf_token(token: str) -> str:
+    """Return `token` XOR-ed with a fresh one-time pad (pad + masked bytes).
+
+    Pages are gzip-compressed (`compression.CompressionMiddleware`); a secret
+    repeated verbatim in compressed HTML leaks through response sizes
+    (BREACH). Masking makes every rendered copy differ, while
+    `_validate_csrf` recovers the session token.
+    """
+    import base64
+
+    raw = token.encode("utf-8")
+    pad = secrets.token_bytes(len(raw))
+    masked = bytes(a ^ b for a, b in zip(pad, raw))
+    return _CSRF_MASK_PREFIX + base64.urlsafe_b64encode(pad + masked).decode("ascii")
+
+
+def _unmask_csrf_token(value: str) -> str:
+    """Inverse of `_mask_csrf_token`; unmasked values are returned unchanged."""
+    if not value.startswith(_CSRF_MASK_PREFIX):
+        return value
+    import base64
+    import binascii
+
+    try:
+        data = base64.urlsafe_b64decode(value[len(_CSRF_MASK_PREFIX):].encode("ascii"))
+    except (binascii.Error, UnicodeEncodeError, ValueError):
+        return ""
+    if not data or len(data) % 2:
+        return ""
+    half = len(data) // 2
+    try:
+        return bytes(a ^ b for a, b in zip(data[:half], data[half:])).decode("utf-8")
+    except UnicodeDecodeError:
+        return ""
+
+
 def _get_or_create_csrf_token(session_id: str) -> str:
-    token = _CSRF_BY_SESSION.get(session_id)
-    if not token:
-        token = secrets.token_urlsafe(24)
-        _CSRF_BY_SESSION[session_id] = token
-    return token
+    """Session CSRF token, masked per call for embedding in responses."""
+    return _mask_csrf_token(CSRF_STORE.get_or_create(session_id))
 
 def _validate_csrf(session_id: Optional[str], form_value: Optional[str]) -> bool:
     if not session_id or not form_value:
         return False
-    expected = _CSRF_BY_SESSION.get(session_id)
+    try:
+        expected = CSRF_STORE.get(session_id)
+    except Exception as exc:
+        logger.warning("CSRF store get failed: %s", exc.__class__.__name__)
+        return False
     if not expected:
         return False
     import hmac
-    return hmac.compare_digest(expected, str(form_value))
+    return hmac.compare_digest(expected.encode("utf-8"), _unmask_csrf_token(str(form_value)).encode("utf-8"))
 
 def _clamp_pagination(limit_raw: str | None, offset_raw: str | None) -> tuple[int, int]:
     """Clamp pagination for SSR views.
@@ -394,10 +549,21 @@ def _resolve_storage_root() -> Path | None:
         return None
 
 
-def _compute_local_sha256(storage_key: str, expected_size: int) -> str | None:
-    """Best-effort compute sha256 for a stored object under STORAGE_VERIFY_ROOT."""
+def _compute_local_sha256(storage_key: str, expected_size: int, *, student_sub: str | None = None) -> str | None:
+    """Best-effort sha256 for a stored object under STORAGE_VERIFY_ROOT.
+
+    Uploads that passed through our stub/proxy for this student already have
+    their hash in the ingest ledger; otherwise the file is hashed in place
+    (mmap, chunked) instead of being read into memory.
+    """
     if not storage_key:
         return None
+    if student_sub:
+        from backend.storage.ingest_ledger import get_ingest_ledger
+
+        rec = get_ingest_ledger().lookup(storage_key, subject=student_sub)
+        if rec is not None:
+            return rec.sha256
     base = _resolve_storage_root()
     if base is None:
         return None
@@ -410,15 +576,15 @@ def _compute_local_sha256(storage_key: str, expected_size: int) -> str | None:
         return None
     if not target.exists() or not target.is_file():
         return None
+    from backend.storage.verification import hash_file_sha256
+
     try:
-        data = target.read_bytes()
+        digest, _size = hash_file_sha256(target)
     except Exception:
         return None
-    if expected_size > 0 and len(data) != expected_size:
-        # Prefer matching sizes; still hash the bytes to avoid blocking submissions.
-        pass
-    h = hashlib.sha256(); h.update(data)
-    return h.hexdigest()
+    # Sizes may differ from the form value; still return the hash to avoid
+    # blocking submissions (the API verifies size separately).
+    return digest
 
 
 def _build_task_submit_form_html(*, course_id: str, unit_id: str, task_id: str) -> str:
@@ -1032,6 +1198,47 @@ def _layout_response(
     return response
 
 
+def _layout_stream_response(
+    request: Request,
+    layout: Layout,
+    blocks: AsyncIterator[str],
+    *,
+    headers: dict[str, str] | None = None,
+) -> StreamingResponse:
+    """Stream a Layout: chrome first, then content blocks as they resolve.
+
+    Why:
+        Large teacher pages wait on several sub-queries. Flushing the head,
+        navigation and page header immediately lets the browser fetch CSS/JS
+        and paint while the slow blocks are still loading.
+    Parameters:
+        layout: Layout whose `content` is ignored; `blocks` provides it.
+        blocks: Async iterator yielding HTML chunks in document order.
+    Behavior:
+        - Same HTMX fragment/full-document rule and cache policy as
+          `_layout_response`; the concatenated body is identical.
+        - Status and headers are fixed before streaming starts, so callers
+          must finish authorization checks first.
+    Permissions:
+        None. Route handlers enforce access before calling this helper.
+    """
+    before, after = layout.render_around_content(fragment=bool(request.headers.get("HX-Request")))
+
+    async def body() -> AsyncIterator[str]:
+        yield before
+        async for chunk in blocks:
+            yield chunk
+        yield after
+
+    response = StreamingResponse(body(), media_type="text/html; charset=utf-8")
+    if getattr(request.state, "user", None) and not (headers and "Cache-Control" in headers):
+        response.headers["Cache-Control"] = "private, no-store"
+    if headers:
+        for key, value in headers.items():
+            response.headers[key] = value
+    return response
+
+
 @app.get("/courses/{course_id}/edit", response_class=HTMLResponse)
 async def courses_edit_form(request: Request, course_id: str):
     """Render the course edit form populated from API when possible.
@@ -1205,10 +1412,21 @@ async def learning_unit_sections(request: Request, course_id: str, unit_id: str)
             sid = request.cookies.get(SESSION_COOKIE_NAME)
             if sid:
                 client.cookies.set(SESSION_COOKIE_NAME, sid)
-            # Find unit title from units listing
+            # Unit title (from the units listing) and the released sections of
+            # this unit (with embedded materials/tasks) are independent.
+            async with FanOut() as fan:
+                units_call = fan.start("units", lambda: client.get(f"/api/learning/courses/{course_id}/units"), default=None)
+                sections_call = fan.start(
+                    "sections",
+                    lambda: client.get(
+                        f"/api/learning/courses/{course_id}/units/{unit_id}/sections",
+                        params={"include": "materials,tasks", "limit": 100, "offset": 0},
+                    ),
+                    default=None,
+                )
+                r_units, r_sections = await units_call, await sections_call
             try:
-                r_units = await client.get(f"/api/learning/courses/{course_id}/units")
-                if r_units.status_code == 200 and isinstance(r_units.json(), list):
+                if r_units is not None and r_units.status_code == 200 and isinstance(r_units.json(), list):
                     for row in r_units.json():
                         u = row.get("unit", {}) if isinstance(row, dict) else {}
                         if str(u.get("id")) == str(unit_id):
@@ -1218,14 +1436,8 @@ async def learning_unit_sections(request: Request, course_id: str, unit_id: str)
                             break
             except Exception:
                 pass
-            # Silence in production; errors handled gracefully below
-            # Fetch released sections for this unit (with embedded materials/tasks)
-            r_sections = await client.get(
-                f"/api/learning/courses/{course_id}/units/{unit_id}/sections",
-                params={"include": "materials,tasks", "limit": 100, "offset": 0},
-            )
             # Silent in production; errors handled below
-            if r_sections.status_code == 200 and isinstance(r_sections.json(), list):
+            if r_sections is not None and r_sections.status_code == 200 and isinstance(r_sections.json(), list):
                 sections = list(r_sections.json())
             if not sections:
                 # Fallback: fetch all released sections for the course and filter by unit.
@@ -1303,6 +1515,43 @@ async def learning_unit_sections(request: Request, course_id: str, unit_id: str)
     except Exception:
         sections = []
 
+    # Sign inline URLs for all file materials of the page in one batch; still-
+    # valid URLs are reused across students (see signed_url_cache). Derived
+    # previews (storage.previews) are signed in a second batch and shown first.
+    inline_urls: dict[str, dict] = {}
+    thumb_urls: dict[str, dict] = {}
+    file_keys = [
+        str(m.get("storage_key") or "")
+        for entry in sections
+        if isinstance(entry, dict)
+        for m in entry.get("materials", [])
+        if str(m.get("kind") or "") == "file" and m.get("storage_key") and m.get("mime_type")
+    ]
+    if file_keys:
+        try:
+            from teaching.services.materials import MaterialFileSettings  # type: ignore
+            import routes.teaching as teaching_routes  # type: ignore
+
+            settings = MaterialFileSettings()
+            adapter = getattr(teaching_routes, "STORAGE_ADAPTER", None)
+            if adapter is not None and hasattr(adapter, "presign_download"):
+                inline_urls = presign_downloads(
+                    adapter,
+                    bucket=settings.storage_bucket,
+                    keys=file_keys,
+                    expires_in=settings.download_url_ttl_seconds,
+                    disposition="inline",
+                )
+                thumb_urls = sign_previews(
+                    adapter,
+                    bucket=settings.storage_bucket,
+                    preview_keys=[material_preview_key(key) for key in inline_urls],
+                    expires_in=settings.download_url_ttl_seconds,
+                )
+        except Exception:
+            inline_urls = {}
+            thumb_urls = {}
+
     # Build HTML without section titles; separate groups with <hr>
     # For readability, render each material and each task as its own card.
     parts: list[str] = []
@@ -1327,20 +1576,8 @@ async def learning_unit_sections(request: Request, course_id: str, unit_id: str)
                 alt_text = str(m.get("alt_text") or "") or None
                 if mime and storage_key:
                     try:
-                        from teaching.services.materials import MaterialFileSettings  # type: ignore
-                        import routes.teaching as teaching_routes  # type: ignore
-
-                        settings = MaterialFileSettings()
-                        adapter = getattr(teaching_routes, "STORAGE_ADAPTER", None)
-                        presign = None
-                        if adapter is not None and hasattr(adapter, "presign_download"):
-                            presign = adapter.presign_download(  # type: ignore[call-arg]
-                                bucket=settings.storage_bucket,
-                                key=storage_key,
-                                expires_in=settings.download_url_ttl_seconds,
-                                disposition="inline",
-                            )
-                        url = presign.get("url") if isinstance(presign, dict) else None
+                        url = (inline_urls.get(storage_key) or {}).get("url")
+                        thumb = (thumb_urls.get(material_preview_key(storage_key)) or {}).get("url")
                         if url:
                             preview_html = FilePreview(
                                 url=str(url),
@@ -1348,6 +1585,7 @@ async def learning_unit_sections(request: Request, course_id: str, unit_id: str)
                                 title=title,
                                 alt=alt_text,
                                 max_height="480px",
+                                preview_url=str(thumb) if thumb else None,
                             ).render()
                     except Exception:
                         preview_html = ""
@@ -1613,7 +1851,7 @@ async def learning_submit_task(request: Request, course_id: str, task_id: str):
             size_bytes = 0
         sha256 = str(form.get("sha256") or "").strip().lower()
         if not sha256 and storage_key:
-            computed_sha = _compute_local_sha256(storage_key, size_bytes)
+            computed_sha = _compute_local_sha256(storage_key, size_bytes, student_sub=str((user or {}).get("sub") or ""))
             if computed_sha:
                 sha256 = computed_sha
         api_kind = "image" if mime_type.startswith("image/") else "file"
@@ -2991,11 +3229,17 @@ def _render_live_matrix(course_id: str, unit_id: str, tasks: list[dict], rows: l
         header_cells.append(f"<th scope=\"col\" title=\"Aufgabe {idx+1}\">{label}</th>")
     thead = f"<thead><tr>{''.join(header_cells)}</tr></thead>"
 
+    # Column data is computed once per render instead of once per cell:
+    # (raw task id for lookup/cell id, escaped id for attributes/query).
+    columns = [(tid, Component.escape(tid)) for tid in (str(t.get("id") or "") for t in tasks)]
+    detail_base = f"/teaching/courses/{course_id}/units/{unit_id}/live/detail?student_sub="
+
     # Body
     body_rows: list[str] = []
     for r in rows:
         student = r.get("student") or {}
         sub = str(student.get("sub") or "")
+        sub_esc = Component.escape(sub)
         raw_name = str(student.get("name") or "")
         # Fallback: when no display name set, prefer email prefix over exposing full email
         disp = raw_name
@@ -3005,19 +3249,14 @@ def _render_live_matrix(course_id: str, unit_id: str, tasks: list[dict], rows: l
         # map tasks by id for deterministic lookup
         cells_by_task = {str(c.get("task_id")): c for c in (r.get("tasks") or []) if isinstance(c, dict)}
         row_cells = [f"<th scope=\"row\" class=\"student-name\">{name}</th>"]
-        for t in tasks:
-            tid = str(t.get("id") or "")
+        # Clicking a cell loads the detail pane below the matrix
+        row_href = f"{detail_base}{sub_esc}&task_id="
+        for tid, tid_esc in columns:
             cell = cells_by_task.get(tid) or {}
-            has = bool(cell.get("has_submission"))
-            content = "✅" if has else "—"
-            cell_id = f"cell-{sub}-{tid}"
-            # Clicking a cell loads the detail pane below the matrix
-            hx_href = (
-                f"/teaching/courses/{course_id}/units/{unit_id}/live/detail?student_sub={Component.escape(sub)}&task_id={Component.escape(tid)}"
-            )
+            content = "✅" if cell.get("has_submission") else "—"
             row_cells.append(
-                f"<td id=\"{cell_id}\" data-sub=\"{Component.escape(sub)}\" data-task=\"{Component.escape(tid)}\" "
-                f"hx-get=\"{hx_href}\" hx-target=\"#live-detail\" hx-swap=\"innerHTML\">{content}</td>"
+                f"<td id=\"cell-{sub}-{tid}\" data-sub=\"{sub_esc}\" data-task=\"{tid_esc}\" "
+                f"hx-get=\"{row_href}{tid_esc}\" hx-target=\"#live-detail\" hx-swap=\"innerHTML\">{content}</td>"
             )
         body_rows.append(f"<tr>{''.join(row_cells)}</tr>")
     tbody = f"<tbody>{''.join(body_rows)}</tbody>"
@@ -3032,6 +3271,11 @@ async def teaching_unit_live_page(request: Request, course_id: str, unit_id: str
         Render a compact matrix of students × tasks for the selected unit.
         Uses the JSON API `summary` endpoint to obtain the initial state.
 
+    Streaming:
+        Titles, module lookup + sections panel and summary are fetched
+        concurrently. The layout shell is flushed immediately and each block
+        is streamed in document order as soon as it resolves.
+
     Permissions:
         Caller must be a teacher. The unit must belong to the course of the
         requesting owner (verified via API call to modules list).
@@ -3044,12 +3288,46 @@ async def teaching_unit_live_page(request: Request, course_id: str, unit_id: str
     if not (role == "teacher" or "teacher" in roles):
         return RedirectResponse(url="/", status_code=303)
 
-    # Resolve titles (best effort)
+    async def blocks() -> AsyncIterator[str]:
+        # Sub-queries run concurrently; the shell is already flushed. Leaving
+        # the block (done or client gone) cancels whatever is still running.
+        async with FanOut() as fan:
+            titles = fan.start("titles", lambda: _live_unit_titles(request, course_id, unit_id), default=("Kurs", "Lerneinheit"))
+            module = fan.start("module", lambda: _live_module_id(request, course_id, unit_id), default=None)
+            summary = fan.start("summary", lambda: _live_summary(request, course_id, unit_id), default=([], []))
+
+            async def _sections_panel() -> str:
+                return await _render_sections_release_panel(request, course_id, unit_id, await module)
+
+            panel = fan.start(
+                "sections_panel",
+                _sections_panel,
+                default=(
+                    '<section id="section-releases-panel" class="card"><h2>Abschnitte freigeben</h2>'
+                    '<p class="text-muted">Keine Abschnitte vorhanden.</p></section>'
+                ),
+            )
+
+            yield '<div class="container"><h1>Unterricht – Live</h1>'
+            course_title, unit_title = await titles
+            yield f'<p class="text-muted">{Component.escape(course_title)} · {Component.escape(unit_title)}</p>'
+            yield await panel
+            tasks, rows = await summary
+            matrix_html = _render_live_matrix(course_id, unit_id, tasks, rows) if tasks else (
+                '<div class="card"><p class="text-muted">Keine Aufgaben in dieser Lerneinheit.</p></div>'
+            )
+            yield f'<section class="card" id="live-section"><div id="live-status" class="text-muted">Letzte Aktualisierung: jetzt</div>{matrix_html}</section>'
+            yield '<div id="live-detail"></div></div>'
+
+    layout = Layout(title="Unterricht – Live", content="", user=user, current_path=request.url.path)
+    return _layout_stream_response(request, layout, blocks(), headers={"Cache-Control": "private, no-store"})
+
+
+async def _live_unit_titles(request: Request, course_id: str, unit_id: str) -> tuple[str, str]:
+    """Resolve course and unit titles for the Live header (best effort)."""
     course_title = "Kurs"
     unit_title = "Lerneinheit"
     try:
-        import httpx
-        from httpx import ASGITransport
         async with _internal_api_client() as client:
             sid = request.cookies.get(SESSION_COOKIE_NAME)
             if sid:
@@ -3065,12 +3343,12 @@ async def teaching_unit_live_page(request: Request, course_id: str, unit_id: str
                 unit_title = str(ru.json().get("title") or unit_title)
     except Exception:
         pass
+    return course_title, unit_title
 
-    # Resolve module_id for this course × unit (owner-only list)
-    module_id = None
+
+async def _live_module_id(request: Request, course_id: str, unit_id: str) -> str | None:
+    """Resolve module_id for this course × unit (owner-only list)."""
     try:
-        import httpx
-        from httpx import ASGITransport
         async with _internal_api_client() as client:
             sid = request.cookies.get(SESSION_COOKIE_NAME)
             if sid:
@@ -3079,17 +3357,15 @@ async def teaching_unit_live_page(request: Request, course_id: str, unit_id: str
             if rm.status_code == 200:
                 for m in rm.json() or []:
                     if str(m.get("unit_id")) == str(unit_id):
-                        module_id = str(m.get("id"))
-                        break
+                        return str(m.get("id"))
     except Exception:
-        module_id = None
+        return None
+    return None
 
-    # Fetch initial summary for matrix
-    tasks: list[dict] = []
-    rows: list[dict] = []
+
+async def _live_summary(request: Request, course_id: str, unit_id: str) -> tuple[list[dict], list[dict]]:
+    """Fetch the initial summary (tasks, rows) for the Live matrix."""
     try:
-        import httpx
-        from httpx import ASGITransport
         async with _internal_api_client() as client:
             sid = request.cookies.get(SESSION_COOKIE_NAME)
             if sid:
@@ -3102,26 +3378,10 @@ async def teaching_unit_live_page(request: Request, course_id: str, unit_id: str
                 payload = rs.json()
                 tasks = [t for t in (payload.get("tasks") or []) if isinstance(t, dict)]
                 rows = [r for r in (payload.get("rows") or []) if isinstance(r, dict)]
+                return tasks, rows
     except Exception:
-        tasks, rows = [], []
-
-    matrix_html = _render_live_matrix(course_id, unit_id, tasks, rows) if tasks else (
-        '<div class="card"><p class="text-muted">Keine Aufgaben in dieser Lerneinheit.</p></div>'
-    )
-    # Render sections release panel
-    sections_panel_html = await _render_sections_release_panel(request, course_id, unit_id, module_id)
-
-    content = (
-        '<div class="container">'
-        f'<h1>Unterricht – Live</h1>'
-        f'<p class="text-muted">{Component.escape(course_title)} · {Component.escape(unit_title)}</p>'
-        f'{sections_panel_html}'
-        f'<section class="card" id="live-section"><div id="live-status" class="text-muted">Letzte Aktualisierung: jetzt</div>{matrix_html}</section>'
-        '<div id="live-detail"></div>'
-        '</div>'
-    )
-    layout = Layout(title="Unterricht – Live", content=content, user=user, current_path=request.url.path)
-    return _layout_response(request, layout, headers={"Cache-Control": "private, no-store"})
+        pass
+    return [], []
 
 
 async def _render_sections_release_panel(request: Request, course_id: str, unit_id: str, module_id: str | None) -> str:
@@ -3437,6 +3697,7 @@ async def teaching_unit_live_detail_partial(
     files = [f for f in (data.get("files") or []) if isinstance(f, dict)]
     file = files[0] if files else {}
     file_url = Component.escape(str(file.get("url") or ""))
+    file_preview_url = str(file.get("preview_url") or "")
     file_mime = str(file.get("mime") or "")
     file_size = file.get("size")
 
@@ -3464,7 +3725,17 @@ async def teaching_unit_live_detail_partial(
         if not file_url:
             return _panel("file", "<p class=\"text-muted\">Originaldatei nicht verfügbar.</p>", active)
         inner_parts: list[str] = []
-        if "image" in file_mime:
+        if file_preview_url and ("image" in file_mime or "pdf" in file_mime):
+            # Small pre-generated preview first; the original loads on zoom/click.
+            inner_parts.append(
+                FilePreview(
+                    url=str(file.get("url") or ""),
+                    mime=file_mime,
+                    title="Originaldatei",
+                    preview_url=file_preview_url,
+                ).render()
+            )
+        elif "image" in file_mime:
             inner_parts.append(f"<img class=\"submission-preview\" src=\"{file_url}\" alt=\"Originaldatei\">")
         elif "pdf" in file_mime:
             inner_parts.append(f"<a class=\"btn\" href=\"{file_url}\" target=\"_blank\" rel=\"noopener\">PDF in neuem Tab öffnen</a>")
@@ -4006,7 +4277,14 @@ async def unit_details_index(request: Request, unit_id: str):
     try:
         async with _internal_api_client() as client:
             client.cookies.set(SESSION_COOKIE_NAME, sid)
-            u = await client.get(f"/api/teaching/units/{unit_id}")
+            # Sections are fetched alongside the unit; the API enforces
+            # authorship on both, so a 403/404 unit simply discards them.
+            async with FanOut() as fan:
+                unit_call = fan.start("unit", lambda: client.get(f"/api/teaching/units/{unit_id}"), default=None)
+                sections_call = fan.start("sections", lambda: client.get(f"/api/teaching/units/{unit_id}/sections"), default=None)
+                u, s = await unit_call, await sections_call
+            if u is None:
+                return _fanout_unavailable_response(unit_call)
             if u.status_code != 200 or not isinstance(u.json(), dict):
                 # Preserve API semantics for clarity and correctness
                 if u.status_code in (403, 404):
@@ -4016,8 +4294,7 @@ async def unit_details_index(request: Request, unit_id: str):
             ud = u.json()
             unit_title = str(ud.get("title") or "") or None
             unit_summary = str(ud.get("summary") or "") or None
-            s = await client.get(f"/api/teaching/units/{unit_id}/sections")
-            if s.status_code == 200 and isinstance(s.json(), list):
+            if s is not None and s.status_code == 200 and isinstance(s.json(), list):
                 # Keep only fields needed for rendering
                 sections = [
                     {"id": it.get("id"), "title": it.get("title")}
@@ -4032,6 +4309,20 @@ async def unit_details_index(request: Request, unit_id: str):
     return _layout_response(request, layout, headers={"Cache-Control": "private, no-store"})
 
 
+def _fanout_unavailable_response(call: Pending) -> HTMLResponse:
+    """Answer an SSR page whose required fetch fell back to its default.
+
+    A timeout (503) or transport error (502) says nothing about whether the
+    resource exists, so it must not be reported as 404.
+    """
+    status_code = 503 if call.outcome == "timeout" else 502
+    return HTMLResponse(
+        "Inhalt derzeit nicht erreichbar – bitte später erneut versuchen",
+        status_code=status_code,
+        headers={"Cache-Control": "private, no-store"},
+    )
+
+
 async def _fetch_materials_for_section(unit_id: str, section_id: str, *, session_id: str) -> list[dict]:
     try:
         async with _internal_api_client() as client:
@@ -4115,17 +4406,26 @@ async def section_detail_index(request: Request, unit_id: str, section_id: str):
     unit_title: str | None = None
     section_title: str | None = None
     try:
-        import httpx
-        from httpx import ASGITransport
         async with _internal_api_client() as client:
             client.cookies.set(SESSION_COOKIE_NAME, sid)
-            u = await client.get(f"/api/teaching/units/{unit_id}")
+            # Unit, sections, materials and tasks only depend on the path ids;
+            # the API enforces authorship on each, so load them concurrently.
+            async with FanOut() as fan:
+                unit_call = fan.start("unit", lambda: client.get(f"/api/teaching/units/{unit_id}"), default=None)
+                sections_call = fan.start("sections", lambda: client.get(f"/api/teaching/units/{unit_id}/sections"), default=None)
+                materials_call = fan.start("materials", lambda: _fetch_materials_for_section(unit_id, section_id, session_id=sid), default=[])
+                tasks_call = fan.start("tasks", lambda: _fetch_tasks_for_section(unit_id, section_id, session_id=sid), default=[])
+                u, s = await unit_call, await sections_call
+                materials, tasks = await materials_call, await tasks_call
+            if u is None:
+                return _fanout_unavailable_response(unit_call)
             if u.status_code != 200:
                 return HTMLResponse("Lerneinheit nicht gefunden", status_code=404)
+            if s is None:
+                return _fanout_unavailable_response(sections_call)
             ud = u.json() if isinstance(u.json(), dict) else {}
             unit_title = str(ud.get("title") or "") or None
-            s = await client.get(f"/api/teaching/units/{unit_id}/sections")
-            if s.status_code == 200 and isinstance(s.json(), list):
+            if s is not None and s.status_code == 200 and isinstance(s.json(), list):
                 for it in s.json():
                     if isinstance(it, dict) and it.get("id") == section_id:
                         section_title = str(it.get("title") or "") or None
@@ -4136,8 +4436,6 @@ async def section_detail_index(request: Request, unit_id: str, section_id: str):
     if section_title is None:
         return HTMLResponse("Abschnitt nicht gefunden", status_code=404)
 
-    materials = await _fetch_materials_for_section(unit_id, section_id, session_id=sid)
-    tasks = await _fetch_tasks_for_section(unit_id, section_id, session_id=sid)
     content = _render_section_detail_page_html(
         unit={"id": unit_id, "title": unit_title or "Lerneinheit"},
         section={"id": section_id, "title": section_title or "Abschnitt"},
@@ -4368,6 +4666,7 @@ def _render_material_detail_page_html(
     *,
     csrf_token: str,
     download_url: str | None = None,
+    preview_url: str | None = None,
 ) -> str:
     title = Component.escape(str(material.get("title") or "Material"))
     body_md = Component.escape(str(material.get("body_md") or ""))
@@ -4392,6 +4691,7 @@ def _render_material_detail_page_html(
                 mime=mime,
                 title=str(material.get("title") or ""),
                 alt=str(material.get("alt_text") or "") or None,
+                preview_url=preview_url,
             ).render()
         else:
             # Fallback: simple download link when we cannot safely embed.
@@ -4464,8 +4764,9 @@ async def material_detail_page(request: Request, unit_id: str, section_id: str,
     mat = await _fetch_material_detail(unit_id, section_id, material_id, session_id=sid)
     if mat is None:
         return HTMLResponse("Material nicht gefunden", status_code=404)
-    # If it's a file material, fetch a download URL (inline)
+    # If it's a file material, fetch a download URL (inline) and its preview, if derived
     download_url = None
+    preview_url = None
     try:
         if str(mat.get("kind") or "") == "file":
             import httpx
@@ -4478,9 +4779,12 @@ async def material_detail_page(request: Request, unit_id: str, section_id: str,
                 )
                 if resp.status_code == 200 and isinstance(resp.json(), dict):
                     download_url = str(resp.json().get("url") or "") or None
+                    preview_url = str(resp.json().get("preview_url") or "") or None
     except Exception:
         download_url = None
-    content = _render_material_detail_page_html(unit_id, section_id, mat, csrf_token=token, download_url=download_url)
+    content = _render_material_detail_page_html(
+        unit_id, section_id, mat, csrf_token=token, download_url=download_url, preview_url=preview_url
+    )
     layout = Layout(title="Material bearbeiten", content=content, user=user, current_path=request.url.path)
     return _layout_response(request, layout, headers={"Cache-Control": "private, no-store"})
 
@@ -5226,6 +5530,7 @@ app.include_router(auth_router)
 app.include_router(learning_router)
 app.include_router(teaching_router)
 app.include_router(users_router)
+app.include_router(uploads_router)
 app.include_router(operations_router)
 
 @app.get("/health")
@@ -5288,6 +5593,14 @@ async def auth_callback(request: Request, code: str | None = None, state: str |
     display_name = claims.get("gustav_display_name") or claims.get("name") or (email.split("@")[0] if email else "Benutzer")
 
     sess = SESSION_STORE.create(sub=sub, roles=roles, name=str(display_name), id_token=id_token)
+    try:
+        # Incremental roster refresh: new users become searchable before the next full sync
+        from identity_access import directory
+
+        for role in roles:
+            directory.role_roster(role).upsert(sub, str(display_name), str(claims.get("preferred_username") or ""))
+    except Exception:
+        pass
     dest = rec.redirect or "/"
     resp = RedirectResponse(url=dest, status_code=302)
     resp.headers["Cache-Control"] = "private, no-store"
@@ -5318,7 +5631,7 @@ def create_app_auth_only() -> FastAPI:
     without pulling in unrelated routers or DB-dependent wiring.
     """
     sub = FastAPI(title="GUSTAV alpha-2 (auth-only)", description="Auth slice", version="0.0.2")
-    sub.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    sub.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
     sub.include_router(auth_router)
     # Lightweight callback stub for contract tests
     @sub.get("/auth/callback")
@@ -355,6 +355,12 @@ async def auth_logout(request: Request, redirect: str | None = None):
             mod.SESSION_STORE.delete(sid)
         except Exception as exc:
             logger.warning("Session delete failed during logout: %s", exc.__class__.__name__)
+        csrf_store = getattr(mod, "CSRF_STORE", None)
+        if csrf_store is not None:
+            try:
+                csrf_store.delete(sid)
+            except Exception as exc:
+                logger.warning("CSRF token delete failed during logout: %s", exc.__class__.__name__)
 
     # Compute IdP logout URL and app redirect target (show success banner)
     end_session = "/auth/logout/success"  # conservative fallback
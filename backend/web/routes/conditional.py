@@ -0,0 +1,77 @@
+"""
+Conditional GET helpers (strong ETags, If-None-Match → 304) for JSON reads.
+
+Why:
+    HTMX refreshes and SSR pages re-request the same JSON repeatedly. With an
+    ETag, unchanged responses shrink to an empty 304 and, where a cheap
+    version is available (e.g., `unit_content_versions`), the heavy queries
+    are skipped entirely.
+
+Security:
+    - Successful reads are `private, no-cache`: browsers may keep a copy but
+      must revalidate it on every use (authorization is re-checked before
+      each 304). With `no-store` no copy exists to revalidate and the ETags
+      would be inert. `API_CACHE_MODE=no-store` restores the old header.
+    - ETags are hashes over the response body or server-side versions; they
+      reveal nothing beyond "changed / unchanged" to the same caller.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Mapping
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+
+def read_cache_control() -> str:
+    """Cache-Control for successful, revalidatable reads (see module docstring)."""
+    mode = (os.getenv("API_CACHE_MODE") or "revalidate").strip().lower()
+    return "private, no-store" if mode == "no-store" else "private, no-cache"
+
+
+def strong_etag(value: Any) -> str:
+    """Quoted strong ETag over a JSON-serializable value (canonical encoding)."""
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match matches ``etag`` (weak comparison, RFC 9110)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: Mapping[str, str]) -> Response:
+    return Response(status_code=304, headers={**headers, "ETag": etag})
+
+
+def conditional_json(
+    request: Request,
+    payload: Any,
+    *,
+    headers: Mapping[str, str],
+    etag: str | None = None,
+) -> Response:
+    """Return 304 when the client's copy is current, else JSON with an ETag.
+
+    ``etag`` defaults to a hash of ``payload``; pass a version-derived tag to
+    keep it consistent with an earlier short-circuit check.
+    """
+    tag = etag or strong_etag(payload)
+    if if_none_match(request, tag):
+        return not_modified(tag, headers)
+    return JSONResponse(payload, headers={**headers, "ETag": tag})
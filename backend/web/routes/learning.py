@@ -10,18 +10,25 @@ if __name__ == "backend.web.routes.learning":
 elif __name__ == "routes.learning":
     sys.modules.setdefault("backend.web.routes.learning", sys.modules[__name__])
 
+import asyncio
 import base64
+import hashlib
 import json
+import logging
 import os
 import sys as _sys
-from typing import Any
+from typing import Any, AsyncIterable, AsyncIterator
 from uuid import UUID
 
+import anyio
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
 
 from backend.learning.repo_db import DBLearningRepo
 from .security import _is_same_origin
+from .conditional import conditional_json, not_modified, read_cache_control, if_none_match, strong_etag
+from .uploads import resumable_intent
 from backend.learning.usecases.sections import (
     ListSectionsInput,
     ListSectionsUseCase,
@@ -51,15 +58,20 @@ from backend.storage.learning_policy import (
     STORAGE_KEY_RE,
     verification_config_from_env,
 )
-from backend.storage.verification import verify_storage_object_integrity
-from backend.storage.config import get_submissions_bucket, get_learning_max_upload_bytes
-from backend.storage.keys import make_submission_key
+from backend.storage.verification import HASH_VERIFIED_REASONS, verify_storage_object_integrity
+from backend.storage import blobs as content_blobs
+from backend.storage.ingest_ledger import get_ingest_ledger
+from backend.storage.config import dev_upload_root, get_submissions_bucket, get_learning_max_upload_bytes
+from backend.storage.keys import make_submission_key, submission_key_prefix
+from backend.storage.preview_jobs import schedule_preview
 import httpx
 from urllib.parse import urlparse as _urlparse, quote as _quote
 
 
 learning_router = APIRouter(tags=["Learning"])
 
+logger = logging.getLogger("gustav.web.learning")
+
 STORAGE_ADAPTER: StorageAdapterProtocol = NullStorageAdapter()
 
 
@@ -91,6 +103,11 @@ def _dev_upload_stub_enabled() -> bool:
     return (os.getenv("ENABLE_DEV_UPLOAD_STUB", "false") or "").strip().lower() == "true"
 
 
+def _dev_upload_root() -> str:
+    """Directory the dev upload stub writes to (and verification reads from)."""
+    return dev_upload_root()
+
+
 def _upload_proxy_enabled() -> bool:
     return (os.getenv("ENABLE_STORAGE_UPLOAD_PROXY", "false") or "").strip().lower() == "true"
 
@@ -144,21 +161,96 @@ def _decode_proxy_headers(token: str | None) -> dict[str, str]:
     return safe
 
 
-async def _read_request_stream_with_limit(request: Request, limit: int) -> tuple[bytes | None, str | None]:
-    """Consume the request stream without buffering unlimited bytes."""
+class _UploadTooLarge(Exception):
+    """Raised from `_UploadStream` once the body exceeds the upload limit."""
 
-    total = 0
-    buffer = bytearray()
-    async for chunk in request.stream():
-        if not chunk:
-            continue
-        buffer.extend(chunk)
-        total += len(chunk)
-        if limit > 0 and total > limit:
-            return None, "size_exceeded"
-    if not buffer:
+
+class _UploadStream:
+    """Request body as a size-limited async byte stream with on-the-fly SHA-256.
+
+    Why:
+        Uploads used to be buffered into memory before forwarding. A class
+        uploading phone photos at once then held every file in the web
+        process. The stream is handed to the forwarder as the request content,
+        so each chunk goes upstream as it arrives and only the hash state and
+        a byte counter stay in memory.
+
+    Behavior:
+        - Iterating yields the body chunks; exceeding `limit` sets `exceeded`
+          and raises `_UploadTooLarge`, which aborts the upstream request.
+        - `drain()` consumes whatever the forwarder did not read so `size`
+          and `hexdigest()` always describe the complete body.
+    """
+
+    def __init__(
+        self, chunks: AsyncIterator[bytes], first: bytes, limit: int, declared_length: int | None = None
+    ) -> None:
+        self._chunks = chunks
+        self._first = first
+        self._limit = limit
+        self.declared_length = declared_length
+        self._sha = hashlib.sha256()
+        self.size = 0
+        self.exceeded = False
+        self._iter = self._generate()
+
+    def _account(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self._limit > 0 and self.size > self._limit:
+            self.exceeded = True
+            raise _UploadTooLarge()
+        self._sha.update(chunk)
+
+    async def _generate(self) -> AsyncIterator[bytes]:
+        self._account(self._first)
+        yield self._first
+        async for chunk in self._chunks:
+            if not chunk:
+                continue
+            self._account(chunk)
+            yield chunk
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._iter
+
+    async def drain(self) -> None:
+        async for _ in self._iter:
+            pass
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+
+async def _record_ingest(storage_key: str, body: _UploadStream, *, subject: str) -> None:
+    """Record the streamed hash in the ingest ledger (a DB write when shared)."""
+    ledger = get_ingest_ledger()
+    sha, size = body.hexdigest(), body.size
+    await anyio.to_thread.run_sync(lambda: ledger.record(storage_key, sha, size, subject=subject))
+
+
+async def _open_upload_stream(request: Request, limit: int) -> tuple[_UploadStream | None, str | None]:
+    """Validate size hints and return the body stream without buffering it.
+
+    A declared Content-Length above the limit is rejected before any byte is
+    read; chunked bodies are checked while streaming. The first non-empty
+    chunk is read eagerly so empty uploads are rejected before forwarding.
+    A declared length is kept on the stream so it can be forwarded upstream.
+    """
+    raw_declared = (request.headers.get("content-length") or "").strip()
+    declared = int(raw_declared) if raw_declared.isdigit() else None
+    if declared is not None and limit > 0 and declared > limit:
+        return None, "size_exceeded"
+    chunks = request.stream().__aiter__()
+    first = b""
+    async for chunk in chunks:
+        if chunk:
+            first = chunk
+            break
+    if not first:
         return None, "empty_body"
-    return bytes(buffer), None
+    if limit > 0 and len(first) > limit:
+        return None, "size_exceeded"
+    return _UploadStream(chunks, first, limit, declared), None
 
 
 def _normalized_parts(parsed) -> tuple[str, str, int | None]:  # type: ignore[override]
@@ -173,15 +265,51 @@ def _normalized_parts(parsed) -> tuple[str, str, int | None]:  # type: ignore[ov
     return scheme, host, port
 
 
+_UPLOAD_CLIENT: httpx.AsyncClient | None = None
+_UPLOAD_CLIENT_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+def _upload_proxy_max_connections() -> int:
+    raw = (os.getenv("LEARNING_UPLOAD_PROXY_MAX_CONNECTIONS") or "").strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 64
+    return max(1, min(value, 1024))
+
+
+def _upload_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client for upstream uploads.
+
+    Reusing one client keeps TLS sessions and keep-alive connections to
+    Storage instead of paying a handshake per upload. The client is bound to
+    the running event loop and recreated if the loop changes (tests).
+    """
+    global _UPLOAD_CLIENT, _UPLOAD_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _UPLOAD_CLIENT is None or _UPLOAD_CLIENT.is_closed or _UPLOAD_CLIENT_LOOP is not loop:
+        max_connections = _upload_proxy_max_connections()
+        _UPLOAD_CLIENT = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=min(20, max_connections)),
+        )
+        _UPLOAD_CLIENT_LOOP = loop
+    return _UPLOAD_CLIENT
+
+
 async def _async_forward_upload(
     *,
     url: str,
-    payload: bytes,
+    payload: bytes | AsyncIterable[bytes],
     content_type: str,
     timeout: float,
     headers: dict[str, str] | None = None,
 ) -> httpx.Response:
-    """Forward the upload to Supabase (patchable for tests)."""
+    """Forward the upload to Supabase (patchable for tests).
+
+    `payload` may be an async byte stream; it is sent as it is read. With a
+    `Content-Length` in `headers` the body goes out with that fixed length,
+    otherwise with chunked transfer encoding.
+    """
     send_headers: dict[str, str] = {}
     if headers:
         for key, value in headers.items():
@@ -190,8 +318,7 @@ async def _async_forward_upload(
             send_headers[str(key)] = str(value)
     if not any(str(k).lower() == "content-type" for k in send_headers):
         send_headers["Content-Type"] = content_type
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        return await client.put(url, content=payload, headers=send_headers)
+    return await _upload_client().put(url, content=payload, headers=send_headers, timeout=timeout)
 
 
 def _cache_headers_success() -> dict[str, str]:
@@ -201,6 +328,12 @@ def _cache_headers_success() -> dict[str, str]:
     return {"Cache-Control": "private, no-store", "Vary": "Origin"}
 
 
+def _cache_headers_read() -> dict[str, str]:
+    # Successful GETs carry an ETag; Cache-Control follows API_CACHE_MODE
+    # (default private, no-store; "revalidate" → private, no-cache).
+    return {"Cache-Control": read_cache_control(), "Vary": "Origin"}
+
+
 def _cache_headers_error() -> dict[str, str]:
     # Error responses: must never be stored; protects PII-bearing error pages.
     # Include Vary: Origin for consistency with success responses.
@@ -459,7 +592,7 @@ async def list_sections(
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404, headers=_cache_headers_error())
 
-    return JSONResponse(sections, headers=_cache_headers_success())
+    return conditional_json(request, sections, headers=_cache_headers_read())
 
 
 @learning_router.get("/api/learning/courses")
@@ -480,7 +613,8 @@ async def list_my_courses(request: Request, limit: int = 50, offset: int = 0):
         - Requires an authenticated session with role "student".
         - Returns courses where the caller is a member, sorted by
           title asc, id asc (stable secondary order).
-        - Uses private, no-store Cache-Control headers.
+        - Uses private Cache-Control headers (`API_CACHE_MODE`) and a strong ETag;
+          `If-None-Match` with the current tag yields 304.
 
     Permissions:
         Caller must have the `student` role; membership filtering is enforced in
@@ -493,7 +627,7 @@ async def list_my_courses(request: Request, limit: int = 50, offset: int = 0):
     items = ListCoursesUseCase(_get_repo()).execute(
         ListCoursesInput(student_sub=str(user.get("sub", "")), limit=int(limit or 50), offset=int(offset or 0))
     )
-    return JSONResponse(items, headers=_cache_headers_success())
+    return conditional_json(request, items, headers=_cache_headers_read())
 
 
 @learning_router.get("/api/learning/courses/{course_id}/units")
@@ -532,7 +666,13 @@ async def list_course_units(request: Request, course_id: str):
         )
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404, headers=_cache_headers_error())
-    return JSONResponse(rows, headers=_cache_headers_success())
+    return conditional_json(request, rows, headers=_cache_headers_read())
+
+
+def _unit_sections_etag(req: ListUnitSectionsInput, version: int) -> str:
+    return strong_etag(
+        ["unit-sections", req.course_id, req.unit_id, version, req.include_materials, req.include_tasks, req.limit, req.offset]
+    )
 
 
 @learning_router.get("/api/learning/courses/{course_id}/units/{unit_id}/sections")
@@ -580,15 +720,26 @@ async def list_unit_sections(
         limit=limit,
         offset=offset,
     )
+    usecase = ListUnitSectionsUseCase(_get_repo())
     try:
-        sections = ListUnitSectionsUseCase(_get_repo()).execute(input_data)
+        # Conditional GET: the content version is checked (with membership and
+        # unit-in-course) before any sections/materials/tasks are loaded. Plain
+        # GETs skip the probe and take the version from the listing itself.
+        if request.headers.get("if-none-match"):
+            version = usecase.content_version(input_data)
+            if version is not None:
+                etag = _unit_sections_etag(input_data, version)
+                if if_none_match(request, etag):
+                    return not_modified(etag, _cache_headers_read())
+        sections, version = usecase.execute_versioned(input_data)
+        etag = _unit_sections_etag(input_data, version) if version is not None else None
     except PermissionError:
         return JSONResponse({"error": "forbidden"}, status_code=403, headers=_cache_headers_error())
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404, headers=_cache_headers_error())
 
     # 200 with possibly empty list
-    return JSONResponse(sections, headers=_cache_headers_success())
+    return conditional_json(request, sections, headers=_cache_headers_read(), etag=etag)
 
 
 def _validate_submission_payload(payload: dict[str, Any]) -> tuple[str, dict[str, Any]]:
@@ -752,18 +903,36 @@ async def create_submission(request: Request, course_id: str, task_id: str, payl
     # Optional storage integrity verification for image/PDF submissions.
     # Enabled when STORAGE_VERIFY_ROOT is set; can be enforced with
     # REQUIRE_STORAGE_VERIFY=true. Protects against mismatched size/hash.
+    uploaded_key: str | None = None
+    reused_blob: content_blobs.BlobRecord | None = None
+    hash_verified = False
     if kind in ("image", "file"):
         storage_key = clean_payload.get("storage_key")
         sha256 = clean_payload.get("sha256")
         size_bytes = clean_payload.get("size_bytes")
         mime_type = clean_payload.get("mime_type")
         try:
-            ok, reason = _verify_storage_object(str(storage_key), str(sha256), int(size_bytes), str(mime_type))
+            ok, reason = _verify_storage_object(
+                str(storage_key),
+                str(sha256),
+                int(size_bytes),
+                str(mime_type),
+                student_sub=str(user.get("sub", "")),
+            )
         except Exception:
             ok, reason = (False, "verification_error")
         if not ok:
             detail = "invalid_image_payload" if kind == "image" else "invalid_file_payload"
             return JSONResponse({"error": "bad_request", "detail": detail}, status_code=400, headers=_cache_headers_error())
+        # Content-addressed reuse: only for bytes whose hash we actually proved.
+        uploaded_key = str(storage_key)
+        hash_verified = reason in HASH_VERIFIED_REASONS and bool(sha256)
+        if hash_verified:
+            reused_blob = _find_reusable_blob(
+                str(user.get("sub", "")), clean_payload, course_id=course_id, task_id=task_id
+            )
+            if reused_blob is not None:
+                clean_payload["storage_key"] = reused_blob.object_key
 
     submission_input = CreateSubmissionInput(
         course_id=course_id,
@@ -845,6 +1014,14 @@ async def create_submission(request: Request, course_id: str, task_id: str, payl
         }
         return JSONResponse(submission, status_code=202, headers=_cache_headers_success())
 
+    if hash_verified and uploaded_key:
+        _record_blob_reference(
+            student_sub=str(user.get("sub", "")),
+            uploaded_key=uploaded_key,
+            clean_payload=clean_payload,
+            submission=submission,
+        )
+
     # Opportunistic dev processing for PDF submissions (synchronous, MVP):
     # In dev environments where STORAGE_VERIFY_ROOT is configured, attempt to
     # read the uploaded PDF bytes directly and kick off the rendering pipeline.
@@ -860,26 +1037,141 @@ async def create_submission(request: Request, course_id: str, task_id: str, payl
                     course_id=str(course_id),
                     task_id=str(task_id),
                     student_sub=str(user.get("sub", "")),
+                    sha256=str(clean_payload.get("sha256") or "") if hash_verified else "",
                 )
     except Exception:
         pass
 
     # Always return 202 Accepted for async processing semantics, including
     # idempotent retries reusing an existing pending submission.
-    return JSONResponse(submission, status_code=202, headers=_cache_headers_success())
+    return JSONResponse(
+        submission,
+        status_code=202,
+        headers=_cache_headers_success(),
+        background=None if reused_blob is not None else _submission_preview_task(kind, clean_payload, submission),
+    )
 
 
-def _dev_try_process_pdf(*, root: str, storage_key: str, submission_id: str, course_id: str, task_id: str, student_sub: str) -> None:
+def _find_reusable_blob(
+    student_sub: str, clean_payload: dict, *, course_id: str, task_id: str
+) -> content_blobs.BlobRecord | None:
+    """Return the student's existing blob with identical content, if any.
+
+    Only a blob stored under this course/task is reused; the same file handed
+    in elsewhere keeps its own object so keys never cross course boundaries.
+    """
+    repo = content_blobs.get_blob_repo()
+    if repo is None or not student_sub:
+        return None
+    try:
+        blob = repo.find(owner_sub=student_sub, sha256=str(clean_payload.get("sha256") or ""))
+    except Exception as exc:
+        logger.warning("learning.blobs action=lookup_failed error_type=%s", type(exc).__name__)
+        return None
+    if blob is None or blob.bucket != _storage_bucket():
+        return None
+    prefix = submission_key_prefix(course_id=course_id, task_id=task_id, student_sub=student_sub)
+    if not blob.object_key.startswith(prefix):
+        return None
+    if blob.size_bytes != int(clean_payload.get("size_bytes") or -1) or blob.mime_type != clean_payload.get("mime_type"):
+        return None
+    # The registry may outlive the object (manual cleanup, restores); never
+    # hand out a key that no longer resolves.
+    if not content_blobs.blob_object_exists(
+        adapter=STORAGE_ADAPTER,
+        bucket=blob.bucket,
+        key=blob.object_key,
+        size_bytes=blob.size_bytes,
+        local_root=_dev_upload_root(),
+    ):
+        logger.warning("learning.blobs action=canonical_missing")
+        return None
+    return blob
+
+
+def _record_blob_reference(*, student_sub: str, uploaded_key: str, clean_payload: dict, submission: dict) -> None:
+    """Register the submission's object as a blob and count its reference.
+
+    A duplicate upload (`uploaded_key` differs from the stored key) is left
+    in place: an Idempotency-Key retry re-verifies that key before the
+    existing submission is returned. Nothing references it, so the storage
+    GC removes it after its grace period.
+    """
+    repo = content_blobs.get_blob_repo()
+    object_key = str(submission.get("storage_key") or "")
+    submission_id = str(submission.get("id") or "")
+    sha256 = str(submission.get("sha256") or clean_payload.get("sha256") or "")
+    if repo is None or not student_sub or not object_key or not submission_id or not sha256:
+        return
+    try:
+        blob = repo.register(
+            owner_sub=student_sub,
+            sha256=sha256,
+            bucket=_storage_bucket(),
+            object_key=object_key,
+            size_bytes=int(clean_payload.get("size_bytes") or 0),
+            mime_type=str(clean_payload.get("mime_type") or ""),
+        )
+        if blob.object_key != object_key:
+            # Lost a registration race: this submission keeps its own object.
+            return
+        repo.add_ref(owner_sub=student_sub, sha256=sha256, submission_id=submission_id)
+    except Exception as exc:
+        logger.warning("learning.blobs action=register_failed error_type=%s", type(exc).__name__)
+        return
+    if uploaded_key != object_key:
+        logger.info("learning.blobs action=reused bytes=%s", blob.size_bytes)
+
+
+def _submission_preview_task(kind: str, clean_payload: dict, submission: dict) -> BackgroundTask | None:
+    """Queue the teacher-facing preview after the 202 response was sent.
+
+    The learning worker renders it (see `backend.storage.preview_jobs`).
+    """
+    if kind not in ("image", "file") or not submission.get("id"):
+        return None
+    work = schedule_preview(
+        kind="submission",
+        storage_key=str(clean_payload.get("storage_key") or ""),
+        mime=str(clean_payload.get("mime_type") or ""),
+        adapter=STORAGE_ADAPTER,
+        local_root=_dev_upload_root(),
+    )
+    return BackgroundTask(work) if work is not None else None
+
+
+def _dev_try_process_pdf(
+    *,
+    root: str,
+    storage_key: str,
+    submission_id: str,
+    course_id: str,
+    task_id: str,
+    student_sub: str,
+    sha256: str = "",
+) -> None:
     """Best-effort dev helper: render, persist pages, and mark extracted.
 
     Intent:
         In lokalen Umgebungen, in denen Uploads auf das Dateisystem geschrieben
         werden (STORAGE_VERIFY_ROOT), verarbeiten wir eingereichte PDFs sofort
         und speichern abgeleitete Seitenbilder unter einem stabilen Pfad.
+        Mit verifiziertem `sha256` werden bereits gerenderte Seiten desselben
+        Blobs wiederverwendet statt neu gerendert.
 
     Permissions:
         Nur für Dev. Produktion soll einen Worker/Queue nutzen.
     """
+    blobs = content_blobs.get_blob_repo() if sha256 else None
+    if blobs is not None:
+        try:
+            blob = blobs.find(owner_sub=student_sub, sha256=sha256)
+            if blob is not None and blob.derived_keys:
+                _get_repo().mark_extracted(submission_id=submission_id, page_keys=list(blob.derived_keys))  # type: ignore[attr-defined]
+                return
+        except Exception:
+            pass
+
     from pathlib import Path as _Path
     base = _Path(root).resolve()
     pdf_path = (base / storage_key).resolve()
@@ -924,13 +1216,15 @@ def _dev_try_process_pdf(*, root: str, storage_key: str, submission_id: str, cou
         course_id=str(course_id), task_id=str(task_id), student_sub=str(student_sub), submission_id=str(submission_id)
     )
     try:
-        persist_rendered_pages(
+        page_keys = persist_rendered_pages(
             storage=fs,
             bucket=_storage_bucket(),
             scope=scope,
             pages=pages,
             repo=_get_repo(),  # type: ignore[arg-type]
         )
+        if blobs is not None:
+            blobs.set_derived(owner_sub=student_sub, sha256=sha256, keys=page_keys)
     except Exception:
         # Never let dev persistence affect the request path
         return
@@ -955,11 +1249,13 @@ async def create_upload_intent(request: Request, course_id: str, task_id: str, p
             - filename: original filename for intent construction
             - mime_type: declared content-type (validated against allowlist)
             - size_bytes: integer size of the upload in bytes (≤ 10 MiB)
+            - resumable: optional bool; also open a chunked upload session
 
     Returns:
         200 JSON with fields: intent_id, storage_key, url, headers,
-        accepted_mime_types, max_size_bytes, expires_at. Clients must still
-        finish by POSTing to /submissions with storage metadata and sha256.
+        accepted_mime_types, max_size_bytes, expires_at (+ `resumable` block
+        when requested, see routes.uploads). Clients must still finish by
+        POSTing to /submissions with storage metadata and sha256.
 
     Security:
         Same-origin required. Caller must have role "student". In the MVP,
@@ -995,6 +1291,7 @@ async def create_upload_intent(request: Request, course_id: str, task_id: str, p
     filename = str(payload.get("filename") or "").strip()
     mime_type = str(payload.get("mime_type") or "").strip()
     size_bytes = payload.get("size_bytes")
+    resumable = payload.get("resumable") is True
     try:
         size_int = int(size_bytes)
     except Exception:
@@ -1117,6 +1414,16 @@ async def create_upload_intent(request: Request, course_id: str, task_id: str, p
                 "max_size_bytes": _max_upload_bytes(),
                 "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=_upload_intent_ttl_seconds())).isoformat(timespec="seconds"),
             }
+            if resumable:
+                intent["resumable"] = resumable_intent(
+                    storage_key=storage_key,
+                    bucket=bucket,
+                    mime_type=mime_type,
+                    size_bytes=size_int,
+                    subject=str(user.get("sub", "")),
+                    context="learning",
+                    local_root=_dev_upload_root(),
+                )
             return JSONResponse(intent, status_code=200, headers=_cache_headers_success())
         return JSONResponse(
             {"error": "service_unavailable", "detail": "storage_adapter_not_configured"},
@@ -1175,6 +1482,8 @@ async def create_upload_intent(request: Request, course_id: str, task_id: str, p
             url_out = f"/api/learning/internal/upload-proxy?url={_quote(str(presign_url))}"
             if proxy_headers_token:
                 url_out += f"&headers={_quote(proxy_headers_token)}"
+            # Lets the proxy record the ingest hash under this key (ledger).
+            url_out += f"&key={_quote(storage_key)}"
     # Normalize response headers to lower-case keys for stability across clients.
     # Provide both canonical casings for compatibility with tests and clients.
     headers_out = {}
@@ -1193,10 +1502,26 @@ async def create_upload_intent(request: Request, course_id: str, task_id: str, p
         # Short-lived expiry (defense-in-depth): 10 minutes from now (UTC)
         "expires_at": (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat(timespec="seconds"),
     }
+    if resumable:
+        intent["resumable"] = resumable_intent(
+            storage_key=storage_key,
+            bucket=bucket,
+            mime_type=mime_type,
+            size_bytes=size_int,
+            subject=str(user.get("sub", "")),
+            context="learning",
+        )
     return JSONResponse(intent, status_code=200, headers=_cache_headers_success())
 
 
-def _verify_storage_object(storage_key: str, sha256: str, size_bytes: int, mime_type: str) -> tuple[bool, str]:
+def _verify_storage_object(
+    storage_key: str,
+    sha256: str,
+    size_bytes: int,
+    mime_type: str,
+    *,
+    student_sub: str | None = None,
+) -> tuple[bool, str]:
     """
     Validate that the referenced storage object matches the submission metadata.
 
@@ -1210,10 +1535,13 @@ def _verify_storage_object(storage_key: str, sha256: str, size_bytes: int, mime_
         size_bytes: Expected object size from the upload intent.
         mime_type: MIME recorded alongside the submission (not used here, passed
             for future policy hooks).
+        student_sub: Submitting student; enables the verified-ingest ledger
+            for uploads that passed through our proxy/stub.
     Behavior:
-        Delegates to the shared verification helper which first attempts a
-        `HEAD` request via the configured storage adapter and, if allowed,
-        falls back to local filesystem verification. Returns (ok, reason).
+        Delegates to the shared verification helper which first consults the
+        ingest ledger, then attempts a `HEAD` request via the configured
+        storage adapter and, if allowed, falls back to local filesystem
+        verification. Returns (ok, reason).
     Permissions:
         Only callable from the authenticated backend flow; the caller must have
         already ensured the student is authorised for the submission.
@@ -1227,6 +1555,7 @@ def _verify_storage_object(storage_key: str, sha256: str, size_bytes: int, mime_
         expected_size=size_bytes,
         mime_type=mime_type,
         config=config,
+        ingest_subject=student_sub,
     )
 
 
@@ -1258,12 +1587,8 @@ async def internal_upload_stub(request: Request):
         return JSONResponse({"error": "bad_request", "detail": "invalid_storage_key"}, status_code=400, headers=_cache_headers_error())
 
     # Resolve target path safely beneath STORAGE_VERIFY_ROOT
-    root = (os.getenv("STORAGE_VERIFY_ROOT") or "").strip()
-    if not root:
-        # Default dev directory inside project workspace
-        root = os.path.abspath(".tmp/dev_uploads")
     from pathlib import Path as _Path
-    base = _Path(root).resolve()
+    base = _Path(_dev_upload_root()).resolve()
     target = (base / storage_key).resolve()
     try:
         common = os.path.commonpath([str(base), str(target)])
@@ -1272,21 +1597,25 @@ async def internal_upload_stub(request: Request):
     if common != str(base):
         return JSONResponse({"error": "bad_request", "detail": "path_escape"}, status_code=400, headers=_cache_headers_error())
 
-    body, body_error = await _read_request_stream_with_limit(request, _max_upload_bytes())
+    body, body_error = await _open_upload_stream(request, _max_upload_bytes())
     if body_error:
         return JSONResponse({"error": "bad_request", "detail": body_error}, status_code=400, headers=_cache_headers_error())
 
-    # Ensure parent dirs exist and write the file.
+    # Ensure parent dirs exist and write the file chunk by chunk; a partial
+    # file is removed when the body turns out to exceed the limit.
     target.parent.mkdir(parents=True, exist_ok=True)
-    with target.open("wb") as fh:
-        fh.write(body)
+    try:
+        with target.open("wb") as fh:
+            async for chunk in body:
+                fh.write(chunk)
+    except _UploadTooLarge:
+        target.unlink(missing_ok=True)
+        return JSONResponse({"error": "bad_request", "detail": "size_exceeded"}, status_code=400, headers=_cache_headers_error())
 
-    # Compute sha256 for the response so the client can finalize submission.
-    import hashlib as _hashlib
-    h = _hashlib.sha256()
-    h.update(body)
-    sha_hex = h.hexdigest()
-    return JSONResponse({"sha256": sha_hex, "size_bytes": len(body)}, status_code=200, headers=_cache_headers_success())
+    # sha256 is computed while streaming so the client can finalize submission;
+    # the ledger lets finalization trust it without re-reading the file.
+    await _record_ingest(storage_key, body, subject=str(user.get("sub", "")))
+    return JSONResponse({"sha256": body.hexdigest(), "size_bytes": body.size}, status_code=200, headers=_cache_headers_success())
 
 
 @learning_router.put("/api/learning/internal/upload-proxy")
@@ -1370,8 +1699,13 @@ async def internal_upload_proxy(request: Request):
         path = path.replace("//", "/")
     if not path.startswith("/storage/v1/object/"):
         return JSONResponse({"error": "bad_request", "detail": "invalid_url"}, status_code=400, headers=_cache_headers_error())
+    # Optional storage key for the verified-ingest ledger; only trusted when the
+    # presigned path actually targets `<bucket>/<key>`.
+    ingest_key = str(request.query_params.get("key") or "").strip()
+    if ingest_key and not (STORAGE_KEY_RE.fullmatch(ingest_key) and path.endswith(f"/{_storage_bucket()}/{ingest_key}")):
+        ingest_key = ""
 
-    body, body_error = await _read_request_stream_with_limit(request, _max_upload_bytes())
+    body, body_error = await _open_upload_stream(request, _max_upload_bytes())
     if body_error:
         return JSONResponse({"error": "bad_request", "detail": body_error}, status_code=400, headers=_cache_headers_error())
     content_type = request.headers.get("content-type") or "application/octet-stream"
@@ -1380,24 +1714,33 @@ async def internal_upload_proxy(request: Request):
     if content_type not in allowed_mime:
         return JSONResponse({"error": "bad_request", "detail": "mime_not_allowed"}, status_code=400, headers=_cache_headers_error())
 
+    # The body is streamed upstream as it arrives; size limit and sha256 are
+    # enforced/computed on the fly (see `_UploadStream`). A declared length is
+    # passed on so Storage gets a fixed-length body; chunked only without one.
+    upstream_headers = {k: v for k, v in (forward_headers or {}).items() if str(k).lower() != "content-length"}
+    if body.declared_length is not None:
+        upstream_headers["Content-Length"] = str(body.declared_length)
     try:
         resp = await _async_forward_upload(
             url=target,
             payload=body,
             content_type=content_type,
             timeout=_upload_proxy_timeout_seconds(),
-            headers=forward_headers or None,
+            headers=upstream_headers or None,
         )
+        await body.drain()
     except Exception:
+        if body.exceeded:
+            return JSONResponse({"error": "bad_request", "detail": "size_exceeded"}, status_code=400, headers=_cache_headers_error())
         # Prod-parity: any upstream exception is a 502 (no soft-200 in dev/test).
         return JSONResponse({"error": "bad_gateway", "detail": "proxy_failed"}, status_code=502, headers=_cache_headers_error())
     if getattr(resp, "status_code", 500) >= 300:
         # Prod-parity: non-2xx upstream is a 502 in all environments.
         return JSONResponse({"error": "bad_gateway", "detail": "upstream_error"}, status_code=502, headers=_cache_headers_error())
 
-    import hashlib as _hashlib
-    h = _hashlib.sha256(); h.update(body)
-    return JSONResponse({"sha256": h.hexdigest(), "size_bytes": len(body)}, status_code=200, headers=_cache_headers_success())
+    if ingest_key:
+        await _record_ingest(ingest_key, body, subject=str(user.get("sub", "")))
+    return JSONResponse({"sha256": body.hexdigest(), "size_bytes": body.size}, status_code=200, headers=_cache_headers_success())
 
 @learning_router.get("/api/learning/courses/{course_id}/tasks/{task_id}/submissions")
 async def list_submissions(
@@ -56,3 +56,48 @@ async def learning_worker_health(request: Request):
     }
     status_code = 200 if probe.status == "healthy" else 503
     return _private_response(body, status_code=status_code)
+
+
+def _cache_stats() -> dict:
+    """Collect in-process cache counters per subsystem (best-effort)."""
+    caches: dict = {}
+    try:
+        from identity_access import directory_cache, roster_index  # type: ignore
+
+        caches["directory"] = directory_cache.stats()
+        caches["roster"] = roster_index.stats()
+    except Exception:  # pragma: no cover - optional in slim test apps
+        pass
+    try:
+        from components.markdown import cache_stats as markdown_cache_stats  # type: ignore
+
+        caches["markdown"] = markdown_cache_stats()
+    except Exception:  # pragma: no cover - optional in slim test apps
+        pass
+    try:
+        from backend.learning.content_cache import RELEASED_CONTENT_CACHE  # type: ignore
+
+        caches["learning_content"] = RELEASED_CONTENT_CACHE.stats()
+    except Exception:  # pragma: no cover - optional in slim test apps
+        pass
+    try:
+        from backend.storage.signed_url_cache import SIGNED_URL_CACHE  # type: ignore
+
+        caches["signed_urls"] = SIGNED_URL_CACHE.stats()
+    except Exception:  # pragma: no cover - optional in slim test apps
+        pass
+    return caches
+
+
+@operations_router.get("/internal/metrics/caches")
+async def cache_metrics(request: Request):
+    """
+    Return hit/miss counters of the in-process caches of this web worker.
+
+    Permissions:
+        Caller must have `teacher` or `operator` role (auth via gustav_session).
+    """
+    _, error = _require_teacher_or_operator(request)
+    if error:
+        return error
+    return _private_response({"caches": _cache_stats()}, status_code=200)
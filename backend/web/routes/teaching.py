@@ -37,14 +37,20 @@ from uuid import uuid4, UUID
 
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse, Response
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from pydantic.functional_validators import field_validator
 
 from teaching.services.materials import MaterialFileSettings, MaterialsService
 from teaching.services.tasks import TasksService
 from teaching.storage import NullStorageAdapter, StorageAdapterProtocol
-from backend.storage.config import get_submissions_bucket
+from backend.storage.config import dev_upload_root, get_submissions_bucket
+from backend.storage.preview_jobs import schedule_preview
+from backend.storage.previews import sign_preview, submission_preview_key
+from backend.storage.signed_url_cache import presign_download_cached
 from .security import _is_same_origin
+from .conditional import conditional_json, if_none_match, not_modified, read_cache_control, strong_etag
+from .uploads import resumable_intent
 teaching_router = APIRouter(tags=["Teaching"])  # explicit paths below
 logger = logging.getLogger("gustav.web.teaching")
 
@@ -1085,6 +1091,42 @@ def _json_private(payload, *, status_code: int = 200, vary_origin: bool = False)
     return JSONResponse(content=payload, status_code=status_code, headers=headers)
 
 
+def _read_headers(*, vary_origin: bool = False) -> dict:
+    headers = {"Cache-Control": read_cache_control()}
+    if vary_origin:
+        headers["Vary"] = "Origin"
+    return headers
+
+
+def _json_private_read(request: Request, payload, *, vary_origin: bool = False, etag: str | None = None):
+    """Return a successful read with a strong ETag (304 on matching If-None-Match).
+
+    Cache-Control is `private, no-cache` (see `routes.conditional`) so clients
+    revalidate instead of re-downloading. Without `etag` the body is hashed.
+    """
+    return conditional_json(request, payload, headers=_read_headers(vary_origin=vary_origin), etag=etag)
+
+
+def _unit_content_etag(request: Request, unit_id: str, *scope: str) -> tuple[str | None, Response | None]:
+    """Pre-query ETag for author reads below a unit: (etag, 304 response or None).
+
+    Derived from `unit_content_versions`, so a matching If-None-Match is
+    answered before sections, materials or tasks are loaded. Repos without
+    versions (in-memory) return (None, None) and the body hash is used.
+    Call only after the author guard.
+    """
+    version_of = getattr(_get_repo(), "unit_content_version", None)
+    if not callable(version_of):
+        return None, None
+    version = version_of(unit_id)
+    if version is None:
+        return None, None
+    etag = strong_etag(["teaching", unit_id, *scope, version])
+    if if_none_match(request, etag):
+        return etag, not_modified(etag, _read_headers())
+    return etag, None
+
+
 def _private_error(payload: dict, *, status_code: int, vary_origin: bool = False) -> JSONResponse:
     """Return error JSON with private, no-store cache headers.
 
@@ -1204,7 +1246,7 @@ async def list_courses(request: Request, limit: int = 20, offset: int = 0):
         items = repo.list_courses_for_teacher(teacher_id=sub, limit=limit, offset=offset)
     else:
         items = repo.list_courses_for_student(student_id=sub, limit=limit, offset=offset)
-    return _json_private([_serialize_course(c) for c in items], status_code=200)
+    return _json_private_read(request, [_serialize_course(c) for c in items])
 
 
 @teaching_router.post("/api/teaching/courses")
@@ -1287,7 +1329,7 @@ async def get_course(request: Request, course_id: str):
         c = repo.get_course(course_id)
     if not c:
         return JSONResponse({"error": "not_found"}, status_code=404)
-    return _json_private(_serialize_course(c), status_code=200)
+    return _json_private_read(request, _serialize_course(c))
 
 class CourseUpdate(BaseModel):
     # Accept raw strings (including empty) and validate in handler to return 400
@@ -1436,6 +1478,7 @@ class MaterialUploadIntentPayload(BaseModel):
     filename: str = Field(..., min_length=1, max_length=255)
     mime_type: str = Field(..., min_length=1, max_length=128)
     size_bytes: int = Field(..., ge=1)
+    resumable: bool = False
 
     @field_validator("filename")
     @classmethod
@@ -1654,7 +1697,7 @@ async def list_units(request: Request, limit: int = 20, offset: int = 0):
     except Exception as exc:
         logger.warning("list_units failed for sub=%s err=%s", sub[-6:], exc.__class__.__name__)
         return JSONResponse({"error": "forbidden"}, status_code=403)
-    return _json_private([_serialize_unit(u) for u in units], status_code=200)
+    return _json_private_read(request, [_serialize_unit(u) for u in units])
 
 
 @teaching_router.post("/api/teaching/units")
@@ -1736,7 +1779,7 @@ async def get_unit(request: Request, unit_id: str):
         u = repo.get_unit_for_author(unit_id, sub)
     if not u:
         return JSONResponse({"error": "not_found"}, status_code=404)
-    return _json_private(_serialize_unit(u), status_code=200)
+    return _json_private_read(request, _serialize_unit(u))
 
 
 @teaching_router.patch("/api/teaching/units/{unit_id}")
@@ -1837,11 +1880,14 @@ async def list_sections(request: Request, unit_id: str):
     guard = _guard_unit_author(unit_id, sub)
     if guard:
         return guard
+    etag, cached = _unit_content_etag(request, unit_id, "sections")
+    if cached is not None:
+        return cached
     try:
         items = _get_repo().list_sections_for_author(unit_id, sub)
     except Exception:
         return JSONResponse({"error": "forbidden"}, status_code=403)
-    return _json_private([_serialize_section(s) for s in items], status_code=200)
+    return _json_private_read(request, [_serialize_section(s) for s in items], etag=etag)
 
 
 @teaching_router.post("/api/teaching/units/{unit_id}/sections")
@@ -2000,7 +2046,8 @@ async def reorder_sections(request: Request, unit_id: str, payload: SectionReord
 async def list_section_tasks(request: Request, unit_id: str, section_id: str):
     """List tasks of a section for the authoring teacher.
 
-    Cache policy: private, no-store (teacher-scoped data must not be cached).
+    Cache policy: private, no-cache with an ETag from the unit's content
+    version (revalidated on every use; never stored by shared caches).
     """
 
     user, error = _require_teacher(request)
@@ -2014,11 +2061,14 @@ async def list_section_tasks(request: Request, unit_id: str, section_id: str):
     guard = _guard_unit_author(unit_id, sub)
     if guard:
         return guard
+    etag, cached = _unit_content_etag(request, unit_id, "tasks", section_id)
+    if cached is not None:
+        return cached
     try:
         items = _get_tasks_service().list_tasks(unit_id, section_id, sub)
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404)
-    return _json_private([_serialize_task(t) for t in items], status_code=200)
+    return _json_private_read(request, [_serialize_task(t) for t in items], etag=etag)
 
 
 @teaching_router.post("/api/teaching/units/{unit_id}/sections/{section_id}/tasks")
@@ -2244,11 +2294,14 @@ async def list_section_materials(request: Request, unit_id: str, section_id: str
     guard = _guard_unit_author(unit_id, sub)
     if guard:
         return guard
+    etag, cached = _unit_content_etag(request, unit_id, "materials", section_id)
+    if cached is not None:
+        return cached
     try:
         items = _get_materials_service().list_markdown_materials(unit_id, section_id, sub)
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404)
-    return _json_private([_serialize_material(m) for m in items], status_code=200)
+    return _json_private_read(request, [_serialize_material(m) for m in items], etag=etag)
 
 
 @teaching_router.post("/api/teaching/units/{unit_id}/sections/{section_id}/materials")
@@ -2539,6 +2592,7 @@ async def create_section_material_upload_intent(
             mime_type=payload.mime_type,
             size_bytes=int(payload.size_bytes),
             storage=STORAGE_ADAPTER,
+            resumable=payload.resumable,
         )
     except LookupError:
         return JSONResponse({"error": "not_found"}, status_code=404)
@@ -2551,6 +2605,16 @@ async def create_section_material_upload_intent(
         if str(exc) == "storage_adapter_not_configured":
             return JSONResponse({"error": "service_unavailable"}, status_code=503)
         raise
+    if payload.resumable:
+        # Chunks are staged server-side and delivered to the intent's key on completion.
+        intent["resumable"] = resumable_intent(
+            storage_key=intent["storage_key"],
+            bucket=MATERIAL_FILE_SETTINGS.storage_bucket,
+            mime_type=payload.mime_type.strip().lower(),
+            size_bytes=int(payload.size_bytes),
+            subject=sub,
+            context="teaching",
+        )
     return JSONResponse(content=intent, status_code=200)
 
 
@@ -2612,7 +2676,27 @@ async def finalize_section_material_upload(
             return JSONResponse({"error": "service_unavailable"}, status_code=503)
         raise
     status_code = 201 if created else 200
-    return JSONResponse(content=_serialize_material(material), status_code=status_code)
+    return JSONResponse(
+        content=_serialize_material(material),
+        status_code=status_code,
+        background=_material_preview_task(material) if created else None,
+    )
+
+
+def _material_preview_task(material: Any) -> BackgroundTask | None:
+    """Queue the inline preview for a new file material after responding.
+
+    The learning worker renders it (see `backend.storage.preview_jobs`).
+    """
+    data = _serialize_material(material)
+    work = schedule_preview(
+        kind="material",
+        storage_key=str(data.get("storage_key") or ""),
+        mime=str(data.get("mime_type") or ""),
+        adapter=STORAGE_ADAPTER,
+        local_root=dev_upload_root(),
+    )
+    return BackgroundTask(work) if work is not None else None
 
 
 @teaching_router.get(
@@ -2667,6 +2751,46 @@ async def get_section_material_download_url(
     return JSONResponse(content=payload, status_code=200, headers={"Cache-Control": "private, no-store"})
 
 
+@teaching_router.get("/api/teaching/units/{unit_id}/sections/{section_id}/materials/download-urls")
+async def get_section_material_download_urls(
+    request: Request,
+    unit_id: str,
+    section_id: str,
+    disposition: Optional[str] = None,
+):
+    """Generate short-lived download URLs for all file materials of a section (batch-signed)."""
+
+    user, error = _require_teacher(request)
+    if error:
+        return error
+    if not _is_uuid_like(unit_id):
+        return JSONResponse({"error": "bad_request", "detail": "invalid_unit_id"}, status_code=400)
+    if not _is_uuid_like(section_id):
+        return JSONResponse({"error": "bad_request", "detail": "invalid_section_id"}, status_code=400)
+    sub = _current_sub(user)
+    guard = _guard_unit_author(unit_id, sub)
+    if guard:
+        return guard
+    normalized_disposition = (disposition or "attachment").strip().lower()
+    if normalized_disposition not in {"inline", "attachment"}:
+        return JSONResponse({"error": "bad_request", "detail": "invalid_disposition"}, status_code=400)
+    try:
+        urls = _get_materials_service().generate_section_download_urls(
+            unit_id,
+            section_id,
+            sub,
+            disposition=normalized_disposition,
+            storage=STORAGE_ADAPTER,
+        )
+    except LookupError:
+        return JSONResponse({"error": "not_found"}, status_code=404)
+    except RuntimeError as exc:
+        if str(exc) == "storage_adapter_not_configured":
+            return JSONResponse({"error": "service_unavailable"}, status_code=503)
+        raise
+    return JSONResponse(content={"urls": urls}, status_code=200, headers={"Cache-Control": "private, no-store"})
+
+
 @teaching_router.post("/api/teaching/units/{unit_id}/sections/{section_id}/materials/reorder")
 async def reorder_section_materials(
     request: Request,
@@ -3057,7 +3181,7 @@ async def list_module_section_releases(request: Request, course_id: str, module_
         return _private_error({"error": "not_found"}, status_code=404, vary_origin=True)
     except PermissionError:
         return _private_error({"error": "forbidden"}, status_code=403, vary_origin=True)
-    return _json_private(releases, status_code=200, vary_origin=True)
+    return _json_private_read(request, releases, vary_origin=True)
 
 
 @teaching_router.get("/api/teaching/courses/{course_id}/modules/{module_id}/sections")
@@ -4106,7 +4230,8 @@ async def get_latest_submission_detail(
                     adapter = getattr(learning_routes, "STORAGE_ADAPTER", STORAGE_ADAPTER)
                 except Exception:
                     adapter = STORAGE_ADAPTER
-                presign = adapter.presign_download(  # type: ignore[union-attr]
+                presign = presign_download_cached(
+                    adapter,
                     bucket=get_submissions_bucket(),
                     key=str(storage_key),
                     expires_in=900,
@@ -4118,13 +4243,21 @@ async def get_latest_submission_detail(
                         size_int = int(size_bytes)
                         if size_int < 0:
                             size_int = 0
-                        files.append(
-                            {
-                                "mime": str(mime_type or ""),
-                                "size": size_int,
-                                "url": str(url),
-                            }
+                        entry = {
+                            "mime": str(mime_type or ""),
+                            "size": size_int,
+                            "url": str(url),
+                        }
+                        # Pre-generated preview (storage.previews); absent until derived.
+                        preview = sign_preview(
+                            adapter,
+                            bucket=get_submissions_bucket(),
+                            preview_key=submission_preview_key(str(storage_key)),
+                            expires_in=900,
                         )
+                        if preview:
+                            entry["preview_url"] = str(preview["url"])
+                        files.append(entry)
                     except (TypeError, ValueError):
                         # When size cannot be determined, we omit the file entry
                         # to keep the API contract (size must be an integer).
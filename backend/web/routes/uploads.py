@@ -0,0 +1,348 @@
+"""Resumable upload endpoints (chunk PUT, status, complete).
+
+Learning and teaching upload intents accept `"resumable": true` and return a
+`resumable` block (see `resumable_intent`). The client then PUTs fixed-size
+chunks to `/api/uploads/resumable/{upload_id}/chunks/{index}`, asks
+`GET /api/uploads/resumable/{upload_id}` which chunks arrived after a
+reconnect, and finally POSTs `/complete`. Completion verifies every chunk and
+the whole file, delivers it to the intent's storage key and returns the
+checksum the client finalizes the submission/material with.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import anyio
+import httpx
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from backend.storage.ingest_ledger import get_ingest_ledger
+from backend.storage.resumable import (
+    RESUMABLE_UPLOADS,
+    ResumableAssembly,
+    ResumableSession,
+    ResumableUploadError,
+)
+from .security import _is_same_origin
+
+uploads_router = APIRouter(tags=["Uploads"])
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _private_response(body: dict, *, status_code: int) -> JSONResponse:
+    """Return JSON with private, non-storable cache headers (upload state is per user)."""
+    return JSONResponse(
+        body,
+        status_code=status_code,
+        headers={"Cache-Control": "private, no-store", "Vary": "Origin"},
+    )
+
+
+def _require_user(request: Request):
+    user = getattr(request.state, "user", None)
+    if not isinstance(user, dict) or not user.get("sub"):
+        return None, _private_response({"error": "unauthenticated"}, status_code=401)
+    return user, None
+
+
+def _csrf_guard(request: Request) -> JSONResponse | None:
+    origin_present = (request.headers.get("origin") or request.headers.get("referer"))
+    if not origin_present or (not _is_same_origin(request)):
+        return _private_response({"error": "forbidden", "detail": "csrf_violation"}, status_code=403)
+    return None
+
+
+def _load_session(request: Request, upload_id: str):
+    """Resolve the caller's session; foreign, expired and unknown ids all map to 404."""
+    user, error = _require_user(request)
+    if error:
+        return None, error
+    session = RESUMABLE_UPLOADS.get(upload_id, subject=str(user.get("sub")))
+    if session is None:
+        return None, _private_response({"error": "not_found"}, status_code=404)
+    return session, None
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+def _status_body(session: ResumableSession) -> dict[str, Any]:
+    received = RESUMABLE_UPLOADS.received(session)
+    return {
+        "upload_id": session.upload_id,
+        "storage_key": session.storage_key,
+        "size_bytes": session.size_bytes,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "received": received,
+        "offset": RESUMABLE_UPLOADS.offset(session, received),
+        "expires_at": _iso(session.expires_at),
+    }
+
+
+def resumable_intent(
+    *,
+    storage_key: str,
+    bucket: str,
+    mime_type: str,
+    size_bytes: int,
+    subject: str,
+    context: str,
+    local_root: str | None = None,
+) -> dict[str, Any]:
+    """Open a resumable session for an upload intent and describe it for the client.
+
+    `context` ("learning" | "teaching") selects the storage adapter used at
+    completion; `local_root` delivers to the filesystem instead (dev stub).
+    """
+    session = RESUMABLE_UPLOADS.create(
+        storage_key=storage_key,
+        bucket=bucket,
+        mime_type=mime_type,
+        size_bytes=size_bytes,
+        subject=subject,
+        context=context,
+        local_root=local_root,
+    )
+    base = f"/api/uploads/resumable/{session.upload_id}"
+    return {
+        "upload_id": session.upload_id,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "status_url": base,
+        "chunk_url": base + "/chunks/{index}",
+        "complete_url": base + "/complete",
+        "expires_at": _iso(session.expires_at),
+    }
+
+
+def _route_module(name: str):
+    # Resolve like main.py does (`routes.*`) so test patches and wiring apply.
+    try:
+        return importlib.import_module(f"routes.{name}")
+    except ModuleNotFoundError:  # pragma: no cover - package-qualified import path
+        return importlib.import_module(f"backend.web.routes.{name}")
+
+
+def _storage_adapter(context: str):
+    module = _route_module("teaching" if context == "teaching" else "learning")
+    return getattr(module, "STORAGE_ADAPTER", None)
+
+
+def _verify_assembly(session: ResumableSession) -> tuple[str, int]:
+    """Read all chunks once, checking each against its stored checksum."""
+    assembly = RESUMABLE_UPLOADS.assemble(session)
+    for _ in assembly:
+        pass
+    return assembly.hexdigest(), assembly.size
+
+
+def _check_expected(sha: str, expected: str) -> None:
+    if expected and expected != sha:
+        raise ResumableUploadError("checksum_mismatch")
+
+
+def _deliver_local(session: ResumableSession, expected: str) -> tuple[str, int]:
+    """Assemble into `local_root/storage_key`; renamed into place only when verified."""
+    base = Path(session.local_root or "").resolve()
+    target = (base / session.storage_key).resolve()
+    if os.path.commonpath([str(base), str(target)]) != str(base):
+        raise ResumableUploadError("path_escape")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{session.upload_id}.tmp")
+    assembly = RESUMABLE_UPLOADS.assemble(session)
+    try:
+        with tmp.open("wb") as fh:
+            for block in assembly:
+                fh.write(block)
+        _check_expected(assembly.hexdigest(), expected)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return assembly.hexdigest(), assembly.size
+
+
+async def _iter_assembly(assembly: ResumableAssembly) -> AsyncIterator[bytes]:
+    """Yield assembled blocks; disk reads and chunk checks run in a worker thread."""
+    blocks = iter(assembly)
+    while True:
+        block = await anyio.to_thread.run_sync(next, blocks, None)
+        if block is None:
+            return
+        yield block
+
+
+async def _deliver_remote(session: ResumableSession) -> str:
+    """Stream the verified file to a fresh presigned upload URL (patchable for tests).
+
+    The intent's original presign may have expired while chunks trickled in,
+    so the target is signed again at completion. Signing (a Storage round
+    trip) and reading the staged chunks run in worker threads; the size is
+    known, so the body is sent with a Content-Length instead of chunked.
+    Returns the sha256 of the bytes actually sent.
+    """
+    _learning = _route_module("learning")
+    adapter = _storage_adapter(session.context)
+    if adapter is None:
+        raise RuntimeError("storage_adapter_not_configured")
+    presigned = await anyio.to_thread.run_sync(
+        lambda: adapter.presign_upload(
+            bucket=session.bucket,
+            key=session.storage_key,
+            expires_in=300,
+            headers={"content-type": session.mime_type},
+        )
+    )
+    url = str((presigned or {}).get("url") or "")
+    if not url:
+        raise RuntimeError("presign_failed")
+    assembly = await anyio.to_thread.run_sync(RESUMABLE_UPLOADS.assemble, session)
+    headers = dict((presigned or {}).get("headers") or {})
+    headers["Content-Length"] = str(session.size_bytes)
+    resp = await _learning._async_forward_upload(
+        url=url,
+        payload=_iter_assembly(assembly),
+        content_type=session.mime_type,
+        timeout=_learning._upload_proxy_timeout_seconds(),
+        headers=headers,
+    )
+    if resp.status_code >= 300:
+        raise RuntimeError("upload_failed")
+    return assembly.hexdigest()
+
+
+@uploads_router.put("/api/uploads/resumable/{upload_id}/chunks/{index}")
+async def put_resumable_chunk(request: Request, upload_id: str, index: str):
+    """Store one chunk; re-sending an index replaces it.
+
+    Chunks must be exactly `chunk_size` bytes (the last one: the remainder).
+    An optional `X-Chunk-SHA256` header is checked against the received bytes.
+    """
+    csrf = _csrf_guard(request)
+    if csrf:
+        return csrf
+    session, error = _load_session(request, upload_id)
+    if error:
+        return error
+    if not index.isdigit():
+        return _private_response({"error": "bad_request", "detail": "invalid_chunk_index"}, status_code=400)
+    chunk_index = int(index)
+    declared = (request.headers.get("content-length") or "").strip()
+    if (
+        declared.isdigit()
+        and chunk_index < session.chunk_count
+        and int(declared) != session.chunk_length(chunk_index)
+    ):
+        return _private_response({"error": "bad_request", "detail": "chunk_size_mismatch"}, status_code=400)
+    try:
+        digest = await RESUMABLE_UPLOADS.write_chunk(
+            session,
+            chunk_index,
+            request.stream(),
+            expected_sha256=request.headers.get("x-chunk-sha256"),
+        )
+    except ResumableUploadError as exc:
+        if str(exc) == "completion_in_progress":
+            return _private_response({"error": "conflict", "detail": str(exc)}, status_code=409)
+        return _private_response({"error": "bad_request", "detail": str(exc)}, status_code=400)
+    body = _status_body(session)
+    return _private_response(
+        {"index": chunk_index, "sha256": digest, "received": body["received"], "offset": body["offset"]},
+        status_code=200,
+    )
+
+
+@uploads_router.get("/api/uploads/resumable/{upload_id}")
+async def get_resumable_status(request: Request, upload_id: str):
+    """Report received chunks so a client can resume after a dropped connection."""
+    session, error = _load_session(request, upload_id)
+    if error:
+        return error
+    return _private_response(_status_body(session), status_code=200)
+
+
+@uploads_router.post("/api/uploads/resumable/{upload_id}/complete")
+async def complete_resumable_upload(request: Request, upload_id: str):
+    """Verify all chunks, deliver the file to its storage key and close the session.
+
+    Body (optional): {"sha256": "<hex>"} — the client's checksum of the whole
+    file; a mismatch rejects the upload before anything reaches Storage.
+
+    Responses:
+        200 {storage_key, sha256, size_bytes}; 409 detail=incomplete with the
+        missing chunk indices or detail=completion_in_progress (chunk PUTs get
+        the same 409 meanwhile); 400 chunk_corrupt (the named chunk was dropped
+        and must be re-sent) or checksum_mismatch; 502 when Storage rejects
+        the upload (session kept for a retry).
+    """
+    csrf = _csrf_guard(request)
+    if csrf:
+        return csrf
+    session, error = _load_session(request, upload_id)
+    if error:
+        return error
+    expected = ""
+    if await request.body():
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return _private_response({"error": "bad_request", "detail": "invalid_input"}, status_code=400)
+        expected = str(payload.get("sha256") or "").strip().lower()
+        if expected and not _SHA256_RE.fullmatch(expected):
+            return _private_response({"error": "bad_request", "detail": "checksum_mismatch"}, status_code=400)
+
+    if not RESUMABLE_UPLOADS.begin_completion(session):
+        return _private_response({"error": "conflict", "detail": "completion_in_progress"}, status_code=409)
+    try:
+        return await _complete(session, expected)
+    finally:
+        RESUMABLE_UPLOADS.end_completion(session)
+
+
+async def _complete(session: ResumableSession, expected: str) -> JSONResponse:
+    try:
+        if session.local_root:
+            sha, size = await anyio.to_thread.run_sync(_deliver_local, session, expected)
+        else:
+            # Nothing reaches Storage before every chunk and the whole file check out.
+            sha, size = await anyio.to_thread.run_sync(_verify_assembly, session)
+            _check_expected(sha, expected)
+            # The ledger may only vouch for the bytes Storage actually received.
+            _check_expected(await _deliver_remote(session), sha)
+    except ResumableUploadError as exc:
+        detail = str(exc)
+        if detail == "incomplete":
+            missing = sorted(set(range(session.chunk_count)) - set(RESUMABLE_UPLOADS.received(session)))
+            return _private_response({"error": "conflict", "detail": detail, "missing": missing}, status_code=409)
+        if detail == "checksum_mismatch":
+            # The chunks are intact but do not form the declared file: start over.
+            RESUMABLE_UPLOADS.discard(session.upload_id)
+        body: dict[str, Any] = {"error": "bad_request", "detail": detail}
+        if exc.index is not None:
+            body["index"] = exc.index
+        return _private_response(body, status_code=400)
+    except RuntimeError as exc:
+        if str(exc) == "storage_adapter_not_configured":
+            return _private_response({"error": "service_unavailable"}, status_code=503)
+        return _private_response({"error": "bad_gateway", "detail": "upload_failed"}, status_code=502)
+    except httpx.HTTPError:
+        return _private_response({"error": "bad_gateway", "detail": "upload_failed"}, status_code=502)
+
+    # The bytes passed through us: finalization can trust this hash (ledger).
+    ledger = get_ingest_ledger()
+    await anyio.to_thread.run_sync(
+        lambda: ledger.record(session.storage_key, sha, size, subject=session.subject)
+    )
+    RESUMABLE_UPLOADS.discard(session.upload_id)
+    return _private_response({"storage_key": session.storage_key, "sha256": sha, "size_bytes": size}, status_code=200)
@@ -65,18 +65,25 @@ class Gustav {
 
   /**
    * Generic intent + PUT upload helper. Returns { intent, sha, mime, size }.
+   * Large files use a resumable (chunked) session so a dropped connection
+   * only costs the current chunk.
    */
   async requestIntentAndUpload(intentUrl, file, payload) {
+    const resumable = file.size > 8 * 1024 * 1024;
     const intentResp = await fetch(intentUrl, {
       method: 'POST',
       credentials: 'same-origin',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(payload)
+      body: JSON.stringify(resumable ? { ...payload, resumable: true } : payload)
     });
     if (!intentResp.ok) {
       throw new Error(`intent_failed_${intentResp.status}`);
     }
     const intent = await intentResp.json();
+    if (intent.resumable) {
+      const sha = await this.uploadResumable(intent.resumable, file);
+      return { intent, sha, mime: file.type || 'application/octet-stream', size: file.size };
+    }
     const uploadUrl = intent.url || intent.upload_url;
     // Normalize headers to avoid duplicate Content-Type entries in browsers
     const uploadHeaders = new Headers();
@@ -116,6 +123,79 @@ class Gustav {
     return { intent, sha, mime: file.type || 'application/octet-stream', size: file.size };
   }
 
+  /**
+   * Upload `file` through a resumable session: send missing chunks (with
+   * retries and backoff), then complete. Each chunk carries its SHA-256 in
+   * `X-Chunk-SHA256`, and complete sends the whole-file digest, so corruption
+   * is caught at the chunk that caused it and before anything reaches Storage.
+   * Without WebCrypto (plain-HTTP deployments) both digests are omitted; the
+   * server still verifies what it staged. Returns the server-computed sha256.
+   */
+  async uploadResumable(session, file) {
+    // Hash the whole file while chunks are in flight.
+    const fileSha = this.canHashSha256() ? this.hashFileSha256(file) : Promise.resolve('');
+    fileSha.catch(() => {});
+    const statusResp = await fetch(session.status_url, { credentials: 'same-origin' });
+    if (!statusResp.ok) throw new Error(`upload_failed_${statusResp.status}`);
+    const received = new Set((await statusResp.json()).received || []);
+    for (let index = 0; index < session.chunk_count; index += 1) {
+      if (received.has(index)) continue;
+      await this.putResumableChunk(session, file, index);
+    }
+    const sha256 = await fileSha;
+    const body = JSON.stringify(sha256 ? { sha256 } : {});
+    for (let attempt = 0; ; attempt += 1) {
+      const doneResp = await fetch(session.complete_url, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json' },
+        body
+      });
+      if (doneResp.ok) return (await doneResp.json()).sha256 || '';
+      let detail = {};
+      try { detail = await doneResp.json(); } catch (_) { detail = {}; }
+      // A chunk damaged on disk is dropped server-side: re-send it once more.
+      if (doneResp.status === 400 && detail.detail === 'chunk_corrupt' && Number.isInteger(detail.index) && attempt < 2) {
+        await this.putResumableChunk(session, file, detail.index);
+        continue;
+      }
+      throw new Error(`upload_failed_${doneResp.status}`);
+    }
+  }
+
+  /**
+   * PUT one chunk with its SHA-256; retries network drops, 5xx and checksum
+   * mismatches (bytes damaged in transit) with exponential backoff.
+   */
+  async putResumableChunk(session, file, index) {
+    const start = index * session.chunk_size;
+    const chunk = await file.slice(start, Math.min(file.size, start + session.chunk_size)).arrayBuffer();
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    if (this.canHashSha256()) headers['X-Chunk-SHA256'] = await this.sha256Hex(chunk);
+    let lastError = null;
+    for (let attempt = 0; attempt < 5; attempt += 1) {
+      try {
+        const resp = await fetch(session.chunk_url.replace('{index}', String(index)), {
+          method: 'PUT',
+          credentials: 'same-origin',
+          headers,
+          body: chunk
+        });
+        if (resp.ok) return;
+        lastError = new Error(`upload_failed_${resp.status}`);
+        if (resp.status < 500) {
+          let detail = {};
+          try { detail = await resp.json(); } catch (_) { detail = {}; }
+          if (detail.detail !== 'chunk_checksum_mismatch') break;
+        }
+      } catch (err) {
+        lastError = err; // network drop: retry this chunk only
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+    throw lastError;
+  }
+
   /**
    * Theme Management
    */
@@ -308,18 +388,48 @@ class Gustav {
    * - Click on a .file-preview wrapper toggles file-preview--zoomed.
    * - Keyboard: Enter/Space on focused wrapper toggles as well.
    * - Uses event delegation so that HTMX-inserted previews also work.
+   * - Pre-generated previews (img[data-full-src]) are swapped for the original
+   *   on first zoom, or right away when the preview itself fails to load.
    */
   initFilePreviewZoom() {
     if (this.filePreviewZoomInit) return;
     this.filePreviewZoomInit = true;
 
+    const loadOriginal = (thumb) => {
+      if (!thumb || !thumb.dataset || !thumb.dataset.fullSrc) return;
+      const full = thumb.dataset.fullSrc;
+      delete thumb.dataset.fullSrc;
+      if (thumb.dataset.fullKind === 'pdf') {
+        const frame = document.createElement('iframe');
+        frame.src = full;
+        frame.title = thumb.alt || 'PDF-Vorschau';
+        frame.className = 'file-preview__frame';
+        frame.style.width = '100%';
+        frame.style.height = thumb.dataset.frameHeight || '600px';
+        frame.style.border = 'none';
+        thumb.replaceWith(frame);
+      } else {
+        thumb.src = full;
+        thumb.classList.remove('file-preview__thumb');
+      }
+    };
+
     const toggleZoom = (wrapper) => {
       if (!wrapper || !wrapper.classList) return;
       const zoomed = wrapper.classList.toggle('file-preview--zoomed');
       wrapper.setAttribute('aria-pressed', zoomed ? 'true' : 'false');
       wrapper.setAttribute('aria-expanded', zoomed ? 'true' : 'false');
+      if (zoomed) loadOriginal(wrapper.querySelector('img[data-full-src]'));
     };
 
+    // Missing or expired previews fall back to the original ('error' does not bubble).
+    document.addEventListener('error', (event) => {
+      const target = event.target;
+      if (target && target.matches && target.matches('.file-preview img[data-full-src]')) {
+        loadOriginal(target);
+      }
+    }, true);
+
     document.addEventListener('click', (event) => {
       const target = event.target;
       if (!target || !target.closest) return;
@@ -429,11 +539,25 @@ class Gustav {
    * Compute SHA-256 digest for a File using Web Crypto.
    */
   async hashFileSha256(file) {
+    return this.sha256Hex(await file.arrayBuffer());
+  }
+
+  /**
+   * Whether Web Crypto digests are available (not in insecure contexts).
+   */
+  canHashSha256() {
+    const cryptoObj = window.crypto || window.msCrypto;
+    return Boolean(cryptoObj && cryptoObj.subtle);
+  }
+
+  /**
+   * Hex SHA-256 digest of an ArrayBuffer using Web Crypto.
+   */
+  async sha256Hex(buffer) {
     const cryptoObj = window.crypto || window.msCrypto;
     if (!cryptoObj || !cryptoObj.subtle) {
       throw new Error('Secure hashing not supported in this browser');
     }
-    const buffer = await file.arrayBuffer();
     const hashBuffer = await cryptoObj.subtle.digest('SHA-256', buffer);
     const hashArray = Array.from(new Uint8Array(hashBuffer));
     return hashArray.map((b) => b.toString(16).padStart(2, '0')).join('');
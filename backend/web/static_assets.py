@@ -0,0 +1,213 @@
+"""
+Static asset pipeline: fingerprinted filenames, precompressed variants, manifest.
+
+Why:
+    Classroom laptops on slow school Wi-Fi re-validated every CSS/JS file on
+    each navigation. Content-hashed filenames can be cached forever
+    (`immutable`) because any change produces a new URL, and precompressed
+    `.br`/`.gz` variants avoid compressing the same bytes per request.
+
+Build (Dockerfile / `make static-assets`):
+    python static_assets.py            # writes static/dist/ + manifest.json
+
+    For each file below `static/css` and `static/js` this writes
+    `static/dist/<dir>/<stem>.<hash12><ext>` plus `.gz` (always) and `.br`
+    (when the optional `brotli` package is installed), and a manifest mapping
+    the logical path (e.g. `css/gustav.css`) to the fingerprinted one.
+
+Runtime:
+    - `asset_url("css/gustav.css")` returns `/static/dist/css/gustav.<hash>.css`
+      when the manifest lists it. Without a build (local dev, tests) it falls
+      back to `/static/css/gustav.css?v=<hash>` so cache busting still works.
+    - `PrecompressedStaticFiles` serves fingerprinted files with
+      `Cache-Control: public, max-age=31536000, immutable` and negotiates the
+      `.br`/`.gz` variant from `Accept-Encoding`. Unfingerprinted files get
+      `no-cache` so browsers revalidate them via ETag.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:  # optional: brotli variants are skipped when the package is missing
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None  # type: ignore
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+SOURCE_DIRS = ("css", "js")
+COMPRESSIBLE_SUFFIXES = (".css", ".js", ".svg", ".json", ".map", ".txt")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_HASH_LEN = 12
+_FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{%d}\.[A-Za-z0-9]+$" % _HASH_LEN)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:_HASH_LEN]
+
+
+def _fingerprinted_name(rel: Path, digest: str) -> Path:
+    return rel.with_name(f"{rel.stem}.{digest}{rel.suffix}")
+
+
+def build(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """Write fingerprinted + precompressed assets and the manifest.
+
+    Returns the manifest mapping (logical path → path relative to static_dir).
+    The output directory is rebuilt from scratch so stale hashes never linger.
+    """
+    static_dir = Path(static_dir)
+    dist = static_dir / DIST_NAME
+    if dist.exists():
+        shutil.rmtree(dist)
+    assets: Dict[str, str] = {}
+    for source_dir in SOURCE_DIRS:
+        root = static_dir / source_dir
+        if not root.is_dir():
+            continue
+        for path in sorted(p for p in root.rglob("*") if p.is_file()):
+            rel = path.relative_to(static_dir)
+            data = path.read_bytes()
+            target_rel = Path(DIST_NAME) / _fingerprinted_name(rel, content_hash(data))
+            target = static_dir / target_rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            if path.suffix in COMPRESSIBLE_SUFFIXES:
+                # mtime=0 keeps the .gz byte-identical across builds
+                target.with_name(target.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    target.with_name(target.name + ".br").write_bytes(brotli.compress(data, quality=11))
+            assets[rel.as_posix()] = target_rel.as_posix()
+    (dist / MANIFEST_NAME).parent.mkdir(parents=True, exist_ok=True)
+    (dist / MANIFEST_NAME).write_text(json.dumps({"version": 1, "assets": assets}, indent=2, sort_keys=True) + "\n")
+    reset_cache()
+    return assets
+
+
+# --- Manifest lookup --------------------------------------------------------------
+
+_lock = Lock()
+_manifest: Optional[Dict[str, str]] = None
+_fallback_hashes: Dict[str, str] = {}
+
+
+def _load_manifest(static_dir: Path) -> Dict[str, str]:
+    try:
+        raw = json.loads((static_dir / DIST_NAME / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    assets = raw.get("assets") if isinstance(raw, dict) else None
+    return {str(k): str(v) for k, v in assets.items()} if isinstance(assets, dict) else {}
+
+
+def asset_url(path: str, *, static_dir: Path = STATIC_DIR) -> str:
+    """Public URL for a static asset, fingerprinted when possible."""
+    global _manifest
+    logical = path.lstrip("/")
+    with _lock:
+        if _manifest is None:
+            _manifest = _load_manifest(static_dir)
+        built = _manifest.get(logical)
+        if built:
+            return f"/static/{built}"
+        digest = _fallback_hashes.get(logical)
+    if digest is None:
+        try:
+            digest = content_hash((static_dir / logical).read_bytes())
+        except OSError:
+            return f"/static/{logical}"
+        with _lock:
+            _fallback_hashes[logical] = digest
+    return f"/static/{logical}?v={digest}"
+
+
+def reset_cache() -> None:
+    """Forget the loaded manifest and fallback hashes (after a build, in tests)."""
+    global _manifest
+    with _lock:
+        _manifest = None
+        _fallback_hashes.clear()
+
+
+# --- Serving ----------------------------------------------------------------------
+
+def _accepted_encodings(scope: Scope) -> set[str]:
+    header = Headers(scope=scope).get("accept-encoding", "")
+    accepted: set[str] = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles with immutable caching and precompressed variants for fingerprinted assets."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        name = os.path.basename(str(full_path))
+        if not _FINGERPRINT_RE.search(name):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers.setdefault("Cache-Control", REVALIDATE_CACHE_CONTROL)
+            return response
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        accepted = _accepted_encodings(scope)
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            variant = f"{full_path}{suffix}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            response = FileResponse(variant, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+            response.headers["Content-Encoding"] = encoding
+            return self._finalize_immutable(response, scope)
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        return self._finalize_immutable(response, scope)
+
+    def _finalize_immutable(self, response: FileResponse, scope: Scope) -> Response:
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets")
+    parser.add_argument("--static-dir", type=Path, default=STATIC_DIR)
+    args = parser.parse_args(argv)
+    assets = build(args.static_dir)
+    variants = "gzip+brotli" if brotli is not None else "gzip"
+    print(f"built {len(assets)} assets ({variants}) into {args.static_dir / DIST_NAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,6 +5,16 @@ Creates timestamped backups of the Supabase Postgres database (including auth),
 the Keycloak database, and Supabase storage buckets, placing all artifacts in
 `/backups/<timestamp>/`. Designed for cron execution inside the container.
 
+Storage snapshots:
+    Storage is backed up as an incremental snapshot tree (`storage/`) plus a
+    gzip'd JSON manifest (`storage_manifest.json.gz`, path → size, mtime_ns,
+    sha256). Files whose size and mtime match the previous successful snapshot
+    are hardlinked from it; only new or changed files are copied, and every
+    copy is re-read and checked against its sha256. Identical content within a
+    snapshot is linked once. Each snapshot is a complete tree, so any snapshot
+    can be restored on its own and retention can delete whole directories:
+    the filesystem frees data once no snapshot links to it any more.
+
 Inputs (required via environment):
 - SESSION_DATABASE_URL (preferred) or BACKUP_DATABASE_URL or DATABASE_URL: Postgres URI with sufficient privileges to dump Supabase DB (auth schema included).
 - KC_DB_URL: Postgres URI for Keycloak DB (includes credentials).
@@ -12,11 +22,21 @@ Inputs (required via environment):
 - BACKUP_DIR: Destination directory for backups (e.g., /backups).
 - RETENTION_DAYS: Number of days to keep backups (default: 7).
 - BACKUP_PG_TIMEOUT_SECONDS: Optional pg_dump timeout (default: 300 seconds).
+- BACKUP_STORAGE_MODE: `snapshot` (default, incremental) or `tar` (full tar.gz per run).
+- BACKUP_PG_FORMAT: `plain` (default, gzip'd SQL) or `directory` (`pg_dump --format=directory`).
+- BACKUP_PG_JOBS: Parallel workers per directory-format dump (default: 2).
+- BACKUP_PG_COMPRESS: Directory-format `--compress` value, e.g. `zstd:3`, `lz4`,
+  `gzip:6` or a level `0-9` (default: pg_dump's own; methods need pg_dump >= 16).
 
 Behavior:
 - On each run: create timestamped directory, dump Supabase DB and Keycloak DB
-  to gzip-compressed plain SQL, archive storage buckets to tar.gz, write a
-  manifest (ok/failed), then delete backup directories older than RETENTION_DAYS.
+  concurrently (gzip-compressed plain SQL, or pg_dump directory format with
+  parallel jobs), snapshot storage buckets (or archive them to
+  tar.gz), write a manifest (ok/failed), then delete backup directories older
+  than RETENTION_DAYS. The manifest records duration and size per phase.
+- `--verify-storage DIR` re-hashes every file of a snapshot against its
+  manifest; `--restore-storage DIR --restore-to DEST` restores a snapshot into
+  DEST (verified by sha256). Both print a JSON report.
 - Fails fast on missing configuration or command errors; exits non-zero when
   any step fails. Credentials are passed via env (PGPASSWORD) so passwords do
   not appear in process lists or logs. Caller must ensure the cron user can
@@ -27,18 +47,30 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import hashlib
 import json
 import os
+import re
 import shutil
+import signal
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlsplit, urlunsplit
 import gzip
 import time
 import select
 
+STORAGE_SNAPSHOT_DIR = "storage"
+STORAGE_MANIFEST = "storage_manifest.json.gz"
+STORAGE_MODES = ("snapshot", "tar")
+_COPY_CHUNK = 1024 * 1024
+DB_FORMATS = ("plain", "directory")
+_COMPRESS_RE = re.compile(r"^(?:[0-9]|(?P<method>gzip|lz4|zstd|none)(?::[0-9]+)?)$")
+
 
 def _require_env(keys: List[str]) -> Dict[str, str]:
     env: Dict[str, str] = {}
@@ -110,6 +142,132 @@ def _run_pg_dump(uri: str, dest: Path, *, timeout: int, env: Dict[str, str]) ->
         raise RuntimeError(f"pg_dump failed for {uri}: {stderr.decode().strip()}")
 
 
+def _run_pg_dump_directory(
+    uri: str, dest: Path, *, jobs: int, compress: str, timeout: int, env: Dict[str, str]
+) -> None:
+    """
+    Dump into a directory-format archive with `jobs` parallel workers.
+
+    pg_dump compresses per table file itself (gzip/lz4/zstd), so no Python
+    compression sits in the data path. The dump runs in its own process group
+    so a timeout also stops the worker processes.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    cmd = ["pg_dump", "--format=directory", f"--jobs={jobs}", "--no-owner", f"--file={dest}"]
+    if compress:
+        cmd.append(f"--compress={compress}")
+    cmd.append(uri)
+    proc_env = os.environ.copy()
+    proc_env.update(env)
+    with subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=proc_env,
+        start_new_session=True,
+    ) as proc:
+        try:
+            _, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.communicate()
+            raise RuntimeError(f"pg_dump timeout after {timeout}s for {uri}")
+    if proc.returncode != 0:
+        raise RuntimeError(f"pg_dump failed for {uri}: {stderr.decode().strip()}")
+
+
+@dataclass
+class DumpSettings:
+    """How database dumps are written (see BACKUP_PG_* in the module docstring)."""
+
+    format: str = "plain"
+    jobs: int = 2
+    compress: str = ""
+    timeout: int = 300
+
+    @property
+    def suffix(self) -> str:
+        return ".dir" if self.format == "directory" else ".sql.gz"
+
+
+def _pg_dump_major() -> int | None:
+    try:
+        out = subprocess.run(["pg_dump", "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"\(PostgreSQL\)\s+(\d+)", out)
+    return int(match.group(1)) if match else None
+
+
+def _read_dump_settings() -> DumpSettings:
+    """Read BACKUP_PG_* settings; raise SystemExit with a clear message when invalid."""
+    fmt = os.environ.get("BACKUP_PG_FORMAT", "plain").strip().lower() or "plain"
+    if fmt not in DB_FORMATS:
+        raise SystemExit(f"Invalid BACKUP_PG_FORMAT: {fmt} (expected one of {', '.join(DB_FORMATS)})")
+    try:
+        jobs = int(os.environ.get("BACKUP_PG_JOBS", "2"))
+        timeout = int(os.environ.get("BACKUP_PG_TIMEOUT_SECONDS", "300"))
+    except ValueError as exc:
+        raise SystemExit(f"Invalid BACKUP_PG_JOBS/BACKUP_PG_TIMEOUT_SECONDS: {exc}")
+    if jobs < 1:
+        raise SystemExit("BACKUP_PG_JOBS must be >= 1")
+    compress = os.environ.get("BACKUP_PG_COMPRESS", "").strip().lower()
+    if compress and fmt == "directory":
+        match = _COMPRESS_RE.match(compress)
+        if not match:
+            raise SystemExit(f"Invalid BACKUP_PG_COMPRESS: {compress} (e.g. zstd:3, lz4, gzip:6, 0-9)")
+        major = _pg_dump_major() if match.group("method") else None
+        if major is not None and major < 16:
+            raise SystemExit(f"BACKUP_PG_COMPRESS={compress} needs pg_dump >= 16 (found {major}); use a level 0-9")
+    return DumpSettings(format=fmt, jobs=jobs, compress=compress, timeout=timeout)
+
+
+def _path_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _dump_databases(
+    dumps: List[Tuple[str, str, Dict[str, str]]],
+    target_dir: Path,
+    settings: DumpSettings,
+    phases: Dict[str, Dict[str, object]],
+) -> None:
+    """
+    Run all dumps concurrently; each enforces its own timeout.
+
+    `dumps` holds (name, redacted uri, env) tuples. Finished dumps are recorded
+    in `phases` (file, seconds, bytes) even when another one fails; all
+    failures are raised together afterwards.
+    """
+
+    def _one(name: str, uri: str, env: Dict[str, str]) -> Dict[str, object]:
+        dest = target_dir / f"{name}{settings.suffix}"
+        start = time.monotonic()
+        if settings.format == "directory":
+            _run_pg_dump_directory(
+                uri, dest, jobs=settings.jobs, compress=settings.compress, timeout=settings.timeout, env=env
+            )
+        else:
+            _run_pg_dump(uri, dest, timeout=settings.timeout, env=env)
+        return {"file": dest.name, "seconds": round(time.monotonic() - start, 3), "bytes": _path_size(dest)}
+
+    errors: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(1, len(dumps)), thread_name_prefix="pg_dump") as pool:
+        futures = [(name, pool.submit(_one, name, uri, env)) for name, uri, env in dumps]
+        for name, future in futures:
+            try:
+                phases[name] = future.result()
+            except Exception as exc:  # noqa: BLE001
+                errors.append(str(exc))
+    if errors:
+        raise RuntimeError("; ".join(errors))
+
+
 def _archive_storage(storage_root: Path, dest: Path) -> None:
     if not storage_root.exists():
         raise RuntimeError(f"storage root not found: {storage_root}")
@@ -124,7 +282,233 @@ def _archive_storage(storage_root: Path, dest: Path) -> None:
             tar.add(child, arcname=child.name)
 
 
-def _write_manifest(target_dir: Path, status: str, extra: Dict[str, str]) -> None:
+@dataclass
+class SnapshotStats:
+    """Counters for one storage snapshot (written to manifest.json)."""
+
+    files: int = 0
+    bytes_total: int = 0
+    linked: int = 0
+    copied: int = 0
+    bytes_copied: int = 0
+    deduplicated: int = 0
+    skipped: int = 0
+    previous: str = ""
+
+    def as_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def _iter_storage_files(root: Path) -> Iterator[Tuple[str, Optional[os.stat_result]]]:
+    """
+    Yield (relative posix path, stat) for every entry below root.
+
+    Symlinks and special files yield `None` as stat so callers can count them;
+    they are not part of a snapshot (the tar archive never followed them either).
+    """
+    stack: List[Tuple[str, str]] = [(str(root), "")]
+    while stack:
+        current, prefix = stack.pop()
+        with os.scandir(current) as it:
+            entries = list(it)
+        for entry in entries:
+            rel = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((entry.path, rel + "/"))
+            elif entry.is_file(follow_symlinks=False):
+                yield rel, entry.stat(follow_symlinks=False)
+            else:
+                yield rel, None
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_COPY_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_with_hash(src: Path, dest: Path, mtime_ns: int) -> Tuple[str, int]:
+    """Copy src to dest in chunks, returning (sha256, size) of the bytes written."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(src, "rb") as reader, open(dest, "wb") as writer:
+        for chunk in iter(lambda: reader.read(_COPY_CHUNK), b""):
+            digest.update(chunk)
+            writer.write(chunk)
+            size += len(chunk)
+    os.utime(dest, ns=(mtime_ns, mtime_ns))
+    return digest.hexdigest(), size
+
+
+def _link(existing: Path, dest: Path, size: int, *, replace: bool = False) -> bool:
+    """
+    Hardlink `existing` to `dest` (with `replace`, swap out an existing dest atomically).
+
+    Returns False instead of raising when linking is not possible (missing or
+    changed source, link limit reached, filesystem without hardlinks); the
+    caller then keeps or makes a real copy.
+    """
+    tmp = dest.with_name(dest.name + ".link-tmp") if replace else dest
+    try:
+        if existing.stat().st_size != size:
+            return False
+        os.link(existing, tmp)
+    except OSError:
+        return False
+    if replace:
+        try:
+            os.replace(tmp, dest)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return False
+    return True
+
+
+def _load_storage_manifest(snapshot_dir: Path) -> Dict[str, Dict[str, object]]:
+    with gzip.open(snapshot_dir / STORAGE_MANIFEST, "rt", encoding="utf-8") as handle:
+        data = json.load(handle)
+    return {entry["path"]: entry for entry in data.get("files", [])}
+
+
+def _write_storage_manifest(snapshot_dir: Path, files: List[Dict[str, object]]) -> None:
+    tmp = snapshot_dir / (STORAGE_MANIFEST + ".tmp")
+    payload = {
+        "version": 1,
+        "created": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "files": sorted(files, key=lambda entry: str(entry["path"])),
+    }
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as handle:
+        json.dump(payload, handle, separators=(",", ":"))
+    os.replace(tmp, snapshot_dir / STORAGE_MANIFEST)
+
+
+def _latest_storage_snapshot(backup_dir: Path, exclude: Path | None = None) -> Path | None:
+    """Newest backup directory with status ok and a storage manifest, if any."""
+    if not backup_dir.exists():
+        return None
+    for entry in sorted(backup_dir.iterdir(), reverse=True):
+        if not entry.is_dir() or entry == exclude:
+            continue
+        try:
+            manifest = json.loads((entry / "manifest.json").read_text())
+        except (OSError, ValueError):
+            continue
+        if manifest.get("status") == "ok" and (entry / STORAGE_MANIFEST).exists():
+            return entry
+    return None
+
+
+def _snapshot_storage(storage_root: Path, target_dir: Path, previous: Path | None) -> SnapshotStats:
+    """
+    Write an incremental snapshot of storage_root into target_dir/storage.
+
+    Unchanged files (same size and mtime as in `previous`) are hardlinked from
+    the previous snapshot and keep its recorded sha256. Everything else is
+    copied, re-read and compared against the hash computed while copying.
+    """
+    if not storage_root.exists():
+        raise RuntimeError(f"storage root not found: {storage_root}")
+    if not storage_root.is_dir():
+        raise RuntimeError(f"storage root is not a directory: {storage_root}")
+    dest_root = target_dir / STORAGE_SNAPSHOT_DIR
+    dest_root.mkdir(parents=True, exist_ok=True)
+    stats = SnapshotStats(previous=previous.name if previous else "")
+    prev_files = _load_storage_manifest(previous) if previous else {}
+    prev_root = previous / STORAGE_SNAPSHOT_DIR if previous else None
+    by_hash: Dict[str, Path] = {}
+    files: List[Dict[str, object]] = []
+    made_dirs = {dest_root}
+    for rel, st in _iter_storage_files(storage_root):
+        if st is None:
+            stats.skipped += 1
+            continue
+        dest = dest_root / rel
+        if dest.parent not in made_dirs:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            made_dirs.add(dest.parent)
+        old = prev_files.get(rel)
+        if (
+            old is not None
+            and prev_root is not None
+            and old["size"] == st.st_size
+            and old["mtime_ns"] == st.st_mtime_ns
+            and _link(prev_root / rel, dest, st.st_size)
+        ):
+            digest, size = str(old["sha256"]), st.st_size
+            stats.linked += 1
+        else:
+            try:
+                digest, size = _copy_with_hash(storage_root / rel, dest, st.st_mtime_ns)
+            except FileNotFoundError:
+                # Deleted between listing and copy (e.g. by the storage GC).
+                stats.skipped += 1
+                continue
+            if _sha256_file(dest) != digest:
+                raise RuntimeError(f"snapshot verification failed for {rel}")
+            stats.copied += 1
+            stats.bytes_copied += size
+            known = by_hash.get(digest)
+            if known is not None and size and _link(known, dest, size, replace=True):
+                stats.deduplicated += 1
+        by_hash.setdefault(digest, dest)
+        stats.files += 1
+        stats.bytes_total += size
+        files.append({"path": rel, "size": size, "mtime_ns": st.st_mtime_ns, "sha256": digest})
+    _write_storage_manifest(target_dir, files)
+    return stats
+
+
+def _snapshot_path(root: Path, rel: str) -> Path:
+    """Join a manifest path to root, rejecting absolute paths and `..` segments."""
+    parts = Path(rel).parts
+    if not parts or Path(rel).is_absolute() or ".." in parts:
+        raise RuntimeError(f"invalid path in storage manifest: {rel!r}")
+    return root.joinpath(*parts)
+
+
+def verify_storage_snapshot(snapshot_dir: Path) -> Dict[str, int]:
+    """Re-hash every file of a snapshot; raise RuntimeError listing mismatches."""
+    files = _load_storage_manifest(snapshot_dir)
+    root = snapshot_dir / STORAGE_SNAPSHOT_DIR
+    problems: List[str] = []
+    total = 0
+    for rel, entry in files.items():
+        path = _snapshot_path(root, rel)
+        try:
+            ok = path.stat().st_size == entry["size"] and _sha256_file(path) == entry["sha256"]
+        except OSError:
+            problems.append(f"missing {rel}")
+            continue
+        if not ok:
+            problems.append(f"mismatch {rel}")
+        total += int(entry["size"])  # type: ignore[arg-type]
+    if problems:
+        raise RuntimeError(f"{len(problems)} invalid file(s) in {snapshot_dir.name}: {', '.join(problems[:5])}")
+    return {"files": len(files), "bytes": total}
+
+
+def restore_storage_snapshot(snapshot_dir: Path, dest_root: Path) -> Dict[str, int]:
+    """
+    Restore a snapshot into dest_root (full tree, original mtimes).
+
+    Every restored file is hashed while copying and must match the manifest.
+    """
+    files = _load_storage_manifest(snapshot_dir)
+    root = snapshot_dir / STORAGE_SNAPSHOT_DIR
+    total = 0
+    for rel, entry in sorted(files.items()):
+        target = _snapshot_path(dest_root, rel)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        digest, size = _copy_with_hash(_snapshot_path(root, rel), target, int(entry["mtime_ns"]))  # type: ignore[arg-type]
+        if digest != entry["sha256"]:
+            raise RuntimeError(f"restore verification failed for {rel}")
+        total += size
+    return {"files": len(files), "bytes": total}
+
+
+def _write_manifest(target_dir: Path, status: str, extra: Dict[str, object]) -> None:
     manifest = {
         "status": status,
         "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(),
@@ -205,12 +589,32 @@ def main() -> int:
     """Entry point for cron: backs up Supabase DB, Keycloak DB, and storage buckets. Caller must have read access and write perms to BACKUP_DIR."""
     parser = argparse.ArgumentParser(description="Daily backup for Supabase DB, storage buckets, and Keycloak DB.")
     parser.add_argument("--once", action="store_true", help="Run once and exit (default behavior).")
+    parser.add_argument("--verify-storage", metavar="SNAPSHOT", help="Re-hash a storage snapshot against its manifest and exit.")
+    parser.add_argument("--restore-storage", metavar="SNAPSHOT", help="Restore a storage snapshot (requires --restore-to) and exit.")
+    parser.add_argument("--restore-to", metavar="DIR", help="Destination directory for --restore-storage.")
     args = parser.parse_args()
-    _ = args  # currently unused; reserved for future scheduling flags
+
+    if args.verify_storage or args.restore_storage:
+        try:
+            if args.verify_storage:
+                report = verify_storage_snapshot(Path(args.verify_storage))
+            elif not args.restore_to:
+                raise RuntimeError("--restore-storage requires --restore-to")
+            else:
+                report = restore_storage_snapshot(Path(args.restore_storage), Path(args.restore_to))
+        except Exception as exc:  # noqa: BLE001
+            sys.stderr.write(f"storage snapshot check failed: {exc}\n")
+            return 1
+        print(json.dumps(report))
+        return 0
 
     try:
         env_required = _require_env(["KC_DB_URL", "SUPABASE_STORAGE_ROOT", "BACKUP_DIR"])
         db_uri = _select_supabase_uri()
+        storage_mode = os.environ.get("BACKUP_STORAGE_MODE", "snapshot").strip().lower() or "snapshot"
+        if storage_mode not in STORAGE_MODES:
+            raise SystemExit(f"Invalid BACKUP_STORAGE_MODE: {storage_mode} (expected one of {', '.join(STORAGE_MODES)})")
+        settings = _read_dump_settings()
     except SystemExit as exc:
         sys.stderr.write(str(exc) + "\n")
         return 1
@@ -225,24 +629,47 @@ def main() -> int:
     kc_uri, kc_env = _normalize_pg_uri(env_required["KC_DB_URL"], kc_user, kc_password)
     supabase_uri, supabase_env = _normalize_pg_uri(db_uri)
 
-    pg_timeout = int(os.environ.get("BACKUP_PG_TIMEOUT_SECONDS", "300"))
     now = dt.datetime.now(dt.timezone.utc)
+    started = time.monotonic()
+    phases: Dict[str, Dict[str, object]] = {}
     target_dir.mkdir(parents=True, exist_ok=True)
     try:
-        _run_pg_dump(_redact_uri(supabase_uri), target_dir / "supabase_db.sql.gz", timeout=pg_timeout, env=supabase_env)
-        _run_pg_dump(_redact_uri(kc_uri), target_dir / "keycloak_db.sql.gz", timeout=pg_timeout, env=kc_env)
-        _archive_storage(storage_root, target_dir / "storage_buckets.tar.gz")
-        _write_manifest(
+        _dump_databases(
+            [("supabase_db", _redact_uri(supabase_uri), supabase_env), ("keycloak_db", _redact_uri(kc_uri), kc_env)],
             target_dir,
-            status="ok",
-            extra={"supabase_db": "supabase_db.sql.gz", "keycloak_db": "keycloak_db.sql.gz", "storage": "storage_buckets.tar.gz"},
+            settings,
+            phases,
         )
+        extra: Dict[str, object] = {
+            "supabase_db": phases["supabase_db"]["file"],
+            "keycloak_db": phases["keycloak_db"]["file"],
+            "db_format": settings.format,
+        }
+        storage_start = time.monotonic()
+        if storage_mode == "tar":
+            _archive_storage(storage_root, target_dir / "storage_buckets.tar.gz")
+            extra["storage"] = "storage_buckets.tar.gz"
+            storage_bytes = (target_dir / "storage_buckets.tar.gz").stat().st_size
+        else:
+            previous = _latest_storage_snapshot(backup_dir, exclude=target_dir)
+            stats = _snapshot_storage(storage_root, target_dir, previous)
+            extra.update(
+                {"storage": STORAGE_SNAPSHOT_DIR + "/", "storage_manifest": STORAGE_MANIFEST, "storage_stats": stats.as_dict()}
+            )
+            storage_bytes = stats.bytes_copied
+        phases["storage"] = {
+            "file": extra["storage"],
+            "seconds": round(time.monotonic() - storage_start, 3),
+            "bytes": storage_bytes,
+        }
+        extra.update({"phases": phases, "duration_seconds": round(time.monotonic() - started, 3)})
+        _write_manifest(target_dir, status="ok", extra=extra)
         _cleanup_retention(backup_dir, retention_days, now)
     except Exception as exc:  # noqa: BLE001
         _write_manifest(
             target_dir,
             status="failed",
-            extra={"error": str(exc)},
+            extra={"error": str(exc), "phases": phases, "duration_seconds": round(time.monotonic() - started, 3)},
         )
         sys.stderr.write(f"backup failed: {exc}\n")
         return 1
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nightly storage backup as full tar.gz vs. incremental snapshot.
+
+Why:
+    `scripts/backup_daily.py` used to tar+gzip the whole storage root every
+    night and keep seven full copies. Storage is now snapshotted: unchanged
+    files are hardlinked from the previous snapshot and only new or changed
+    files are copied (and re-hashed). This script builds a synthetic storage
+    tree (bucket/course/task/student layout, mostly incompressible payloads
+    like PNG/PDF uploads), then measures
+
+      - the legacy full tar.gz (time, archive size),
+      - a first (full) snapshot and a second one after changing a share of
+        the files (time, bytes copied, files linked),
+      - a full sha256 verification and a restore of the second snapshot.
+
+    "new disk" is the space a run adds to BACKUP_DIR: the whole archive for
+    tar.gz, only copied bytes plus the manifest for snapshots.
+
+Usage:
+    python scripts/bench/bench_backup_snapshots.py [--files 100000] [--change-pct 1] [--skip-tar]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+_spec = importlib.util.spec_from_file_location("backup_daily", REPO_ROOT / "scripts" / "backup_daily.py")
+assert _spec is not None and _spec.loader is not None
+backup = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = backup
+_spec.loader.exec_module(backup)
+
+
+def _build_tree(root: Path, files: int, rng: random.Random) -> list[Path]:
+    paths: list[Path] = []
+    for i in range(files):
+        if i % 10 == 0:
+            rel = f"materials/unit{i % 97}/section{i % 13}/m{i}/file.pdf"
+        else:
+            rel = f"submissions/course{i % 7}/task{i % 211}/student{i % 1499}/{i}-upload.png"
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(rng.randint(512, 8192)))
+        paths.append(path)
+    return paths
+
+
+def _mutate(paths: list[Path], pct: float, rng: random.Random) -> int:
+    count = max(1, int(len(paths) * pct / 100))
+    for path in rng.sample(paths, count):
+        path.write_bytes(rng.randbytes(rng.randint(512, 8192)))
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    return count
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _snapshot(storage: Path, backup_dir: Path, stamp: str):
+    target = backup_dir / stamp
+    target.mkdir(parents=True)
+    previous = backup._latest_storage_snapshot(backup_dir, exclude=target)
+    (stats, seconds) = _timed(backup._snapshot_storage, storage, target, previous)
+    backup._write_manifest(target, status="ok", extra={"storage_stats": stats.as_dict()})
+    return target, stats, seconds
+
+
+def _mb(n: float) -> str:
+    return f"{n / 1e6:9.1f} MB"
+
+
+def run(files: int, change_pct: float, skip_tar: bool, seed: int) -> None:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="bench-backup-") as tmp:
+        base = Path(tmp)
+        storage, backups = base / "storage", base / "backups"
+        paths, build_s = _timed(_build_tree, storage, files, rng)
+        total = sum(p.stat().st_size for p in paths)
+        print(f"synthetic tree: {files} files, {_mb(total).strip()} (built in {build_s:.1f}s)")
+        print(f"{'run':34} {'seconds':>8} {'copied':>13} {'linked':>8} {'new disk':>13}")
+
+        if not skip_tar:
+            archive = base / "storage_buckets.tar.gz"
+            _, tar_s = _timed(backup._archive_storage, storage, archive)
+            size = archive.stat().st_size
+            print(f"{'tar.gz (every night)':34} {tar_s:8.2f} {_mb(total)} {0:8d} {_mb(size)}")
+            archive.unlink()
+
+        first, s1, first_s = _snapshot(storage, backups, "2025-01-01_020000")
+        m1 = (first / backup.STORAGE_MANIFEST).stat().st_size
+        print(f"{'snapshot 1 (full)':34} {first_s:8.2f} {_mb(s1.bytes_copied)} {s1.linked:8d} {_mb(s1.bytes_copied + m1)}")
+
+        changed = _mutate(paths, change_pct, rng)
+        second, s2, second_s = _snapshot(storage, backups, "2025-01-02_020000")
+        m2 = (second / backup.STORAGE_MANIFEST).stat().st_size
+        label = f"snapshot 2 ({changed} changed)"
+        print(f"{label:34} {second_s:8.2f} {_mb(s2.bytes_copied)} {s2.linked:8d} {_mb(s2.bytes_copied + m2)}")
+
+        report, verify_s = _timed(backup.verify_storage_snapshot, second)
+        print(f"{'verify snapshot 2 (sha256)':34} {verify_s:8.2f} {_mb(report['bytes'])}")
+        restored = base / "restored"
+        report, restore_s = _timed(backup.restore_storage_snapshot, second, restored)
+        rate = report["bytes"] / 1e6 / max(restore_s, 1e-9)
+        print(f"{'restore snapshot 2':34} {restore_s:8.2f} {_mb(report['bytes'])}   ({rate:.0f} MB/s)")
+        shutil.rmtree(restored)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--change-pct", type=float, default=1.0)
+    parser.add_argument("--skip-tar", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.files, args.change_pct, args.skip_tar, args.seed)
+
+
+if __name__ == "__main__":
+    main_cli()
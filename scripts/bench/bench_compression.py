@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire for the main teacher and student pages.
+
+Why:
+    SSR pages and HTMX fragments used to leave FastAPI uncompressed. This script
+    seeds the in-memory teaching repo (courses, a unit with sections and
+    Markdown materials), then fetches the main pages once with
+    `Accept-Encoding: identity` and once with `gzip`, and reports the bytes
+    received plus the compression time per request. Runs in-process (no
+    network, no database); pages backed by Postgres render their empty states.
+
+Usage:
+    python scripts/bench/bench_compression.py [--sections 8] [--repeat 20]
+    RESPONSE_COMPRESSION_LEVEL=9 python scripts/bench/bench_compression.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+for p in (REPO_ROOT / "backend" / "web", REPO_ROOT / "backend", REPO_ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+import httpx  # noqa: E402
+
+import main  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+MATERIAL_MD = """## Brechung
+
+Licht ändert an der Grenzfläche zweier Medien seine Richtung. Das
+**Brechungsgesetz** lautet `n1 · sin(α) = n2 · sin(β)`.
+
+| Medium | n |
+|---|---|
+| Luft | 1,00 |
+| Wasser | 1,33 |
+| Glas | 1,50 |
+
+- Beobachte den Strahl im Wasserbecken.
+- Miss die Winkel und trage sie in die Tabelle ein.
+"""
+
+
+async def _seed(client: httpx.AsyncClient, sections: int) -> dict:
+    course = (await client.post("/api/teaching/courses", json={"title": "Physik 9b", "subject": "Physik"})).json()
+    for i in range(5):
+        await client.post("/api/teaching/courses", json={"title": f"Kurs {i}", "subject": "Chemie"})
+    unit = (await client.post("/api/teaching/units", json={"title": "Optik", "summary": "Licht und Brechung"})).json()
+    for s in range(sections):
+        section = (await client.post(f"/api/teaching/units/{unit['id']}/sections", json={"title": f"Abschnitt {s + 1}"})).json()
+        for m in range(3):
+            await client.post(
+                f"/api/teaching/units/{unit['id']}/sections/{section['id']}/materials",
+                json={"title": f"Material {m + 1}", "body_md": MATERIAL_MD},
+            )
+    await client.post(f"/api/teaching/courses/{course['id']}/modules", json={"unit_id": unit["id"]})
+    return {"course_id": course["id"], "unit_id": unit["id"]}
+
+
+async def _measure(client: httpx.AsyncClient, path: str, encoding: str, repeat: int) -> tuple[int, float]:
+    wire = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        resp = await client.get(path, headers={"Accept-Encoding": encoding})
+        resp.raise_for_status()
+        wire = resp.num_bytes_downloaded
+    return wire, (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(sections: int, repeat: int) -> None:
+    main.SESSION_STORE = SessionStore()
+    teacher = main.SESSION_STORE.create(sub="bench-teacher", name="Frau Bench", roles=["teacher"])
+    student = main.SESSION_STORE.create(sub="bench-student", name="Sam Bench", roles=["student"])
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"Origin": "http://test"}) as client:
+        client.cookies.set(main.SESSION_COOKIE_NAME, teacher.session_id)
+        ids = await _seed(client, sections)
+        teacher_pages = [
+            "/",
+            "/courses",
+            "/units",
+            f"/units/{ids['unit_id']}",
+            f"/courses/{ids['course_id']}/modules",
+            "/teaching/live",
+        ]
+        rows = [("teacher", p) for p in teacher_pages]
+        rows += [("student", p) for p in ("/", "/learning", f"/learning/courses/{ids['course_id']}")]
+
+        level = os.getenv("RESPONSE_COMPRESSION_LEVEL") or "6"
+        print(f"gzip level {level}, {repeat} requests per row (in-process, wire bytes = response body)")
+        print(f"{'role':8} {'path':58} {'identity':>9} {'gzip':>8} {'ratio':>6} {'Δms':>6}")
+        total_plain = total_gzip = 0
+        for role, path in rows:
+            session = teacher if role == "teacher" else student
+            client.cookies.set(main.SESSION_COOKIE_NAME, session.session_id)
+            plain, plain_ms = await _measure(client, path, "identity", repeat)
+            gz, gz_ms = await _measure(client, path, "gzip", repeat)
+            total_plain += plain
+            total_gzip += gz
+            shown = path if len(path) <= 58 else path[:55] + "..."
+            print(f"{role:8} {shown:58} {plain:9d} {gz:8d} {plain / max(gz, 1):5.1f}x {gz_ms - plain_ms:+6.2f}")
+        print(f"{'total':67} {total_plain:9d} {total_gzip:8d} {total_plain / max(total_gzip, 1):5.1f}x")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.sections, args.repeat))
+
+
+if __name__ == "__main__":
+    main_cli()
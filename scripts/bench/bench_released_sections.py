@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: round-trips and wall time for the student released-sections loader.
+
+Why:
+    `DBLearningRepo.list_released_sections[_by_unit]` used to query materials
+    and tasks once per section (2N+3 round-trips). They now use two set-based
+    helpers over `section_id = any(...)`. This script drives the repo against
+    an in-process fake connection that sleeps `--rtt-ms` per query, so the
+    numbers show the effect of round-trips independent of a live database.
+    The "per_section" column replays the previous query pattern.
+
+Usage:
+    python scripts/bench/bench_released_sections.py [--rtt-ms 1.0] [--sizes 5,20,50]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import types
+import uuid
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from backend.learning import repo_db  # noqa: E402
+
+
+class _Conn:
+    def __init__(self, section_ids: list[str], rtt: float) -> None:
+        self.section_ids = section_ids
+        self.rtt = rtt
+        self.queries = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return _Cursor(self)
+
+
+class _Cursor:
+    def __init__(self, conn: _Conn) -> None:
+        self.conn = conn
+        self.rows: list[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        text = str(sql)
+        if "set_config" in text:
+            # Sent in the same round-trip as the following statement by a
+            # pipelining driver; not counted as a separate round-trip here.
+            self.rows = []
+            return
+        self.conn.queries += 1
+        time.sleep(self.conn.rtt)
+        ids = self.conn.section_ids
+        if "exists" in text:
+            self.rows = [(True,)]
+        elif "get_released_sections_for_student" in text:
+            self.rows = [(sid, f"S{i}", i + 1, "u", "m") for i, sid in enumerate(ids)]
+        elif "materials" in text:
+            wanted = params[2] if isinstance(params[2], list) else [params[2]]
+            rows = []
+            for sid in wanted:
+                for k in range(3):
+                    row = (f"{sid}-m{k}", "T", "markdown", "body", None, None, None, None, None, None, k + 1, "c", "u")
+                    rows.append(row if "_sections" not in text else (sid, *row))
+            self.rows = rows
+        elif "tasks" in text:
+            wanted = params[2] if isinstance(params[2], list) else [params[2]]
+            rows = []
+            for sid in wanted:
+                row = (f"{sid}-t", "Do", ["A"], None, None, 3, 1, "c", "u")
+                rows.append(row if "_sections" not in text else (sid, *row))
+            self.rows = rows
+        else:
+            self.rows = []
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def _per_section(conn: _Conn, n_sections: int) -> None:
+    """Replay the previous pattern: membership, sections, then 2 queries per section."""
+    with conn.cursor() as cur:
+        cur.execute("select exists(...)")
+        cur.execute("select ... from public.get_released_sections_for_student(...)", ())
+        for sid in conn.section_ids[:n_sections]:
+            cur.execute("select ... from public.get_released_materials_for_student(%s, %s, %s)", ("s", "c", sid))
+            cur.fetchall()
+            cur.execute("select ... from public.get_released_tasks_for_student(%s, %s, %s)", ("s", "c", sid))
+            cur.fetchall()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--sizes", default="5,20,50")
+    args = parser.parse_args()
+    os.environ.setdefault("ALLOW_SERVICE_DSN_FOR_TESTING", "1")
+
+    print(f"{'sections':>8} | {'per_section q':>13} {'ms':>8} | {'bulk q':>6} {'ms':>8}")
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        ids = [str(uuid.uuid4()) for _ in range(n)]
+
+        legacy = _Conn(ids, args.rtt_ms / 1000)
+        t0 = time.perf_counter()
+        _per_section(legacy, n)
+        legacy_ms = (time.perf_counter() - t0) * 1000
+
+        bulk = _Conn(ids, args.rtt_ms / 1000)
+        repo_db.psycopg = types.SimpleNamespace(connect=lambda *a, **k: bulk)  # type: ignore[attr-defined]
+        repo = repo_db.DBLearningRepo(dsn="postgresql://gustav_limited:x@localhost/db")
+        t0 = time.perf_counter()
+        out = repo.list_released_sections(
+            student_sub="s", course_id=str(uuid.uuid4()), include_materials=True, include_tasks=True, limit=100, offset=0
+        )
+        bulk_ms = (time.perf_counter() - t0) * 1000
+        assert len(out) == n and all(len(e["materials"]) == 3 for e in out)
+
+        print(f"{n:>8} | {legacy.queries:>13} {legacy_ms:>8.1f} | {bulk.queries:>6} {bulk_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
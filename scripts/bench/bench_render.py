@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: server-side render time per page type.
+
+Why:
+    Every SSR response rebuilds the layout shell and the role navigation, and
+    the live matrix / history fragments are rebuilt on each HTMX poll. This
+    script times the pure rendering functions (no HTTP, no database) so
+    changes to `backend/web/components` can be compared in isolation.
+
+Page types:
+    layout-teacher / layout-student / layout-public   full document
+    fragment-teacher                                   HTMX swap (main + OOB sidebar)
+    live-matrix                                        students × tasks table
+    history                                            learner history accordion
+    course-list                                        teacher course list partial
+
+Usage:
+    python scripts/bench/bench_render.py [--iterations 2000] [--students 30] [--tasks 10]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+for p in (REPO_ROOT / "backend" / "web", REPO_ROOT / "backend", REPO_ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+import main  # type: ignore  # noqa: E402
+from components import Layout  # type: ignore  # noqa: E402
+from components.cards.task import HistoryEntry  # type: ignore  # noqa: E402
+
+TEACHER = {"sub": "t-1", "name": "Frau Lehrer", "role": "teacher", "roles": ["teacher"]}
+STUDENT = {"sub": "s-1", "name": "Sam Schüler", "role": "student", "roles": ["student"]}
+CONTENT = "<section class=\"card\"><h1>Kurse</h1>" + "<p>Inhalt &amp; mehr</p>" * 40 + "</section>"
+
+
+def _cases(students: int, tasks: int) -> dict[str, Callable[[], str]]:
+    course_id, unit_id = str(uuid.uuid4()), str(uuid.uuid4())
+    task_rows = [{"id": str(uuid.uuid4()), "position": i + 1} for i in range(tasks)]
+    matrix_rows = [
+        {
+            "student": {"sub": f"student-{s}", "name": f"Schüler {s}"},
+            "tasks": [{"task_id": t["id"], "has_submission": (s + i) % 3 == 0} for i, t in enumerate(task_rows)],
+        }
+        for s in range(students)
+    ]
+    history = [
+        HistoryEntry(
+            label=f"Versuch {i}",
+            timestamp="2025-12-10 09:00",
+            content_html="<p>Antwort</p>",
+            feedback_html="<section class=\"analysis-feedback\"><p>Gut gemacht</p></section>",
+            expanded=i == 0,
+            submission_id=str(uuid.uuid4()),
+        )
+        for i in range(20)
+    ]
+    courses = [{"id": str(uuid.uuid4()), "title": f"Kurs {i}", "subject": "Physik", "grade_level": "9"} for i in range(20)]
+    path = f"/courses/{course_id}/modules"
+    return {
+        "layout-teacher": lambda: Layout("Kurse", CONTENT, user=TEACHER, current_path=path).render(),
+        "layout-student": lambda: Layout("Meine Kurse", CONTENT, user=STUDENT, current_path="/learning").render(),
+        "layout-public": lambda: Layout("Über GUSTAV", CONTENT, user=None, current_path="/about").render(),
+        "fragment-teacher": lambda: Layout("Kurse", CONTENT, user=TEACHER, current_path=path).render_fragment(),
+        "live-matrix": lambda: main._render_live_matrix(course_id, unit_id, task_rows, matrix_rows),
+        "history": lambda: main._render_history_entries_html(history),
+        "course-list": lambda: main._render_course_list_partial(courses, 20, 0, True, csrf_token="csrf"),
+    }
+
+
+def _time(fn: Callable[[], str], iterations: int) -> tuple[float, float, int]:
+    fn()  # warm caches
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            out = fn()
+        samples.append((time.perf_counter() - start) / iterations * 1e6)
+    return statistics.median(samples), min(samples), len(out)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="subset of page types")
+    args = parser.parse_args()
+
+    cases = _cases(args.students, args.tasks)
+    print(f"{'page type':18} {'median µs':>10} {'best µs':>9} {'bytes':>8}")
+    for name, fn in cases.items():
+        if args.only and name not in args.only:
+            continue
+        median, best, size = _time(fn, args.iterations)
+        print(f"{name:18} {median:10.1f} {best:9.1f} {size:8d}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time-to-first-byte and time-to-interactive for the Live page.
+
+Why:
+    `teaching_unit_live_page` used to await titles, module lookup, sections
+    panel and summary one after another and only then return the whole page.
+    It now starts them concurrently and streams the layout shell first. This
+    script injects configurable latencies into those sub-queries (standing in
+    for database round trips on a big course) and measures, in-process:
+
+    - TTFB: first body chunk (head + navigation; the browser starts loading
+      CSS/JS here),
+    - TTI:  chunk containing the matrix (the page's interactive part),
+    - total: last chunk.
+
+    The baseline replays the previous sequential, buffered handler against the
+    same latencies.
+
+Usage:
+    python scripts/bench/bench_streaming.py [--titles-ms 30] [--module-ms 40]
+        [--panel-ms 60] [--summary-ms 150] [--runs 10]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+for p in (REPO_ROOT / "backend" / "web", REPO_ROOT / "backend", REPO_ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from fastapi import FastAPI, Request  # noqa: E402
+
+import main  # type: ignore  # noqa: E402
+from components import Layout  # type: ignore  # noqa: E402
+from components.base import Component  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+COURSE_ID = "11111111-1111-1111-1111-111111111111"
+UNIT_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def _install_latencies(args: argparse.Namespace, students: int, tasks: int) -> None:
+    task_rows = [{"id": f"task-{i}"} for i in range(tasks)]
+    rows = [
+        {"student": {"sub": f"s{s}", "name": f"Schüler {s}"}, "tasks": [{"task_id": t["id"], "has_submission": s % 2 == 0} for t in task_rows]}
+        for s in range(students)
+    ]
+
+    async def titles(request, course_id, unit_id):
+        await asyncio.sleep(args.titles_ms / 1000)
+        return "Physik 9b", "Optik"
+
+    async def module_id(request, course_id, unit_id):
+        await asyncio.sleep(args.module_ms / 1000)
+        return "module-1"
+
+    async def panel(request, course_id, unit_id, module_id):
+        await asyncio.sleep(args.panel_ms / 1000)
+        return '<section id="section-releases-panel" class="card"><h2>Abschnitte freigeben</h2></section>'
+
+    async def summary(request, course_id, unit_id):
+        await asyncio.sleep(args.summary_ms / 1000)
+        return task_rows, rows
+
+    main._live_unit_titles = titles
+    main._live_module_id = module_id
+    main._render_sections_release_panel = panel
+    main._live_summary = summary
+
+
+def _baseline_app() -> FastAPI:
+    """Previous implementation: sequential sub-queries, buffered response."""
+    app = FastAPI()
+
+    @app.get("/teaching/courses/{course_id}/units/{unit_id}/live")
+    async def live(request: Request, course_id: str, unit_id: str):
+        rec = main.SESSION_STORE.get(request.cookies.get(main.SESSION_COOKIE_NAME) or "")
+        user = {"sub": rec.sub, "name": rec.name, "role": "teacher", "roles": rec.roles}
+        course_title, unit_title = await main._live_unit_titles(request, course_id, unit_id)
+        module_id = await main._live_module_id(request, course_id, unit_id)
+        tasks, rows = await main._live_summary(request, course_id, unit_id)
+        matrix_html = main._render_live_matrix(course_id, unit_id, tasks, rows)
+        panel = await main._render_sections_release_panel(request, course_id, unit_id, module_id)
+        content = (
+            '<div class="container"><h1>Unterricht – Live</h1>'
+            f'<p class="text-muted">{Component.escape(course_title)} · {Component.escape(unit_title)}</p>'
+            f'{panel}<section class="card" id="live-section"><div id="live-status" class="text-muted">Letzte Aktualisierung: jetzt</div>{matrix_html}</section>'
+            '<div id="live-detail"></div></div>'
+        )
+        layout = Layout(title="Unterricht – Live", content=content, user=user, current_path=request.url.path)
+        return main._layout_response(request, layout, headers={"Cache-Control": "private, no-store"})
+
+    return app
+
+
+async def _measure(app, session_id: str) -> tuple[float, float, float]:
+    path = f"/teaching/courses/{COURSE_ID}/units/{UNIT_ID}/live"
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"host", b"test"), (b"cookie", f"{main.SESSION_COOKIE_NAME}={session_id}".encode())],
+        "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1), "root_path": "", "http_version": "1.1",
+    }
+    marks: dict[str, float] = {}
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    start = time.perf_counter()
+
+    async def send(message):
+        if message["type"] != "http.response.body" or not message.get("body"):
+            return
+        now = time.perf_counter() - start
+        marks.setdefault("ttfb", now)
+        if b"live-matrix" in message["body"]:
+            marks.setdefault("tti", now)
+        marks["total"] = now
+
+    await app(scope, receive, send)
+    return marks["ttfb"] * 1000, marks["tti"] * 1000, marks["total"] * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+    _install_latencies(args, args.students, args.tasks)
+    main.SESSION_STORE = SessionStore()
+    teacher = main.SESSION_STORE.create(sub="bench-teacher", name="Frau Bench", roles=["teacher"])
+    baseline = _baseline_app()
+    print(
+        f"latencies: titles {args.titles_ms} ms, module {args.module_ms} ms, panel {args.panel_ms} ms, "
+        f"summary {args.summary_ms} ms; {args.students}×{args.tasks} matrix; median of {args.runs} runs"
+    )
+    print(f"{'variant':26} {'TTFB ms':>8} {'TTI ms':>8} {'total ms':>9}")
+    for name, app in (("baseline (sequential)", baseline), ("streamed (concurrent)", main.app)):
+        results = [await _measure(app, teacher.session_id) for _ in range(args.runs)]
+        ttfb, tti, total = (statistics.median(col) for col in zip(*results))
+        print(f"{name:26} {ttfb:8.1f} {tti:8.1f} {total:9.1f}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles-ms", type=float, default=30)
+    parser.add_argument("--module-ms", type=float, default=40)
+    parser.add_argument("--panel-ms", type=float, default=60)
+    parser.add_argument("--summary-ms", type=float, default=150)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
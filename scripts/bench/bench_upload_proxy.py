@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and throughput of the internal upload proxy under load.
+
+Why:
+    `PUT /api/learning/internal/upload-proxy` used to read the whole body
+    into a bytearray, open a new httpx client per upload and hash the buffer
+    afterwards. With a class uploading phone photos at the same time, every
+    file sat in the web process at once. The proxy now streams chunks
+    upstream as they arrive and hashes on the fly via a pooled client.
+
+    This script sends N concurrent uploads of S MiB (in 64 KiB chunks, as an
+    ASGI server would deliver them) to both variants in-process. Storage is a
+    transport that consumes and discards the forwarded body. Reported: peak
+    Python heap (tracemalloc), wall time and throughput.
+
+Usage:
+    python scripts/bench/bench_upload_proxy.py [--uploads 60] [--size-mib 10]
+        [--chunk-kib 64]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urlencode
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+for p in (REPO_ROOT / "backend" / "web", REPO_ROOT / "backend", REPO_ROOT):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+os.environ.setdefault("ENABLE_STORAGE_UPLOAD_PROXY", "true")
+os.environ.setdefault("SUPABASE_URL", "https://supabase.local:54321")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import main  # type: ignore  # noqa: E402
+import routes.learning as learning  # type: ignore  # noqa: E402
+from identity_access.stores import SessionStore  # type: ignore  # noqa: E402
+
+TARGET = "https://supabase.local:54321/storage/v1/object/upload/sign/submissions/bench.jpg?token=t"
+
+
+class _DiscardingStorage(httpx.AsyncBaseTransport):
+    """Consumes the forwarded body chunk by chunk, like a remote Storage."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            await asyncio.sleep(0)
+        return httpx.Response(200, json={"Key": "bench"})
+
+
+def _baseline_app() -> FastAPI:
+    """Previous implementation: buffer, new client per upload, hash afterwards."""
+    app = FastAPI()
+
+    @app.put("/api/learning/internal/upload-proxy")
+    async def proxy(request: Request):
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer.extend(chunk)
+        body = bytes(buffer)
+        async with httpx.AsyncClient(transport=_DiscardingStorage()) as client:
+            await client.put(TARGET, content=body, headers={"Content-Type": "image/jpeg"})
+        return JSONResponse({"sha256": hashlib.sha256(body).hexdigest(), "size_bytes": len(body)})
+
+    return app
+
+
+async def _upload(app, session_id: str, size: int, chunk: bytes) -> int:
+    path = "/api/learning/internal/upload-proxy"
+    scope = {
+        "type": "http", "method": "PUT", "path": path, "raw_path": path.encode(),
+        "query_string": urlencode({"url": TARGET}).encode(),
+        "headers": [
+            (b"host", b"test"), (b"origin", b"http://test"), (b"content-type", b"image/jpeg"),
+            (b"content-length", str(size).encode()),
+            (b"cookie", f"{main.SESSION_COOKIE_NAME}={session_id}".encode()),
+        ],
+        "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1), "root_path": "", "http_version": "1.1",
+    }
+    remaining = size
+    status = 0
+
+    async def receive():
+        nonlocal remaining
+        if remaining <= 0:
+            await asyncio.Event().wait()
+        await asyncio.sleep(0)  # network pacing: let other uploads interleave
+        part = chunk[: min(len(chunk), remaining)]
+        remaining -= len(part)
+        return {"type": "http.request", "body": part, "more_body": remaining > 0}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def _measure(app, session_id: str, args: argparse.Namespace) -> tuple[float, float]:
+    size = int(args.size_mib * 1024 * 1024)
+    chunk = b"\xff" * (args.chunk_kib * 1024)
+    tracemalloc.start()
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(_upload(app, session_id, size, chunk) for _ in range(args.uploads)))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if set(statuses) != {200}:
+        raise SystemExit(f"unexpected statuses: {sorted(set(statuses))}")
+    return peak / (1024 * 1024), elapsed
+
+
+async def run(args: argparse.Namespace) -> None:
+    main.SESSION_STORE = SessionStore()
+    student = main.SESSION_STORE.create(sub="bench-student", name="S", roles=["student"])
+    learning.set_storage_adapter(learning.NullStorageAdapter())
+    pooled = httpx.AsyncClient(transport=_DiscardingStorage())
+    for route in main.app.routes:
+        if getattr(route, "path", "") == "/api/learning/internal/upload-proxy":
+            route.endpoint.__globals__["_upload_client"] = lambda: pooled
+            route.endpoint.__globals__["_max_upload_bytes"] = lambda: 1 << 40
+
+    total_mib = args.uploads * args.size_mib
+    print(f"{args.uploads} concurrent uploads × {args.size_mib} MiB ({total_mib:.0f} MiB), {args.chunk_kib} KiB chunks")
+    print(f"{'variant':22} {'peak heap MiB':>14} {'wall s':>8} {'MiB/s':>8}")
+    for name, app in (("baseline (buffered)", _baseline_app()), ("streaming (pooled)", main.app)):
+        peak, elapsed = await _measure(app, student.session_id, args)
+        print(f"{name:22} {peak:14.1f} {elapsed:8.2f} {total_mib / elapsed:8.1f}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=60)
+    parser.add_argument("--size-mib", type=float, default=10)
+    parser.add_argument("--chunk-kib", type=int, default=64)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
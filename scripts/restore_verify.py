@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Restore the latest backup into scratch targets and verify it against the RTO.
+
+Why:
+    `backup_daily.py` only records whether a backup run succeeded. This tool
+    proves that the newest backup can be restored and measures how long that
+    takes, because the recovery time objective (RTO) is what matters in an
+    incident.
+
+What it does:
+- Picks the newest `BACKUP_DIR/<timestamp>/` whose manifest says `ok`, or the
+  directory given by `--snapshot`.
+- Restores the Supabase and Keycloak dumps into fresh scratch databases
+  `restore_verify_<name>` on RESTORE_VERIFY_DB_URL and the storage backup into
+  a scratch directory. All three run concurrently, as in a real recovery.
+  Plain dumps are streamed into `psql`; directory dumps use
+  `pg_restore --jobs`.
+- Compares the row count of every table with the number of COPY rows in the
+  dump. A snapshot restore checks every file against its sha256 manifest.
+  Each `sha256` recorded in `learning_submissions` and `unit_materials` must
+  exist among the restored storage objects.
+- Reports seconds, MB/s (dump/storage bytes on disk) and rows/s per phase as
+  JSON on stdout and in `<snapshot>/restore_verify.json`.
+
+Exit codes:
+    0 verified and within RTO, 1 verification failed or error,
+    2 verified but the restore took longer than the RTO.
+
+Inputs (environment, flags override):
+- RESTORE_VERIFY_DB_URL (required): admin DSN of a scratch Postgres server
+  (ideally the Supabase Postgres image, so auth/storage schemas restore). Only
+  databases named `restore_verify_*` are created and dropped.
+- BACKUP_DIR: backup root (default: /backups).
+- RESTORE_VERIFY_RTO_SECONDS: recovery time objective (default: 3600).
+- RESTORE_VERIFY_JOBS: pg_restore workers for directory dumps (default: 2).
+- RESTORE_VERIFY_TIMEOUT_SECONDS: hard limit per restore step
+  (default: twice the RTO, at least 60 seconds).
+
+Usage:
+    python scripts/restore_verify.py [--snapshot DIR] [--scratch-dir DIR] [--keep]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import backup_daily  # noqa: E402
+
+SCRATCH_DB_PREFIX = "restore_verify_"
+DATABASES = ("supabase_db", "keycloak_db")
+_COPY_RE = re.compile(r"^COPY (.+?) (?:\(.*\) )?FROM stdin;$")
+_IGNORED_ERRORS_RE = re.compile(r"errors ignored on restore: (\d+)")
+_STORAGE_HASH_SQL = (
+    "select storage_key, sha256 from public.learning_submissions "
+    "where storage_key is not null and sha256 is not null "
+    "union all select storage_key, sha256 from public.unit_materials "
+    "where storage_key is not null and sha256 is not null"
+)
+
+
+class CopyRowCounter:
+    """Count data rows per table in the COPY blocks of a plain SQL dump."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[str, int] = {}
+        self._table: Optional[str] = None
+
+    def feed(self, line: bytes) -> None:
+        if self._table is not None:
+            if line.rstrip(b"\r\n") == b"\\.":
+                self._table = None
+            else:
+                self.rows[self._table] += 1
+        elif line.startswith(b"COPY "):
+            match = _COPY_RE.match(line.decode("utf-8", "replace").rstrip("\r\n"))
+            if match:
+                self._table = match.group(1)
+                self.rows.setdefault(self._table, 0)
+
+
+def _run(
+    cmd: List[str],
+    *,
+    env: Dict[str, str],
+    timeout: float,
+    stdin_lines: Optional[Iterable[bytes]] = None,
+    on_stdout_line: Optional[Callable[[bytes], None]] = None,
+) -> Tuple[int, str]:
+    """
+    Run cmd, optionally streaming stdin and/or consuming stdout line by line.
+
+    A watchdog kills the whole process group after `timeout` seconds (pg_restore
+    forks workers) and turns that into RuntimeError. Returns (returncode, stderr).
+    """
+    proc_env = os.environ.copy()
+    proc_env.update(env)
+    timed_out = threading.Event()
+    with subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if stdin_lines is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE if on_stdout_line is not None else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=proc_env,
+        start_new_session=True,
+    ) as proc:
+
+        def _kill() -> None:
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        stderr_chunks: List[bytes] = []
+        reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)  # type: ignore[union-attr]
+        reader.start()
+        watchdog = threading.Timer(timeout, _kill)
+        watchdog.start()
+        try:
+            if stdin_lines is not None:
+                try:
+                    for line in stdin_lines:
+                        proc.stdin.write(line)  # type: ignore[union-attr]
+                    proc.stdin.close()  # type: ignore[union-attr]
+                except (BrokenPipeError, ValueError):
+                    # The process died (or was killed); its stderr tells why.
+                    pass
+            if on_stdout_line is not None:
+                for line in proc.stdout:  # type: ignore[union-attr]
+                    on_stdout_line(line)
+            proc.wait()
+        finally:
+            watchdog.cancel()
+        reader.join(timeout=5)
+    if timed_out.is_set():
+        raise RuntimeError(f"{cmd[0]} timeout after {timeout:.0f}s")
+    return proc.returncode, b"".join(stderr_chunks).decode("utf-8", "replace")
+
+
+def _psql(uri: str, sql: str, *, env: Dict[str, str], timeout: float, stop_on_error: bool = True) -> Tuple[str, str]:
+    """Run SQL (read from stdin) with unaligned, tab-separated output; returns (stdout, stderr)."""
+    proc_env = os.environ.copy()
+    proc_env.update(env)
+    stop = "1" if stop_on_error else "0"
+    result = subprocess.run(
+        ["psql", "-X", "-q", "-At", "-F", "\t", "-v", f"ON_ERROR_STOP={stop}", "--dbname", uri],
+        input=sql,
+        capture_output=True,
+        text=True,
+        env=proc_env,
+        timeout=timeout,
+    )
+    if stop_on_error and result.returncode != 0:
+        raise RuntimeError(f"psql failed: {result.stderr.strip()}")
+    return result.stdout, result.stderr
+
+
+def _replace_db_name(uri: str, db_name: str) -> str:
+    parts = urlsplit(uri)
+    return urlunsplit(parts._replace(path="/" + db_name))
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _table_counts(uri: str, tables: Iterable[str], *, env: Dict[str, str], timeout: float) -> Dict[str, int]:
+    """Row count per table; tables that failed to restore are simply absent."""
+    script = "".join(f"select {_quote_literal(t)}, count(*) from {t};\n" for t in tables)
+    if not script:
+        return {}
+    out, _ = _psql(uri, script, env=env, timeout=timeout, stop_on_error=False)
+    counts: Dict[str, int] = {}
+    for line in out.splitlines():
+        name, _, value = line.rpartition("\t")
+        if name and value.isdigit():
+            counts[name] = int(value)
+    return counts
+
+
+def _count_errors(stderr: str) -> int:
+    match = _IGNORED_ERRORS_RE.search(stderr)
+    if match:
+        return int(match.group(1))
+    return sum(1 for line in stderr.splitlines() if "ERROR:" in line)
+
+
+def _iter_gzip_lines(path: Path, counter: CopyRowCounter) -> Iterable[bytes]:
+    with gzip.open(path, "rb") as handle:
+        for line in handle:
+            counter.feed(line)
+            yield line
+
+
+def restore_database(
+    name: str,
+    dump: Path,
+    db_format: str,
+    admin_uri: str,
+    *,
+    env: Dict[str, str],
+    jobs: int,
+    timeout: float,
+) -> Dict[str, object]:
+    """
+    Restore one dump into a fresh scratch database and compare row counts.
+
+    Expected rows come from the dump itself: the COPY blocks of a plain dump
+    are counted while streaming it into psql; for a directory dump they are
+    counted from `pg_restore --data-only` output before the timed restore.
+    """
+    db_uri = _replace_db_name(admin_uri, SCRATCH_DB_PREFIX + name)
+    db_name = SCRATCH_DB_PREFIX + name
+    _psql(admin_uri, f'drop database if exists "{db_name}";', env=env, timeout=timeout)
+    _psql(admin_uri, f'create database "{db_name}";', env=env, timeout=timeout)
+
+    counter = CopyRowCounter()
+    if db_format == "directory":
+        code, stderr = _run(["pg_restore", "--data-only", str(dump)], env=env, timeout=timeout, on_stdout_line=counter.feed)
+        if code != 0:
+            raise RuntimeError(f"pg_restore could not read {dump.name}: {stderr.strip()}")
+        start = time.monotonic()
+        code, stderr = _run(
+            ["pg_restore", f"--jobs={jobs}", "--no-owner", "--no-privileges", f"--dbname={db_uri}", str(dump)],
+            env=env,
+            timeout=timeout,
+        )
+    else:
+        start = time.monotonic()
+        code, stderr = _run(
+            ["psql", "-X", "-q", "-v", "ON_ERROR_STOP=0", "--dbname", db_uri],
+            env=env,
+            timeout=timeout,
+            stdin_lines=_iter_gzip_lines(dump, counter),
+        )
+    seconds = time.monotonic() - start
+    if code != 0 and db_format != "directory":
+        raise RuntimeError(f"psql restore of {dump.name} failed: {stderr.strip()[-500:]}")
+
+    counts = _table_counts(db_uri, counter.rows, env=env, timeout=timeout)
+    mismatched = sorted(t for t, rows in counter.rows.items() if counts.get(t) != rows)
+    rows = sum(counter.rows.values())
+    size = backup_daily._path_size(dump)
+    return {
+        "database": db_name,
+        "seconds": round(seconds, 3),
+        "bytes": size,
+        "tables": len(counter.rows),
+        "rows": rows,
+        "mb_per_s": round(size / 1e6 / max(seconds, 1e-6), 2),
+        "rows_per_s": round(rows / max(seconds, 1e-6), 1),
+        "sql_errors": _count_errors(stderr),
+        "mismatched_tables": [
+            {"table": t, "expected": counter.rows[t], "restored": counts.get(t)} for t in mismatched[:20]
+        ],
+    }
+
+
+def restore_storage(snapshot: Path, storage: str, dest: Path) -> Tuple[Dict[str, object], Set[str]]:
+    """
+    Restore the storage backup into dest; return the phase report and all sha256s.
+
+    Snapshot trees are verified per file while copying; a tar.gz backup has no
+    manifest, so its extracted files are hashed afterwards (outside the timing).
+    """
+    shutil.rmtree(dest, ignore_errors=True)  # leftovers would mask missing objects
+    start = time.monotonic()
+    if storage.endswith(".tar.gz"):
+        with tarfile.open(snapshot / storage, "r:gz") as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(dest, filter="data")
+            else:  # Python < 3.11.4
+                tar.extractall(dest)
+        seconds = time.monotonic() - start
+        files = [p for p in dest.rglob("*") if p.is_file()]
+        hashes = {backup_daily._sha256_file(p) for p in files}
+        report = {"files": len(files), "bytes": sum(p.stat().st_size for p in files)}
+    else:
+        report = backup_daily.restore_storage_snapshot(snapshot, dest)
+        seconds = time.monotonic() - start
+        hashes = {str(entry["sha256"]) for entry in backup_daily._load_storage_manifest(snapshot).values()}
+    size = int(report["bytes"])
+    return {
+        "seconds": round(seconds, 3),
+        "bytes": size,
+        "files": report["files"],
+        "mb_per_s": round(size / 1e6 / max(seconds, 1e-6), 2),
+    }, hashes
+
+
+def check_storage_hashes(rows: Iterable[Tuple[str, str]], hashes: Set[str]) -> Dict[str, object]:
+    """Every (storage_key, sha256) the database knows must exist in restored storage."""
+    checked = 0
+    missing: List[str] = []
+    for key, digest in rows:
+        checked += 1
+        if digest.lower() not in hashes:
+            missing.append(key)
+    return {"db_objects": checked, "missing": len(missing), "missing_sample": missing[:20]}
+
+
+def _latest_backup(backup_dir: Path) -> Path:
+    if backup_dir.exists():
+        for entry in sorted(backup_dir.iterdir(), reverse=True):
+            try:
+                manifest = json.loads((entry / "manifest.json").read_text())
+            except (OSError, ValueError):
+                continue
+            if manifest.get("status") == "ok":
+                return entry
+    raise RuntimeError(f"no successful backup found in {backup_dir}")
+
+
+def verify(
+    snapshot: Path,
+    admin_uri: str,
+    scratch_dir: Path,
+    *,
+    env: Dict[str, str],
+    rto_seconds: float,
+    jobs: int,
+    timeout: float,
+) -> Dict[str, object]:
+    """Restore `snapshot` concurrently (databases + storage) and collect all checks."""
+    manifest = json.loads((snapshot / "manifest.json").read_text())
+    if manifest.get("status") != "ok":
+        raise RuntimeError(f"backup {snapshot.name} has status {manifest.get('status')!r}")
+    db_format = str(manifest.get("db_format", "plain"))
+    storage = str(manifest.get("storage", backup_daily.STORAGE_SNAPSHOT_DIR + "/"))
+
+    phases: Dict[str, Dict[str, object]] = {}
+    problems: List[str] = []
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(DATABASES) + 1, thread_name_prefix="restore") as pool:
+        futures = {
+            name: pool.submit(
+                restore_database,
+                name,
+                snapshot / str(manifest[name]),
+                db_format,
+                admin_uri,
+                env=env,
+                jobs=jobs,
+                timeout=timeout,
+            )
+            for name in DATABASES
+        }
+        storage_future = pool.submit(restore_storage, snapshot, storage, scratch_dir / "storage")
+        for name, future in futures.items():
+            try:
+                phases[name] = future.result()
+            except Exception as exc:  # noqa: BLE001
+                problems.append(f"{name}: {exc}")
+        hashes: Set[str] = set()
+        try:
+            phases["storage"], hashes = storage_future.result()
+        except Exception as exc:  # noqa: BLE001
+            problems.append(f"storage: {exc}")
+    # Restores finish at different times; the RTO is about the slowest one.
+    restore_seconds = max((float(p["seconds"]) for p in phases.values()), default=time.monotonic() - started)
+
+    for name in DATABASES:
+        mismatched = phases.get(name, {}).get("mismatched_tables")
+        if mismatched:
+            problems.append(f"{name}: row counts differ for {len(mismatched)} table(s)")
+    if "supabase_db" in phases and "storage" in phases:
+        try:
+            out, _ = _psql(
+                _replace_db_name(admin_uri, SCRATCH_DB_PREFIX + "supabase_db"), _STORAGE_HASH_SQL, env=env, timeout=timeout
+            )
+            rows = [tuple(line.split("\t", 1)) for line in out.splitlines() if "\t" in line]
+            phases["storage"].update(check_storage_hashes(rows, hashes))  # type: ignore[arg-type]
+            if phases["storage"]["missing"]:
+                problems.append(f"storage: {phases['storage']['missing']} object(s) referenced by the database are missing")
+        except Exception as exc:  # noqa: BLE001
+            problems.append(f"storage check: {exc}")
+
+    rto_exceeded = restore_seconds > rto_seconds
+    return {
+        "snapshot": snapshot.name,
+        "status": "failed" if problems else ("rto_exceeded" if rto_exceeded else "ok"),
+        "db_format": db_format,
+        "restore_seconds": round(restore_seconds, 3),
+        "rto_seconds": rto_seconds,
+        "rto_exceeded": rto_exceeded,
+        "phases": phases,
+        "problems": problems,
+    }
+
+
+def _drop_scratch_databases(admin_uri: str, *, env: Dict[str, str], timeout: float) -> None:
+    for name in DATABASES:
+        try:
+            _psql(admin_uri, f'drop database if exists "{SCRATCH_DB_PREFIX + name}";', env=env, timeout=timeout)
+        except Exception as exc:  # noqa: BLE001
+            sys.stderr.write(f"could not drop scratch database {SCRATCH_DB_PREFIX + name}: {exc}\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Restore the latest backup into scratch targets and check it against the RTO.")
+    parser.add_argument("--backup-dir", default=os.environ.get("BACKUP_DIR", "/backups"))
+    parser.add_argument("--snapshot", help="Backup directory to verify (default: newest successful one).")
+    parser.add_argument("--scratch-dir", help="Directory for the restored storage (default: a temporary directory).")
+    parser.add_argument("--rto-seconds", type=float, default=float(os.environ.get("RESTORE_VERIFY_RTO_SECONDS", "3600")))
+    parser.add_argument("--jobs", type=int, default=int(os.environ.get("RESTORE_VERIFY_JOBS", "2")))
+    parser.add_argument("--timeout", type=float, default=float(os.environ.get("RESTORE_VERIFY_TIMEOUT_SECONDS", "0")))
+    parser.add_argument("--keep", action="store_true", help="Keep scratch databases and files for inspection.")
+    args = parser.parse_args()
+
+    raw_uri = os.environ.get("RESTORE_VERIFY_DB_URL")
+    if not raw_uri:
+        sys.stderr.write("Missing required environment variable: RESTORE_VERIFY_DB_URL\n")
+        return 1
+    admin_uri, env = backup_daily._normalize_pg_uri(raw_uri)
+    timeout = args.timeout or max(args.rto_seconds * 2, 60)
+    scratch_dir = Path(args.scratch_dir) if args.scratch_dir else Path(tempfile.mkdtemp(prefix="restore-verify-"))
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        snapshot = Path(args.snapshot) if args.snapshot else _latest_backup(Path(args.backup_dir))
+        report = verify(
+            snapshot, admin_uri, scratch_dir, env=env, rto_seconds=args.rto_seconds, jobs=args.jobs, timeout=timeout
+        )
+    except Exception as exc:  # noqa: BLE001
+        sys.stderr.write(f"RESTORE VERIFY FAILED: {exc}\n")
+        return 1
+    finally:
+        if not args.keep:
+            _drop_scratch_databases(admin_uri, env=env, timeout=max(timeout, 60))
+            shutil.rmtree(scratch_dir / "storage", ignore_errors=True)
+            if not args.scratch_dir:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    try:
+        (snapshot / "restore_verify.json").write_text(json.dumps(report, indent=2))
+    except OSError:
+        pass  # read-only backup mount; stdout carries the report
+    if report["problems"]:
+        sys.stderr.write("RESTORE VERIFY FAILED:\n" + "".join(f"  - {p}\n" for p in report["problems"]))  # type: ignore[union-attr]
+        return 1
+    if report["rto_exceeded"]:
+        sys.stderr.write(
+            f"RESTORE VERIFY FAILED: RTO exceeded, restore took {report['restore_seconds']}s "
+            f"> RTO {report['rto_seconds']:.0f}s\n"
+        )
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
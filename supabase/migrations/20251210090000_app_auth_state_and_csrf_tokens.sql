@@ -0,0 +1,48 @@
+-- Identity: shared OIDC state records and CSRF tokens for multi-worker web tiers
+-- Used by DBStateStore / DBCsrfTokenStore (AUTH_STATE_BACKEND=db). Same access
+-- model as public.app_sessions: service role only, no gustav_limited access.
+
+create table if not exists public.app_auth_states (
+    state text primary key,
+    code_verifier text not null,
+    redirect text,
+    nonce text,
+    expires_at timestamptz not null
+);
+
+create index if not exists idx_app_auth_states_expires_at on public.app_auth_states (expires_at);
+
+create table if not exists public.app_csrf_tokens (
+    session_id text primary key,
+    token text not null,
+    expires_at timestamptz not null
+);
+
+create index if not exists idx_app_csrf_tokens_expires_at on public.app_csrf_tokens (expires_at);
+
+alter table public.app_auth_states enable row level security;
+alter table public.app_csrf_tokens enable row level security;
+
+revoke all on public.app_auth_states from anon, authenticated;
+revoke all on public.app_csrf_tokens from anon, authenticated;
+
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'gustav_limited') then
+    execute 'revoke all on public.app_auth_states from gustav_limited';
+    execute 'revoke all on public.app_csrf_tokens from gustav_limited';
+  end if;
+end
+$$;
+
+drop policy if exists app_auth_states_service_rw on public.app_auth_states;
+create policy app_auth_states_service_rw on public.app_auth_states
+  for all to postgres
+  using (true)
+  with check (true);
+
+drop policy if exists app_csrf_tokens_service_rw on public.app_csrf_tokens;
+create policy app_csrf_tokens_service_rw on public.app_csrf_tokens
+  for all to postgres
+  using (true)
+  with check (true);
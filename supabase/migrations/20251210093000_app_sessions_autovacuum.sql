@@ -0,0 +1,14 @@
+-- Identity: vacuum tuning for expiring app_sessions rows
+--
+-- Lookups (`where session_id = $1 and expires_at > now()`) are served by the
+-- primary key. The maintenance sweep (identity_access.session_maintenance)
+-- walks expired rows oldest first via the existing `idx_app_sessions_expires_at`
+-- index; it locks rows by ctid, so it visits the heap regardless and a wider
+-- covering index would not save anything.
+
+-- Sessions churn constantly (insert on login, delete on logout/sweep). Vacuum
+-- earlier than the 20% default so dead tuples do not bloat the PK index.
+alter table public.app_sessions set (
+  autovacuum_vacuum_scale_factor = 0.02,
+  autovacuum_analyze_scale_factor = 0.05
+);
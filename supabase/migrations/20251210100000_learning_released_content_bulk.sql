@@ -0,0 +1,117 @@
+-- Learning helpers — set-based released materials/tasks for many sections.
+--
+-- Why: the student sections endpoints called get_released_materials_for_student
+-- and get_released_tasks_for_student once per section (2N+3 round-trips per
+-- unit page). These variants take an array of section ids and return the
+-- owning section_id with each row so the app can group in one pass.
+-- Semantics (membership, release visibility, ordering within a section) match
+-- the single-section helpers. SECURITY INVOKER to keep RLS effective.
+
+set check_function_bodies = off;
+
+create or replace function public.get_released_materials_for_student_sections(
+  p_student_sub text,
+  p_course_id uuid,
+  p_section_ids uuid[]
+)
+returns table (
+  section_id uuid,
+  id uuid,
+  title text,
+  kind text,
+  body_md text,
+  mime_type text,
+  size_bytes integer,
+  filename_original text,
+  storage_key text,
+  sha256 text,
+  alt_text text,
+  material_position integer,
+  created_at_iso text,
+  updated_at_iso text
+)
+language sql
+security invoker
+set search_path = public, pg_temp
+as $$
+  select
+    s.id as section_id,
+    m.id,
+    m.title,
+    m.kind,
+    m.body_md,
+    m.mime_type,
+    m.size_bytes,
+    m.filename_original,
+    m.storage_key,
+    m.sha256,
+    m.alt_text,
+    m.position as material_position,
+    to_char(m.created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"'),
+    to_char(m.updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"')
+  from public.course_memberships cm
+  join public.course_modules mod on mod.course_id = cm.course_id
+  join public.module_section_releases r on r.course_module_id = mod.id and r.section_id = any(p_section_ids)
+  join public.unit_sections s on s.id = r.section_id and s.unit_id = mod.unit_id
+  join public.unit_materials m on m.section_id = s.id
+  where cm.course_id = p_course_id
+    and cm.student_id = p_student_sub
+    and coalesce(r.visible, false) = true
+  order by s.id, m.position, m.id;
+$$;
+
+create or replace function public.get_released_tasks_for_student_sections(
+  p_student_sub text,
+  p_course_id uuid,
+  p_section_ids uuid[]
+)
+returns table (
+  section_id uuid,
+  id uuid,
+  instruction_md text,
+  criteria text[],
+  hints_md text,
+  due_at_iso text,
+  max_attempts integer,
+  task_position integer,
+  created_at_iso text,
+  updated_at_iso text
+)
+language sql
+security invoker
+set search_path = public, pg_temp
+as $$
+  select
+    s.id as section_id,
+    t.id,
+    t.instruction_md,
+    t.criteria,
+    t.hints_md,
+    case
+      when t.due_at is null then null
+      else to_char(t.due_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"')
+    end,
+    t.max_attempts,
+    t.position as task_position,
+    to_char(t.created_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"'),
+    to_char(t.updated_at at time zone 'utc', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"')
+  from public.course_memberships cm
+  join public.course_modules mod on mod.course_id = cm.course_id
+  join public.module_section_releases r
+    on r.course_module_id = mod.id
+   and r.section_id = any(p_section_ids)
+   and coalesce(r.visible, false) = true
+  join public.unit_sections s on s.id = r.section_id and s.unit_id = mod.unit_id
+  join public.unit_tasks t on t.section_id = s.id
+  where cm.course_id = p_course_id
+    and cm.student_id = p_student_sub
+  order by s.id, t.position, t.id;
+$$;
+
+revoke all on function public.get_released_materials_for_student_sections(text, uuid, uuid[]) from public;
+grant execute on function public.get_released_materials_for_student_sections(text, uuid, uuid[]) to gustav_limited;
+
+revoke all on function public.get_released_tasks_for_student_sections(text, uuid, uuid[]) from public;
+grant execute on function public.get_released_tasks_for_student_sections(text, uuid, uuid[]) to gustav_limited;
+
+set check_function_bodies = on;
@@ -0,0 +1,87 @@
+-- Learning: per-unit content version for shared snapshot caching.
+--
+-- Why: the student unit page renders the same released sections/materials/tasks
+-- for every member of a course. The web tier caches that structure keyed by
+-- (course, unit, content version). Triggers bump the version on every write to
+-- sections, materials, tasks, release toggles and course modules, regardless of
+-- which code path or worker performed the write. Course modules need their own
+-- trigger: deleting one cascades to its releases only after the module row is
+-- gone, so the release trigger can no longer resolve the unit.
+--
+-- Security: the table only holds (unit_id, version, updated_at); readable by
+-- gustav_limited, writable only through the SECURITY DEFINER trigger function.
+
+create table if not exists public.unit_content_versions (
+  unit_id uuid primary key references public.units(id) on delete cascade,
+  version bigint not null default 1,
+  updated_at timestamptz not null default now()
+);
+
+alter table public.unit_content_versions enable row level security;
+
+revoke all on public.unit_content_versions from anon, authenticated;
+
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'gustav_limited') then
+    execute 'revoke all on public.unit_content_versions from gustav_limited';
+    execute 'grant select on public.unit_content_versions to gustav_limited';
+  end if;
+end
+$$;
+
+drop policy if exists unit_content_versions_select_all on public.unit_content_versions;
+create policy unit_content_versions_select_all on public.unit_content_versions
+  for select using (true);
+
+create or replace function public.bump_unit_content_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_units uuid[];
+begin
+  -- OLD is null on INSERT and NEW on DELETE; updates that move a row to
+  -- another unit bump both units.
+  if tg_table_name = 'module_section_releases' then
+    select array_agg(cm.unit_id) into v_units
+      from public.course_modules cm
+     where cm.id in (old.course_module_id, new.course_module_id);
+  else
+    v_units := array[old.unit_id, new.unit_id];
+  end if;
+  insert into public.unit_content_versions as v (unit_id, version, updated_at)
+  select distinct u.id, 1, now() from public.units u where u.id = any(v_units)
+  on conflict (unit_id) do update set version = v.version + 1, updated_at = now();
+  return null;
+end;
+$$;
+
+revoke all on function public.bump_unit_content_version() from public;
+
+drop trigger if exists trg_unit_sections_content_version on public.unit_sections;
+create trigger trg_unit_sections_content_version
+after insert or update or delete on public.unit_sections
+for each row execute function public.bump_unit_content_version();
+
+drop trigger if exists trg_unit_materials_content_version on public.unit_materials;
+create trigger trg_unit_materials_content_version
+after insert or update or delete on public.unit_materials
+for each row execute function public.bump_unit_content_version();
+
+drop trigger if exists trg_unit_tasks_content_version on public.unit_tasks;
+create trigger trg_unit_tasks_content_version
+after insert or update or delete on public.unit_tasks
+for each row execute function public.bump_unit_content_version();
+
+drop trigger if exists trg_module_section_releases_content_version on public.module_section_releases;
+create trigger trg_module_section_releases_content_version
+after insert or update or delete on public.module_section_releases
+for each row execute function public.bump_unit_content_version();
+
+drop trigger if exists trg_course_modules_content_version on public.course_modules;
+create trigger trg_course_modules_content_version
+after insert or update or delete on public.course_modules
+for each row execute function public.bump_unit_content_version();
@@ -0,0 +1,109 @@
+-- Storage: content-addressed blobs for submission uploads.
+--
+-- Why: students re-upload identical files (same sha256), e.g. a worksheet PDF
+-- for every attempt. Each copy used to be stored and rendered again. The web
+-- tier now registers the first verified object per (student, sha256) as a
+-- blob; later submissions point at it and reuse its rendered pages.
+--
+-- Model:
+--   storage_blobs      one row per (owner_sub, sha256) with the canonical key,
+--                      derived page keys and a refcount kept by triggers.
+--   storage_blob_refs  one row per submission; cascades when the submission
+--                      is deleted, which drops the refcount.
+--
+-- GC (backend.storage.blobs.collect_unreferenced_blobs) deletes only rows with
+-- refcount 0 past a grace period whose key no submission names; the FK from
+-- storage_blob_refs (on delete restrict) rejects deleting a referenced blob.
+--
+-- Security: service role only (DBBlobRepo), same model as public.app_sessions.
+
+create table if not exists public.storage_blobs (
+  owner_sub text not null,
+  sha256 text not null check (sha256 ~ '^[0-9a-f]{64}$'),
+  bucket text not null,
+  object_key text not null,
+  size_bytes bigint not null check (size_bytes >= 0),
+  mime_type text not null,
+  derived_keys text[] not null default '{}',
+  refcount integer not null default 0 check (refcount >= 0),
+  created_at timestamptz not null default now(),
+  last_seen_at timestamptz not null default now(),
+  unreferenced_at timestamptz,
+  primary key (owner_sub, sha256),
+  unique (bucket, object_key)
+);
+
+create index if not exists idx_storage_blobs_collectable
+  on public.storage_blobs (last_seen_at)
+  where refcount = 0;
+
+create table if not exists public.storage_blob_refs (
+  submission_id uuid primary key references public.learning_submissions(id) on delete cascade,
+  owner_sub text not null,
+  sha256 text not null,
+  created_at timestamptz not null default now(),
+  foreign key (owner_sub, sha256) references public.storage_blobs(owner_sub, sha256) on delete restrict
+);
+
+create index if not exists idx_storage_blob_refs_blob
+  on public.storage_blob_refs (owner_sub, sha256);
+
+-- GC checks that no submission still names a blob's key.
+create index if not exists idx_learning_submissions_storage_key
+  on public.learning_submissions (storage_key)
+  where storage_key is not null;
+
+create or replace function public.storage_blob_refcount()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+begin
+  if tg_op = 'INSERT' then
+    update public.storage_blobs
+       set refcount = refcount + 1, unreferenced_at = null
+     where owner_sub = new.owner_sub and sha256 = new.sha256;
+  else
+    update public.storage_blobs
+       set refcount = greatest(refcount - 1, 0),
+           unreferenced_at = case when refcount <= 1 then now() else unreferenced_at end
+     where owner_sub = old.owner_sub and sha256 = old.sha256;
+  end if;
+  return null;
+end;
+$$;
+
+revoke all on function public.storage_blob_refcount() from public;
+
+drop trigger if exists trg_storage_blob_refs_refcount on public.storage_blob_refs;
+create trigger trg_storage_blob_refs_refcount
+after insert or delete on public.storage_blob_refs
+for each row execute function public.storage_blob_refcount();
+
+alter table public.storage_blobs enable row level security;
+alter table public.storage_blob_refs enable row level security;
+
+revoke all on public.storage_blobs from anon, authenticated;
+revoke all on public.storage_blob_refs from anon, authenticated;
+
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'gustav_limited') then
+    execute 'revoke all on public.storage_blobs from gustav_limited';
+    execute 'revoke all on public.storage_blob_refs from gustav_limited';
+  end if;
+end
+$$;
+
+drop policy if exists storage_blobs_service_rw on public.storage_blobs;
+create policy storage_blobs_service_rw on public.storage_blobs
+  for all to postgres
+  using (true)
+  with check (true);
+
+drop policy if exists storage_blob_refs_service_rw on public.storage_blob_refs;
+create policy storage_blob_refs_service_rw on public.storage_blob_refs
+  for all to postgres
+  using (true)
+  with check (true);
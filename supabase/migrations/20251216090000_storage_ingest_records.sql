@@ -0,0 +1,41 @@
+-- Storage: verified-ingest ledger shared by all web workers.
+--
+-- Why: the upload proxy, the dev stub and resumable uploads hash the bytes
+-- while streaming them. Submission finalization trusts that hash instead of a
+-- Storage HEAD/re-download, but it usually runs on a different worker than
+-- the upload. A process-local ledger therefore mostly missed; this table is
+-- read by DBIngestLedger (INGEST_LEDGER_BACKEND=db, default SESSIONS_BACKEND).
+--
+-- Rows are short-lived (INGEST_LEDGER_TTL_SECONDS); expired rows are ignored
+-- on lookup and swept opportunistically by the writers.
+--
+-- Security: service role only, same model as public.app_sessions.
+
+create table if not exists public.storage_ingest_records (
+  storage_key text primary key,
+  sha256 text not null check (sha256 ~ '^[0-9a-f]{64}$'),
+  size_bytes bigint not null check (size_bytes >= 0),
+  subject text not null,
+  expires_at timestamptz not null
+);
+
+create index if not exists idx_storage_ingest_records_expires_at
+  on public.storage_ingest_records (expires_at);
+
+alter table public.storage_ingest_records enable row level security;
+
+revoke all on public.storage_ingest_records from anon, authenticated;
+
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'gustav_limited') then
+    execute 'revoke all on public.storage_ingest_records from gustav_limited';
+  end if;
+end
+$$;
+
+drop policy if exists storage_ingest_records_service_rw on public.storage_ingest_records;
+create policy storage_ingest_records_service_rw on public.storage_ingest_records
+  for all to postgres
+  using (true)
+  with check (true);
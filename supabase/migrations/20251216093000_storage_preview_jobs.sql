@@ -0,0 +1,37 @@
+-- Storage: queued preview derivation for submissions and file materials.
+--
+-- Why: rendering previews (PDF rasterization) ran as a background task inside
+-- the web worker and competed with request handling. The web tier now only
+-- inserts a job after responding; the learning worker derives the preview
+-- between analysis jobs (backend.storage.preview_jobs).
+--
+-- Jobs hold only (kind, storage_key, mime_type); bucket and preview key are
+-- derived from the kind by the worker. `visible_at` doubles as the lease:
+-- leasing moves it forward, so a crashed worker's job reappears.
+--
+-- Access: the web tier enqueues with the service DSN; the worker drains the
+-- queue with its app role via gustav_limited (like learning_submission_jobs).
+
+create table if not exists public.storage_preview_jobs (
+  id bigint generated always as identity primary key,
+  kind text not null check (kind in ('submission', 'material')),
+  storage_key text not null,
+  mime_type text not null,
+  attempts integer not null default 0 check (attempts >= 0),
+  visible_at timestamptz not null default now(),
+  created_at timestamptz not null default now(),
+  unique (kind, storage_key)
+);
+
+create index if not exists idx_storage_preview_jobs_visible_at
+  on public.storage_preview_jobs (visible_at);
+
+revoke all on public.storage_preview_jobs from anon, authenticated;
+
+do $$
+begin
+  if exists (select 1 from pg_roles where rolname = 'gustav_limited') then
+    execute 'grant insert, select, update, delete on public.storage_preview_jobs to gustav_limited';
+  end if;
+end
+$$;